@@ -1,4 +1,20 @@
 # Nuevos casos de uso para flujo de anuncios
-from .detect_ad_hashtags_use_case import DetectAdHashtagsUseCase
-from .map_campaign_course_use_case import MapCampaignCourseUseCase
-from .process_ad_flow_use_case import ProcessAdFlowUseCase
+# Se importan al primer acceso: importar un submódulo (p. ej. request_context)
+# no carga el flujo de anuncios ni, con él, la capa de base de datos
+_LAZY_EXPORTS = {
+    'DetectAdHashtagsUseCase': '.detect_ad_hashtags_use_case',
+    'MapCampaignCourseUseCase': '.map_campaign_course_use_case',
+    'ProcessAdFlowUseCase': '.process_ad_flow_use_case',
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -10,6 +10,8 @@ import logging
 from app.domain.entities.message import IncomingMessage, OutgoingMessage
 from app.templates.advisor_referral_templates import AdvisorReferralTemplates
 from app.infrastructure.twilio.client import TwilioWhatsAppClient
+from app.infrastructure.campaign.metrics_tracker import campaign_metrics
+from app.infrastructure.twilio.send_queue import SendLane
 from app.config.settings import settings
 from memory.lead_memory import LeadMemory
 
@@ -76,6 +78,7 @@ class AdvisorReferralUseCase:
         
         # Actualizar memoria del usuario
         self._update_user_memory(user_memory, referral_type, urgency_level)
+        await campaign_metrics.track_user_interaction(user_memory.user_id, 'advisor')
         
         # Enviar notificación al asesor
         advisor_notified = False
@@ -357,8 +360,8 @@ class AdvisorReferralUseCase:
                 body=advisor_message
             )
             
-            # Enviar mensaje
-            result = await self.twilio_client.send_message(outgoing_message)
+            # Enviar mensaje (carril de asesor: después de las respuestas a usuarios)
+            result = await self.twilio_client.send_message(outgoing_message, lane=SendLane.ADVISOR)
             
             if result.get('success', False):
                 logger.info(f"Asesor notificado exitosamente para lead {user_memory.user_id} - SID: {result.get('message_sid')}")
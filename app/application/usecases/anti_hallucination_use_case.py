@@ -6,7 +6,7 @@ and providing safe fallback responses when database information is insufficient.
 """
 
 import logging
-from typing import Dict, Optional, Any, List
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 import json
 import re
 
@@ -17,6 +17,13 @@ from prompts.anti_hallucination_prompts import get_anti_hallucination_prompt, ge
 
 logger = logging.getLogger(__name__)
 
+# Se envía cuando el stream se corta después de enviar parte de la respuesta
+STREAM_INTERRUPTED_MESSAGE = "Déjame confirmar el resto de la información y te escribo en un momento. 😊"
+
+
+class ChunkDeliveryError(Exception):
+    """Raised when ``on_chunk`` reports that a streamed chunk was not delivered."""
+
 class AntiHallucinationUseCase:
     """
     Prevents AI hallucination by validating responses and providing safe alternatives.
@@ -45,7 +52,8 @@ class AntiHallucinationUseCase:
         user_memory: Any,
         intent_analysis: Dict,
         course_info: Optional[Dict] = None,
-        course_detailed_info: Optional[Dict] = None
+        course_detailed_info: Optional[Dict] = None,
+        on_chunk: Optional[Callable[[str], Awaitable[Any]]] = None
     ) -> Dict[str, Any]:
         """
         Generates a safe, validated response that prevents hallucination.
@@ -56,6 +64,10 @@ class AntiHallucinationUseCase:
             intent_analysis: Intent analysis result
             course_info: Course information from database
             course_detailed_info: Detailed course info for OpenAI (name, description, etc.)
+            on_chunk: Optional async callback. When given, verified responses are
+                streamed: each paragraph chunk is validated and handed to the
+                callback before the rest is generated (``chunks_sent`` > 0).
+                The callback returns False when a chunk could not be delivered.
             
         Returns:
             Dict with safe response and validation metadata
@@ -66,14 +78,20 @@ class AntiHallucinationUseCase:
             
             # 2. Verificar disponibilidad de datos en BD
             # Combinar course_info y course_detailed_info para tener información completa
-            combined_course_info = course_info or {}
+            # Copia: course_info puede venir memoizado del contexto del mensaje
+            combined_course_info = dict(course_info or {})
             if course_detailed_info:
                 combined_course_info.update(course_detailed_info)
                 
             data_availability = await self._check_data_availability(combined_course_info, needs_specific_info)
             
             # 3. Generar respuesta según disponibilidad de datos
-            if data_availability['has_sufficient_data']:
+            if data_availability['has_sufficient_data'] and on_chunk:
+                # Streaming: cada fragmento se valida antes de enviarse
+                return await self._stream_verified_response(
+                    user_message, combined_course_info, course_info, data_availability, on_chunk
+                )
+            elif data_availability['has_sufficient_data']:
                 # Generar respuesta con datos verificados
                 response = await self._generate_verified_response(
                     user_message, user_memory, intent_analysis, combined_course_info
@@ -169,6 +187,111 @@ class AntiHallucinationUseCase:
         # Preparar contexto verificado
         verified_context = self._prepare_verified_context(course_info)
         
+        # Generar respuesta con OpenAI
+        response = await self.openai_client.chat_completion(
+            messages=self._build_verified_messages(user_message, verified_context),
+            model="gpt-4o-mini",
+            max_tokens=500,
+            temperature=0.3,  # Baja temperatura para respuestas más consistentes
+            call_site='anti_hallucination_verified'
+        )
+        
+        return {
+            'message': response['content'],
+            'generation_method': 'verified_data',
+            'verified_context_used': verified_context
+        }
+
+    async def _stream_verified_response(
+        self,
+        user_message: str,
+        combined_course_info: Dict,
+        course_info: Optional[Dict],
+        data_availability: Dict,
+        on_chunk: Callable[[str], Awaitable[Any]]
+    ) -> Dict[str, Any]:
+        """
+        Streams a verified response paragraph by paragraph.
+        
+        Each chunk goes through the same validation as a full response before
+        it is handed to ``on_chunk``. If a chunk fails validation the stream is
+        stopped and the corrected response is sent instead of the rest.
+        
+        If the stream fails, or ``on_chunk`` returns False, after some chunks
+        were delivered, a short continuation message is sent instead of the rest
+        and ``message`` holds only what was actually delivered. If it fails
+        before any chunk was delivered, the error propagates.
+        """
+        verified_context = self._prepare_verified_context(combined_course_info)
+        sent_chunks: List[str] = []
+        issues_count = 0
+        confidence_score = 1.0
+        corrected = False
+        interrupted = False
+        
+        stream = self.openai_client.chat_completion_stream(
+            messages=self._build_verified_messages(user_message, verified_context),
+            model="gpt-4o-mini",
+            max_tokens=500,
+            temperature=0.3,
+            call_site='anti_hallucination_verified'
+        )
+        try:
+            async for chunk in stream:
+                validation_result = await self.validate_response_use_case.validate_response(
+                    chunk, course_info, user_message
+                )
+                issues_count += len(validation_result.issues)
+                confidence_score = min(confidence_score, validation_result.confidence_score)
+                
+                if not validation_result.is_valid and validation_result.corrected_response:
+                    logger.warning(f"Fragmento corregido por validación, se detiene el stream. Issues: {validation_result.issues}")
+                    corrected = True
+                    await self._deliver_chunk(on_chunk, validation_result.corrected_response, sent_chunks)
+                    break
+                
+                await self._deliver_chunk(on_chunk, chunk, sent_chunks)
+        except Exception as e:
+            if not sent_chunks:
+                raise
+            logger.error(f"Stream interrumpido tras {len(sent_chunks)} fragmentos enviados: {e}")
+            interrupted = True
+            try:
+                await self._deliver_chunk(on_chunk, STREAM_INTERRUPTED_MESSAGE, sent_chunks)
+            except Exception as send_error:
+                logger.error(f"No se pudo enviar el aviso de continuación: {send_error}")
+        finally:
+            await stream.aclose()
+        
+        return {
+            'message': "\n\n".join(sent_chunks),
+            'generation_method': 'verified_data_stream_interrupted' if interrupted else 'verified_data_stream',
+            'verified_context_used': verified_context,
+            'validation_corrected': corrected,
+            'chunks_sent': len(sent_chunks),
+            'anti_hallucination_applied': True,
+            'validation_result': {
+                'is_valid': not corrected,
+                'confidence_score': confidence_score,
+                'issues_count': issues_count
+            },
+            'data_availability': data_availability
+        }
+
+    @staticmethod
+    async def _deliver_chunk(
+        on_chunk: Callable[[str], Awaitable[Any]],
+        chunk: str,
+        sent_chunks: List[str]
+    ) -> None:
+        """Hands a chunk to ``on_chunk`` and records it only if it was delivered."""
+        if await on_chunk(chunk) is False:
+            raise ChunkDeliveryError(f"Fragmento {len(sent_chunks) + 1} no entregado")
+        sent_chunks.append(chunk)
+
+    def _build_verified_messages(self, user_message: str, verified_context: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Builds the strict-validation messages used for verified responses"""
+        
         # Prompt con validación estricta
         system_prompt = f"""
         {get_anti_hallucination_prompt()}
@@ -183,22 +306,10 @@ class AntiHallucinationUseCase:
         4. Si faltan datos específicos solicitados, di "déjame consultar esa información específica"
         """
         
-        # Generar respuesta con OpenAI
-        response = await self.openai_client.chat_completion(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Usuario pregunta: {user_message}"}
-            ],
-            model="gpt-4o-mini",
-            max_tokens=500,
-            temperature=0.3  # Baja temperatura para respuestas más consistentes
-        )
-        
-        return {
-            'message': response,
-            'generation_method': 'verified_data',
-            'verified_context_used': verified_context
-        }
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Usuario pregunta: {user_message}"}
+        ]
 
     async def _generate_fallback_response(
         self,
@@ -11,6 +11,10 @@ from app.domain.entities.message import IncomingMessage, OutgoingMessage, Messag
 from app.application.usecases.query_course_information import QueryCourseInformationUseCase
 from app.application.usecases.manage_user_memory import ManageUserMemoryUseCase
 from memory.lead_memory import LeadMemory
+from app.infrastructure.media.media_registry import media_registry
+from app.infrastructure.media.static_media import static_media_catalog
+from app.infrastructure.twilio.message_batch import OutboundMessageBatch
+from app.infrastructure.twilio.send_queue import SendLane
 
 logger = logging.getLogger(__name__)
 
@@ -403,37 +407,31 @@ Al finalizar serás capaz de implementar soluciones de IA que generen ROI medibl
             
             # Crear mensaje principal con resumen del curso
             main_message = self._create_course_summary_message(course_info, user_memory)
+            follow_up_message = self._create_follow_up_message(course_info, user_memory)
             
-            # Enviar mensaje principal
-            outgoing_message = OutgoingMessage(
+            # Resumen, PDF, imagen y seguimiento salen en un solo lote: se preparan
+            # a la vez y se despachan en orden (cada uno tras la aceptación del anterior)
+            batch = OutboundMessageBatch(self.twilio_client, user_id)
+            batch.add(OutgoingMessage(
                 to_number=user_id,
                 body=main_message,
                 message_type=MessageType.TEXT
-            )
+            ), required=True)
+            batch.add(self._build_course_pdf_message(user_id, course_info), lane=SendLane.FOLLOW_UP)
+            batch.add(self._build_course_image_message(user_id, course_info), lane=SendLane.FOLLOW_UP)
+            batch.add(OutgoingMessage(
+                to_number=user_id,
+                body=follow_up_message,
+                message_type=MessageType.TEXT
+            ), lane=SendLane.FOLLOW_UP)
             
-            main_result = await self.twilio_client.send_message(outgoing_message)
+            batch_result = await batch.dispatch()
+            main_result, pdf_result, image_result, follow_up_result = (item.result for item in batch_result.items)
             
             if not main_result.get('success'):
                 logger.error(f"Error enviando mensaje principal: {main_result}")
                 return {'success': False, 'error': 'Error enviando mensaje'}
             
-            # Enviar PDF (simulado por ahora)
-            pdf_result = await self._send_course_pdf(user_id, course_info)
-            
-            # Enviar imagen (simulado por ahora)
-            image_result = await self._send_course_image(user_id, course_info)
-            
-            # Enviar mensaje de seguimiento
-            follow_up_message = self._create_follow_up_message(course_info, user_memory)
-            
-            follow_up_outgoing = OutgoingMessage(
-                to_number=user_id,
-                body=follow_up_message,
-                message_type=MessageType.TEXT
-            )
-            
-            follow_up_result = await self.twilio_client.send_message(follow_up_outgoing)
-            
             return {
                 'success': True,
                 'processed': True,
@@ -446,7 +444,8 @@ Al finalizar serás capaz de implementar soluciones de IA que generen ROI medibl
                     'pdf_sent': pdf_result.get('success', False),
                     'image_sent': image_result.get('success', False),
                     'follow_up_sent': follow_up_result.get('success', False)
-                }
+                },
+                'batch': batch_result.to_dict()
             }
             
         except Exception as e:
@@ -611,28 +610,31 @@ Al finalizar serás capaz de implementar soluciones de IA que generen ROI medibl
             logger.error(f"Error generando ROI corto: {e}")
             return ""
     
-    async def _send_course_pdf(self, user_id: str, course_info: Dict[str, Any]) -> Dict[str, Any]:
+    async def _build_course_pdf_message(self, user_id: str, course_info: Dict[str, Any]) -> OutgoingMessage:
         """
-        Envía el PDF del curso real desde la carpeta resources.
+        Construye el mensaje con el PDF del curso real desde la carpeta resources.
         
         Args:
             user_id: ID del usuario
             course_info: Información del curso
             
         Returns:
-            Resultado del envío
+            Mensaje con el PDF adjunto, o mensaje de texto alternativo
         """
         try:
             pdf_filename = course_info.get('pdf_resource', 'experto_ia_profesionales.pdf')
             
-            # Intentar usar ngrok si está disponible, sino fallback
+            # Preferir la URL pre-subida al blob store; si no hay, usar ngrok; sino fallback
             from app.config import settings
             ngrok_url = settings.ngrok_url
-            
-            if ngrok_url:
-                # Asegurar que no haya doble barra en la URL
-                base_url = ngrok_url.rstrip('/')
-                pdf_url = f"{base_url}/resources/course_materials/{pdf_filename}"
+            blob_url = await media_registry.get_url(f"course_materials/{pdf_filename}")
+            
+            if blob_url:
+                pdf_url = blob_url
+                logger.info(f"📄 Usando URL pre-subida para PDF: {pdf_url}")
+            elif ngrok_url:
+                # URL versionada por hash: Twilio y su CDN pueden cachearla sin revalidar
+                pdf_url = static_media_catalog.public_url(ngrok_url, f"course_materials/{pdf_filename}")
                 logger.info(f"📄 Usando URL ngrok para PDF: {pdf_url}")
             else:
                 pdf_url = None  # Forzar fallback si no hay ngrok
@@ -662,16 +664,15 @@ Te envío la guía detallada con toda la información que necesitas:
                     media_url=pdf_url
                 )
                 
-                result = await self.twilio_client.send_message(outgoing_message)
-                logger.info(f"📄 PDF real enviado: {pdf_filename} desde {pdf_url}")
+                logger.info(f"📄 PDF real preparado: {pdf_filename} desde {pdf_url}")
                 
-                return result
+                return outgoing_message
             else:
                 # Fallback: enviar solo mensaje de texto informativo
                 raise Exception("URL no disponible - usar fallback")
             
         except Exception as e:
-            logger.error(f"Error enviando PDF real: {e}")
+            logger.error(f"Error preparando PDF real: {e}")
             # Fallback: enviar mensaje de texto si falla el archivo
             fallback_message = f"""📄 **DOCUMENTO DEL CURSO**
 
@@ -688,30 +689,33 @@ Te enviaremos el documento por correo electrónico o puedes solicitarlo directam
                 message_type=MessageType.TEXT
             )
             
-            return await self.twilio_client.send_message(fallback_outgoing)
+            return fallback_outgoing
     
-    async def _send_course_image(self, user_id: str, course_info: Dict[str, Any]) -> Dict[str, Any]:
+    async def _build_course_image_message(self, user_id: str, course_info: Dict[str, Any]) -> OutgoingMessage:
         """
-        Envía la imagen del curso real desde la carpeta resources.
+        Construye el mensaje con la imagen del curso real desde la carpeta resources.
         
         Args:
             user_id: ID del usuario
             course_info: Información del curso
             
         Returns:
-            Resultado del envío
+            Mensaje con la imagen adjunta, o mensaje de texto alternativo
         """
         try:
             image_filename = course_info.get('image_resource', 'experto_ia_profesionales.jpg')
             
-            # Intentar usar ngrok si está disponible, sino fallback
+            # Preferir la URL pre-subida al blob store; si no hay, usar ngrok; sino fallback
             from app.config import settings
             ngrok_url = settings.ngrok_url
-            
-            if ngrok_url:
-                # Asegurar que no haya doble barra en la URL
-                base_url = ngrok_url.rstrip('/')
-                image_url = f"{base_url}/resources/course_materials/{image_filename}"
+            blob_url = await media_registry.get_url(f"course_materials/{image_filename}")
+            
+            if blob_url:
+                image_url = blob_url
+                logger.info(f"🖼️ Usando URL pre-subida para imagen: {image_url}")
+            elif ngrok_url:
+                # URL versionada por hash: Twilio y su CDN pueden cachearla sin revalidar
+                image_url = static_media_catalog.public_url(ngrok_url, f"course_materials/{image_filename}")
                 logger.info(f"🖼️ Usando URL ngrok para imagen: {image_url}")
             else:
                 image_url = None  # Forzar fallback si no hay ngrok
@@ -739,16 +743,15 @@ Esta imagen te muestra de un vistazo:
                     media_url=image_url
                 )
                 
-                result = await self.twilio_client.send_message(outgoing_message)
-                logger.info(f"🖼️ Imagen real enviada: {image_filename} desde {image_url}")
+                logger.info(f"🖼️ Imagen real preparada: {image_filename} desde {image_url}")
                 
-                return result
+                return outgoing_message
             else:
                 # Fallback: enviar solo mensaje de texto informativo
                 raise Exception("URL no disponible - usar fallback")
             
         except Exception as e:
-            logger.error(f"Error enviando imagen real: {e}")
+            logger.error(f"Error preparando imagen real: {e}")
             # Fallback: enviar mensaje de texto si falla la imagen
             fallback_message = f"""🖼️ **IMAGEN DEL CURSO**
 
@@ -769,7 +772,7 @@ Te enviaremos las imágenes por correo electrónico o las puedes ver directament
                 message_type=MessageType.TEXT
             )
             
-            return await self.twilio_client.send_message(fallback_outgoing)
+            return fallback_outgoing
     
     def _create_follow_up_message(
         self, 
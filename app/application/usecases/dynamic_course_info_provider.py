@@ -2,8 +2,10 @@
 Proveedor dinámico de información de cursos desde base de datos.
 Elimina la dependencia de datos hardcodeados.
 """
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import time
+from typing import Callable, Dict, Any, Optional, List, Tuple
 from uuid import UUID
 from datetime import datetime
 
@@ -13,52 +15,144 @@ from app.domain.entities.course import Course, CourseInfo
 logger = logging.getLogger(__name__)
 
 
+# Roles con ejemplos de ROI precalculados en el paquete del curso
+ROI_ROLE_KEYS = ('marketing_manager', 'operations_manager', 'ceo_founder')
+
+
 class DynamicCourseInfoProvider:
     """
     Proveedor centralizado de información de cursos desde la base de datos.
     Reemplaza todos los valores hardcodeados con datos reales de BD.
+    
+    El paquete del curso principal (datos, ROI por rol y formato para
+    templates) se construye una sola vez por versión del catálogo y se sirve
+    desde memoria. Cada ``cache_duration_seconds`` se revisa la fila del curso
+    (una consulta ligera): si no cambió, se sigue usando el mismo paquete;
+    sesiones y bonos se recargan como máximo cada ``catalog_max_age_seconds``.
+    
+    Quien guarde datos derivados del curso (p. ej. la caché de herramientas)
+    se registra con ``add_version_listener``: se le avisa con el id del curso
+    cuando cambia su versión, o con ``None`` cuando se invalida todo.
     """
     
     def __init__(self, course_repository: CourseRepository):
         self.course_repo = course_repository
-        self._cache = {}
-        self._cache_expiry = {}
-        self.cache_duration_seconds = 300  # 5 minutos de cache
+        self.cache_duration_seconds = 300  # 5 minutos entre revisiones de versión
+        self.catalog_max_age_seconds = 3600  # recarga completa (sesiones y bonos)
+        self._bundle: Optional[Dict[str, Any]] = None
+        self._bundle_version: Optional[Tuple] = None
+        self._bundle_built_at = 0.0
+        self._bundle_checked_at = 0.0
+        self._templates_view: Optional[Dict[str, Any]] = None
+        self._refresh_lock = asyncio.Lock()
+        self._version_listeners: List[Callable[[Optional[str]], None]] = []
+        self.cache_stats = {'hits': 0, 'revalidations': 0, 'rebuilds': 0, 'fallbacks': 0}
     
     async def get_primary_course_info(self) -> Dict[str, Any]:
         """
         Obtiene información del curso principal dinámicamente desde BD.
         
+        El diccionario retornado es compartido (se sirve desde caché):
+        no debe modificarse.
+        
         Returns:
             Diccionario con información completa del curso o datos de fallback
         """
+        if self._bundle is not None and time.monotonic() - self._bundle_checked_at < self.cache_duration_seconds:
+            self.cache_stats['hits'] += 1
+            return self._bundle
+        
+        async with self._refresh_lock:
+            # Otra corrutina pudo haber refrescado mientras esperábamos
+            if self._bundle is not None and time.monotonic() - self._bundle_checked_at < self.cache_duration_seconds:
+                self.cache_stats['hits'] += 1
+                return self._bundle
+            return await self._refresh_primary_course_info()
+    
+    def add_version_listener(self, listener: Callable[[Optional[str]], None]) -> None:
+        """
+        Registra una función a la que se avisa cuando cambia la versión del
+        catálogo. Recibe None: cualquier dato de curso en caché quedó viejo.
+        """
+        self._version_listeners.append(listener)
+    
+    def invalidate(self) -> None:
+        """Descarta el paquete en caché (p. ej. tras editar el catálogo)."""
+        self._bundle = None
+        self._bundle_version = None
+        self._templates_view = None
+        self._notify_version_change(None)
+    
+    def _notify_version_change(self, course_id: Optional[str]) -> None:
+        for listener in self._version_listeners:
+            try:
+                listener(course_id)
+            except Exception as e:
+                logger.error(f"❌ Error avisando cambio de versión del curso {course_id}: {e}")
+    
+    async def _refresh_primary_course_info(self) -> Dict[str, Any]:
+        """Revisa la versión del catálogo y reconstruye el paquete solo si cambió."""
         try:
-            # Obtener el primer curso activo de la BD
-            active_courses = await self.course_repo.get_active_courses(limit=1)
+            # Primer curso activo de la BD o, si no hay, cualquier curso
+            courses = await self.course_repo.get_active_courses(limit=1)
+            if not courses:
+                courses = await self.course_repo.get_all_courses(limit=1)
             
-            if active_courses:
-                course = active_courses[0]
-                course_info = await self.course_repo.get_course_complete_info(course.id_course)
+            if courses:
+                course = courses[0]
+                version = self._catalog_version(course)
+                now = time.monotonic()
+                
+                if (self._bundle is not None and version == self._bundle_version
+                        and now - self._bundle_built_at < self.catalog_max_age_seconds):
+                    self._bundle_checked_at = now
+                    self.cache_stats['revalidations'] += 1
+                    return self._bundle
                 
-                if course_info:
-                    return await self._build_complete_course_data(course_info)
-            
-            # Si no hay cursos activos, buscar cualquier curso
-            all_courses = await self.course_repo.get_all_courses(limit=1)
-            if all_courses:
-                course = all_courses[0]
                 course_info = await self.course_repo.get_course_complete_info(course.id_course)
+                if self._bundle_version is not None and version != self._bundle_version:
+                    # Los consumidores cachean por el código o nombre del curso del
+                    # usuario, no por el id de BD: se avisa un cambio global
+                    self._notify_version_change(None)
                 
                 if course_info:
-                    return await self._build_complete_course_data(course_info)
+                    bundle = await self._build_complete_course_data(course_info)
+                    bundle['roi_texts'] = {role: self._get_roi_text(role, bundle) for role in ROI_ROLE_KEYS}
+                    self._bundle = bundle
+                    self._bundle_version = version
+                    self._bundle_built_at = self._bundle_checked_at = now
+                    self._templates_view = None
+                    self.cache_stats['rebuilds'] += 1
+                    return bundle
             
             logger.warning("⚠️ No se encontraron cursos en BD, usando fallback")
+            self.cache_stats['fallbacks'] += 1
             return self._get_fallback_course_data()
             
         except Exception as e:
             logger.error(f"❌ Error obteniendo info de curso desde BD: {e}")
+            self.cache_stats['fallbacks'] += 1
             return self._get_fallback_course_data()
     
+    @staticmethod
+    def _catalog_version(course: Course) -> Tuple:
+        """Versión del curso: cambia si cambia cualquier campo de su fila."""
+        return tuple(sorted((key, str(value)) for key, value in course.model_dump().items()))
+    
+    def get_roi_text(self, role_key: str, course_data: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Texto de ROI para un rol; O(1) cuando el paquete tiene los textos precalculados.
+        
+        Args:
+            role_key: 'marketing_manager', 'operations_manager' o 'ceo_founder'
+            course_data: Paquete del curso (por defecto, el que está en caché)
+        """
+        course_data = course_data or self._bundle or self._get_fallback_course_data()
+        roi_texts = course_data.get('roi_texts') or {}
+        if role_key in roi_texts:
+            return roi_texts[role_key]
+        return self._get_roi_text(role_key, course_data)
+    
     async def _build_complete_course_data(self, course_info: CourseInfo) -> Dict[str, Any]:
         """
         Construye diccionario completo con información del curso desde BD.
@@ -257,9 +351,11 @@ class DynamicCourseInfoProvider:
         Optimizado para uso en WhatsApp templates.
         """
         course_data = await self.get_primary_course_info()
+        if course_data is self._bundle and self._templates_view is not None:
+            return self._templates_view
         
         # Formato optimizado para templates
-        return {
+        templates_view = {
             'name': course_data['name'],
             'price': course_data['price'],
             'price_text': course_data['price_formatted'],
@@ -269,12 +365,15 @@ class DynamicCourseInfoProvider:
             'session_count': course_data['session_count'],
             'duration_hours': course_data['total_duration_hours'],
             'duration_text': course_data['total_duration_formatted'],
-            'roi_marketing': self._get_roi_text('marketing_manager', course_data),
-            'roi_operations': self._get_roi_text('operations_manager', course_data),
-            'roi_ceo': self._get_roi_text('ceo_founder', course_data),
+            'roi_marketing': self.get_roi_text('marketing_manager', course_data),
+            'roi_operations': self.get_roi_text('operations_manager', course_data),
+            'roi_ceo': self.get_roi_text('ceo_founder', course_data),
             'bonds': course_data['bonds'][:3],  # Top 3 bonos
             'bonds_count': course_data['bonds_count']
         }
+        if course_data is self._bundle:
+            self._templates_view = templates_view
+        return templates_view
     
     def _get_roi_text(self, role_key: str, course_data: Dict[str, Any]) -> str:
         """Genera texto de ROI para un rol específico."""
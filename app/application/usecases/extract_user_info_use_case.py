@@ -8,10 +8,12 @@ to build detailed buyer persona profiles for enhanced personalization.
 import logging
 import json
 import re
+from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 
-from app.infrastructure.openai.client import OpenAIClient
+from app.config import settings
+from app.infrastructure.openai.client import OpenAIClient, clean_openai_json_response
 from memory.lead_memory import LeadMemory
 
 logger = logging.getLogger(__name__)
@@ -31,13 +33,104 @@ class UserInsights:
     buyer_persona_match: str = "unknown"  # lucia_copypro, marcos_multitask, etc.
     confidence_score: float = 0.0
 
+# Scalar insight fields merged into LeadMemory (replaced only by a more confident extraction)
+SCALAR_INSIGHT_FIELDS = [
+    'professional_level', 'company_size', 'industry_sector',
+    'technical_level', 'decision_making_power', 'buyer_persona_match'
+]
+
+# Maximum items kept per insight list after merging
+MAX_INSIGHT_LIST_ITEMS = 10
+
+
+def _parse_insights_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parses last_insights_update (ISO datetime or legacy date-only string)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class InsightRefreshPolicy:
+    """
+    Decides when user insights must be re-extracted.
+    
+    Stored confidence decays with age (half-life), so stale profiles are
+    refreshed even when no single turn changes them much. Nothing is
+    re-extracted unless there are new messages to analyze.
+    """
+    min_new_messages: int = 3
+    max_age_hours: float = 24.0
+    max_confidence_drop: float = 0.2
+    confidence_half_life_hours: float = 72.0
+
+    @classmethod
+    def from_settings(cls) -> 'InsightRefreshPolicy':
+        return cls(
+            min_new_messages=settings.insights_refresh_min_new_messages,
+            max_age_hours=settings.insights_refresh_max_age_hours,
+            max_confidence_drop=settings.insights_max_confidence_drop,
+            confidence_half_life_hours=settings.insights_confidence_half_life_hours
+        )
+
+    def age_hours(self, user_memory: LeadMemory, now: Optional[datetime] = None) -> Optional[float]:
+        updated_at = _parse_insights_timestamp(user_memory.last_insights_update)
+        if updated_at is None:
+            return None
+        return max(0.0, ((now or datetime.now()) - updated_at).total_seconds() / 3600)
+
+    def decayed_confidence(self, user_memory: LeadMemory, now: Optional[datetime] = None) -> float:
+        """Stored confidence after exponential decay by age"""
+        age = self.age_hours(user_memory, now)
+        if age is None:
+            return 0.0
+        return user_memory.insights_confidence * 0.5 ** (age / self.confidence_half_life_hours)
+
+    def new_message_count(self, user_memory: LeadMemory) -> int:
+        return max(0, user_memory.interaction_count - (user_memory.insights_message_count or 0))
+
+    def get_refresh_reason(self, user_memory: LeadMemory, now: Optional[datetime] = None) -> Optional[str]:
+        """
+        Returns why insights should be refreshed, or None if they are current.
+        
+        Args:
+            user_memory: User memory with insights metadata
+            now: Reference time (defaults to now)
+            
+        Returns:
+            'initial', 'unknown_persona', 'confidence_drop', 'message_count', 'age' or None
+        """
+        if _parse_insights_timestamp(user_memory.last_insights_update) is None:
+            return 'initial'
+        
+        new_messages = self.new_message_count(user_memory)
+        if new_messages == 0:
+            return None
+        
+        # Sin buyer persona aún: cada turno nuevo puede aportar (análisis incremental, barato)
+        if user_memory.buyer_persona_match == 'unknown':
+            return 'unknown_persona'
+        decayed = self.decayed_confidence(user_memory, now)
+        if user_memory.insights_confidence - decayed >= self.max_confidence_drop:
+            return 'confidence_drop'
+        if new_messages >= self.min_new_messages:
+            return 'message_count'
+        if self.age_hours(user_memory, now) >= self.max_age_hours:
+            return 'age'
+        return None
+
+
 class ExtractUserInfoUseCase:
     """
     Intelligently extracts and analyzes user information for personalization.
     """
     
-    def __init__(self, openai_client: OpenAIClient):
+    def __init__(self, openai_client: OpenAIClient, refresh_policy: Optional[InsightRefreshPolicy] = None):
         self.openai_client = openai_client
+        self.refresh_policy = refresh_policy or InsightRefreshPolicy.from_settings()
         
         # Buyer persona patterns for detection
         self.buyer_persona_patterns = {
@@ -93,27 +186,34 @@ class ExtractUserInfoUseCase:
     async def extract_insights_from_conversation(
         self, 
         user_memory: LeadMemory,
-        recent_messages: List[str] = None
+        recent_messages: List[str] = None,
+        incremental: bool = True
     ) -> UserInsights:
         """
-        Extracts comprehensive user insights from conversation history.
+        Extracts user insights from the conversation.
+        
+        In incremental mode only the turns received since the last extraction
+        are analyzed; the already known profile is passed along so the model
+        refines it instead of re-reading the whole history.
         
         Args:
             user_memory: Current user memory with conversation history
             recent_messages: Recent messages for immediate analysis
+            incremental: Analyze only new turns (False = full history)
             
         Returns:
             UserInsights: Extracted insights about the user
         """
         try:
-            # Combine all available text for analysis
-            conversation_text = self._prepare_conversation_text(user_memory, recent_messages)
+            since = _parse_insights_timestamp(user_memory.last_insights_update) if incremental else None
+            conversation_text = self._prepare_conversation_text(user_memory, recent_messages, since)
             
             if not conversation_text.strip():
                 return UserInsights()
             
             # Use AI for intelligent extraction
-            insights = await self._ai_extract_insights(conversation_text, user_memory)
+            known_profile = self._describe_known_profile(user_memory) if since else ""
+            insights = await self._ai_extract_insights(conversation_text, user_memory, known_profile)
             
             # Enhance with pattern-based detection
             enhanced_insights = self._enhance_with_patterns(insights, conversation_text)
@@ -121,7 +221,11 @@ class ExtractUserInfoUseCase:
             # Calculate confidence score
             enhanced_insights.confidence_score = self._calculate_confidence_score(enhanced_insights, conversation_text)
             
-            logger.info(f"Extracted insights for user {user_memory.user_id}: persona={enhanced_insights.buyer_persona_match}, confidence={enhanced_insights.confidence_score:.2f}")
+            logger.info(
+                f"Extracted insights for user {user_memory.user_id} "
+                f"({'incremental' if since else 'full'}, {len(conversation_text)} chars): "
+                f"persona={enhanced_insights.buyer_persona_match}, confidence={enhanced_insights.confidence_score:.2f}"
+            )
             
             return enhanced_insights
             
@@ -129,8 +233,13 @@ class ExtractUserInfoUseCase:
             logger.error(f"Error extracting user insights: {e}")
             return UserInsights()
 
-    def _prepare_conversation_text(self, user_memory: LeadMemory, recent_messages: List[str] = None) -> str:
-        """Prepares conversation text for analysis"""
+    def _prepare_conversation_text(
+        self,
+        user_memory: LeadMemory,
+        recent_messages: List[str] = None,
+        since: Optional[datetime] = None
+    ) -> str:
+        """Prepares conversation text for analysis (only turns after ``since`` when given)"""
         text_parts = []
         
         # Add basic user info
@@ -140,30 +249,64 @@ class ExtractUserInfoUseCase:
             text_parts.append(f"Rol: {user_memory.role}")
         
         # Add conversation history
+        history_messages = []
         if hasattr(user_memory, 'conversation_history') and user_memory.conversation_history:
             for msg in user_memory.conversation_history[-10:]:  # Last 10 messages
-                if isinstance(msg, dict) and msg.get('user_message'):
-                    text_parts.append(msg['user_message'])
+                if isinstance(msg, dict) and msg.get('user_message') and self._is_new_turn(msg, since):
+                    history_messages.append(msg['user_message'])
+        if user_memory.message_history:
+            for msg in user_memory.message_history[-10:]:
+                if isinstance(msg, dict) and msg.get('content') and self._is_new_turn(msg, since):
+                    history_messages.append(msg['content'])
+        text_parts.extend(history_messages)
         
-        # Add recent messages
+        # Add recent messages not already included
         if recent_messages:
-            text_parts.extend(recent_messages[-5:])  # Last 5 recent messages
+            text_parts.extend(msg for msg in recent_messages[-5:] if msg not in history_messages)
         
-        # Add existing insights
-        if hasattr(user_memory, 'interests') and user_memory.interests:
-            text_parts.append(f"Intereses: {', '.join(user_memory.interests)}")
-        if hasattr(user_memory, 'pain_points') and user_memory.pain_points:
-            text_parts.append(f"Pain points: {', '.join(user_memory.pain_points)}")
+        # Add existing insights (already summarized in the known profile in incremental mode)
+        if since is None:
+            if hasattr(user_memory, 'interests') and user_memory.interests:
+                text_parts.append(f"Intereses: {', '.join(user_memory.interests)}")
+            if hasattr(user_memory, 'pain_points') and user_memory.pain_points:
+                text_parts.append(f"Pain points: {', '.join(user_memory.pain_points)}")
         
         return " ".join(text_parts)
 
-    async def _ai_extract_insights(self, conversation_text: str, user_memory: LeadMemory) -> UserInsights:
+    def _is_new_turn(self, message: Dict[str, Any], since: Optional[datetime]) -> bool:
+        """True if the message was received after the last extraction"""
+        if since is None:
+            return True
+        timestamp = _parse_insights_timestamp(message.get('timestamp'))
+        return timestamp is None or timestamp > since
+
+    def _describe_known_profile(self, user_memory: LeadMemory) -> str:
+        """Summarizes already extracted insights for incremental extraction"""
+        known = [
+            f"{field}: {getattr(user_memory, field)}"
+            for field in SCALAR_INSIGHT_FIELDS
+            if getattr(user_memory, field, 'unknown') != 'unknown'
+        ]
+        if user_memory.pain_points:
+            known.append(f"pain_points: {', '.join(user_memory.pain_points[:5])}")
+        if user_memory.urgency_signals:
+            known.append(f"urgency_signals: {', '.join(user_memory.urgency_signals[:3])}")
+        return "; ".join(known)
+
+    async def _ai_extract_insights(self, conversation_text: str, user_memory: LeadMemory, known_profile: str = "") -> UserInsights:
         """Uses AI to extract insights from conversation"""
         
+        known_profile_section = ""
+        if known_profile:
+            known_profile_section = f"""
+PERFIL YA CONOCIDO (actualízalo solo si los mensajes nuevos lo contradicen o precisan):
+{known_profile}
+"""
+        
         extraction_prompt = f"""
 Analiza la siguiente conversación de un usuario interesado en cursos de IA para empresas PyME y extrae información clave para personalización.
-
-CONVERSACIÓN:
+{known_profile_section}
+CONVERSACIÓN{' (MENSAJES NUEVOS)' if known_profile else ''}:
 {conversation_text}
 
 INSTRUCCIONES:
@@ -198,11 +341,12 @@ Responde solo con JSON válido, sin explicaciones adicionales.
                 ],
                 model="gpt-4o-mini",
                 max_tokens=500,
-                temperature=0.1
+                temperature=0.1,
+                call_site='extract_user_insights'
             )
             
             # Parse JSON response
-            insights_data = json.loads(response)
+            insights_data = json.loads(clean_openai_json_response(response['content']))
             
             return UserInsights(
                 professional_level=insights_data.get('professional_level', 'unknown'),
@@ -301,7 +445,11 @@ Responde solo con JSON válido, sin explicaciones adicionales.
 
     async def update_user_memory_with_insights(self, user_memory: LeadMemory, insights: UserInsights) -> LeadMemory:
         """
-        Updates user memory with extracted insights.
+        Merges extracted insights into user memory.
+        
+        Scalar fields are replaced only when the new extraction is at least as
+        confident as the stored insights after age decay; list fields are
+        merged keeping the most recent items first.
         
         Args:
             user_memory: Current user memory
@@ -311,41 +459,46 @@ Responde solo con JSON válido, sin explicaciones adicionales.
             Updated user memory
         """
         try:
-            # Update basic info
-            if not hasattr(user_memory, 'professional_level'):
-                user_memory.professional_level = insights.professional_level
-            if not hasattr(user_memory, 'company_size'):
-                user_memory.company_size = insights.company_size
-            if not hasattr(user_memory, 'industry_sector'):
-                user_memory.industry_sector = insights.industry_sector
+            stored_confidence = self.refresh_policy.decayed_confidence(user_memory)
+            
+            # Update scalar info
+            for field in SCALAR_INSIGHT_FIELDS:
+                new_value = getattr(insights, field)
+                if new_value == 'unknown':
+                    continue
+                if getattr(user_memory, field, 'unknown') == 'unknown' or insights.confidence_score >= stored_confidence:
+                    setattr(user_memory, field, new_value)
             
             # Update or merge lists
-            if insights.pain_points:
-                if not hasattr(user_memory, 'pain_points') or not user_memory.pain_points:
-                    user_memory.pain_points = insights.pain_points
-                else:
-                    # Merge unique pain points
-                    user_memory.pain_points = list(set(user_memory.pain_points + insights.pain_points))
+            user_memory.pain_points = self._merge_list(insights.pain_points, user_memory.pain_points)
+            user_memory.budget_indicators = self._merge_list(insights.budget_indicators, user_memory.budget_indicators)
+            user_memory.urgency_signals = self._merge_list(insights.urgency_signals, user_memory.urgency_signals)
             
             if insights.automation_needs:
-                if not hasattr(user_memory, 'automation_needs') or not user_memory.automation_needs:
-                    user_memory.automation_needs = insights.automation_needs
+                if isinstance(user_memory.automation_needs, dict):
+                    # automation_needs estructurado (flujo de anuncios): guardar aparte lo detectado por IA
+                    user_memory.automation_needs['ai_identified'] = self._merge_list(
+                        insights.automation_needs, user_memory.automation_needs.get('ai_identified')
+                    )
                 else:
-                    user_memory.automation_needs = list(set(user_memory.automation_needs + insights.automation_needs))
+                    user_memory.automation_needs = self._merge_list(insights.automation_needs, user_memory.automation_needs)
             
-            # Update advanced attributes
-            if not hasattr(user_memory, 'buyer_persona_match'):
-                user_memory.buyer_persona_match = insights.buyer_persona_match
-            if not hasattr(user_memory, 'technical_level'):
-                user_memory.technical_level = insights.technical_level
-            if not hasattr(user_memory, 'decision_making_power'):
-                user_memory.decision_making_power = insights.decision_making_power
-            
-            # Add insights metadata
-            user_memory.insights_confidence = insights.confidence_score
-            user_memory.last_insights_update = "2024-07-29"  # Current date
+            # Add insights metadata (confidence of the merged profile, not just the new turns)
+            merged_automation = user_memory.automation_needs
+            if isinstance(merged_automation, dict):
+                merged_automation = merged_automation.get('ai_identified', [])
+            merged_profile = UserInsights(
+                pain_points=user_memory.pain_points,
+                automation_needs=merged_automation or [],
+                **{field: getattr(user_memory, field) for field in SCALAR_INSIGHT_FIELDS}
+            )
+            user_memory.insights_confidence = max(
+                stored_confidence, self._calculate_confidence_score(merged_profile, "")
+            )
+            user_memory.last_insights_update = datetime.now().isoformat()
+            user_memory.insights_message_count = user_memory.interaction_count
             
-            logger.info(f"Updated user memory with insights: persona={insights.buyer_persona_match}, confidence={insights.confidence_score:.2f}")
+            logger.info(f"Updated user memory with insights: persona={user_memory.buyer_persona_match}, confidence={user_memory.insights_confidence:.2f}")
             
             return user_memory
             
@@ -353,6 +506,14 @@ Responde solo con JSON válido, sin explicaciones adicionales.
             logger.error(f"Error updating user memory with insights: {e}")
             return user_memory
 
+    def _merge_list(self, new_items: Optional[List[str]], existing_items: Optional[List[str]]) -> List[str]:
+        """Merges insight lists: new items first, no duplicates, bounded size"""
+        merged = []
+        for item in (new_items or []) + (existing_items or []):
+            if item and item not in merged:
+                merged.append(item)
+        return merged[:MAX_INSIGHT_LIST_ITEMS]
+
     def get_personalization_context(self, user_memory: LeadMemory) -> Dict[str, Any]:
         """
         Generates personalization context for response generation.
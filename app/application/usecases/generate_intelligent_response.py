@@ -4,8 +4,9 @@ Combina análisis de intención, plantillas de mensajes y respuestas de IA con s
 """
 import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
+from app.config import settings
 from app.application.usecases.analyze_message_intent import AnalyzeMessageIntentUseCase
 from app.application.usecases.query_course_information import QueryCourseInformationUseCase
 from app.application.usecases.validate_response_use_case import ValidateResponseUseCase
@@ -14,6 +15,11 @@ from app.application.usecases.extract_user_info_use_case import ExtractUserInfoU
 from app.application.usecases.personalize_response_use_case import PersonalizeResponseUseCase
 from app.application.usecases.dynamic_course_info_provider import DynamicCourseInfoProvider
 from app.application.usecases.bonus_activation_use_case import BonusActivationUseCase
+from app.application.usecases.request_context import (
+    start_request_context,
+    finish_request_context,
+    memoize_in_request
+)
 from uuid import UUID
 from app.infrastructure.twilio.client import TwilioWhatsAppClient
 from app.infrastructure.openai.client import OpenAIClient
@@ -100,8 +106,27 @@ class GenerateIntelligentResponseUseCase:
         Returns:
             Dict con resultado del procesamiento y respuesta enviada
         """
+        # Contexto por mensaje: lookups de curso, validaciones y personalización
+        # se calculan una sola vez aunque varios pasos los pidan
+        request_token = start_request_context(user_id)
+        try:
+            result = await self._execute_in_request_context(user_id, incoming_message, context_info)
+        finally:
+            request_summary = finish_request_context(request_token)
+        result['avoided_calls'] = request_summary.get('avoided', {})
+        return result
+    
+    async def _execute_in_request_context(
+        self,
+        user_id: str,
+        incoming_message: IncomingMessage,
+        context_info: str = ""
+    ) -> Dict[str, Any]:
+        """Cuerpo de ``execute``, dentro del contexto del mensaje."""
         try:
             debug_print(f"💬 GENERANDO RESPUESTA INTELIGENTE\n👤 Usuario: {user_id}\n📨 Mensaje: '{incoming_message.body}'", "execute", "generate_intelligent_response.py")
+            streamed_sends: List[Dict[str, Any]] = []
+            streamed_texts: List[str] = []
             
             # 1. Analizar intención del mensaje
             debug_print("🧠 Ejecutando análisis de intención...", "execute", "generate_intelligent_response.py")
@@ -116,18 +141,42 @@ class GenerateIntelligentResponseUseCase:
             else:
                 debug_print(f"✅ Análisis completado - Intención: {analysis_result.get('intent_analysis', {}).get('category', 'N/A')}", "execute", "generate_intelligent_response.py")
                 
-                # 2. Generar respuesta basada en análisis
+                # 2. Generar respuesta basada en análisis (en streaming, los fragmentos
+                # validados se envían conforme se generan)
                 debug_print("📝 Generando respuesta contextual...", "execute", "generate_intelligent_response.py")
+                
+                async def send_chunk(chunk: str) -> bool:
+                    debug_print(f"📤 Enviando fragmento {len(streamed_sends) + 1} a WhatsApp", "execute", "generate_intelligent_response.py")
+                    send_result = await self._send_response(incoming_message.from_number, chunk)
+                    streamed_sends.append(send_result)
+                    if send_result.get('success'):
+                        streamed_texts.append(chunk)
+                        return True
+                    return False
+                
                 response_text = await self._generate_contextual_response(
-                    analysis_result, incoming_message, user_id
+                    analysis_result, incoming_message, user_id,
+                    on_chunk=send_chunk if settings.openai_stream_responses else None
                 )
                 debug_print(f"✅ Respuesta generada: {response_text[:100]}{'...' if len(response_text) > 100 else ''}", "execute", "generate_intelligent_response.py")
             
-            # 3. Enviar respuesta principal
-            debug_print(f"📤 Enviando respuesta a WhatsApp: {incoming_message.from_number}", "execute", "generate_intelligent_response.py")
-            send_result = await self._send_response(
-                incoming_message.from_number, response_text
-            )
+            # 3. Enviar respuesta principal (si no se envió ya por fragmentos)
+            if streamed_sends:
+                if not streamed_texts:
+                    # Ningún fragmento llegó al usuario: se envía la respuesta
+                    # (normalmente el fallback) una sola vez
+                    await send_chunk(response_text)
+                elif response_text != "\n\n".join(streamed_texts):
+                    # Parte de la respuesta ya llegó: no se reenvía el texto completo
+                    self.logger.warning(f"⚠️ Respuesta en streaming incompleta para {user_id}: no se reenvía")
+                # Se registra solo lo que el usuario recibió
+                response_text = "\n\n".join(streamed_texts)
+                send_result = self._merge_streamed_send_results(streamed_sends)
+            else:
+                debug_print(f"📤 Enviando respuesta a WhatsApp: {incoming_message.from_number}", "execute", "generate_intelligent_response.py")
+                send_result = await self._send_response(
+                    incoming_message.from_number, response_text
+                )
             
             if send_result['success']:
                 debug_print(f"✅ MENSAJE ENVIADO EXITOSAMENTE!\n🔗 SID: {send_result.get('message_sid', 'N/A')}", "execute", "generate_intelligent_response.py")
@@ -150,6 +199,7 @@ class GenerateIntelligentResponseUseCase:
                 'response_text': response_text,
                 'response_sent': send_result['success'],
                 'response_sid': send_result.get('message_sid'),
+                'response_chunks_sent': len(streamed_sends),
                 'additional_actions': additional_actions,
                 'user_memory_updated': analysis_result['success'],
                 'extracted_info': analysis_result.get('extracted_info', {})
@@ -186,10 +236,14 @@ class GenerateIntelligentResponseUseCase:
         self,
         analysis_result: Dict[str, Any],
         incoming_message: IncomingMessage,
-        user_id: str
+        user_id: str,
+        on_chunk: Optional[Callable[[str], Awaitable[Any]]] = None
     ) -> str:
         """
         Genera respuesta contextual con sistema anti-inventos y activación inteligente de bonos.
+        
+        Si se pasa ``on_chunk``, la generación con IA verificada se hace en
+        streaming y cada fragmento validado se entrega al callback.
         """
         try:
             intent_analysis = analysis_result.get('intent_analysis', {})
@@ -244,7 +298,8 @@ class GenerateIntelligentResponseUseCase:
                 debug_print(f"📚 Información de curso para OpenAI: {course_detailed_info.get('name', 'No disponible') if course_detailed_info else 'No disponible'}", "_generate_contextual_response")
                 
                 safe_response_result = await self.anti_hallucination_use_case.generate_safe_response(
-                    incoming_message.body, user_memory, intent_analysis, course_info, course_detailed_info
+                    incoming_message.body, user_memory, intent_analysis, course_info, course_detailed_info,
+                    on_chunk=on_chunk
                 )
                 response_text = safe_response_result['message']
                 
@@ -314,7 +369,16 @@ class GenerateIntelligentResponseUseCase:
     async def _get_course_info_for_validation(self, user_memory) -> Optional[Dict]:
         """
         Obtiene información de curso para validación desde la base de datos.
+        Se consulta una sola vez por mensaje.
         """
+        selected_course = getattr(user_memory, 'selected_course', None) if user_memory else None
+        return await memoize_in_request(
+            'db', ('course_info_for_validation', selected_course),
+            lambda: self._fetch_course_info_for_validation(user_memory)
+        )
+
+    async def _fetch_course_info_for_validation(self, user_memory) -> Optional[Dict]:
+        """Consulta la información de curso para validación (sin memoizar)."""
         try:
             if not self.course_query_use_case:
                 return None
@@ -1019,6 +1083,26 @@ Una agencia redujo 80% el tiempo de creación de contenido, pasando de 8 horas/d
 
 ¿Cuál es tu principal desafío estratégico con IA actualmente?"""
     
+    def _merge_streamed_send_results(self, send_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combina los resultados de envío de una respuesta enviada por fragmentos.
+        
+        Args:
+            send_results: Resultados de ``_send_response`` por fragmento
+            
+        Returns:
+            Resultado equivalente al de un envío único
+        """
+        failed = [result for result in send_results if not result.get('success')]
+        merged = {
+            'success': not failed,
+            'message_sid': send_results[-1].get('message_sid'),
+            'chunks_sent': len(send_results)
+        }
+        if failed:
+            merged['error'] = failed[0].get('error', 'Error enviando fragmento')
+        return merged
+
     async def _send_response(self, to_number: str, response_text: str) -> Dict[str, Any]:
         """
         Envía respuesta al usuario.
@@ -1363,10 +1447,15 @@ Cada curso te enseña:"""
         """
         Obtiene información detallada del curso dinámicamente desde BD.
         Reemplaza datos hardcodeados con información real de la base de datos.
+        Se consulta una sola vez por mensaje.
         
         Returns:
             Dict con información completa del curso para OpenAI
         """
+        return await memoize_in_request('db', ('course_detailed_info',), self._fetch_course_detailed_info)
+
+    async def _fetch_course_detailed_info(self) -> dict:
+        """Construye la información detallada del curso (sin memoizar)."""
         try:
             # Usar el nuevo proveedor dinámico de información
             course_data = await self.dynamic_course_provider.get_primary_course_info()
@@ -44,6 +44,16 @@ class ManageUserMemoryUseCase:
             self.logger.error(f"❌ Error obteniendo memoria para {user_id}: {e}")
             raise
     
+    async def refresh_user_memory(self, user_id: str) -> None:
+        """
+        Sincroniza la memoria del usuario con el almacén compartido sin
+        bloquear el event loop (ver ``MemoryManager.refresh_lead_memory``).
+        
+        Args:
+            user_id: Identificador único del usuario
+        """
+        await self.memory_manager.refresh_lead_memory(user_id)
+    
     def update_user_memory(
         self,
         user_id: str,
@@ -11,6 +11,7 @@ from dataclasses import dataclass
 
 from app.infrastructure.openai.client import OpenAIClient
 from app.application.usecases.extract_user_info_use_case import ExtractUserInfoUseCase
+from app.application.usecases.request_context import memoize_in_request
 from memory.lead_memory import LeadMemory
 from prompts.personalization_prompts import (
     get_personalized_system_prompt,
@@ -63,11 +64,12 @@ class PersonalizeResponseUseCase:
             PersonalizationResult with personalized response and metadata
         """
         try:
-            # 1. Update user insights if needed
-            updated_memory = await self._ensure_user_insights(user_memory, [user_message], force_insight_extraction)
-            
-            # 2. Get personalization context
-            personalization_context = updated_memory.get_personalization_context()
+            # 1-2. Update user insights if needed and get personalization context
+            # (once per message, even if several steps personalize)
+            updated_memory, personalization_context = await memoize_in_request(
+                'context', ('personalization_context', user_memory.user_id, user_message, force_insight_extraction),
+                lambda: self._build_personalization_context(user_memory, user_message, force_insight_extraction)
+            )
             
             # 3. Determine personalization strategy
             personalization_strategy = self._determine_personalization_strategy(
@@ -106,28 +108,38 @@ class PersonalizeResponseUseCase:
             logger.error(f"Error generating personalized response: {e}")
             return self._generate_fallback_response(user_message, user_memory)
 
+    async def _build_personalization_context(
+        self,
+        user_memory: LeadMemory,
+        user_message: str,
+        force_extraction: bool
+    ):
+        """Refreshes insights if needed and returns (updated_memory, personalization_context)"""
+        updated_memory = await self._ensure_user_insights(user_memory, [user_message], force_extraction)
+        return updated_memory, updated_memory.get_personalization_context()
+
     async def _ensure_user_insights(
         self, 
         user_memory: LeadMemory, 
         recent_messages: List[str],
         force_extraction: bool = False
     ) -> LeadMemory:
-        """Ensures user insights are up-to-date"""
+        """Ensures user insights are up-to-date (incremental, driven by the refresh policy)"""
         
         # Check if insights need updating
-        needs_update = (
-            force_extraction or
-            user_memory.buyer_persona_match == "unknown" or
-            user_memory.insights_confidence < 0.5 or
-            user_memory.last_insights_update != "2024-07-29"  # Today's date
+        refresh_reason = 'forced' if force_extraction else (
+            self.extract_user_info_use_case.refresh_policy.get_refresh_reason(user_memory)
         )
         
-        if needs_update:
-            logger.info(f"Extracting/updating user insights for {user_memory.user_id}")
+        if refresh_reason:
+            logger.info(f"Extracting/updating user insights for {user_memory.user_id} (reason: {refresh_reason})")
             
-            # Extract new insights
-            insights = await self.extract_user_info_use_case.extract_insights_from_conversation(
-                user_memory, recent_messages
+            # Extract new insights (full re-analysis only when forced); one LLM call per message
+            insights = await memoize_in_request(
+                'llm', ('user_insights', user_memory.user_id, tuple(recent_messages), force_extraction),
+                lambda: self.extract_user_info_use_case.extract_insights_from_conversation(
+                    user_memory, recent_messages, incremental=not force_extraction
+                )
             )
             
             # Update memory with insights
@@ -244,7 +256,8 @@ class PersonalizeResponseUseCase:
             messages=messages,
             model="gpt-4o-mini",
             max_tokens=600,
-            temperature=0.3  # Lower temperature for more consistent personalized responses
+            temperature=0.3,  # Lower temperature for more consistent personalized responses
+            call_site='personalized_response'
         )
         
         return response
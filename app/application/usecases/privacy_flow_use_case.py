@@ -9,6 +9,7 @@ from datetime import datetime
 from app.domain.entities.message import IncomingMessage, OutgoingMessage, MessageType
 from app.application.usecases.manage_user_memory import ManageUserMemoryUseCase
 from app.infrastructure.twilio.client import TwilioWhatsAppClient
+from app.infrastructure.campaign.metrics_tracker import campaign_metrics
 from app.templates.privacy_flow_templates import PrivacyFlowTemplates
 from memory.lead_memory import LeadMemory
 
@@ -236,6 +237,7 @@ class PrivacyFlowUseCase:
         
         # Marcar privacidad como aceptada
         updated_memory = self.memory_use_case.accept_privacy(user_id)
+        await campaign_metrics.track_user_interaction(user_id, 'privacy_accepted')
         
         # Establecer que esperamos el nombre del usuario
         self.memory_use_case.set_waiting_for_response(user_id, "user_name")
@@ -1,11 +1,14 @@
 """
 Caso de uso principal para procesar el flujo completo de anuncios.
 """
+import asyncio
 import os
 from typing import Dict, Any, List
 from app.application.usecases.manage_user_memory import ManageUserMemoryUseCase
 from app.application.usecases.privacy_flow_use_case import PrivacyFlowUseCase
 from app.application.usecases.query_course_information import QueryCourseInformationUseCase
+from app.infrastructure.campaign.metrics_tracker import campaign_metrics
+from app.infrastructure.twilio.message_batch import OutboundMessageBatch
 from app.templates.ad_flow_templates import AdFlowTemplates
 
 
@@ -40,6 +43,9 @@ class ProcessAdFlowUseCase:
             user_id = str(user_data.get('id', user_data.get('user_id')))
             course_id = hashtags_info.get('course_id')
             
+            # Métricas del embudo: el usuario llega por el hashtag del anuncio
+            await campaign_metrics.track_ad_interaction(user_id, course_id, hashtags_info.get('campaign_name'), 'hashtag')
+            
             # 1. Verificar privacidad y nombre
             privacy_valid = await self._validate_privacy_and_name(user_id)
             
@@ -50,6 +56,9 @@ class ProcessAdFlowUseCase:
                 incoming_message = IncomingMessage.from_twilio_webhook(message_data)
                 return await self.privacy_flow_use_case.handle_privacy_flow(user_id, incoming_message)
             
+            # Si ya había aceptado antes del anuncio también pasa el paso de privacidad
+            await campaign_metrics.track_user_interaction(user_id, 'privacy_accepted')
+            
             # 2. DESACTIVAR AGENTE - Iniciar flujo de anuncio
             responses = []
             
@@ -61,43 +70,42 @@ class ProcessAdFlowUseCase:
             welcome_message = self.templates.get_welcome_message(user_name, is_first_time)
             responses.append(welcome_message)
             
-            # 4. Enviar PDF del curso
-            if course_id:
-                pdf_message = await self._send_course_pdf(course_id)
-                responses.append(pdf_message)
-            
-            # 5. Enviar imagen del curso
+            # 4-6. PDF, imagen y plantilla del curso (consulta a BD) se preparan a la vez
             if course_id:
-                image_message = await self._send_course_image(course_id)
-                responses.append(image_message)
-            
-            # 6. Mostrar plantilla con datos del curso
-            if course_id:
-                course_template = await self._present_course_template(course_id, user_name)
-                responses.append(course_template)
+                course_parts = await asyncio.gather(
+                    self._send_course_pdf(course_id),
+                    self._send_course_image(course_id),
+                    self._present_course_template(course_id, user_name)
+                )
+                responses.extend(course_parts)
+                await campaign_metrics.track_user_interaction(user_id, 'course_shown')
             
             # 7. Mostrar mensaje motivador
             motivational_message = self.templates.get_motivational_message(user_name)
             responses.append(motivational_message)
             
-            # 8. Guardar selected_course en memoria
-            if course_id:
-                await self._save_selected_course_to_memory(user_id, course_id)
-            
             # 9. REACTIVAR AGENTE - Combinar todas las respuestas
             combined_response = "\n\n".join(responses)
             
-            # 10. ENVIAR REALMENTE EL MENSAJE A TWILIO
-            response_sid = None
+            # 10 y 8. Enviar el mensaje a Twilio y, mientras Twilio responde, guardar selected_course
+            pending = []
+            batch = None
             if self.twilio_client:
                 from app.domain.entities.message import OutgoingMessage, MessageType
-                outgoing_message = OutgoingMessage(
+                batch = OutboundMessageBatch(self.twilio_client, user_id)
+                batch.add(OutgoingMessage(
                     to_number=user_id,
                     body=combined_response,
                     message_type=MessageType.TEXT
-                )
-                twilio_result = await self.twilio_client.send_message(outgoing_message)
-                response_sid = twilio_result.get('message_sid')
+                ), required=True)
+                pending.append(batch.dispatch())
+            
+            if course_id:
+                pending.append(self._save_selected_course_to_memory(user_id, course_id))
+            
+            results = await asyncio.gather(*pending)
+            batch_result = results[0] if batch else None
+            response_sid = batch_result.items[0].result.get('message_sid') if batch_result else None
             
             return {
                 'success': True,
@@ -105,7 +113,8 @@ class ProcessAdFlowUseCase:
                 'response_sid': response_sid,
                 'processed': True,
                 'ad_flow_completed': True,
-                'course_id': course_id
+                'course_id': course_id,
+                'batch': batch_result.to_dict() if batch_result else None
             }
             
         except Exception as e:
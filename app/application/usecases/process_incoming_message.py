@@ -15,6 +15,7 @@ from app.application.usecases.detect_ad_hashtags_use_case import DetectAdHashtag
 from app.application.usecases.process_ad_flow_use_case import ProcessAdFlowUseCase
 from app.application.usecases.welcome_flow_use_case import WelcomeFlowUseCase
 from app.application.usecases.advisor_referral_use_case import AdvisorReferralUseCase
+from app.infrastructure.openai.usage_tracker import bind_usage_context
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +75,12 @@ class ProcessIncomingMessageUseCase:
             # Extraer user_id del número de teléfono (sin el prefijo whatsapp:)
             user_id = incoming_message.from_number.replace("+", "")
             
+            # Atribuir el consumo de OpenAI de este mensaje al usuario
+            bind_usage_context(user_id=user_id)
+            
+            # Traer la memoria del almacén compartido antes de los flujos (síncronos)
+            await self.memory_use_case.refresh_user_memory(user_id)
+            
             logger.info(
                 f"📨 Mensaje recibido de {incoming_message.from_number} (user_id: {user_id}): "
                 f"'{incoming_message.body}'"
@@ -244,6 +251,7 @@ class ProcessIncomingMessageUseCase:
                     # 1. Es un anuncio directo (usuario nuevo con hashtags)
                     # 2. Usuario existente con privacidad completa envía hashtags
                     if is_ad or (has_completed_privacy and hashtags_info.get('has_course_hashtag')):
+                        bind_usage_context(campaign=hashtags_info.get('campaign_name'))
                         logger.info(f"📢 Detectado anuncio con hashtags para {user_id}: {hashtags_info}")
                         logger.info(f"📊 Estado usuario - Privacidad: {has_completed_privacy}, Hashtags: {is_ad}")
                         
@@ -0,0 +1,135 @@
+"""
+Contexto por mensaje para no repetir trabajo dentro de una misma respuesta.
+
+Durante el procesamiento de un mensaje varios casos de uso piden lo mismo:
+la información del curso (para OpenAI y para validación), la validación de
+un mismo texto o el contexto de personalización del usuario. ``RequestContext``
+memoiza esos resultados para que cada pieza de trabajo ocurra como máximo una
+vez por mensaje, y cuenta las llamadas a BD / LLM que se evitaron.
+
+El contexto se propaga con ``contextvars`` (igual que el contexto de uso de
+OpenAI): cada webhook corre en su propia tarea asyncio, así que lo memoizado
+en un mensaje no se comparte con mensajes concurrentes. Fuera de un mensaje
+(scripts, pruebas) ``memoize_in_request`` simplemente ejecuta la función.
+"""
+
+import asyncio
+import logging
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Tipos de trabajo memoizable
+CALL_KINDS = ('db', 'llm', 'validation', 'context')
+
+_request_context: ContextVar[Optional['RequestContext']] = ContextVar('request_context', default=None)
+
+# Totales acumulados del proceso (para monitoreo)
+_totals: Dict[str, Dict[str, int]] = {
+    'executed': {kind: 0 for kind in CALL_KINDS},
+    'avoided': {kind: 0 for kind in CALL_KINDS},
+}
+
+
+class RequestContext:
+    """
+    Resultados memoizados de un mensaje.
+
+    Args:
+        user_id: Usuario del mensaje en curso (solo para logs)
+    """
+
+    def __init__(self, user_id: Optional[str] = None):
+        self.user_id = user_id
+        self._results: Dict[Hashable, 'asyncio.Future[Any]'] = {}
+        self.executed_calls: Dict[str, int] = {kind: 0 for kind in CALL_KINDS}
+        self.avoided_calls: Dict[str, int] = {kind: 0 for kind in CALL_KINDS}
+
+    async def memoize(self, kind: str, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta ``factory`` la primera vez que se pide ``key`` en este mensaje.
+
+        Llamadas concurrentes con la misma clave esperan al mismo resultado.
+        Si ``factory`` falla, la clave no queda memoizada.
+
+        Args:
+            kind: Tipo de trabajo ('db', 'llm', 'validation', 'context')
+            key: Clave del resultado dentro del mensaje
+            factory: Corrutina sin argumentos que produce el resultado
+
+        Returns:
+            Resultado de ``factory`` (nuevo o memoizado)
+        """
+        future = self._results.get(key)
+        if future is not None:
+            self.avoided_calls[kind] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._results[key] = future
+        self.executed_calls[kind] += 1
+        try:
+            result = await factory()
+        except BaseException as error:
+            del self._results[key]
+            future.set_exception(error)
+            future.exception()  # evitar "exception was never retrieved" si nadie más espera
+            raise
+        future.set_result(result)
+        return result
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {'executed': dict(self.executed_calls), 'avoided': dict(self.avoided_calls)}
+
+
+def start_request_context(user_id: Optional[str] = None) -> Token:
+    """
+    Abre un contexto nuevo para el mensaje en curso.
+
+    Returns:
+        Token para cerrarlo con ``finish_request_context``
+    """
+    return _request_context.set(RequestContext(user_id))
+
+
+def get_request_context() -> Optional[RequestContext]:
+    """Contexto del mensaje en curso, o None fuera de un mensaje."""
+    return _request_context.get()
+
+
+def finish_request_context(token: Token) -> Dict[str, Dict[str, int]]:
+    """
+    Cierra el contexto, acumula sus contadores en los totales y lo descarta.
+
+    Returns:
+        Llamadas ejecutadas y evitadas durante el mensaje
+    """
+    context = _request_context.get()
+    _request_context.reset(token)
+    if context is None:
+        return {}
+
+    summary = context.summary()
+    for bucket, counts in summary.items():
+        for kind, count in counts.items():
+            _totals[bucket][kind] += count
+    avoided = {kind: count for kind, count in summary['avoided'].items() if count}
+    if avoided:
+        logger.info(f"♻️ Trabajo reutilizado en el mensaje de {context.user_id}: {avoided}")
+    return summary
+
+
+async def memoize_in_request(kind: str, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+    """Memoiza ``factory`` en el mensaje en curso; sin contexto, solo la ejecuta."""
+    context = _request_context.get()
+    if context is None:
+        return await factory()
+    return await context.memoize(kind, key, factory)
+
+
+def get_request_dedup_stats() -> Dict[str, Dict[str, int]]:
+    """Totales del proceso de llamadas ejecutadas y evitadas por tipo."""
+    return {bucket: dict(counts) for bucket, counts in _totals.items()}
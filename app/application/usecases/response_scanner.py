@@ -0,0 +1,90 @@
+"""
+Escáner compilado de respuestas.
+
+Compila una sola vez todas las reglas de texto de la validación de
+respuestas (patrones de riesgo, frases prohibidas y palabras disparadoras)
+para que cada respuesta se pase a minúsculas una sola vez y cada regla se
+evalúe con la operación más barata posible:
+
+- Las frases y palabras se buscan como subcadena (``in``, búsqueda en C).
+- Cada regex se filtra primero por el literal que obligatoriamente contiene
+  (p. ej. ``módulo`` en ``\\b\\d+\\s*módulos?\\b``); solo si el literal
+  aparece se ejecuta la regex precompilada.
+
+Como la mayoría de las respuestas no contiene esos literales, casi ninguna
+regex llega a ejecutarse.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Pattern
+
+# Corridas de letras que no son parte de un escape (\b, \d, \s, \w...)
+_LITERAL_RUN = re.compile(r'(?<!\\)[^\W\d_]+')
+_REGEX_SYNTAX = set('|()[]{}')
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """
+    Literal más largo que toda coincidencia de ``pattern`` debe contener.
+
+    Retorna None si el patrón tiene alternativas, grupos o clases de
+    caracteres (en ese caso la regex se ejecuta siempre).
+    """
+    if _REGEX_SYNTAX.intersection(pattern):
+        return None
+    candidates = []
+    for run in _LITERAL_RUN.finditer(pattern):
+        literal = run.group(0)
+        if pattern[run.end():run.end() + 1] in ('?', '*'):
+            literal = literal[:-1]  # el último carácter es opcional
+        if literal:
+            candidates.append(literal)
+    return max(candidates, key=len) if candidates else None
+
+
+@dataclass(frozen=True)
+class ScanRule:
+    """Regla de texto: subcadena literal o regex con su literal obligatorio."""
+    name: str
+    phrase: Optional[str] = None
+    regex: Optional[Pattern] = None
+    required: Optional[str] = None
+
+
+def literal_rule(name: str, phrase: str) -> ScanRule:
+    """Regla de subcadena (equivale a ``phrase in text``)."""
+    return ScanRule(name=name, phrase=phrase)
+
+
+def regex_rule(name: str, pattern: str) -> ScanRule:
+    """Regla de regex (equivale a la primera coincidencia de ``re.findall(pattern, text)``)."""
+    return ScanRule(name=name, regex=re.compile(pattern), required=required_literal(pattern))
+
+
+class ResponseScanner:
+    """Evalúa un conjunto fijo de reglas sobre una respuesta ya en minúsculas."""
+
+    def __init__(self, rules: Iterable[ScanRule]):
+        self.rules: List[ScanRule] = list(rules)
+        self._literals = [(rule.name, rule.phrase) for rule in self.rules if rule.regex is None]
+        self._regexes = [(rule.name, rule.required, rule.regex) for rule in self.rules if rule.regex is not None]
+
+    def scan(self, text: str) -> Dict[str, str]:
+        """
+        Evalúa todas las reglas sobre ``text`` (ya en minúsculas).
+
+        Returns:
+            Dict nombre de regla -> primera coincidencia, solo para las reglas que coinciden
+        """
+        found: Dict[str, str] = {}
+        for name, required, regex in self._regexes:
+            if required is not None and required not in text:
+                continue
+            match = regex.search(text)
+            if match:
+                found[name] = match.group(0)
+        for name, phrase in self._literals:
+            if phrase in text:
+                found[name] = phrase
+        return found
@@ -182,6 +182,10 @@ class ToolActivationUseCase:
         
         return False
     
+    def invalidate_course_cache(self, course_id: str = None) -> None:
+        """Descarta los resultados de herramientas en caché de un curso (o de todos)."""
+        self.tool_system.invalidate_course(course_id)
+    
     def get_tool_activation_summary(self) -> Dict[str, Any]:
         """
         Obtiene resumen de activaciones de herramientas.
@@ -200,7 +204,8 @@ class ToolActivationUseCase:
             return {
                 'total_tools': len(self.tool_system.tools),
                 'tool_stats': tool_stats,
-                'activation_history_count': len(self.tool_system.activation_history)
+                'activation_history_count': len(self.tool_system.activation_history),
+                'result_cache': self.tool_system.result_cache.get_status()
             }
             
         except Exception as e:
@@ -7,11 +7,13 @@ to prevent hallucination and ensure accuracy.
 
 import logging
 from typing import Dict, Optional, List, Any
-import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from app.infrastructure.database.repositories.course_repository import CourseRepository
 from app.infrastructure.database.client import DatabaseClient
+from app.application.usecases.response_scanner import ResponseScanner, literal_rule, regex_rule
+from app.domain.course_fact_index import CourseFactIndex, FactCheckResult, get_course_fact_index
+from app.application.usecases.request_context import memoize_in_request
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +24,8 @@ class ValidationResult:
     issues: List[str]
     corrected_response: Optional[str] = None
     confidence_score: float = 0.0
+    # Datos concretos que el índice de hechos no pudo decidir (candidatos a validación LLM)
+    unverified_facts: List[str] = field(default_factory=list)
 
 class ValidateResponseUseCase:
     """
@@ -55,6 +59,41 @@ class ValidateResponseUseCase:
             "son 12 módulos",
             "8 semanas de duración"
         ]
+        
+        # Palabras que indican que la respuesta menciona un dato del curso:
+        # campo en BD -> (palabras, advertencia si el campo no está verificado)
+        self.course_field_triggers = {
+            'price': (['precio', 'cuesta', 'costo', '$'], "ADVERTENCIA: Menciona precio sin datos verificados en BD"),
+            'total_duration_min': (['duración', 'horas', 'tiempo'], "ADVERTENCIA: Menciona duración sin datos verificados en BD"),
+            'level': (['nivel', 'básico', 'intermedio', 'avanzado'], "ADVERTENCIA: Menciona nivel sin datos verificados en BD"),
+            'session_count': (['sesión', 'módulo', 'clase'], "ADVERTENCIA: Menciona sesiones sin datos verificados en BD"),
+        }
+        
+        # Temas de curso que requieren mencionar la validación con BD
+        self.course_topic_words = ['curso', 'precio', 'duración']
+        self.validation_phrases = [
+            'según la información',
+            'basándome en',
+            'según nuestra base de datos',
+            'datos verificados',
+            'información disponible'
+        ]
+        
+        self.scanner = self._build_scanner()
+
+    def _build_scanner(self) -> ResponseScanner:
+        """Compila todas las reglas de texto en un solo escáner"""
+        rules = [regex_rule(f"risk:{i}", pattern) for i, pattern in enumerate(self.risk_patterns)]
+        rules += [literal_rule(f"forbidden:{i}", phrase) for i, phrase in enumerate(self.forbidden_phrases)]
+        
+        words = [word for keywords, _ in self.course_field_triggers.values() for word in keywords]
+        words += self.course_topic_words + self.validation_phrases
+        rules += [literal_rule(f"word:{word}", word) for word in dict.fromkeys(words)]
+        
+        return ResponseScanner(rules)
+
+    def _mentions_any(self, found: Dict[str, str], words: List[str]) -> bool:
+        return any(f"word:{word}" in found for word in words)
 
     async def validate_response(
         self, 
@@ -73,25 +112,47 @@ class ValidateResponseUseCase:
         Returns:
             ValidationResult: Validation result with issues and corrections
         """
+        # El mismo texto con el mismo curso se valida una sola vez por mensaje
+        course_key = CourseFactIndex.fingerprint(course_info) if course_info else None
+        return await memoize_in_request(
+            'validation', ('validate_response', response_text, course_key, user_query),
+            lambda: self._validate(response_text, course_info, user_query)
+        )
+
+    async def _validate(
+        self,
+        response_text: str,
+        course_info: Optional[Dict],
+        user_query: Optional[str]
+    ) -> ValidationResult:
+        """Runs the validation checks (not memoized)"""
         try:
             issues = []
             confidence_score = 1.0
             
+            # Un solo escaneo del texto para todas las reglas
+            found = self.scanner.scan(response_text.lower())
+            
             # 1. Verificar patrones de riesgo
-            risk_issues = self._check_risk_patterns(response_text)
+            risk_issues = self._check_risk_patterns(found)
             issues.extend(risk_issues)
             
             # 2. Verificar frases prohibidas
-            forbidden_issues = self._check_forbidden_phrases(response_text)
+            forbidden_issues = self._check_forbidden_phrases(found)
             issues.extend(forbidden_issues)
             
             # 3. Validar información de curso si está disponible
+            fact_check = FactCheckResult()
             if course_info:
-                course_issues = await self._validate_course_information(response_text, course_info)
+                course_issues = await self._validate_course_information(found, course_info)
                 issues.extend(course_issues)
+                
+                # Verificar montos, duraciones, sesiones, modalidad y bonos contra BD
+                fact_check = get_course_fact_index(course_info).verify(response_text)
+                issues.extend(fact_check.issues())
             
             # 4. Verificar que mencione validación de BD cuando corresponde
-            db_validation_issues = self._check_database_validation_mentions(response_text, course_info)
+            db_validation_issues = self._check_database_validation_mentions(found, course_info)
             issues.extend(db_validation_issues)
             
             # Calcular puntuación de confianza
@@ -112,7 +173,8 @@ class ValidateResponseUseCase:
                 is_valid=is_valid,
                 issues=issues,
                 corrected_response=corrected_response,
-                confidence_score=confidence_score
+                confidence_score=confidence_score,
+                unverified_facts=[span.text for span in fact_check.unverifiable]
             )
             
         except Exception as e:
@@ -123,76 +185,45 @@ class ValidateResponseUseCase:
                 confidence_score=0.0
             )
 
-    def _check_risk_patterns(self, response_text: str) -> List[str]:
+    def _check_risk_patterns(self, found: Dict[str, str]) -> List[str]:
         """Verifica patrones de riesgo en la respuesta"""
         issues = []
-        response_lower = response_text.lower()
         
-        for pattern in self.risk_patterns:
-            matches = re.findall(pattern, response_lower)
-            if matches:
-                issues.append(f"CRÍTICO: Patrón de riesgo detectado: {matches[0]}")
+        for i in range(len(self.risk_patterns)):
+            match = found.get(f"risk:{i}")
+            if match is not None:
+                issues.append(f"CRÍTICO: Patrón de riesgo detectado: {match}")
         
         return issues
 
-    def _check_forbidden_phrases(self, response_text: str) -> List[str]:
+    def _check_forbidden_phrases(self, found: Dict[str, str]) -> List[str]:
         """Verifica frases prohibidas que indican invención"""
         issues = []
-        response_lower = response_text.lower()
         
-        for phrase in self.forbidden_phrases:
-            if phrase in response_lower:
+        for i, phrase in enumerate(self.forbidden_phrases):
+            if f"forbidden:{i}" in found:
                 issues.append(f"CRÍTICO: Frase prohibida detectada: '{phrase}'")
         
         return issues
 
-    async def _validate_course_information(self, response_text: str, course_info: Dict) -> List[str]:
+    async def _validate_course_information(self, found: Dict[str, str], course_info: Dict) -> List[str]:
         """Valida información específica del curso"""
         issues = []
-        response_lower = response_text.lower()
-        
-        # Verificar que datos mencionados existen en course_info
-        
-        # 1. Precio mencionado vs BD
-        if any(word in response_lower for word in ['precio', 'cuesta', 'costo', '$']):
-            if 'price' not in course_info or not course_info.get('price'):
-                issues.append("ADVERTENCIA: Menciona precio sin datos verificados en BD")
         
-        # 2. Duración mencionada vs BD
-        if any(word in response_lower for word in ['duración', 'horas', 'tiempo']):
-            if 'total_duration_min' not in course_info or not course_info.get('total_duration_min'):
-                issues.append("ADVERTENCIA: Menciona duración sin datos verificados en BD")
-        
-        # 3. Nivel mencionado vs BD
-        if any(word in response_lower for word in ['nivel', 'básico', 'intermedio', 'avanzado']):
-            if 'level' not in course_info or not course_info.get('level'):
-                issues.append("ADVERTENCIA: Menciona nivel sin datos verificados en BD")
-        
-        # 4. Sesiones mencionadas vs BD
-        if any(word in response_lower for word in ['sesión', 'módulo', 'clase']):
-            if 'session_count' not in course_info or not course_info.get('session_count'):
-                issues.append("ADVERTENCIA: Menciona sesiones sin datos verificados en BD")
+        # Verificar que datos mencionados (precio, duración, nivel, sesiones) existen en course_info
+        for field, (keywords, warning) in self.course_field_triggers.items():
+            if self._mentions_any(found, keywords) and not course_info.get(field):
+                issues.append(warning)
         
         return issues
 
-    def _check_database_validation_mentions(self, response_text: str, course_info: Optional[Dict]) -> List[str]:
+    def _check_database_validation_mentions(self, found: Dict[str, str], course_info: Optional[Dict]) -> List[str]:
         """Verifica que mencione validación con BD cuando corresponde"""
         issues = []
-        response_lower = response_text.lower()
         
         # Si hay información de curso pero no menciona validación
-        if course_info and any(word in response_lower for word in ['curso', 'precio', 'duración']):
-            validation_phrases = [
-                'según la información',
-                'basándome en',
-                'según nuestra base de datos',
-                'datos verificados',
-                'información disponible'
-            ]
-            
-            has_validation_mention = any(phrase in response_lower for phrase in validation_phrases)
-            
-            if not has_validation_mention:
+        if course_info and self._mentions_any(found, self.course_topic_words):
+            if not self._mentions_any(found, self.validation_phrases):
                 issues.append("RECOMENDACIÓN: Agregar mención de validación con BD")
         
         return issues
@@ -14,14 +14,55 @@ class Settings(BaseSettings):
     twilio_account_sid: str
     twilio_auth_token: str  
     twilio_phone_number: str
+
+    # === TWILIO OUTBOUND RATE SHAPING ===
+    twilio_messages_per_second: float = 80.0
+    twilio_recipient_messages_per_minute: float = 10.0
+    twilio_recipient_burst: int = 45
+    twilio_send_workers: int = 16
+    twilio_send_max_retries: int = 3
     
     # === OPENAI CREDENTIALS ===
     openai_api_key: str
-    
+
+    # === OPENAI USAGE ACCOUNTING ===
+    openai_usage_export_dir: Optional[str] = "metrics"
+    openai_usage_export_interval_seconds: int = 300
+    openai_daily_cost_budget_usd: Optional[float] = None
+    openai_user_daily_token_budget: Optional[int] = None
+
+    # === OPENAI RATE LIMITING / RESILIENCE ===
+    openai_max_concurrency: int = 8
+    openai_requests_per_minute: int = 500
+    openai_tokens_per_minute: int = 200000
+    openai_request_timeout_seconds: float = 30.0
+    openai_max_retries: int = 3
+    openai_retry_budget_ratio: float = 0.2
+    openai_breaker_failure_threshold: int = 5
+    openai_breaker_recovery_seconds: float = 30.0
+
+    # === OPENAI STREAMING ===
+    openai_stream_responses: bool = False
+    openai_stream_min_chunk_chars: int = 200
+
+    # === USER INSIGHTS REFRESH POLICY ===
+    insights_refresh_min_new_messages: int = 3
+    insights_refresh_max_age_hours: float = 24.0
+    insights_max_confidence_drop: float = 0.2
+    insights_confidence_half_life_hours: float = 72.0
+
     # === DATABASE ===
     database_url: Optional[str] = None
+
+    # === MULTI-WORKER / SHARED STATE ===
+    web_workers: int = 1  # Debe coincidir con -w de gunicorn (WEB_WORKERS en el Procfile)
+    shared_state_backend: str = "memory"  # "memory", "sqlite" o "redis"
+    shared_state_sqlite_path: str = "shared_state.db"
+    shared_state_redis_url: Optional[str] = None
+    worker_lease_seconds: float = 15.0
     
     # === APPLICATION SETTINGS ===
+    lazy_startup: bool = True  # Herramientas y pre-subido de media se inicializan fuera del arranque
     app_environment: str = "development"
     log_level: str = "INFO"
     webhook_verify_signature: bool = False
@@ -36,6 +77,34 @@ class Settings(BaseSettings):
     
     # === NGROK CONFIGURATION ===
     ngrok_url: Optional[str] = None
+
+    # === MEDIA BLOB STORE (adjuntos pre-subidos) ===
+    media_blob_store: Optional[str] = None  # "local" o "s3"; sin valor se usan URLs del servidor
+    media_blob_local_dir: str = "media_cache"
+    media_blob_public_base_url: Optional[str] = None
+    media_s3_bucket: Optional[str] = None
+    media_s3_prefix: str = "course-media"
+    media_s3_region: Optional[str] = None
+    media_presign_seconds: int = 86400
+
+    # === FAQ SEMÁNTICO (requiere numpy) ===
+    faq_semantic_backend: Optional[str] = None  # "sentence_transformers" o "hashing"; sin valor se desactiva
+    faq_semantic_model: str = "paraphrase-multilingual-MiniLM-L12-v2"
+    faq_semantic_threshold: Optional[float] = None  # Sin valor se usa el umbral del backend
+
+    # === HERRAMIENTAS DE CONVERSIÓN ===
+    tool_timeout_seconds: float = 8.0  # Por herramienta; las independientes corren en paralelo
+    tool_usage_flush_seconds: float = 5.0  # Escritura diferida de tool_usage_metrics.json
+    tool_cache_ttl_seconds: float = 300.0  # Resultados por curso (syllabus, precios, bonos, recursos)
+    tool_cache_max_entries: int = 512
+
+    # === MÉTRICAS DE CAMPAÑA ===
+    campaign_metrics_flush_seconds: float = 30.0
+    campaign_metrics_snapshot_path: Optional[str] = "metrics/campaign_metrics.json"  # Solo con un worker
+    campaign_metrics_postgres: bool = False  # Suma los contadores en la tabla campaign_metric_buckets
+
+    # === MÉTRICAS DEL SERVICIO (/metrics) ===
+    metrics_publish_seconds: float = 15.0  # Con varios workers: cada cuánto publica cada uno sus muestras
     
     class Config:
         env_file = ".env"
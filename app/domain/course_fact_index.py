@@ -0,0 +1,366 @@
+"""
+Índice de hechos verificables de un curso.
+
+Se construye una sola vez por curso (y versión de catálogo) a partir de los
+datos de BD: precio, duraciones, número de sesiones, nombres de bonos y
+modalidad. Con él, los datos concretos que aparecen en una respuesta
+(montos, horas, minutos, sesiones, modalidad, bonos) se verifican de forma
+determinista, sin llamar al validador LLM.
+
+Cada dato extraído queda en una de tres listas:
+- ``verified``: coincide con la BD
+- ``contradicted``: se refiere al curso y no coincide con la BD
+- ``unverifiable``: no se puede decidir sin contexto (p. ej. "ahorras $1,200
+  al mes")
+
+El validador LLM solo se omite si hay datos contradichos (respuesta
+inválida) o si todos los datos extraídos se verificaron. Una respuesta sin
+datos extraídos puede inventar algo que el índice no ve (certificados,
+garantías, funciones), así que va al LLM.
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Palabras previas que indican que el dato se refiere al curso. Solo cuentan
+# si están en la misma frase y después del número anterior (ver _cue_context)
+PRICE_CONTEXT = ('precio', 'cuesta', 'costo', 'inversion', 'pago unico')
+DURATION_CONTEXT = ('duracion', 'dura ', 'en total', 'programa de')
+SESSION_CONTEXT = ('curso', 'programa', 'total', 'consta de')
+MODALITY_CONTEXT = ('modalidad', 'curso', 'programa', 'clases', 'sesiones', 'formato')
+CONTEXT_WINDOW_CHARS = 40
+MAX_DURATION_AS_HOURS = 200
+
+MODALITY_ALIASES = {
+    'online': 'online',
+    'en linea': 'online',
+    'virtual': 'online',
+    'remoto': 'online',
+    'remota': 'online',
+    'a distancia': 'online',
+    'presencial': 'presencial',
+    'hibrido': 'hibrido',
+    'hibrida': 'hibrido',
+    'mixto': 'hibrido',
+    'mixta': 'hibrido',
+}
+
+# Unidad que acompaña a un número -> tipo de dato
+UNIT_KINDS = {
+    'mxn': 'price', 'usd': 'price', 'pesos': 'price', 'dolares': 'price',
+    'hora': 'hours', 'horas': 'hours', 'hr': 'hours', 'hrs': 'hours',
+    'minuto': 'minutes', 'minutos': 'minutes', 'min': 'minutes', 'mins': 'minutes',
+    'sesion': 'sessions', 'sesiones': 'sessions',
+}
+
+# Ambas regex empiezan con un dígito/literal para que re pueda saltar rápido
+# entre candidatos en lugar de probar cada alternativa en cada posición
+_NUMERIC_SPAN = re.compile(
+    rf'\d(?:[\d.,]*\d)?(?:\s*(?P<unit>{"|".join(sorted(UNIT_KINDS, key=len, reverse=True))})\b)?'
+)
+_MODALITY_SPAN = re.compile(rf'(?:{"|".join(sorted(MODALITY_ALIASES, key=len, reverse=True))})\b')
+_THOUSANDS = re.compile(r'^\d{1,3}(?:[.,]\d{3})+$')
+# Hasta el último fin de frase o número de la ventana (greedy)
+_CONTEXT_BREAK = re.compile(r'.*[.!?;\n\d]', re.DOTALL)
+
+
+_ACCENTS = tuple(zip('áéíóúüàèìòùâêîôû', 'aeiouuaeiouaeiou'))
+_COMBINING_MARKS = re.compile('[\u0300-\u036f]')
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas sin acentos, para comparar texto libre con datos de BD."""
+    folded = text.lower()
+    # str.replace es mucho más rápido que str.translate con texto no ASCII (emojis)
+    for accented, plain in _ACCENTS:
+        if accented in folded:
+            folded = folded.replace(accented, plain)
+    if _COMBINING_MARKS.search(folded):
+        # Texto con acentos combinados (NFD): normalizar y quitarlos
+        folded = _COMBINING_MARKS.sub('', unicodedata.normalize('NFD', folded))
+    return folded
+
+
+def parse_amount(raw: str) -> Optional[float]:
+    """Convierte '4,500', '4.500', '4500.00' o '1.5' a número."""
+    if _THOUSANDS.match(raw):
+        return float(re.sub(r'[.,]', '', raw))
+    try:
+        return float(raw.replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def _cue_context(text: str, start: int) -> str:
+    """Texto previo a ``start`` en el que se buscan las palabras de contexto.
+
+    Se corta en el fin de frase o número anterior: en "programa de 4 semanas
+    con 2 horas diarias", "programa de" se refiere al 4, no a las 2 horas.
+    """
+    window = text[max(0, start - CONTEXT_WINDOW_CHARS):start]
+    cut = _CONTEXT_BREAK.match(window)
+    return window[cut.end():] if cut else window
+
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = ''.join(filter(str.isdigit, str(value).split('.')[0]))
+    return int(digits) if digits else None
+
+
+def _bond_name(bond: Any) -> Optional[str]:
+    """Nombre corto de un bono: el texto antes de ':', '.', ' - ' o un salto de línea."""
+    if isinstance(bond, dict):
+        content = bond.get('content') or bond.get('name') or ''
+    else:
+        content = getattr(bond, 'content', None) or str(bond or '')
+    name = re.split(r':|\.|\s-\s|\n', content, maxsplit=1)[0]
+    name = fold_text(name).strip(' *"\'')[:60].strip()
+    return name if len(name) >= 4 else None
+
+
+def _course_fields(course_data: Any) -> Dict[str, Any]:
+    """Normaliza dicts de BD/proveedor y objetos CourseInfo al mismo dict."""
+    if course_data is None:
+        return {}
+    if isinstance(course_data, dict):
+        return course_data
+    course = getattr(course_data, 'course', None)
+    if course is None:
+        return {}
+    fields = dict(vars(course))
+    fields['sessions'] = [
+        {'duration_minutes': session.duration_minutes} for session in getattr(course_data, 'sessions', [])
+    ]
+    fields['bonds'] = list(getattr(course_data, 'bonds', []))
+    return fields
+
+
+@dataclass(frozen=True)
+class FactSpan:
+    """Dato concreto extraído de una respuesta."""
+    kind: str
+    text: str
+    expected: str = ""
+
+
+@dataclass
+class FactCheckResult:
+    """Resultado de verificar una respuesta contra el índice."""
+    verified: List[FactSpan] = field(default_factory=list)
+    contradicted: List[FactSpan] = field(default_factory=list)
+    unverifiable: List[FactSpan] = field(default_factory=list)
+
+    @property
+    def is_consistent(self) -> bool:
+        return not self.contradicted
+
+    @property
+    def needs_llm_validation(self) -> bool:
+        """False solo si el índice decide: hay contradicciones, o todo lo extraído se verificó."""
+        if self.contradicted:
+            return False
+        return bool(self.unverifiable) or not self.verified
+
+    def issues(self) -> List[str]:
+        return [
+            f"CRÍTICO: Dato de {span.kind} no coincide con BD: '{span.text}' (BD: {span.expected})"
+            for span in self.contradicted
+        ]
+
+
+@dataclass(frozen=True)
+class CourseFactIndex:
+    """Hechos verificables de un curso, normalizados para comparación rápida."""
+    prices: FrozenSet[int]
+    currency: str
+    hours: FrozenSet[float]
+    minutes: FrozenSet[int]
+    session_counts: FrozenSet[int]
+    modality: Optional[str]
+    bond_names: Tuple[str, ...]
+
+    @classmethod
+    def from_course_data(cls, course_data: Any, bonds: Optional[Iterable[Any]] = None) -> 'CourseFactIndex':
+        """
+        Construye el índice desde los datos de un curso.
+
+        Args:
+            course_data: Dict de curso (BD o DynamicCourseInfoProvider) u objeto CourseInfo
+            bonds: Bonos adicionales (dicts, entidades Bond o strings)
+        """
+        data = _course_fields(course_data)
+
+        price = _to_int(data.get('price'))
+        prices = frozenset([price]) if price else frozenset()
+
+        durations = [_to_int(data.get('total_duration_min'))]
+        if data.get('total_duration_hours') and not durations[0]:
+            durations[0] = int(float(data['total_duration_hours']) * 60)
+        sessions = data.get('sessions') or []
+        for session in sessions:
+            if isinstance(session, dict):
+                durations.append(_to_int(session.get('duration_minutes')))
+        session_counts = {_to_int(data.get('session_count'))}
+        if sessions:
+            session_counts.add(len(sessions))
+        session_counts = frozenset(value for value in session_counts if value)
+
+        # Sin duraciones por sesión, la duración promedio también es un dato válido
+        if durations[0] and len(durations) == 1:
+            durations.extend(durations[0] / count for count in session_counts)
+        minutes = frozenset(int(value) for value in durations if value)
+        hours = {round(value / 60, 1) for value in minutes}
+        # Algunos cursos guardan horas en total_duration_min (ver AdFlowTemplates):
+        # un valor pequeño también se acepta como horas
+        if durations[0] and durations[0] <= MAX_DURATION_AS_HOURS:
+            hours.add(float(durations[0]))
+
+        modality = MODALITY_ALIASES.get(fold_text(str(data.get('modality') or '')).strip())
+
+        bond_names = []
+        for bond in list(data.get('bonds') or []) + list(bonds or []):
+            name = _bond_name(bond)
+            if name and name not in bond_names:
+                bond_names.append(name)
+
+        return cls(
+            prices=prices,
+            currency=str(data.get('currency') or ''),
+            hours=frozenset(hours),
+            minutes=minutes,
+            session_counts=session_counts,
+            modality=modality,
+            bond_names=tuple(bond_names),
+        )
+
+    @staticmethod
+    def fingerprint(course_data: Any, bonds: Optional[Iterable[Any]] = None) -> Tuple:
+        """Clave de caché: cambia si cambia cualquier dato indexado del curso."""
+        data = _course_fields(course_data)
+        sessions = tuple(
+            session.get('duration_minutes') for session in (data.get('sessions') or []) if isinstance(session, dict)
+        )
+        bond_contents = tuple(
+            bond.get('content') if isinstance(bond, dict) else getattr(bond, 'content', bond)
+            for bond in list(data.get('bonds') or []) + list(bonds or [])
+        )
+        return (
+            str(data.get('id') or data.get('id_course') or data.get('name') or ''),
+            str(data.get('price')), data.get('total_duration_min'), data.get('total_duration_hours'),
+            data.get('session_count'), str(data.get('modality')), sessions, bond_contents,
+        )
+
+    def verify(self, response_text: str) -> FactCheckResult:
+        """
+        Extrae los datos concretos de la respuesta y los compara con el índice.
+
+        Args:
+            response_text: Respuesta generada
+
+        Returns:
+            FactCheckResult con los datos verificados, contradichos y no decidibles
+        """
+        result = FactCheckResult()
+        text = fold_text(response_text)
+
+        for match in _NUMERIC_SPAN.finditer(text):
+            start = match.start()
+            unit = match.group('unit')
+            kind = UNIT_KINDS.get(unit) if unit else None
+            if text[max(0, start - 3):start].rstrip().endswith('$'):
+                kind = 'price'
+                start = text.rindex('$', 0, start)
+            if kind is None:
+                continue
+
+            span = text[start:match.end()]
+            value = parse_amount(match.group(0)[:len(match.group(0)) - len(unit or '')].strip())
+            context = _cue_context(text, start)
+
+            if kind == 'price':
+                self._classify(result, 'precio', span, value, self.prices,
+                               self._format_prices(), any(word in context for word in PRICE_CONTEXT))
+            elif kind == 'hours':
+                self._classify(result, 'duración', span, value, self.hours,
+                               self._format_hours(), any(word in context for word in DURATION_CONTEXT))
+            elif kind == 'minutes':
+                self._classify(result, 'duración', span, value, self.minutes,
+                               self._format_hours(), any(word in context for word in DURATION_CONTEXT))
+            else:
+                # "las primeras 2 sesiones" o "1 sesión de mentoría" no son el total
+                self._classify(result, 'sesiones', span, value, self.session_counts,
+                               ", ".join(str(count) for count in sorted(self.session_counts)),
+                               any(word in context for word in SESSION_CONTEXT))
+
+        for match in _MODALITY_SPAN.finditer(text):
+            start = match.start()
+            if start and text[start - 1].isalnum():
+                continue
+            span = match.group(0)
+            context = _cue_context(text, start)
+            if self.modality and MODALITY_ALIASES[span] == self.modality:
+                result.verified.append(FactSpan('modalidad', span))
+            elif self.modality and any(word in context for word in MODALITY_CONTEXT):
+                result.contradicted.append(FactSpan('modalidad', span, self.modality))
+            else:
+                result.unverifiable.append(FactSpan('modalidad', span))
+
+        if 'bono' in text or 'bonus' in text:
+            known = [name for name in self.bond_names if name in text]
+            if known:
+                result.verified.extend(FactSpan('bono', name) for name in known)
+            else:
+                result.unverifiable.append(FactSpan('bono', 'bono'))
+
+        return result
+
+    @staticmethod
+    def _classify(result: FactCheckResult, kind: str, span: str, value: Optional[float],
+                  known: FrozenSet, expected: str, refers_to_course: bool) -> None:
+        if value is None or not known:
+            result.unverifiable.append(FactSpan(kind, span))
+        elif any(abs(value - item) < 0.05 for item in known):
+            result.verified.append(FactSpan(kind, span))
+        elif refers_to_course:
+            result.contradicted.append(FactSpan(kind, span, expected))
+        else:
+            result.unverifiable.append(FactSpan(kind, span))
+
+    def _format_prices(self) -> str:
+        return ", ".join(f"${price:,} {self.currency}".strip() for price in sorted(self.prices))
+
+    def _format_hours(self) -> str:
+        return ", ".join(f"{hours:g} horas" for hours in sorted(self.hours))
+
+
+# Índices ya construidos, por huella del curso (una entrada por versión de catálogo)
+_FACT_INDEX_CACHE: Dict[Tuple, CourseFactIndex] = {}
+_FACT_INDEX_CACHE_MAX_ENTRIES = 64
+
+
+def get_course_fact_index(course_data: Any, bonds: Optional[Iterable[Any]] = None) -> CourseFactIndex:
+    """
+    Retorna el índice de hechos del curso, construyéndolo solo la primera vez.
+
+    Args:
+        course_data: Dict de curso u objeto CourseInfo
+        bonds: Bonos adicionales
+
+    Returns:
+        CourseFactIndex del curso
+    """
+    bonds = list(bonds or [])
+    key = CourseFactIndex.fingerprint(course_data, bonds)
+    index = _FACT_INDEX_CACHE.get(key)
+    if index is None:
+        if len(_FACT_INDEX_CACHE) >= _FACT_INDEX_CACHE_MAX_ENTRIES:
+            _FACT_INDEX_CACHE.clear()
+        index = CourseFactIndex.from_course_data(course_data, bonds)
+        _FACT_INDEX_CACHE[key] = index
+    return index
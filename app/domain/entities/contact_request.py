@@ -63,7 +63,8 @@ class ContactRequest(BaseModel):
         # Generar ID único si no existe
         if not self.request_id:
             import uuid
-            self.request_id = f"REQ_{uuid.uuid4().hex[:8].upper()}"
+            # uuid4 completo: con 8 caracteres hex había colisiones en backlogs de decenas de miles
+            self.request_id = f"REQ_{uuid.uuid4().hex.upper()}"
         
         # Establecer timestamp de creación si no existe
         if not self.created_at:
@@ -140,12 +141,12 @@ class ContactRequest(BaseModel):
         
         return any(keyword in self.contact_reason.lower() for keyword in urgent_keywords)
     
-    def get_priority_score(self) -> int:
+    def get_base_priority_score(self) -> int:
         """
-        Calcula un score de prioridad basado en varios factores.
+        Score de prioridad sin el factor de tiempo de espera.
         
         Returns:
-            Score de prioridad (1-10)
+            Score base (puede superar 10; el tope se aplica en get_priority_score)
         """
         score = 5  # Prioridad base
         
@@ -165,15 +166,35 @@ class ContactRequest(BaseModel):
         if self.industry and any(ind in self.industry.lower() for ind in high_priority_industries):
             score += 1
         
-        # Factor de tiempo de espera
-        if self.created_at:
-            hours_since_creation = (datetime.now() - self.created_at).total_seconds() / 3600
-            if hours_since_creation > 24:
-                score += 2
-            elif hours_since_creation > 4:
-                score += 1
+        return score
+    
+    def get_wait_priority_bonus(self, now: Optional[datetime] = None) -> int:
+        """
+        Puntos extra de prioridad por tiempo de espera.
         
-        return min(score, 10)  # Máximo 10
+        Args:
+            now: Momento de referencia (por defecto ahora)
+            
+        Returns:
+            2 tras 24 horas, 1 tras 4 horas, 0 en otro caso
+        """
+        if not self.created_at:
+            return 0
+        hours_since_creation = ((now or datetime.now()) - self.created_at).total_seconds() / 3600
+        if hours_since_creation > 24:
+            return 2
+        if hours_since_creation > 4:
+            return 1
+        return 0
+    
+    def get_priority_score(self) -> int:
+        """
+        Calcula un score de prioridad basado en varios factores.
+        
+        Returns:
+            Score de prioridad (1-10)
+        """
+        return min(self.get_base_priority_score() + self.get_wait_priority_bonus(), 10)  # Máximo 10
     
     def to_dict(self) -> dict:
         """
@@ -0,0 +1,463 @@
+"""
+Contadores de métricas de campaña agrupados por ventanas de tiempo.
+
+Cada serie (campaña, curso, tipo de interacción) guarda contadores
+acumulativos en tres resoluciones: minuto, hora y día. Cada resolución es
+un buffer circular de ``array('I')`` (4 bytes por ventana), así que
+registrar un evento son tres sumas sin crear objetos, y la memoria no
+crece con el número de eventos sino con el de series.
+
+Las consultas por rango cubren el intervalo con la resolución más gruesa
+posible (días completos en el centro, horas y minutos solo en los
+extremos): el costo depende del número de ventanas, nunca del número de
+eventos. Los incrementos que aún no se han persistido se acumulan por
+minuto para que los sinks los escriban de forma periódica.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (nombre, segundos por ventana, ventanas retenidas)
+RESOLUTIONS: Tuple[Tuple[str, int, int], ...] = (
+    ('minute', 60, 24 * 60),          # 24 horas
+    ('hour', 3600, 60 * 24),          # 60 días
+    ('day', 86400, 2 * 366),          # ~2 años
+)
+RESOLUTION_NAMES = tuple(name for name, _, _ in RESOLUTIONS)
+
+SERIES_SEPARATOR = '|'
+
+# (serie, resolución, ventana) -> incremento
+BucketKey = Tuple[str, str, int]
+
+
+@lru_cache(maxsize=4096)
+def series_key(campaign: str, course_id: Optional[str], interaction_type: str) -> str:
+    """Clave de una serie; el separador se elimina de los valores."""
+    parts = (campaign or '', course_id or '', interaction_type or '')
+    return SERIES_SEPARATOR.join(part.replace(SERIES_SEPARATOR, '/') for part in parts)
+
+
+def split_series_key(key: str) -> Tuple[str, str, str]:
+    campaign, course_id, interaction_type = key.split(SERIES_SEPARATOR)
+    return campaign, course_id, interaction_type
+
+
+def cover_range(widths: Sequence[int], level: int, start: float, end: float) -> Iterable[Tuple[int, int, int]]:
+    """
+    Cubre ``[start, end)`` con ventanas: gruesas en el centro, finas en los extremos.
+
+    Args:
+        widths: Segundos por ventana de cada resolución, de la más fina a la más gruesa
+        level: Resolución más fina que se puede usar
+
+    Returns:
+        Tramos ``(resolución, primera ventana, ventana final exclusiva)``
+    """
+    finest = widths[level]
+    cursor = int(start // finest) * finest
+    end = int(-(-end // finest)) * finest
+    top = len(widths) - 1
+    segments = []
+
+    def take(index: int, upto: int) -> int:
+        if upto > cursor:
+            segments.append((index, cursor // widths[index], upto // widths[index]))
+            return upto
+        return cursor
+
+    # Subida: cada resolución hasta el límite de la siguiente
+    for index in range(level, top):
+        cursor = take(index, min(-(-cursor // widths[index + 1]) * widths[index + 1], end))
+    # Centro y bajada: ventanas completas, de la más gruesa a la más fina
+    for index in range(top, level - 1, -1):
+        cursor = take(index, (end // widths[index]) * widths[index])
+    return segments
+
+
+class _Ring:
+    """
+    Buffer circular de contadores para una resolución.
+
+    ``head`` es la ventana más reciente; las posiciones guardan las
+    ``size`` ventanas hasta ``head`` y se ponen en cero al avanzar.
+    """
+
+    __slots__ = ('width', 'size', 'head', 'counts')
+
+    def __init__(self, width: int, size: int):
+        self.width = width
+        self.size = size
+        self.head: Optional[int] = None
+        self.counts = array('I', bytes(4 * size))
+
+    def add(self, bucket: int, amount: int) -> None:
+        head, size, counts = self.head, self.size, self.counts
+        if head is None or bucket > head:
+            if head is None or bucket - head >= size:
+                counts[:] = array('I', bytes(4 * size))
+            else:
+                for skipped in range(head + 1, bucket + 1):
+                    counts[skipped % size] = 0
+            self.head = bucket
+        elif bucket <= head - size:
+            return  # más viejo que la retención
+        counts[bucket % size] += amount
+
+    def get(self, bucket: int) -> int:
+        head = self.head
+        if head is None or not head - self.size < bucket <= head:
+            return 0
+        return self.counts[bucket % self.size]
+
+    def total(self, first: int, last: int) -> int:
+        """Suma de las ventanas ``first..last-1``."""
+        if self.head is None:
+            return 0
+        first = max(first, self.head - self.size + 1)
+        last = min(last, self.head + 1)
+        if last <= first:
+            return 0
+        # Como mucho dos tramos contiguos del buffer
+        start, stop = first % self.size, last % self.size or self.size
+        if start < stop:
+            return sum(self.counts[start:stop])
+        return sum(self.counts[start:]) + sum(self.counts[:stop])
+
+    def buckets(self) -> Iterable[Tuple[int, int]]:
+        """Ventanas retenidas con contador distinto de cero."""
+        if self.head is None:
+            return
+        for bucket in range(self.head - self.size + 1, self.head + 1):
+            count = self.counts[bucket % self.size]
+            if count:
+                yield bucket, count
+
+    def oldest(self, now_bucket: int) -> int:
+        """Primera ventana que sigue retenida."""
+        return now_bucket - self.size + 1
+
+
+class BucketedCounters:
+    """
+    Series de contadores por minuto, hora y día.
+
+    Args:
+        resolutions: Resoluciones (nombre, segundos, ventanas retenidas), de la más fina a la más gruesa
+        clock: Reloj en segundos epoch (inyectable para benchmarks)
+    """
+
+    def __init__(self, resolutions: Sequence[Tuple[str, int, int]] = RESOLUTIONS, clock=time.time):
+        self.resolutions = tuple(resolutions)
+        self.clock = clock
+        self._series: Dict[str, List[_Ring]] = {}
+        self._lock = threading.Lock()
+        # Incrementos sin persistir por (serie, ventana de la resolución más fina)
+        self._pending: Dict[Tuple[str, int], int] = defaultdict(int)
+
+    def _rings(self, key: str) -> List[_Ring]:
+        rings = self._series.get(key)
+        if rings is None:
+            rings = [_Ring(width, size) for _, width, size in self.resolutions]
+            self._series[key] = rings
+        return rings
+
+    @property
+    def series(self) -> List[str]:
+        return list(self._series)
+
+    def add(self, key: str, amount: int = 1, timestamp: Optional[float] = None) -> None:
+        """Suma ``amount`` a la serie en la ventana de ``timestamp`` de cada resolución."""
+        timestamp = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            for ring in self._rings(key):
+                ring.add(int(timestamp // ring.width), amount)
+            self._pending[(key, int(timestamp // self.resolutions[0][1]))] += amount
+
+    def load_bucket(self, key: str, resolution: str, bucket: int, amount: int) -> None:
+        """Restaura una ventana persistida (sin marcarla como pendiente)."""
+        with self._lock:
+            index = RESOLUTION_NAMES.index(resolution)
+            self._rings(key)[index].add(bucket, amount)
+
+    def _expand(self, pending: Dict[Tuple[str, int], int]) -> Dict[BucketKey, int]:
+        finest = self.resolutions[0][1]
+        deltas: Dict[BucketKey, int] = defaultdict(int)
+        for (key, bucket), amount in pending.items():
+            timestamp = bucket * finest
+            for name, width, _ in self.resolutions:
+                deltas[(key, name, timestamp // width)] += amount
+        return dict(deltas)
+
+    def pending_deltas(self) -> Dict[BucketKey, int]:
+        """Incrementos sin persistir en cada resolución."""
+        with self._lock:
+            pending = dict(self._pending)
+        return self._expand(pending)
+
+    def drain_pending(self) -> Dict[BucketKey, int]:
+        """Incrementos sin persistir en cada resolución; quedan vacíos hasta el próximo evento."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+        return self._expand(pending)
+
+    def range_total(self, key: str, start: float, end: float) -> int:
+        """Eventos de la serie en ``[start, end)`` (alineado a minutos)."""
+        with self._lock:
+            rings = self._series.get(key)
+            if rings is None:
+                return 0
+            # Si la resolución fina ya no retiene el inicio se usa la siguiente
+            now, level = self.clock(), 0
+            while level < len(rings) - 1 and int(start // rings[level].width) < rings[level].oldest(int(now // rings[level].width)):
+                level += 1
+            widths = [ring.width for ring in rings]
+            return sum(rings[index].total(first, last) for index, first, last in cover_range(widths, level, start, end))
+
+    def timeseries(self, key: str, resolution: str, start: float, end: float) -> List[Tuple[int, int]]:
+        """Pares ``(inicio de la ventana en epoch, contador)`` en una resolución."""
+        index = RESOLUTION_NAMES.index(resolution)
+        width = self.resolutions[index][1]
+        with self._lock:
+            rings = self._series.get(key)
+            first, last = int(start // width), int(-(-end // width))
+            if rings is None:
+                return [(bucket * width, 0) for bucket in range(first, last)]
+            ring = rings[index]
+            return [(bucket * width, ring.get(bucket)) for bucket in range(first, last)]
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Ventanas no vacías de todas las series (para el archivo de respaldo)."""
+        with self._lock:
+            data = {}
+            for key, rings in self._series.items():
+                data[key] = {
+                    name: {str(bucket): count for bucket, count in ring.buckets()}
+                    for (name, _, _), ring in zip(self.resolutions, rings)
+                }
+            return data
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(
+                ring.counts.itemsize * ring.size
+                for rings in self._series.values() for ring in rings
+            )
+
+
+class FileSnapshotSink:
+    """
+    Respaldo en un archivo JSON con todas las ventanas.
+
+    Se reescribe completo de forma atómica (archivo temporal y
+    ``os.replace``) y se carga al arrancar.
+
+    Args:
+        path: Ruta del archivo
+    """
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    async def write(self, counters: BucketedCounters, deltas: Dict[BucketKey, int]) -> bool:
+        data = counters.snapshot()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary = f"{self.path}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'series': data}, f, ensure_ascii=False)
+            os.replace(temporary, self.path)
+            return True
+        except OSError as e:
+            logger.error(f"❌ Error guardando métricas de campaña en {self.path}: {e}")
+            return False
+
+    async def restore(self, counters: BucketedCounters) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Error leyendo métricas de campaña de {self.path}: {e}")
+            return 0
+        restored = 0
+        for key, resolutions in data.get('series', {}).items():
+            for resolution, buckets in resolutions.items():
+                if resolution not in RESOLUTION_NAMES:
+                    continue
+                for bucket, count in buckets.items():
+                    counters.load_bucket(key, resolution, int(bucket), int(count))
+                    restored += 1
+        return restored
+
+
+class PostgresSink:
+    """
+    Respaldo en PostgreSQL: suma los incrementos a cada ventana con un upsert.
+
+    Varios workers pueden escribir en la misma tabla; cada uno solo envía
+    sus propios incrementos.
+
+    Args:
+        database_client: Cliente con ``execute_query`` (por defecto el global)
+    """
+
+    name = "postgres"
+    TABLE = "campaign_metric_buckets"
+
+    CREATE_TABLE = f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            series text NOT NULL,
+            resolution text NOT NULL,
+            bucket bigint NOT NULL,
+            count bigint NOT NULL DEFAULT 0,
+            PRIMARY KEY (series, resolution, bucket)
+        )
+    """
+
+    UPSERT = f"""
+        INSERT INTO {TABLE} (series, resolution, bucket, count)
+        SELECT * FROM unnest($1::text[], $2::text[], $3::bigint[], $4::bigint[])
+        ON CONFLICT (series, resolution, bucket)
+        DO UPDATE SET count = {TABLE}.count + EXCLUDED.count
+    """
+
+    def __init__(self, database_client=None):
+        self._client = database_client
+        self._table_ready = False
+
+    @property
+    def client(self):
+        if self._client is None:
+            from app.infrastructure.database.client import database_client
+            self._client = database_client
+        return self._client
+
+    async def _ensure_table(self) -> bool:
+        if not self._table_ready:
+            self._table_ready = await self.client.execute_query(self.CREATE_TABLE, fetch_mode="none") is not None
+        return self._table_ready
+
+    async def write(self, counters: BucketedCounters, deltas: Dict[BucketKey, int]) -> bool:
+        if not deltas:
+            return True
+        if not await self._ensure_table():
+            return False
+        series, resolutions, buckets, counts = [], [], [], []
+        for (key, resolution, bucket), count in deltas.items():
+            series.append(key)
+            resolutions.append(resolution)
+            buckets.append(bucket)
+            counts.append(count)
+        result = await self.client.execute_query(
+            self.UPSERT, series, resolutions, buckets, counts, fetch_mode="none"
+        )
+        return result is not None
+
+    async def restore(self, counters: BucketedCounters) -> int:
+        if not await self._ensure_table():
+            return 0
+        now = counters.clock()
+        restored = 0
+        for name, width, size in counters.resolutions:
+            rows = await self.client.execute_query(
+                f"SELECT series, bucket, count FROM {self.TABLE} WHERE resolution = $1 AND bucket > $2",
+                name, int(now // width) - size
+            )
+            for row in rows or []:
+                counters.load_bucket(row['series'], name, int(row['bucket']), int(row['count']))
+                restored += 1
+        return restored
+
+
+
+class SharedStoreSink:
+    """
+    Ventanas por hora y día en el almacén de estado compartido.
+
+    Con varios workers cada uno suma aquí sus incrementos, y las consultas
+    leen de aquí las ventanas del rango (una lectura por ventana) más los
+    incrementos locales aún sin escribir. Los minutos no se comparten: el
+    almacén no expira claves y serían 1440 por serie y día.
+
+    Args:
+        store: Almacén compartido (``KeyValueStore``)
+    """
+
+    name = "shared_store"
+    BUCKETS_NAMESPACE = "campaign_metric_buckets"
+    SERIES_NAMESPACE = "campaign_metric_series"
+    RESOLUTIONS = ('hour', 'day')
+
+    def __init__(self, store):
+        self.store = store
+        self._known_series = set()
+
+    @staticmethod
+    def _key(key: str, resolution: str, bucket: int) -> str:
+        return f"{key}#{resolution}#{bucket}"
+
+    async def write(self, counters: BucketedCounters, deltas: Dict[BucketKey, int]) -> bool:
+        # SQLite/Redis bloquean: el lote se escribe en un hilo
+        await asyncio.to_thread(self._write, deltas)
+        return True
+
+    def _write(self, deltas: Dict[BucketKey, int]) -> None:
+        for (key, resolution, bucket), count in deltas.items():
+            if resolution not in self.RESOLUTIONS:
+                continue
+            if key not in self._known_series:
+                self.store.set(self.SERIES_NAMESPACE, key, True)
+                self._known_series.add(key)
+            self.store.incr(self.BUCKETS_NAMESPACE, self._key(key, resolution, bucket), count)
+
+    async def restore(self, counters: BucketedCounters) -> int:
+        # Las consultas leen directamente del almacén
+        return 0
+
+    def series(self) -> List[str]:
+        return list(self.store.items(self.SERIES_NAMESPACE))
+
+    def _widths(self, counters: BucketedCounters) -> List[Tuple[str, int]]:
+        return [(name, width) for name, width, _ in counters.resolutions if name in self.RESOLUTIONS]
+
+    def range_total(self, counters: BucketedCounters, key: str, start: float, end: float,
+                    pending: Dict[BucketKey, int]) -> int:
+        """
+        Eventos de la serie en ``[start, end)`` (alineado a horas) de todos los workers.
+
+        Args:
+            pending: Incrementos locales sin escribir (``counters.pending_deltas()``)
+        """
+        resolutions = self._widths(counters)
+        total = 0
+        for index, first, last in cover_range([width for _, width in resolutions], 0, start, end):
+            name = resolutions[index][0]
+            for bucket in range(first, last):
+                total += self.store.get(self.BUCKETS_NAMESPACE, self._key(key, name, bucket), 0)
+                total += pending.get((key, name, bucket), 0)
+        return total
+
+    def timeseries(self, counters: BucketedCounters, key: str, resolution: str, start: float, end: float,
+                   pending: Dict[BucketKey, int]) -> List[Tuple[int, int]]:
+        width = dict(self._widths(counters))[resolution]
+        return [
+            (bucket * width, self.store.get(self.BUCKETS_NAMESPACE, self._key(key, resolution, bucket), 0)
+             + pending.get((key, resolution, bucket), 0))
+            for bucket in range(int(start // width), int(-(-end // width)))
+        ]
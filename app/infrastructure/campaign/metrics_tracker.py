@@ -1,50 +1,162 @@
 """
 Tracker de métricas para campañas (opcional).
+
+Los eventos se cuentan en series (campaña, curso, tipo de interacción) con
+ventanas por minuto, hora y día (``metric_buckets``); los reportes por
+rango y los embudos se calculan sumando ventanas, sin recorrer eventos.
+Los contadores se persisten de forma periódica en los sinks configurados
+(archivo JSON, PostgreSQL y, con varios workers, el almacén compartido).
+
+Con un almacén compartido (SQLite o Redis) la atribución de cada evento se
+lee y escribe en un hilo, para no bloquear el event loop.
 """
-from typing import Dict, Any, Optional
+import asyncio
+import logging
 from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+from app.config import settings
+from app.infrastructure.campaign.metric_buckets import (
+    BucketedCounters, FileSnapshotSink, PostgresSink, SharedStoreSink,
+    RESOLUTION_NAMES, RESOLUTIONS, series_key, split_series_key
+)
+from app.infrastructure.shared_state.kv_store import KeyValueStore, call_store, shared_state_store
+
+logger = logging.getLogger(__name__)
+
+# Embudo de los anuncios: hashtag → privacidad → curso mostrado → asesor
+FUNNEL_STEPS = ('hashtag', 'privacy_accepted', 'course_shown', 'advisor')
+
+# Sufijo de las series que cuentan usuarios únicos por paso (la primera vez de cada usuario)
+UNIQUE_SUFFIX = ':users'
+
+TimeValue = Union[datetime, float, int, None]
+
+
+def _epoch(value: TimeValue, default: Optional[float]) -> Optional[float]:
+    if value is None:
+        return default
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
 
 
 class MetricsTracker:
     """Tracker de métricas para campañas"""
     
-    def __init__(self):
-        self.metrics = {}
+    # Atribución usuario -> campaña, curso y pasos del embudo ya contados
+    STORE_NAMESPACE = "campaign_attribution"
+    
+    def __init__(
+        self,
+        store: Optional[KeyValueStore] = None,
+        counters: Optional[BucketedCounters] = None,
+        sinks: Optional[List[Any]] = None,
+        flush_interval_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            store: Almacén de estado compartido entre workers (por defecto el global)
+            counters: Contadores por ventanas (por defecto vacíos)
+            sinks: Destinos de persistencia (por defecto según la configuración)
+            flush_interval_seconds: Cada cuánto se persisten los incrementos
+        """
+        # Compartido entre workers según el backend configurado
+        self.store = store or shared_state_store
+        self.counters = counters or BucketedCounters()
+        self.sinks = sinks if sinks is not None else build_campaign_metric_sinks(self.store)
+        self.flush_interval_seconds = flush_interval_seconds or settings.campaign_metrics_flush_seconds
+        # Sink que responde las consultas cuando varios workers comparten las métricas
+        self.shared_sink = next((sink for sink in self.sinks if isinstance(sink, SharedStoreSink)), None)
+        # Incrementos que un sink no pudo escribir; se reintentan en el siguiente flush
+        self._retry: Dict[str, Dict[Any, int]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._series_by_campaign: Dict[str, List[Tuple[str, str, str]]] = {}
+        self._indexed_series = 0
+    
+    def _count(self, campaign_name: str, course_id: Optional[str], interaction_type: str,
+               timestamp: Optional[float]) -> None:
+        self.counters.add(series_key(campaign_name, course_id, interaction_type), timestamp=timestamp)
+    
+    def _record(self, user_id: str, attribution: Dict[str, Any], interaction_type: str,
+                timestamp: Optional[float]) -> None:
+        """Cuenta el evento y, si es la primera vez del usuario en ese paso, también como usuario único."""
+        campaign_name, course_id = attribution['campaign_name'], attribution.get('course_id')
+        self._count(campaign_name, course_id, interaction_type, timestamp)
+        if interaction_type not in attribution['steps']:
+            attribution['steps'].append(interaction_type)
+            self._count(campaign_name, course_id, interaction_type + UNIQUE_SUFFIX, timestamp)
+            self.store.set(self.STORE_NAMESPACE, user_id, attribution)
     
-    def track_ad_interaction(self, user_id: str, course_id: str, 
-                           campaign_name: str, interaction_type: str) -> Dict[str, Any]:
+    async def track_ad_interaction(self, user_id: str, course_id: str,
+                                   campaign_name: str, interaction_type: str,
+                                   timestamp: TimeValue = None) -> Dict[str, Any]:
         """
         Registra interacción con anuncio
         
+        El usuario queda atribuido a la campaña (último anuncio), de modo que
+        sus pasos siguientes se registran con ``track_user_interaction``.
+        
         Args:
             user_id: ID del usuario
             course_id: ID del curso
             campaign_name: Nombre de la campaña
             interaction_type: Tipo de interacción
-            
+            timestamp: Momento del evento (por defecto ahora)
+        
         Returns:
             Dict con información de métrica registrada
         """
         try:
-            metric_key = f"{user_id}_{course_id}_{campaign_name}"
-            
-            metric_data = {
-                'user_id': user_id,
-                'course_id': course_id,
-                'campaign_name': campaign_name,
-                'interaction_type': interaction_type,
-                'timestamp': datetime.now().isoformat(),
-                'success': True
-            }
-            
-            self.metrics[metric_key] = metric_data
-            
+            return await call_store(
+                self.store, self._track_ad_interaction, user_id, course_id, campaign_name, interaction_type, timestamp
+            )
+        except Exception as e:
             return {
-                'success': True,
-                'metric_key': metric_key,
-                'tracked': True
+                'success': False,
+                'error': str(e),
+                'tracked': False
             }
-            
+    
+    def _track_ad_interaction(self, user_id: str, course_id: str, campaign_name: str,
+                              interaction_type: str, timestamp: TimeValue) -> Dict[str, Any]:
+        campaign_name = campaign_name or 'sin_campaña'
+        attribution = self.store.get(self.STORE_NAMESPACE, user_id)
+        if (not attribution or attribution.get('campaign_name') != campaign_name
+                or attribution.get('course_id') != course_id):
+            attribution = {
+                'campaign_name': campaign_name,
+                'course_id': course_id,
+                'attributed_at': datetime.now().isoformat(),
+                'steps': []
+            }
+            self.store.set(self.STORE_NAMESPACE, user_id, attribution)
+        
+        self._record(user_id, attribution, interaction_type, _epoch(timestamp, None))
+        
+        return {
+            'success': True,
+            'metric_key': series_key(campaign_name, course_id, interaction_type),
+            'tracked': True
+        }
+    
+    async def track_user_interaction(self, user_id: str, interaction_type: str,
+                                     timestamp: TimeValue = None) -> Dict[str, Any]:
+        """
+        Registra un paso del embudo para la campaña a la que está atribuido el usuario.
+        
+        Args:
+            user_id: ID del usuario
+            interaction_type: Tipo de interacción (p. ej. 'privacy_accepted', 'advisor')
+            timestamp: Momento del evento (por defecto ahora)
+        
+        Returns:
+            Dict con información de métrica registrada; ``tracked`` es False si el
+            usuario no llegó por una campaña
+        """
+        try:
+            return await call_store(self.store, self._track_user_interaction, user_id, interaction_type, timestamp)
         except Exception as e:
             return {
                 'success': False,
@@ -52,56 +164,303 @@ class MetricsTracker:
                 'tracked': False
             }
     
-    def get_campaign_metrics(self, campaign_name: str) -> Dict[str, Any]:
+    def _track_user_interaction(self, user_id: str, interaction_type: str,
+                                timestamp: TimeValue) -> Dict[str, Any]:
+        attribution = self.store.get(self.STORE_NAMESPACE, user_id)
+        if not attribution:
+            return {'success': True, 'tracked': False}
+        
+        self._record(user_id, attribution, interaction_type, _epoch(timestamp, None))
+        return {
+            'success': True,
+            'metric_key': series_key(attribution['campaign_name'], attribution.get('course_id'), interaction_type),
+            'tracked': True
+        }
+    
+    # === CONSULTAS ===
+    
+    def _series(self) -> List[str]:
+        if self.shared_sink:
+            return sorted(set(self.shared_sink.series()) | set(self.counters.series))
+        return self.counters.series
+    
+    def _campaign_series(self, campaign_name: str) -> List[Tuple[str, str, str]]:
+        """(serie, curso, tipo de interacción) de una campaña; el índice se rehace cuando aparecen series."""
+        series = self._series()
+        if len(series) != self._indexed_series:
+            index: Dict[str, List[Tuple[str, str, str]]] = {}
+            for key in series:
+                campaign, course_id, interaction_type = split_series_key(key)
+                index.setdefault(campaign, []).append((key, course_id, interaction_type))
+            self._series_by_campaign, self._indexed_series = index, len(series)
+        return self._series_by_campaign.get(campaign_name, [])
+    
+    def _range_total(self, key: str, start: float, end: float, pending: Optional[Dict[Any, int]]) -> int:
+        if self.shared_sink:
+            return self.shared_sink.range_total(self.counters, key, start, end, pending)
+        return self.counters.range_total(key, start, end)
+    
+    def _pending(self) -> Optional[Dict[Any, int]]:
+        # Solo las consultas al almacén compartido suman los incrementos locales sin escribir
+        return self.counters.pending_deltas() if self.shared_sink else None
+    
+    def _range(self, start: TimeValue, end: TimeValue):
+        now = self.counters.clock()
+        # Sin inicio: toda la retención de la resolución más gruesa
+        _, width, size = RESOLUTIONS[-1]
+        return _epoch(start, now - width * (size - 1)), _epoch(end, now)
+    
+    def _campaign_totals(self, campaign_name: str, start: float, end: float) -> Dict[str, Dict[str, int]]:
+        """{tipo de interacción: {curso: eventos}} de una campaña."""
+        totals: Dict[str, Dict[str, int]] = {}
+        pending = self._pending()
+        for key, course_id, interaction_type in self._campaign_series(campaign_name):
+            count = self._range_total(key, start, end, pending)
+            if count:
+                totals.setdefault(interaction_type, {})[course_id] = count
+        return totals
+    
+    def get_campaign_metrics(self, campaign_name: str, start: TimeValue = None,
+                             end: TimeValue = None) -> Dict[str, Any]:
         """
         Obtiene métricas de una campaña específica
         
         Args:
             campaign_name: Nombre de la campaña
-            
+            start: Inicio del rango (por defecto toda la retención)
+            end: Fin del rango (por defecto ahora)
+        
         Returns:
             Dict con métricas de la campaña
         """
         try:
-            campaign_metrics = [
-                metric for metric in self.metrics.values()
-                if metric.get('campaign_name') == campaign_name
-            ]
+            start_ts, end_ts = self._range(start, end)
+            totals = self._campaign_totals(campaign_name, start_ts, end_ts)
+            events = {
+                interaction_type: sum(by_course.values())
+                for interaction_type, by_course in totals.items()
+                if not interaction_type.endswith(UNIQUE_SUFFIX)
+            }
+            unique_users = {
+                interaction_type[:-len(UNIQUE_SUFFIX)]: sum(by_course.values())
+                for interaction_type, by_course in totals.items()
+                if interaction_type.endswith(UNIQUE_SUFFIX)
+            }
+            by_course: Dict[str, int] = {}
+            for interaction_type, courses in totals.items():
+                if interaction_type.endswith(UNIQUE_SUFFIX):
+                    continue
+                for course_id, count in courses.items():
+                    by_course[course_id] = by_course.get(course_id, 0) + count
             
             return {
                 'success': True,
                 'campaign_name': campaign_name,
-                'total_interactions': len(campaign_metrics),
-                'metrics': campaign_metrics
+                'start': datetime.fromtimestamp(start_ts).isoformat(),
+                'end': datetime.fromtimestamp(end_ts).isoformat(),
+                'total_interactions': sum(events.values()),
+                'metrics': events,
+                'unique_users': unique_users,
+                'by_course': by_course
             }
-            
+        
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e),
                 'campaign_name': campaign_name,
                 'total_interactions': 0,
-                'metrics': []
+                'metrics': {}
             }
     
+    def get_timeseries(self, campaign_name: str, interaction_type: str,
+                       resolution: str = 'hour', start: TimeValue = None, end: TimeValue = None,
+                       course_id: Optional[str] = None, unique_users: bool = False) -> List[Dict[str, Any]]:
+        """
+        Serie de tiempo de un tipo de interacción de la campaña.
+        
+        Args:
+            campaign_name: Nombre de la campaña
+            interaction_type: Tipo de interacción
+            resolution: 'minute', 'hour' o 'day'
+            start: Inicio (por defecto 24 ventanas antes del fin)
+            end: Fin (por defecto ahora)
+            course_id: Solo este curso (por defecto todos)
+            unique_users: Contar usuarios únicos en lugar de eventos
+        
+        Returns:
+            Lista de {'start', 'count'} por ventana
+        """
+        if resolution not in RESOLUTION_NAMES:
+            raise ValueError(f"Resolución desconocida: {resolution}")
+        width = dict((name, width) for name, width, _ in RESOLUTIONS)[resolution]
+        end_ts = _epoch(end, self.counters.clock())
+        start_ts = _epoch(start, end_ts - 24 * width)
+        wanted_type = interaction_type + UNIQUE_SUFFIX if unique_users else interaction_type
+        
+        merged: Dict[int, int] = {}
+        pending = self._pending()
+        for key, series_course, series_type in self._campaign_series(campaign_name):
+            if series_type != wanted_type or (course_id is not None and series_course != course_id):
+                continue
+            if self.shared_sink and resolution in SharedStoreSink.RESOLUTIONS:
+                points = self.shared_sink.timeseries(self.counters, key, resolution, start_ts, end_ts, pending)
+            else:
+                points = self.counters.timeseries(key, resolution, start_ts, end_ts)
+            for bucket_start, count in points:
+                merged[bucket_start] = merged.get(bucket_start, 0) + count
+        
+        return [
+            {'start': datetime.fromtimestamp(bucket_start).isoformat(), 'count': merged[bucket_start]}
+            for bucket_start in sorted(merged)
+        ]
+    
+    def get_funnel(self, campaign_name: str, steps: Sequence[str] = FUNNEL_STEPS,
+                   start: TimeValue = None, end: TimeValue = None) -> Dict[str, Any]:
+        """
+        Embudo de usuarios únicos de la campaña.
+        
+        Args:
+            campaign_name: Nombre de la campaña
+            steps: Pasos en orden (por defecto hashtag → privacidad → curso → asesor)
+            start: Inicio del rango (por defecto toda la retención)
+            end: Fin del rango (por defecto ahora)
+        
+        Returns:
+            Dict con usuarios y conversión de cada paso
+        """
+        start_ts, end_ts = self._range(start, end)
+        totals = self._campaign_totals(campaign_name, start_ts, end_ts)
+        
+        funnel = []
+        first = previous = None
+        for step in steps:
+            users = sum(totals.get(step + UNIQUE_SUFFIX, {}).values())
+            funnel.append({
+                'step': step,
+                'users': users,
+                'conversion_from_previous': round(users / previous, 4) if previous else None,
+                'conversion_from_start': round(users / first, 4) if first else None
+            })
+            if first is None:
+                first = users
+            previous = users
+        
+        return {
+            'campaign_name': campaign_name,
+            'start': datetime.fromtimestamp(start_ts).isoformat(),
+            'end': datetime.fromtimestamp(end_ts).isoformat(),
+            'steps': funnel
+        }
+    
     def get_all_metrics(self) -> Dict[str, Any]:
         """
         Obtiene todas las métricas registradas
         
         Returns:
-            Dict con todas las métricas
+            Dict con los totales de cada campaña
         """
         try:
+            campaigns = sorted({split_series_key(key)[0] for key in self._series()})
+            metrics = [self.get_campaign_metrics(campaign) for campaign in campaigns]
             return {
                 'success': True,
-                'total_metrics': len(self.metrics),
-                'metrics': list(self.metrics.values())
+                'total_metrics': sum(metric['total_interactions'] for metric in metrics),
+                'metrics': metrics,
+                'series': len(self.counters.series),
+                'memory_bytes': self.counters.memory_bytes(),
+                'sinks': [sink.name for sink in self.sinks]
             }
-            
+        
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e),
                 'total_metrics': 0,
                 'metrics': []
-            } 
\ No newline at end of file
+            }
+    
+    # === PERSISTENCIA ===
+    
+    async def restore(self) -> int:
+        """
+        Carga las ventanas persistidas desde el primer sink que tenga datos.
+        
+        Returns:
+            Número de ventanas restauradas
+        """
+        for sink in self.sinks:
+            try:
+                restored = await sink.restore(self.counters)
+            except Exception as e:
+                logger.error(f"❌ Error restaurando métricas de campaña desde {sink.name}: {e}")
+                continue
+            if restored:
+                return restored
+        return 0
+    
+    async def flush(self) -> int:
+        """
+        Escribe los incrementos pendientes en todos los sinks.
+        
+        Returns:
+            Número de ventanas con incrementos escritas
+        """
+        async with self._flush_lock:
+            deltas = self.counters.drain_pending()
+            for sink in self.sinks:
+                batch = self._retry.pop(sink.name, {})
+                for bucket_key, count in deltas.items():
+                    batch[bucket_key] = batch.get(bucket_key, 0) + count
+                if not batch:
+                    continue
+                try:
+                    written = await sink.write(self.counters, batch)
+                except Exception as e:
+                    logger.error(f"❌ Error escribiendo métricas de campaña en {sink.name}: {e}")
+                    written = False
+                if not written:
+                    self._retry[sink.name] = batch
+            return len(deltas)
+    
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            await self.flush()
+    
+    async def start(self) -> None:
+        """Restaura las métricas persistidas e inicia el flush periódico."""
+        if self._flush_task is not None:
+            return
+        restored = await self.restore()
+        if restored:
+            logger.info(f"📈 Métricas de campaña restauradas: {restored} ventanas")
+        self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self) -> None:
+        """Detiene el flush periódico y persiste lo pendiente."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+
+def build_campaign_metric_sinks(store: KeyValueStore) -> List[Any]:
+    """Sinks de persistencia según la configuración y el backend de estado compartido."""
+    sinks: List[Any] = []
+    if store.shared:
+        # Con varios workers el archivo local no tendría los eventos de los demás
+        sinks.append(SharedStoreSink(store))
+    elif settings.campaign_metrics_snapshot_path:
+        sinks.append(FileSnapshotSink(settings.campaign_metrics_snapshot_path))
+    if settings.campaign_metrics_postgres:
+        sinks.append(PostgresSink())
+    return sinks
+
+
+# Instancia global usada por los casos de uso y el webhook
+campaign_metrics = MetricsTracker()
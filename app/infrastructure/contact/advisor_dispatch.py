@@ -0,0 +1,184 @@
+"""
+Cola de despacho de solicitudes de contacto a asesores.
+
+Mantiene índices en memoria sobre las solicitudes para que asignar y
+consultar no recorra todo el backlog:
+
+- Pendientes en un heap por score base de prioridad. El score efectivo
+  suma un bono por tiempo de espera (``get_wait_priority_bonus``) que crece
+  con la antigüedad, así que dentro de un mismo score base la más antigua
+  es siempre la de mayor prioridad: hay un heap por score base (ordenado
+  por fecha de creación) y la siguiente solicitud es la mejor cabeza entre
+  esos pocos heaps. Las solicitudes que dejan de estar pendientes se
+  descartan al llegar a la cima (borrado perezoso).
+- Índices por ID, por usuario y por estado, y el conjunto de urgentes
+  abiertas.
+- Carga actual (solicitudes asignadas sin completar) de cada asesor.
+- Fechas de creación ordenadas por score base, para calcular el promedio
+  de prioridad contando solo cuántas solicitudes superan cada umbral de
+  espera.
+"""
+
+import heapq
+from bisect import bisect_left, insort
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.domain.entities.contact_request import ContactRequest
+
+# Umbrales de espera de ContactRequest.get_wait_priority_bonus: (horas, bono acumulado)
+WAIT_BONUS_STEPS = ((4, 1), (24, 2))
+MAX_PRIORITY_SCORE = 10
+
+OPEN_STATUSES = ('pending', 'assigned')
+
+
+@dataclass
+class Advisor:
+    """Asesor con su capacidad de solicitudes simultáneas."""
+    advisor_id: str
+    name: str
+    specialties: List[str]
+    # Tamaños de empresa que atiende cuando no hay coincidencia por especialidad
+    company_sizes: List[str] = field(default_factory=list)
+    capacity: int = 5
+
+
+DEFAULT_ADVISORS = [
+    Advisor('ADV_001', 'María González', ['tecnología', 'implementación']),
+    Advisor('ADV_002', 'Carlos Rodríguez', ['finanzas', 'empresas grandes'], company_sizes=['grande', 'enterprise']),
+    Advisor('ADV_003', 'Ana Martínez', ['salud', 'educación']),
+    Advisor('ADV_004', 'Luis Pérez', ['startups', 'pymes'], company_sizes=['startup', 'pequeña']),
+]
+
+
+def _timestamp(request: ContactRequest) -> float:
+    return request.created_at.timestamp() if request.created_at else 0.0
+
+
+class ContactDispatchQueue:
+    """
+    Índices de las solicitudes de contacto y carga de los asesores.
+
+    Args:
+        advisors: Asesores disponibles, en orden de preferencia por defecto
+    """
+
+    def __init__(self, advisors: Iterable[Advisor]):
+        self.advisors = list(advisors)
+        self.clear()
+
+    def clear(self) -> None:
+        self.requests: Dict[str, ContactRequest] = {}
+        # request_id -> (estado, asesor) con los que está indexada; la entidad
+        # puede haber cambiado ya (assign_advisor, mark_as_completed)
+        self._indexed: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._base_scores: Dict[str, int] = {}
+        self._by_user: Dict[str, Set[str]] = defaultdict(set)
+        self._by_status: Dict[str, Set[str]] = defaultdict(set)
+        self._urgent_open: Set[str] = set()
+        # score base -> heap de (fecha de creación, request_id)
+        self._pending: Dict[int, List[Tuple[float, str]]] = defaultdict(list)
+        # score base -> fechas de creación ordenadas (todas las solicitudes)
+        self._created_by_score: Dict[int, List[float]] = defaultdict(list)
+        self.advisor_load: Dict[str, int] = {advisor.advisor_id: 0 for advisor in self.advisors}
+
+    def upsert(self, request: ContactRequest) -> None:
+        """Agrega la solicitud o actualiza sus índices tras un cambio de estado."""
+        request_id = request.request_id
+        previous = self._indexed.get(request_id)
+        if previous is not None:
+            self._unindex(request_id, previous)
+        else:
+            base_score = request.get_base_priority_score()
+            self._base_scores[request_id] = base_score
+            insort(self._created_by_score[base_score], _timestamp(request))
+
+        self.requests[request_id] = request
+        self._by_user[request.user_id].add(request_id)
+        self._by_status[request.status].add(request_id)
+        if request.status in OPEN_STATUSES and request.is_urgent():
+            self._urgent_open.add(request_id)
+        if request.status == 'pending' and (previous is None or previous[0] != 'pending'):
+            heapq.heappush(self._pending[self._base_scores[request_id]], (_timestamp(request), request_id))
+        if request.status == 'assigned' and request.assigned_advisor in self.advisor_load:
+            self.advisor_load[request.assigned_advisor] += 1
+        self._indexed[request_id] = (request.status, request.assigned_advisor)
+
+    def remove(self, request_id: str) -> None:
+        """Elimina la solicitud de todos los índices."""
+        request = self.requests.pop(request_id, None)
+        if request is None:
+            return
+        self._unindex(request_id, self._indexed.pop(request_id))
+        self._by_user[request.user_id].discard(request_id)
+        if not self._by_user[request.user_id]:
+            del self._by_user[request.user_id]
+        base_score = self._base_scores.pop(request_id)
+        created = self._created_by_score[base_score]
+        position = bisect_left(created, _timestamp(request))
+        if position < len(created) and created[position] == _timestamp(request):
+            created.pop(position)
+
+    def _unindex(self, request_id: str, indexed: Tuple[str, Optional[str]]) -> None:
+        # El heap de pendientes se limpia de forma perezosa en peek_pending()
+        status, advisor_id = indexed
+        self._by_status[status].discard(request_id)
+        self._urgent_open.discard(request_id)
+        if status == 'assigned' and advisor_id in self.advisor_load:
+            self.advisor_load[advisor_id] -= 1
+
+    def peek_pending(self, now: Optional[datetime] = None) -> Optional[ContactRequest]:
+        """Solicitud pendiente de mayor prioridad efectiva (empate: la más antigua)."""
+        now = now or datetime.now()
+        best: Optional[Tuple[int, float, str]] = None
+        for base_score, heap in self._pending.items():
+            while heap and self._status_of(heap[0][1]) != 'pending':
+                heapq.heappop(heap)
+            if not heap:
+                continue
+            created, request_id = heap[0]
+            score = min(base_score + self.requests[request_id].get_wait_priority_bonus(now), MAX_PRIORITY_SCORE)
+            if best is None or (score, -created) > (best[0], -best[1]):
+                best = (score, created, request_id)
+        return self.requests[best[2]] if best else None
+
+    def _status_of(self, request_id: str) -> Optional[str]:
+        request = self.requests.get(request_id)
+        return request.status if request is not None else None
+
+    def ids_with_status(self, status: str) -> Set[str]:
+        return self._by_status.get(status, set())
+
+    def count(self, status: str) -> int:
+        return len(self._by_status.get(status, ()))
+
+    def user_request_ids(self, user_id: str) -> Set[str]:
+        return self._by_user.get(user_id, set())
+
+    @property
+    def urgent_open_ids(self) -> Set[str]:
+        return self._urgent_open
+
+    def priority_score_sum(self, now: Optional[datetime] = None) -> int:
+        """Suma de get_priority_score() de todas las solicitudes sin recalcularlo una por una."""
+        now = now or datetime.now()
+        total = 0
+        for base_score, created in self._created_by_score.items():
+            count = len(created)
+            if not count:
+                continue
+            total += count * min(base_score, MAX_PRIORITY_SCORE)
+            previous_bonus = 0
+            for hours, bonus in WAIT_BONUS_STEPS:
+                # Solicitudes con más de ``hours`` horas de espera suben de bono
+                aged = bisect_left(created, (now - timedelta(hours=hours)).timestamp())
+                step = min(bonus, MAX_PRIORITY_SCORE - base_score) - min(previous_bonus, MAX_PRIORITY_SCORE - base_score)
+                total += aged * max(step, 0)
+                previous_bonus = bonus
+        return total
+
+    def available_advisors(self) -> List[Advisor]:
+        return [advisor for advisor in self.advisors if self.advisor_load[advisor.advisor_id] < advisor.capacity]
@@ -7,6 +7,8 @@ import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from app.domain.entities.contact_request import ContactRequest
+from app.infrastructure.contact.advisor_dispatch import Advisor, ContactDispatchQueue, DEFAULT_ADVISORS
+from app.infrastructure.shared_state.kv_store import KeyValueStore, call_store, shared_state_store
 
 
 class ContactProcessor:
@@ -14,11 +16,91 @@ class ContactProcessor:
     Procesador para manejar solicitudes de contacto con asesores.
     """
     
-    def __init__(self):
-        """Inicializa el procesador de contacto."""
-        self.pending_requests: List[ContactRequest] = []
-        self.assigned_requests: List[ContactRequest] = []
-        self.completed_requests: List[ContactRequest] = []
+    # Namespaces en el almacén compartido: solicitudes (clave: request_id) y versión
+    STORE_NAMESPACE = "contact_requests"
+    META_NAMESPACE = "contact_requests_meta"
+    
+    def __init__(self, store: Optional[KeyValueStore] = None, advisors: Optional[List[Advisor]] = None):
+        """
+        Inicializa el procesador de contacto.
+        
+        Args:
+            store: Almacén de estado compartido entre workers (por defecto el global)
+            advisors: Asesores con su capacidad (por defecto DEFAULT_ADVISORS)
+        """
+        self.store = store or shared_state_store
+        self.queue = ContactDispatchQueue(advisors or DEFAULT_ADVISORS)
+        self._version: Optional[int] = None
+    
+    def _read_changes(self, known_version: Optional[int]):
+        """(versión, solicitudes) del almacén; solicitudes es None si la versión no cambió."""
+        version = self.store.get(self.META_NAMESPACE, 'version', 0)
+        if version == known_version:
+            return version, None
+        return version, self.store.items(self.STORE_NAMESPACE)
+    
+    async def _sync(self) -> None:
+        """Reconstruye los índices locales si otro worker cambió las solicitudes."""
+        version, stored = await call_store(self.store, self._read_changes, self._version)
+        if stored is None:
+            return
+        # Los índices se tocan solo en el event loop
+        self.queue.clear()
+        for data in stored.values():
+            self.queue.upsert(ContactRequest(**data))
+        self._version = version
+    
+    async def _save(self, contact_request: ContactRequest, new: bool = False) -> None:
+        """
+        Actualiza los índices y guarda la solicitud en el almacén compartido.
+        
+        Raises:
+            ValueError: Si ``new`` y ya existe otra solicitud con el mismo ID
+        """
+        existing = self.queue.requests.get(contact_request.request_id)
+        if new and existing is not None and existing is not contact_request:
+            raise ValueError(f"Ya existe una solicitud con el ID {contact_request.request_id}")
+        self.queue.upsert(contact_request)
+        version = await call_store(
+            self.store, self._write_request, contact_request.request_id, contact_request.model_dump(mode='json')
+        )
+        await self._check_version(version)
+    
+    def _write_request(self, request_id: str, data: Dict[str, Any]) -> int:
+        self.store.set(self.STORE_NAMESPACE, request_id, data)
+        return self.store.incr(self.META_NAMESPACE, 'version')
+    
+    def _delete_requests(self, request_ids: List[str]) -> int:
+        for request_id in request_ids:
+            self.store.delete(self.STORE_NAMESPACE, request_id)
+        return self.store.incr(self.META_NAMESPACE, 'version')
+    
+    async def _check_version(self, version: int) -> None:
+        """Adopta la versión recién escrita, o relee todo si otro worker escribió en medio."""
+        if version == (self._version or 0) + 1:
+            self._version = version
+        else:
+            self._version = None
+            await self._sync()
+    
+    def _sorted(self, request_ids) -> List[ContactRequest]:
+        requests = [self.queue.requests[request_id] for request_id in request_ids]
+        requests.sort(key=lambda request: request.created_at)
+        return requests
+    
+    # Las propiedades leen los índices locales (última sincronización); los
+    # métodos get_* sincronizan antes con el almacén
+    @property
+    def pending_requests(self) -> List[ContactRequest]:
+        return self._sorted(self.queue.ids_with_status('pending'))
+    
+    @property
+    def assigned_requests(self) -> List[ContactRequest]:
+        return self._sorted(self.queue.ids_with_status('assigned'))
+    
+    @property
+    def completed_requests(self) -> List[ContactRequest]:
+        return self._sorted(self.queue.ids_with_status('completed'))
     
     async def process_contact_request(self, contact_request: ContactRequest) -> Dict[str, Any]:
         """
@@ -36,14 +118,15 @@ class ContactProcessor:
             print(f"   Usuario: {contact_request.user_name}")
             print(f"   Motivo: {contact_request.contact_reason}")
             
-            # Agregar a la lista de solicitudes pendientes
-            self.pending_requests.append(contact_request)
+            # Registrar como solicitud pendiente
+            await self._sync()
+            await self._save(contact_request, new=True)
             
             # Determinar prioridad
             priority_score = contact_request.get_priority_score()
             is_urgent = contact_request.is_urgent()
             
-            # Simular asignación de asesor (en producción esto sería más complejo)
+            # Asignar asesor si alguno tiene capacidad; si no, queda en cola por prioridad
             assignment_result = await self._assign_advisor(contact_request)
             
             return {
@@ -54,7 +137,7 @@ class ContactProcessor:
                 'assigned_advisor': assignment_result.get('advisor_id'),
                 'advisor_name': assignment_result.get('advisor_name'),
                 'estimated_response_time': assignment_result.get('response_time'),
-                'status': 'pending'
+                'status': contact_request.status
             }
             
         except Exception as e:
@@ -73,69 +156,85 @@ class ContactProcessor:
             contact_request: Solicitud de contacto
             
         Returns:
-            Dict con información del asesor asignado
+            Dict con información del asesor asignado (advisor_id None si quedó en cola)
         """
-        # Simulación de asignación de asesor
-        # En producción, esto sería más complejo con base de datos de asesores
-        
-        advisors = [
-            {'id': 'ADV_001', 'name': 'María González', 'specialties': ['tecnología', 'implementación']},
-            {'id': 'ADV_002', 'name': 'Carlos Rodríguez', 'specialties': ['finanzas', 'empresas grandes']},
-            {'id': 'ADV_003', 'name': 'Ana Martínez', 'specialties': ['salud', 'educación']},
-            {'id': 'ADV_004', 'name': 'Luis Pérez', 'specialties': ['startups', 'pymes']}
-        ]
-        
-        # Determinar asesor basado en industria y urgencia
-        selected_advisor = self._select_advisor(contact_request, advisors)
+        # Determinar asesor basado en industria, tamaño de empresa y carga
+        selected_advisor = self._select_advisor(contact_request)
         
+        if selected_advisor is None:
+            return {
+                'advisor_id': None,
+                'advisor_name': None,
+                'response_time': "En cola: te contactará el primer asesor disponible",
+                'specialties': [],
+                'queue_length': self.queue.count('pending')
+            }
+            
         # Calcular tiempo de respuesta estimado
         if contact_request.is_urgent():
             response_time = "30-60 minutos"
         else:
             response_time = "2-4 horas"
+            
+        contact_request.assign_advisor(selected_advisor.advisor_id, selected_advisor.name)
         
-        # Simular asignación
-        contact_request.assign_advisor(selected_advisor['id'], selected_advisor['name'])
-        
-        # Mover de pendientes a asignadas
-        if contact_request in self.pending_requests:
-            self.pending_requests.remove(contact_request)
-        self.assigned_requests.append(contact_request)
+        # Pasa de pendiente a asignada (el estado lo cambia assign_advisor)
+        await self._save(contact_request)
         
         return {
-            'advisor_id': selected_advisor['id'],
-            'advisor_name': selected_advisor['name'],
+            'advisor_id': selected_advisor.advisor_id,
+            'advisor_name': selected_advisor.name,
             'response_time': response_time,
-            'specialties': selected_advisor['specialties']
+            'specialties': selected_advisor.specialties
         }
     
-    def _select_advisor(self, contact_request: ContactRequest, advisors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _select_advisor(self, contact_request: ContactRequest) -> Optional[Advisor]:
         """
-        Selecciona el asesor más adecuado para la solicitud.
+        Selecciona el asesor más adecuado entre los que tienen capacidad.
         
         Args:
             contact_request: Solicitud de contacto
-            advisors: Lista de asesores disponibles
             
         Returns:
-            Asesor seleccionado
+            Asesor seleccionado, o None si todos están a capacidad
         """
+        advisors = self.queue.available_advisors()
+        if not advisors:
+            return None
+            
         industry = contact_request.industry.lower() if contact_request.industry else ''
         company_size = contact_request.company_size.lower() if contact_request.company_size else ''
         
         # Buscar asesor por especialidad
         for advisor in advisors:
-            for specialty in advisor['specialties']:
+            for specialty in advisor.specialties:
                 if specialty in industry or specialty in company_size:
                     return advisor
+                    
+        # Después por tamaño de empresa
+        for advisor in advisors:
+            if any(size in company_size for size in advisor.company_sizes):
+                return advisor
+                
+        # Si no hay coincidencia específica, el menos cargado (empate: orden de la lista)
+        return min(advisors, key=lambda advisor: self.queue.advisor_load[advisor.advisor_id] / advisor.capacity)
+    
+    async def dispatch_pending_requests(self) -> int:
+        """
+        Asigna las solicitudes en cola, de mayor a menor prioridad, mientras haya capacidad.
         
-        # Si no hay coincidencia específica, seleccionar por defecto
-        if 'grande' in company_size or 'enterprise' in company_size:
-            return advisors[1]  # Carlos para empresas grandes
-        elif 'startup' in company_size or 'pequeña' in company_size:
-            return advisors[3]  # Luis para startups/pymes
-        else:
-            return advisors[0]  # María por defecto
+        Returns:
+            Número de solicitudes asignadas
+        """
+        await self._sync()
+        assigned = 0
+        while self.queue.available_advisors():
+            contact_request = self.queue.peek_pending()
+            if contact_request is None:
+                break
+            await self._assign_advisor(contact_request)
+            assigned += 1
+        return assigned
     
     async def get_pending_requests(self) -> List[ContactRequest]:
         """
@@ -144,7 +243,8 @@ class ContactProcessor:
         Returns:
             Lista de solicitudes pendientes
         """
-        return self.pending_requests.copy()
+        await self._sync()
+        return self.pending_requests
     
     async def get_assigned_requests(self) -> List[ContactRequest]:
         """
@@ -153,7 +253,8 @@ class ContactProcessor:
         Returns:
             Lista de solicitudes asignadas
         """
-        return self.assigned_requests.copy()
+        await self._sync()
+        return self.assigned_requests
     
     async def get_urgent_requests(self) -> List[ContactRequest]:
         """
@@ -162,13 +263,8 @@ class ContactProcessor:
         Returns:
             Lista de solicitudes urgentes
         """
-        urgent_requests = []
-        
-        for request in self.pending_requests + self.assigned_requests:
-            if request.is_urgent():
-                urgent_requests.append(request)
-        
-        return urgent_requests
+        await self._sync()
+        return self._sorted(self.queue.urgent_open_ids)
     
     async def mark_request_as_completed(self, request_id: str, satisfaction_score: Optional[int] = None) -> bool:
         """
@@ -181,23 +277,19 @@ class ContactProcessor:
         Returns:
             True si se marcó como completada
         """
-        # Buscar en solicitudes asignadas
-        for request in self.assigned_requests:
-            if request.request_id == request_id:
-                request.mark_as_completed(satisfaction_score)
-                self.assigned_requests.remove(request)
-                self.completed_requests.append(request)
-                return True
+        await self._sync()
         
-        # Buscar en solicitudes pendientes (caso raro)
-        for request in self.pending_requests:
-            if request.request_id == request_id:
-                request.mark_as_completed(satisfaction_score)
-                self.pending_requests.remove(request)
-                self.completed_requests.append(request)
-                return True
+        # Solo solicitudes asignadas o pendientes (caso raro)
+        request = self.queue.requests.get(request_id)
+        if request is None or request.status not in ('assigned', 'pending'):
+            return False
+            
+        request.mark_as_completed(satisfaction_score)
+        await self._save(request)
         
-        return False
+        # El asesor liberó capacidad: despachar la siguiente en cola
+        await self.dispatch_pending_requests()
+        return True
     
     async def get_request_by_id(self, request_id: str) -> Optional[ContactRequest]:
         """
@@ -209,13 +301,8 @@ class ContactProcessor:
         Returns:
             Solicitud encontrada o None
         """
-        all_requests = self.pending_requests + self.assigned_requests + self.completed_requests
-        
-        for request in all_requests:
-            if request.request_id == request_id:
-                return request
-        
-        return None
+        await self._sync()
+        return self.queue.requests.get(request_id)
     
     async def get_user_requests(self, user_id: str) -> List[ContactRequest]:
         """
@@ -227,14 +314,8 @@ class ContactProcessor:
         Returns:
             Lista de solicitudes del usuario
         """
-        user_requests = []
-        all_requests = self.pending_requests + self.assigned_requests + self.completed_requests
-        
-        for request in all_requests:
-            if request.user_id == user_id:
-                user_requests.append(request)
-        
-        return user_requests
+        await self._sync()
+        return self._sorted(self.queue.user_request_ids(user_id))
     
     async def get_statistics(self) -> Dict[str, Any]:
         """
@@ -243,29 +324,46 @@ class ContactProcessor:
         Returns:
             Dict con estadísticas
         """
-        total_requests = len(self.pending_requests) + len(self.assigned_requests) + len(self.completed_requests)
+        await self._sync()
+        pending_count = self.queue.count('pending')
+        assigned_count = self.queue.count('assigned')
+        completed_count = self.queue.count('completed')
+        total_requests = pending_count + assigned_count + completed_count
         
-        urgent_count = 0
-        for request in self.pending_requests + self.assigned_requests:
-            if request.is_urgent():
-                urgent_count += 1
+        urgent_count = len(self.queue.urgent_open_ids)
         
         avg_priority_score = 0
         if total_requests > 0:
-            all_requests = self.pending_requests + self.assigned_requests + self.completed_requests
-            total_score = sum(request.get_priority_score() for request in all_requests)
-            avg_priority_score = total_score / total_requests
-        
+            avg_priority_score = self.queue.priority_score_sum() / len(self.queue.requests)
+            
         return {
             'total_requests': total_requests,
-            'pending_requests': len(self.pending_requests),
-            'assigned_requests': len(self.assigned_requests),
-            'completed_requests': len(self.completed_requests),
+            'pending_requests': pending_count,
+            'assigned_requests': assigned_count,
+            'completed_requests': completed_count,
             'urgent_requests': urgent_count,
             'average_priority_score': round(avg_priority_score, 2),
-            'completion_rate': round(len(self.completed_requests) / total_requests * 100, 2) if total_requests > 0 else 0
+            'completion_rate': round(completed_count / total_requests * 100, 2) if total_requests > 0 else 0,
+            'advisors': self.get_advisor_status()
         }
     
+    def get_advisor_status(self) -> List[Dict[str, Any]]:
+        """
+        Carga y capacidad de cada asesor.
+        
+        Returns:
+            Lista con la carga actual de cada asesor
+        """
+        return [
+            {
+                'advisor_id': advisor.advisor_id,
+                'name': advisor.name,
+                'load': self.queue.advisor_load[advisor.advisor_id],
+                'capacity': advisor.capacity
+            }
+            for advisor in self.queue.advisors
+        ]
+    
     async def cleanup_old_requests(self, days_old: int = 30) -> int:
         """
         Limpia solicitudes antiguas.
@@ -276,17 +374,18 @@ class ContactProcessor:
         Returns:
             Número de solicitudes eliminadas
         """
+        await self._sync()
         cutoff_date = datetime.now() - timedelta(days=days_old)
-        removed_count = 0
         
         # Limpiar solicitudes completadas antiguas
-        old_completed = []
-        for request in self.completed_requests:
-            if request.completed_at and request.completed_at < cutoff_date:
-                old_completed.append(request)
-                removed_count += 1
-        
-        for request in old_completed:
-            self.completed_requests.remove(request)
+        old_completed = [
+            request_id for request_id in self.queue.ids_with_status('completed')
+            if self.queue.requests[request_id].completed_at and self.queue.requests[request_id].completed_at < cutoff_date
+        ]
         
-        return removed_count 
\ No newline at end of file
+        for request_id in old_completed:
+            self.queue.remove(request_id)
+        if old_completed:
+            await self._check_version(await call_store(self.store, self._delete_requests, old_completed))
+            
+        return len(old_completed)
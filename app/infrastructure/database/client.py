@@ -2,24 +2,43 @@
 Cliente PostgreSQL para la base de datos de cursos.
 """
 import logging
-from typing import Optional, List, Dict, Any
-import asyncpg
-from asyncpg import Pool, Connection
+import sys
+import time
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
 from app.config import settings
+from app.infrastructure.observability.metrics import db_query_errors, db_query_seconds
+
+if TYPE_CHECKING:
+    from asyncpg import Pool
 
 logger = logging.getLogger(__name__)
 
+# Código del método que llama a execute_query -> etiqueta de métricas
+_method_labels: Dict[Any, str] = {}
+
+
+def _caller_method(depth: int = 2) -> str:
+    """Método que ejecuta la query (p. ej. ``CourseRepository.get_course_by_id``)."""
+    code = sys._getframe(depth).f_code
+    label = _method_labels.get(code)
+    if label is None:
+        label = _method_labels[code] = getattr(code, 'co_qualname', code.co_name)
+    return label
+
 
 class DatabaseClient:
     """Cliente para conexiones a PostgreSQL."""
     
     def __init__(self):
-        self.pool: Optional[Pool] = None
+        self.pool: Optional["Pool"] = None
         self._connection_url = settings.database_url
         
     async def connect(self) -> bool:
         """Establece conexión con la base de datos."""
         try:
+            # asyncpg se importa al conectar: importar repositorios no carga el driver
+            import asyncpg
+            
             self.pool = await asyncpg.create_pool(
                 self._connection_url,
                 min_size=1,
@@ -65,10 +84,13 @@ class DatabaseClient:
         Returns:
             Lista de registros como diccionarios o None si hay error
         """
+        # Se resuelve antes del primer await, cuando el marco de arriba es el llamador
+        method = _caller_method()
         if not self.pool:
             logger.error("❌ No hay conexión a la base de datos")
             return None
             
+        started = time.perf_counter()
         try:
             async with self.pool.acquire() as conn:
                 if fetch_mode == "all":
@@ -78,7 +100,9 @@ class DatabaseClient:
                     records = [record] if record else []
                 else:  # none
                     await conn.execute(query, *args)
+                    db_query_seconds.labels(method).observe(time.perf_counter() - started)
                     return []
+                db_query_seconds.labels(method).observe(time.perf_counter() - started)
                 
                 # Convertir records a diccionarios manteniendo los nombres originales
                 result = []
@@ -91,6 +115,7 @@ class DatabaseClient:
                 return result if result else []
                 
         except Exception as e:
+            db_query_errors.labels(method).inc()
             logger.error(f"❌ Error ejecutando query: {e}")
             logger.error(f"Query: {query}")
             logger.error(f"Args: {args}")
@@ -109,20 +134,24 @@ class DatabaseClient:
         Returns:
             True si la transacción fue exitosa
         """
+        method = _caller_method()
         if not self.pool:
             logger.error("❌ No hay conexión a la base de datos")
             return False
             
+        started = time.perf_counter()
         try:
             async with self.pool.acquire() as conn:
                 async with conn.transaction():
                     for query, *args in operations:
                         await conn.execute(query, *args)
+            db_query_seconds.labels(method).observe(time.perf_counter() - started)
                         
             logger.info(f"✅ Transacción completada: {len(operations)} operaciones")
             return True
             
         except Exception as e:
+            db_query_errors.labels(method).inc()
             logger.error(f"❌ Error en transacción: {e}")
             return False
     
@@ -0,0 +1,171 @@
+"""
+Índice invertido para buscar FAQs.
+
+Se construye una sola vez por versión de la base de FAQs (al cargarla o al
+cambiarla con ``add_faq``/``update_faq``) y responde cada búsqueda
+recorriendo solo las listas de los términos del mensaje, sin re-escanear
+todas las FAQs:
+
+- Texto normalizado sin acentos ni mayúsculas (``fold_text``) y plurales
+  simples reducidos ("precios" → "precio").
+- Puntuación BM25 sobre pregunta, palabras clave y respuesta, con más peso
+  para las palabras clave y la pregunta.
+- Coincidencia de frases: las palabras clave de la FAQ y de su categoría
+  ("cuánto cuesta", "casos de éxito") se buscan como secuencias exactas de
+  tokens y suman un bono; ``detect_faq`` solo acepta resultados con alguna
+  frase coincidente.
+"""
+
+import heapq
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from app.domain.course_fact_index import fold_text
+
+# Parámetros estándar de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Peso de cada campo en la frecuencia de un término
+FIELD_WEIGHTS = (('keywords', 3), ('question', 2), ('answer', 1))
+
+# Bono por cada token de una frase coincidente (palabra clave o de categoría)
+PHRASE_BOOST = 2.5
+
+# Palabras vacías que no aportan a BM25 (sí cuentan dentro de frases)
+STOPWORDS = frozenset((
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los', 'me', 'mi',
+    'o', 'para', 'por', 'que', 'se', 'si', 'su', 'te', 'tu', 'un', 'una', 'y', 'yo', 'hay',
+    'como', 'cual', 'esta', 'este', 'son', 'hola'
+))
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados: sin acentos, en minúsculas y sin plural simple."""
+    tokens = []
+    for token in _TOKEN.findall(fold_text(text)):
+        if len(token) > 4 and token.endswith('s'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass
+class FAQMatch:
+    """FAQ encontrada con su puntuación."""
+    faq: Dict[str, Any]
+    score: float
+    matched_phrases: List[str] = field(default_factory=list)
+
+
+class FAQSearchIndex:
+    """
+    Índice BM25 + frases sobre una lista de FAQs.
+
+    Args:
+        faqs: FAQs (dicts con ``question``, ``keywords``, ``answer``, ``category``)
+        category_phrases: Frases adicionales por categoría
+    """
+
+    def __init__(self, faqs: Sequence[Dict[str, Any]], category_phrases: Optional[Mapping[str, Iterable[str]]] = None):
+        self.faqs = list(faqs)
+        category_phrases = category_phrases or {}
+        # término -> [(posición de la FAQ, frecuencia ponderada)]
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        # posición de la FAQ -> {término: frecuencia ponderada}
+        self._frequencies: List[Dict[str, int]] = []
+        # primer token -> [(tokens de la frase, frase original, posición de la FAQ)]
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], str, int]]] = defaultdict(list)
+        lengths: List[int] = []
+        seen_categories = set()
+
+        for position, faq in enumerate(self.faqs):
+            frequencies: Dict[str, int] = defaultdict(int)
+            length = 0
+            for field_name, weight in FIELD_WEIGHTS:
+                value = faq.get(field_name) or ''
+                text = ' '.join(value) if isinstance(value, (list, tuple)) else str(value)
+                for token in tokenize(text):
+                    if token not in STOPWORDS:
+                        frequencies[token] += weight
+                        length += weight
+            for token, frequency in frequencies.items():
+                self._postings[token].append((position, frequency))
+            self._frequencies.append(dict(frequencies))
+            lengths.append(length)
+
+            phrases = list(faq.get('keywords') or [])
+            # Las frases de categoría apuntan a la primera FAQ de esa categoría
+            category = faq.get('category')
+            if category in category_phrases and category not in seen_categories:
+                seen_categories.add(category)
+                phrases += list(category_phrases[category])
+            for phrase in dict.fromkeys(phrases):
+                tokens = tuple(tokenize(phrase))
+                if tokens:
+                    self._phrases[tokens[0]].append((tokens, phrase, position))
+
+        average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        # Normalización por longitud de BM25, precalculada por FAQ
+        self._norms = [
+            BM25_K1 * (1 - BM25_B + BM25_B * length / average_length) if average_length else BM25_K1
+            for length in lengths
+        ]
+        count = len(self.faqs)
+        self._idf = {
+            token: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for token, postings in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.faqs)
+
+    def search(self, query: str, top_k: int = 5, require_phrase: bool = False) -> List[FAQMatch]:
+        """
+        FAQs más relevantes para la consulta.
+
+        Args:
+            query: Mensaje o consulta del usuario
+            top_k: Máximo de resultados
+            require_phrase: Solo FAQs con alguna frase (palabra clave) coincidente
+
+        Returns:
+            Coincidencias ordenadas de mayor a menor puntuación
+        """
+        tokens = tokenize(query)
+        if not tokens or not self.faqs:
+            return []
+
+        matched: Dict[int, List[str]] = defaultdict(list)
+        scores: Dict[int, float] = defaultdict(float)
+        for start, token in enumerate(tokens):
+            for phrase_tokens, phrase, position in self._phrases.get(token, ()):
+                if tuple(tokens[start:start + len(phrase_tokens)]) == phrase_tokens and phrase not in matched.get(position, ()):
+                    matched[position].append(phrase)
+                    scores[position] += PHRASE_BOOST * len(phrase_tokens)
+
+        terms = [token for token in set(tokens) if token not in STOPWORDS and token in self._idf]
+        if require_phrase:
+            # Solo se puntúan las FAQs con frase coincidente
+            for position in matched:
+                frequencies = self._frequencies[position]
+                for token in terms:
+                    frequency = frequencies.get(token)
+                    if frequency:
+                        scores[position] += self._bm25(token, frequency, position)
+        else:
+            for token in terms:
+                for position, frequency in self._postings[token]:
+                    scores[position] += self._bm25(token, frequency, position)
+
+        candidates = matched.keys() if require_phrase else scores.keys()
+        best = heapq.nlargest(top_k, candidates, key=lambda position: (scores[position], -position))
+        return [FAQMatch(self.faqs[position], round(scores[position], 4), matched.get(position, [])) for position in best]
+
+    def _bm25(self, token: str, frequency: int, position: int) -> float:
+        return self._idf[token] * frequency * (BM25_K1 + 1) / (frequency + self._norms[position])
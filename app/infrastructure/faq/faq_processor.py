@@ -7,15 +7,95 @@ import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from app.infrastructure.faq.faq_index import FAQMatch, FAQSearchIndex
+from app.infrastructure.faq.semantic_index import SemanticFAQMatcher, build_faq_semantic_matcher
+from app.infrastructure.shared_state.kv_store import KeyValueStore, call_store, shared_state_store
+
+# Frases que asocian un mensaje con la categoría de una FAQ
+CATEGORY_KEYWORDS = {
+    'precio': ['precio', 'costo', 'valor', 'cuánto cuesta', 'inversión'],
+    'duración': ['duración', 'tiempo', 'cuánto dura', 'horas'],
+    'implementación': ['implementación', 'empresa', 'proceso', 'pasos'],
+    'requisitos': ['requisitos', 'necesito', 'conocimientos'],
+    'casos_éxito': ['casos de éxito', 'ejemplos', 'resultados'],
+    'roi': ['roi', 'retorno', 'beneficio'],
+    'certificado': ['certificado', 'diploma'],
+    'soporte': ['soporte', 'ayuda', 'asistencia'],
+    'acceso': ['acceso', 'tiempo', 'ilimitado'],
+    'garantía': ['garantía', 'satisfacción', 'devolución']
+}
+
 
 class FAQProcessor:
     """
     Procesador para manejar preguntas frecuentes.
     """
     
-    def __init__(self):
-        """Inicializa el procesador de FAQ."""
-        self.faq_database = self._initialize_faq_database()
+    # Namespaces en el almacén compartido: FAQs por ID y contadores (versión, último ID)
+    STORE_NAMESPACE = "faq"
+    META_NAMESPACE = "faq_meta"
+    
+    def __init__(
+        self,
+        store: Optional[KeyValueStore] = None,
+        semantic_matcher: Optional[SemanticFAQMatcher] = None
+    ):
+        """
+        Inicializa el procesador de FAQ.
+        
+        Args:
+            store: Almacén de estado compartido entre workers (por defecto el global)
+            semantic_matcher: Nivel semántico (por defecto según la configuración; None si está desactivado)
+        """
+        self.store = store or shared_state_store
+        self.semantic_matcher = semantic_matcher or build_faq_semantic_matcher()
+        # Qué nivel resolvió cada mensaje: palabras clave, semántico o ninguno
+        self.match_stats: Dict[str, int] = {'keyword': 0, 'semantic': 0, 'miss': 0}
+        self._faq_cache: List[Dict[str, Any]] = []
+        self._faq_index = FAQSearchIndex([])
+        self._cached_version: Optional[int] = None
+        
+        # El primer worker en arrancar siembra las FAQs iniciales
+        if not self.store.items(self.STORE_NAMESPACE):
+            initial_faqs = self._initialize_faq_database()
+            for faq in initial_faqs:
+                self.store.set(self.STORE_NAMESPACE, faq['id'], faq)
+            self.store.set(self.META_NAMESPACE, 'last_id', len(initial_faqs))
+            self.store.incr(self.META_NAMESPACE, 'version')
+        self._apply_changes(*self._read_changes(None))
+    
+    def _read_changes(self, known_version: Optional[int]):
+        """(versión, FAQs) del almacén; FAQs es None si la versión no cambió."""
+        version = self.store.get(self.META_NAMESPACE, 'version', 0)
+        if version == known_version:
+            return version, None
+        return version, self.store.items(self.STORE_NAMESPACE)
+    
+    def _apply_changes(self, version: int, faqs: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        if faqs is None:
+            return
+        self._faq_cache = [faqs[faq_id] for faq_id in sorted(faqs)]
+        self._faq_index = FAQSearchIndex(self._faq_cache, CATEGORY_KEYWORDS)
+        self._cached_version = version
+    
+    async def refresh(self) -> None:
+        """Recarga la copia local si otro worker cambió las FAQs (una lectura de la versión)."""
+        self._apply_changes(*await call_store(self.store, self._read_changes, self._cached_version))
+    
+    @property
+    def faq_database(self) -> List[Dict[str, Any]]:
+        """
+        FAQs de la copia local, tal como quedaron en el último ``refresh``.
+        
+        Returns:
+            Lista de FAQs ordenada por ID
+        """
+        return self._faq_cache
+    
+    @property
+    def faq_index(self) -> FAQSearchIndex:
+        """Índice de búsqueda de la copia local de las FAQs."""
+        return self._faq_index
     
     def _initialize_faq_database(self) -> List[Dict[str, Any]]:
         """
@@ -127,37 +207,94 @@ class FAQProcessor:
         Returns:
             FAQ encontrada o None
         """
-        message_lower = message.lower()
+        await self.refresh()
+        matches = self.faq_index.search(message, top_k=1, require_phrase=True)
+        if matches:
+            self.match_stats['keyword'] += 1
+            return matches[0].faq
         
-        # Buscar coincidencias por palabras clave
-        for faq in self.faq_database:
-            for keyword in faq['keywords']:
-                if keyword in message_lower:
-                    return faq
+        # Paráfrasis sin palabras clave: similitud de embeddings (fuera del event loop)
+        if self.semantic_matcher is not None:
+            faqs = self.faq_database
+            semantic_match = await asyncio.to_thread(
+                self.semantic_matcher.match, message, faqs, self._cached_version
+            )
+            if semantic_match is not None:
+                self.match_stats['semantic'] += 1
+                return semantic_match.faq
         
-        # Buscar coincidencias por categoría
-        category_keywords = {
-            'precio': ['precio', 'costo', 'valor', 'cuánto cuesta', 'inversión'],
-            'duración': ['duración', 'tiempo', 'cuánto dura', 'horas'],
-            'implementación': ['implementación', 'empresa', 'proceso', 'pasos'],
-            'requisitos': ['requisitos', 'necesito', 'conocimientos'],
-            'casos_éxito': ['casos de éxito', 'ejemplos', 'resultados'],
-            'roi': ['roi', 'retorno', 'beneficio'],
-            'certificado': ['certificado', 'diploma'],
-            'soporte': ['soporte', 'ayuda', 'asistencia'],
-            'acceso': ['acceso', 'tiempo', 'ilimitado'],
-            'garantía': ['garantía', 'satisfacción', 'devolución']
-        }
+        self.match_stats['miss'] += 1
+        return None
+    
+    async def detect_faq_batch(self, messages: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Detecta FAQs para varios mensajes; el nivel semántico los resuelve en un solo lote.
         
-        for category, keywords in category_keywords.items():
-            for keyword in keywords:
-                if keyword in message_lower:
-                    # Buscar FAQ de esa categoría
-                    for faq in self.faq_database:
-                        if faq['category'] == category:
-                            return faq
+        Args:
+            messages: Mensajes de usuarios
+            
+        Returns:
+            FAQ encontrada (o None) para cada mensaje, en el mismo orden
+        """
+        await self.refresh()
+        results: List[Optional[Dict[str, Any]]] = []
+        pending: List[int] = []
+        for position, message in enumerate(messages):
+            matches = self.faq_index.search(message, top_k=1, require_phrase=True)
+            results.append(matches[0].faq if matches else None)
+            if matches:
+                self.match_stats['keyword'] += 1
+            else:
+                pending.append(position)
         
-        return None
+        if pending and self.semantic_matcher is not None:
+            faqs = self.faq_database
+            semantic_matches = await asyncio.to_thread(
+                self.semantic_matcher.match_batch, [messages[i] for i in pending], faqs, self._cached_version
+            )
+            for position, semantic_match in zip(pending, semantic_matches):
+                if semantic_match is not None:
+                    results[position] = semantic_match.faq
+                    self.match_stats['semantic'] += 1
+                else:
+                    self.match_stats['miss'] += 1
+        else:
+            self.match_stats['miss'] += len(pending)
+        
+        return results
+    
+    def get_match_report(self) -> Dict[str, Any]:
+        """
+        Reporte de aciertos por nivel (palabras clave y semántico).
+        
+        Returns:
+            Dict con conteos, tasas y estado del nivel semántico
+        """
+        total = sum(self.match_stats.values())
+        return {
+            'messages': total,
+            **self.match_stats,
+            'keyword_hit_rate': round(self.match_stats['keyword'] / total, 4) if total else 0.0,
+            'semantic_hit_rate': round(self.match_stats['semantic'] / total, 4) if total else 0.0,
+            'answered_without_llm_rate': round(
+                (self.match_stats['keyword'] + self.match_stats['semantic']) / total, 4
+            ) if total else 0.0,
+            'semantic_tier': self.semantic_matcher.get_status() if self.semantic_matcher is not None else None
+        }
+    
+    async def find_faq_matches(self, message: str, top_k: int = 3) -> List[FAQMatch]:
+        """
+        FAQs candidatas para el mensaje, ordenadas por puntuación.
+        
+        Args:
+            message: Mensaje del usuario
+            top_k: Máximo de resultados
+            
+        Returns:
+            Lista de FAQMatch (FAQ, puntuación y palabras clave coincidentes)
+        """
+        await self.refresh()
+        return self.faq_index.search(message, top_k=top_k, require_phrase=True)
     
     async def get_common_faqs(self) -> List[Dict[str, Any]]:
         """
@@ -167,6 +304,7 @@ class FAQProcessor:
             Lista de FAQs comunes
         """
         # Ordenar por prioridad y devolver las más importantes
+        await self.refresh()
         sorted_faqs = sorted(self.faq_database, key=lambda x: self._get_priority_score(x['priority']), reverse=True)
         return sorted_faqs[:5]
     
@@ -187,69 +325,20 @@ class FAQProcessor:
         }
         return priority_scores.get(priority, 1)
     
-    async def search_faqs(self, query: str) -> List[Dict[str, Any]]:
+    async def search_faqs(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Busca FAQs por consulta.
         
         Args:
             query: Consulta de búsqueda
+            top_k: Máximo de resultados (por defecto todas las que coinciden)
             
         Returns:
-            Lista de FAQs que coinciden
+            Lista de FAQs que coinciden, de la más a la menos relevante
         """
-        query_lower = query.lower()
-        matches = []
-        
-        for faq in self.faq_database:
-            # Buscar en pregunta
-            if query_lower in faq['question'].lower():
-                matches.append(faq)
-                continue
-            
-            # Buscar en palabras clave
-            for keyword in faq['keywords']:
-                if query_lower in keyword:
-                    matches.append(faq)
-                    break
-            
-            # Buscar en respuesta
-            if query_lower in faq['answer'].lower():
-                matches.append(faq)
-        
-        # Ordenar por relevancia
-        matches.sort(key=lambda x: self._calculate_relevance_score(x, query_lower), reverse=True)
-        return matches
-    
-    def _calculate_relevance_score(self, faq: Dict[str, Any], query: str) -> int:
-        """
-        Calcula el score de relevancia de una FAQ.
-        
-        Args:
-            faq: FAQ a evaluar
-            query: Consulta de búsqueda
-            
-        Returns:
-            Score de relevancia
-        """
-        score = 0
-        
-        # Pregunta exacta
-        if query in faq['question'].lower():
-            score += 10
-        
-        # Palabras clave
-        for keyword in faq['keywords']:
-            if query in keyword:
-                score += 5
-        
-        # Respuesta
-        if query in faq['answer'].lower():
-            score += 3
-        
-        # Prioridad
-        score += self._get_priority_score(faq['priority'])
-        
-        return score
+        await self.refresh()
+        index = self.faq_index
+        return [match.faq for match in index.search(query, top_k=top_k or len(index))]
     
     async def get_faq_by_category(self, category: str) -> List[Dict[str, Any]]:
         """
@@ -261,6 +350,7 @@ class FAQProcessor:
         Returns:
             Lista de FAQs de esa categoría
         """
+        await self.refresh()
         return [faq for faq in self.faq_database if faq['category'] == category]
     
     async def get_faq_statistics(self) -> Dict[str, Any]:
@@ -270,6 +360,7 @@ class FAQProcessor:
         Returns:
             Dict con estadísticas
         """
+        await self.refresh()
         total_faqs = len(self.faq_database)
         
         # Contar por categoría
@@ -314,7 +405,6 @@ class FAQProcessor:
         """
         try:
             new_faq = {
-                'id': f"FAQ_{len(self.faq_database) + 1:03d}",
                 'category': category,
                 'question': question,
                 'keywords': keywords or [],
@@ -322,8 +412,7 @@ class FAQProcessor:
                 'escalation_needed': False,
                 'priority': 'medium'
             }
-            
-            self.faq_database.append(new_faq)
+            await call_store(self.store, self._store_new_faq, new_faq)
             return True
             
         except Exception as e:
@@ -342,13 +431,23 @@ class FAQProcessor:
             True si se actualizó exitosamente
         """
         try:
-            for faq in self.faq_database:
-                if faq['id'] == faq_id:
-                    faq.update(updates)
-                    return True
-            
-            return False
+            return await call_store(self.store, self._store_faq_update, faq_id, updates)
             
         except Exception as e:
             print(f"❌ Error actualizando FAQ: {e}")
-            return False 
\ No newline at end of file
+            return False 
+    
+    def _store_new_faq(self, faq: Dict[str, Any]) -> None:
+        # ID único aunque varios workers agreguen FAQs a la vez
+        faq_number = self.store.incr(self.META_NAMESPACE, 'last_id')
+        faq_id = f"FAQ_{faq_number:03d}"
+        self.store.set(self.STORE_NAMESPACE, faq_id, {'id': faq_id, **faq})
+        self.store.incr(self.META_NAMESPACE, 'version')
+    
+    def _store_faq_update(self, faq_id: str, updates: Dict[str, Any]) -> bool:
+        faq = self.store.get(self.STORE_NAMESPACE, faq_id)
+        if faq is None:
+            return False
+        self.store.set(self.STORE_NAMESPACE, faq_id, {**faq, **updates})
+        self.store.incr(self.META_NAMESPACE, 'version')
+        return True
@@ -0,0 +1,265 @@
+"""
+Nivel semántico de detección de FAQs.
+
+Las palabras clave no reconocen paráfrasis ("¿me dan constancia?" para la
+FAQ del certificado) y esos mensajes terminan en una generación con
+OpenAI. Este nivel compara el mensaje con las preguntas de las FAQs por
+similitud de embeddings, calculados localmente en CPU:
+
+- ``sentence_transformers``: modelo multilingüe pequeño (paráfrasis reales;
+  requiere el paquete ``sentence-transformers``)
+- ``hashing``: n-gramas de caracteres proyectados por hashing; sin modelo
+  ni descargas, solo reconoce variantes de escritura
+
+Los vectores de cada versión de las FAQs se guardan normalizados en una
+matriz ``float16`` de NumPy; las consultas se resuelven en lote con un solo
+producto matricial. Solo se acepta la FAQ más similar si supera el umbral.
+"""
+
+import logging
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.infrastructure.faq.faq_index import STOPWORDS, tokenize
+
+try:
+    import numpy as np
+except ImportError:  # El nivel semántico queda desactivado
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Palabras de pregunta que aparecen en casi todas las FAQs y no distinguen ninguna
+QUESTION_WORDS = frozenset((
+    'cuanto', 'cuanta', 'cual', 'cuale', 'cuando', 'donde', 'quien',
+    'puedo', 'tengo', 'tiene', 'tienen', 'incluye', 'curso'
+))
+
+
+class TextEmbedder(ABC):
+    """Interfaz de los modelos de embeddings locales."""
+
+    name: str = "base"
+    # Similitud coseno mínima sugerida para aceptar una FAQ
+    default_threshold: float = 0.75
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        """Matriz ``len(texts) x dimensión`` con filas de norma 1."""
+        pass
+
+
+class HashingEmbedder(TextEmbedder):
+    """
+    Embeddings por hashing de palabras y trigramas de caracteres.
+
+    Args:
+        dimension: Tamaño del vector
+    """
+
+    name = "hashing"
+    default_threshold = 0.28
+
+    def __init__(self, dimension: int = 1024):
+        self.dimension = dimension
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                if token in STOPWORDS or token in QUESTION_WORDS:
+                    continue
+                self._add(vectors[row], token, 1.0)
+                padded = f" {token} "
+                for start in range(len(padded) - 2):
+                    self._add(vectors[row], padded[start:start + 3], 0.5)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _add(self, vector: "np.ndarray", feature: str, weight: float) -> None:
+        hashed = zlib.crc32(feature.encode('utf-8'))
+        vector[hashed % self.dimension] += weight if hashed & 0x80000000 else -weight
+
+
+class SentenceTransformerEmbedder(TextEmbedder):
+    """
+    Embeddings de un modelo ``sentence-transformers`` en CPU.
+
+    El modelo se carga en el primer uso, no al importar.
+
+    Args:
+        model_name: Nombre del modelo (p. ej. ``paraphrase-multilingual-MiniLM-L12-v2``)
+    """
+
+    name = "sentence_transformers"
+    default_threshold = 0.75
+
+    def __init__(self, model_name: str):
+        try:
+            import sentence_transformers  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "El backend 'sentence_transformers' requiere sentence-transformers "
+                "(pip install sentence-transformers)"
+            ) from e
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                logger.info(f"🧠 Cargando modelo de embeddings {self.model_name}")
+                self._model = SentenceTransformer(self.model_name, device='cpu')
+        vectors = self._model.encode(
+            list(texts), batch_size=32, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+@dataclass
+class SemanticMatch:
+    """FAQ más similar al mensaje."""
+    faq: Dict[str, Any]
+    similarity: float
+
+
+class SemanticFAQMatcher:
+    """
+    Índice vectorial de las FAQs con búsqueda por similitud en lote.
+
+    Cada FAQ aporta dos filas: su pregunta y sus palabras clave; su
+    similitud es la mayor de las dos.
+
+    Args:
+        embedder: Modelo de embeddings
+        threshold: Similitud mínima para aceptar una FAQ (por defecto la del modelo)
+    """
+
+    def __init__(self, embedder: TextEmbedder, threshold: Optional[float] = None):
+        self.embedder = embedder
+        self.threshold = threshold if threshold is not None else embedder.default_threshold
+        # (vectores, inicio de cada FAQ en los vectores, FAQs): se reemplaza
+        # entero para que match_batch nunca mezcle partes de dos versiones
+        self._index: Optional[Tuple["np.ndarray", "np.ndarray", List[Dict[str, Any]]]] = None
+        self._version: Any = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {'queries': 0, 'hits': 0, 'similarity_sum': 0.0, 'rebuilds': 0}
+
+    def rebuild(self, faqs: Sequence[Dict[str, Any]], version: Any = None) -> None:
+        """Recalcula los vectores si cambió la versión de las FAQs."""
+        with self._lock:
+            if self._index is not None and version is not None and version == self._version:
+                return
+            texts, offsets = [], []
+            for faq in faqs:
+                offsets.append(len(texts))
+                texts.append(faq['question'])
+                if faq.get('keywords'):
+                    texts.append(', '.join(faq['keywords']))
+            vectors = self.embedder.embed(texts) if texts else None
+            # float16: la mitad de memoria; el producto se acumula en float32
+            if vectors is None:
+                self._index = None
+            else:
+                self._index = (vectors.astype(np.float16), np.asarray(offsets, dtype=np.intp), list(faqs))
+            self._version = version
+            self.stats['rebuilds'] += 1
+
+    def match_batch(
+        self,
+        messages: Sequence[str],
+        faqs: Optional[Sequence[Dict[str, Any]]] = None,
+        version: Any = None
+    ) -> List[Optional[SemanticMatch]]:
+        """
+        FAQ más similar a cada mensaje (None si no supera el umbral).
+
+        Args:
+            messages: Mensajes de usuarios
+            faqs: FAQs vigentes; si se dan, el índice se reconstruye cuando cambia ``version``
+            version: Versión de ``faqs``
+        """
+        if faqs is not None:
+            self.rebuild(faqs, version)
+        if not messages:
+            return []
+        index = self._index
+        if index is None:
+            return [None] * len(messages)
+        vectors, offsets, indexed_faqs = index
+
+        queries = self.embedder.embed(messages)
+        similarities = queries @ vectors.T.astype(np.float32)
+        # Mejor fila de cada FAQ (pregunta o palabras clave)
+        per_faq = np.maximum.reduceat(similarities, offsets, axis=1)
+        best = per_faq.argmax(axis=1)
+
+        results: List[Optional[SemanticMatch]] = []
+        for row, position in enumerate(best):
+            similarity = float(per_faq[row, position])
+            self.stats['queries'] += 1
+            if similarity >= self.threshold:
+                self.stats['hits'] += 1
+                self.stats['similarity_sum'] += similarity
+                results.append(SemanticMatch(indexed_faqs[position], round(similarity, 4)))
+            else:
+                results.append(None)
+        return results
+
+    def match(self, message: str, faqs: Optional[Sequence[Dict[str, Any]]] = None, version: Any = None) -> Optional[SemanticMatch]:
+        """FAQ más similar a un mensaje, o None."""
+        return self.match_batch([message], faqs, version)[0]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Reporte de aciertos del nivel semántico."""
+        queries, hits = int(self.stats['queries']), int(self.stats['hits'])
+        index = self._index
+        return {
+            'backend': self.embedder.name,
+            'threshold': self.threshold,
+            'faqs': 0 if index is None else len(index[2]),
+            'vectors': 0 if index is None else int(index[0].shape[0]),
+            'index_bytes': 0 if index is None else int(index[0].nbytes),
+            'queries': queries,
+            'hits': hits,
+            'hit_rate': round(hits / queries, 4) if queries else 0.0,
+            'avg_hit_similarity': round(self.stats['similarity_sum'] / hits, 4) if hits else None,
+            'rebuilds': int(self.stats['rebuilds'])
+        }
+
+
+def build_faq_embedder() -> Optional[TextEmbedder]:
+    """Modelo de embeddings según ``settings.faq_semantic_backend`` (None si está desactivado)."""
+    backend = (settings.faq_semantic_backend or '').lower()
+    if not backend:
+        return None
+    if np is None:
+        logger.warning("⚠️ El FAQ semántico requiere numpy (pip install numpy); queda desactivado")
+        return None
+    if backend == 'hashing':
+        return HashingEmbedder()
+    if backend == 'sentence_transformers':
+        try:
+            return SentenceTransformerEmbedder(settings.faq_semantic_model)
+        except ImportError as e:
+            logger.warning(f"⚠️ {e}; FAQ semántico desactivado")
+            return None
+    logger.warning(f"⚠️ Backend de FAQ semántico desconocido: {backend}; queda desactivado")
+    return None
+
+
+# Modelo compartido por todos los procesadores de FAQ del proceso
+faq_embedder = build_faq_embedder()
+
+
+def build_faq_semantic_matcher() -> Optional[SemanticFAQMatcher]:
+    """Nivel semántico con el modelo global, o None si está desactivado."""
+    if faq_embedder is None:
+        return None
+    return SemanticFAQMatcher(faq_embedder, settings.faq_semantic_threshold)
@@ -0,0 +1 @@
+# Infraestructura de archivos multimedia
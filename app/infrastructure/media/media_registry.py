@@ -0,0 +1,311 @@
+"""
+Registro de URLs pre-subidas para los adjuntos de WhatsApp.
+
+Los PDF e imágenes de los cursos apuntaban a nuestro propio dyno (ngrok /
+Heroku): Twilio tenía que descargarlos de ahí en cada envío, y la latencia
+de esa descarga (o el tiempo de despertar del dyno) se sumaba a la entrega.
+
+``MediaRegistry`` sube cada archivo del catálogo una sola vez a un blob
+store configurable y guarda la URL resultante indexada por el hash del
+contenido: mientras el archivo no cambie, todos los envíos reutilizan la
+misma URL ya caliente. Las URLs firmadas (S3 con ``presign_seconds``) se
+vuelven a firmar antes de expirar.
+
+Blob stores disponibles:
+- ``local``: copia a una carpeta local servida en ``MEDIA_BLOB_PUBLIC_BASE_URL``
+  (sustituto para pruebas y desarrollo)
+- ``s3``: bucket S3 o compatible (requiere ``boto3``)
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from app.config import settings
+from app.infrastructure.media.static_media import MediaAsset, StaticMediaCatalog, static_media_catalog
+
+logger = logging.getLogger(__name__)
+
+# Margen antes de la expiración de una URL firmada para volver a firmarla
+# (como mucho la mitad de su vigencia)
+PRESIGN_REFRESH_MARGIN_SECONDS = 3600
+
+
+class BlobStore(ABC):
+    """Interfaz de almacenamiento de blobs con URL pública o firmada."""
+
+    # Vigencia de las URLs que entrega (None = no expiran)
+    url_ttl_seconds: Optional[float] = None
+
+    @abstractmethod
+    async def find(self, key: str) -> Optional[str]:
+        """URL del blob si ya existe, o None."""
+        pass
+
+    @abstractmethod
+    async def upload(self, key: str, asset: MediaAsset) -> str:
+        """Sube el archivo con la clave dada y retorna su URL."""
+        pass
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blob store en una carpeta local.
+
+    Args:
+        directory: Carpeta donde se copian los archivos
+        base_url: URL pública que sirve esa carpeta; sin ella se usan URLs
+            ``file://``, que Twilio no puede descargar (solo para pruebas)
+    """
+
+    def __init__(self, directory: str, base_url: Optional[str] = None):
+        self.directory = Path(directory).resolve()
+        self.base_url = base_url.rstrip('/') if base_url else None
+
+    def _url(self, key: str) -> str:
+        if self.base_url:
+            return f"{self.base_url}/{key}"
+        return (self.directory / key).as_uri()
+
+    async def find(self, key: str) -> Optional[str]:
+        return self._url(key) if (self.directory / key).is_file() else None
+
+    async def upload(self, key: str, asset: MediaAsset) -> str:
+        target = self.directory / key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(shutil.copyfile, asset.path, target)
+        return self._url(key)
+
+
+class S3BlobStore(BlobStore):
+    """
+    Blob store en S3 (o compatible) con URLs públicas o pre-firmadas.
+
+    Args:
+        bucket: Nombre del bucket
+        prefix: Prefijo de las claves dentro del bucket
+        region: Región del bucket
+        public_base_url: URL pública del bucket/CDN; si no se da, se pre-firman las URLs
+        presign_seconds: Vigencia de las URLs pre-firmadas
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        region: Optional[str] = None,
+        public_base_url: Optional[str] = None,
+        presign_seconds: int = 86400
+    ):
+        try:
+            import boto3
+        except ImportError as e:
+            raise ImportError("El blob store 's3' requiere boto3 (pip install boto3)") from e
+        self.client = boto3.client('s3', region_name=region)
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.public_base_url = public_base_url.rstrip('/') if public_base_url else None
+        self.presign_seconds = presign_seconds
+        self.url_ttl_seconds = None if self.public_base_url else presign_seconds
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _url(self, key: str) -> str:
+        object_key = self._object_key(key)
+        if self.public_base_url:
+            return f"{self.public_base_url}/{object_key}"
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': object_key}, ExpiresIn=self.presign_seconds
+        )
+
+    async def find(self, key: str) -> Optional[str]:
+        from botocore.exceptions import ClientError
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError:
+            return None
+        return self._url(key)
+
+    async def upload(self, key: str, asset: MediaAsset) -> str:
+        await asyncio.to_thread(
+            self.client.upload_file, asset.path, self.bucket, self._object_key(key),
+            ExtraArgs={
+                'ContentType': asset.content_type,
+                # La clave incluye el hash: el objeto nunca cambia
+                'CacheControl': 'public, max-age=31536000, immutable'
+            }
+        )
+        return self._url(key)
+
+
+@dataclass
+class RegisteredMedia:
+    """URL pre-subida de un archivo, válida para un hash de contenido."""
+    sha256: str
+    url: str
+    expires_at: Optional[float] = None
+    fetch_ms: Optional[float] = None
+    ttl_seconds: Optional[float] = None
+
+    def is_fresh(self) -> bool:
+        if self.expires_at is None:
+            return True
+        # Con firmas de una hora o menos el margen fijo las daría por vencidas al firmarlas
+        margin = PRESIGN_REFRESH_MARGIN_SECONDS
+        if self.ttl_seconds is not None:
+            margin = min(margin, self.ttl_seconds / 2)
+        return time.time() < self.expires_at - margin
+
+
+class MediaRegistry:
+    """
+    Sube cada archivo del catálogo una vez y reutiliza su URL por hash.
+
+    Args:
+        store: Blob store destino (None desactiva el registro)
+        catalog: Catálogo de archivos locales
+        prewarm_fetch: Si se descarga la URL (HEAD) tras subirla, para
+            calentar la caché del proveedor y medir la latencia de descarga
+    """
+
+    def __init__(self, store: Optional[BlobStore], catalog: StaticMediaCatalog, prewarm_fetch: bool = True):
+        self.store = store
+        self.catalog = catalog
+        self.prewarm_fetch = prewarm_fetch
+        self._entries: Dict[str, RegisteredMedia] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.stats: Dict[str, int] = {'hits': 0, 'uploads': 0, 'reused': 0, 'resigned': 0, 'failures': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    @staticmethod
+    def blob_key(asset: MediaAsset) -> str:
+        """Clave estable por contenido: ``<hash>/<nombre>``."""
+        return f"{asset.digest}/{os.path.basename(asset.relative_path)}"
+
+    async def get_url(self, relative_path: str) -> Optional[str]:
+        """
+        URL pre-subida del archivo, subiéndolo si es la primera vez.
+
+        Args:
+            relative_path: Ruta relativa a resources/ (p. ej. ``course_materials/x.pdf``)
+
+        Returns:
+            URL del blob store, o None si el registro está desactivado, el
+            archivo no existe o la subida falló (el llamador usa su fallback)
+        """
+        if self.store is None:
+            return None
+        asset = self.catalog.get(relative_path)
+        if asset is None:
+            return None
+
+        entry = self._entries.get(asset.sha256)
+        if entry is not None and entry.is_fresh():
+            self.stats['hits'] += 1
+            return self._public_url(entry)
+
+        # Un solo registro en vuelo por hash, aunque varios envíos lo pidan a la vez
+        task = self._pending.get(asset.sha256)
+        if task is None:
+            task = asyncio.ensure_future(self._register(asset, resign=entry is not None))
+            self._pending[asset.sha256] = task
+            task.add_done_callback(lambda _: self._pending.pop(asset.sha256, None))
+        try:
+            entry = await asyncio.shield(task)
+        except Exception as e:
+            self.stats['failures'] += 1
+            logger.error(f"Error registrando media {relative_path} en el blob store: {e}")
+            return None
+        return self._public_url(entry)
+
+    @staticmethod
+    def _public_url(entry: RegisteredMedia) -> Optional[str]:
+        """Solo las URLs http(s) sirven como ``media_url`` de Twilio."""
+        return entry.url if entry.url.startswith(('http://', 'https://')) else None
+
+    async def _register(self, asset: MediaAsset, resign: bool) -> RegisteredMedia:
+        key = self.blob_key(asset)
+        url = await self.store.find(key)
+        if url is not None:
+            self.stats['resigned' if resign else 'reused'] += 1
+        else:
+            url = await self.store.upload(key, asset)
+            self.stats['uploads'] += 1
+            logger.info(f"☁️ Media subido al blob store: {asset.relative_path} → {key}")
+
+        ttl = self.store.url_ttl_seconds
+        entry = RegisteredMedia(asset.sha256, url, expires_at=time.time() + ttl if ttl else None, ttl_seconds=ttl or None)
+        if self.prewarm_fetch and url.startswith('http'):
+            entry.fetch_ms = await self._measure_fetch(url)
+        self._entries[asset.sha256] = entry
+        return entry
+
+    @staticmethod
+    async def _measure_fetch(url: str) -> Optional[float]:
+        """HEAD a la URL: calienta la caché del proveedor y mide la latencia de descarga."""
+        import httpx  # Solo con blob store configurado; no se carga al importar el webhook
+
+        started = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.head(url)
+            if response.status_code >= 400:
+                logger.warning(f"⚠️ HEAD de media respondió {response.status_code}: {url}")
+                return None
+        except httpx.HTTPError as e:
+            logger.warning(f"⚠️ No se pudo pre-calentar {url}: {e}")
+            return None
+        return (time.perf_counter() - started) * 1000
+
+    async def prewarm(self, relative_paths: Iterable[str]) -> int:
+        """Registra varios archivos a la vez; retorna cuántos quedaron con URL."""
+        urls = await asyncio.gather(*(self.get_url(path) for path in relative_paths))
+        return sum(1 for url in urls if url)
+
+    def get_status(self) -> Dict[str, object]:
+        """Estado actual para monitoreo."""
+        return {
+            'enabled': self.enabled,
+            'registered': len(self._entries),
+            'fetch_ms': {
+                entry.url.split('?')[0].rsplit('/', 1)[-1]: round(entry.fetch_ms, 1)
+                for entry in self._entries.values() if entry.fetch_ms is not None
+            },
+            **self.stats
+        }
+
+
+def _build_blob_store() -> Optional[BlobStore]:
+    """Blob store según la configuración (None si no hay ninguno configurado)."""
+    kind = (settings.media_blob_store or '').lower()
+    if not kind:
+        return None
+    if kind == 'local':
+        if not settings.media_blob_public_base_url:
+            logger.warning("⚠️ El blob store 'local' requiere MEDIA_BLOB_PUBLIC_BASE_URL; se usarán URLs del servidor")
+            return None
+        return LocalBlobStore(settings.media_blob_local_dir, settings.media_blob_public_base_url)
+    if kind == 's3':
+        return S3BlobStore(
+            bucket=settings.media_s3_bucket,
+            prefix=settings.media_s3_prefix,
+            region=settings.media_s3_region,
+            public_base_url=settings.media_blob_public_base_url,
+            presign_seconds=settings.media_presign_seconds
+        )
+    logger.warning(f"⚠️ Blob store de media desconocido: {kind}; se usarán URLs del servidor")
+    return None
+
+
+# Instancia global; sin blob store configurado, get_url() retorna None
+media_registry = MediaRegistry(_build_blob_store(), static_media_catalog)
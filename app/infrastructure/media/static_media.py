@@ -0,0 +1,282 @@
+"""
+Catálogo de archivos estáticos de cursos (PDF, imágenes) servidos a Twilio.
+
+Twilio descarga el PDF y la imagen del curso en cada anuncio. En lugar de
+releer y re-transmitir el archivo completo en cada descarga:
+
+- Cada archivo se abre una sola vez como memoria mapeada (``mmap``) y se
+  sirve desde ahí sin copias.
+- Su hash SHA-256 se calcula una vez (y de nuevo solo si cambia el archivo)
+  y se usa como ETag y como versión de la URL (``/media/<hash>/<ruta>``),
+  de modo que esas URLs se pueden cachear un año como ``immutable``.
+- Se responden GET condicionales (``If-None-Match`` / ``If-Modified-Since``)
+  con 304 y rangos de bytes (``Range``) con 206.
+"""
+
+import hashlib
+import logging
+import mimetypes
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Longitud del hash usado en las URLs versionadas
+URL_DIGEST_CHARS = 16
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=3600, must-revalidate"
+
+
+@dataclass
+class MediaAsset:
+    """Archivo del catálogo con su contenido mapeado en memoria."""
+    relative_path: str
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+    content_type: str
+    _mmap: Optional[mmap.mmap] = None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256[:32]}"'
+
+    @property
+    def digest(self) -> str:
+        return self.sha256[:URL_DIGEST_CHARS]
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.mtime, usegmt=True)
+
+    def content(self, start: int = 0, end: Optional[int] = None) -> memoryview:
+        """Vista sin copia de ``[start, end)`` del archivo."""
+        if self._mmap is None:
+            return memoryview(b"")
+        return memoryview(self._mmap)[start:self.size if end is None else end]
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Aún hay una respuesta usando la vista; el GC lo cerrará
+                pass
+            self._mmap = None
+
+
+@dataclass
+class MediaResponse:
+    """Respuesta HTTP resuelta (independiente del framework)."""
+    status_code: int
+    headers: Dict[str, str]
+    body: memoryview
+
+
+class StaticMediaCatalog:
+    """
+    Archivos de ``root`` indexados por ruta relativa, con hash y mmap.
+
+    Args:
+        root: Carpeta raíz (p. ej. ``resources/``)
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._assets: Dict[str, MediaAsset] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            'full': 0, 'partial': 0, 'not_modified': 0, 'bytes_sent': 0, 'hashed': 0
+        }
+
+    def warm(self) -> int:
+        """Indexa todos los archivos de ``root``; retorna cuántos hay."""
+        count = 0
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                relative = os.path.relpath(os.path.join(directory, filename), self.root).replace(os.sep, '/')
+                if self.get(relative) is not None:
+                    count += 1
+        return count
+
+    def _resolve(self, relative_path: str) -> Optional[str]:
+        path = os.path.abspath(os.path.join(self.root, relative_path))
+        # No permitir salir de la carpeta raíz (../)
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def get(self, relative_path: str) -> Optional[MediaAsset]:
+        """
+        Retorna el archivo del catálogo, re-indexándolo si cambió en disco.
+
+        Args:
+            relative_path: Ruta relativa a ``root`` (p. ej. ``course_materials/x.pdf``)
+
+        Returns:
+            MediaAsset, o None si no existe
+        """
+        path = self._resolve(relative_path)
+        if path is None:
+            return None
+        stat = os.stat(path)
+
+        asset = self._assets.get(relative_path)
+        if asset is not None and asset.size == stat.st_size and asset.mtime == stat.st_mtime:
+            return asset
+
+        with self._lock:
+            asset = self._assets.get(relative_path)
+            if asset is not None and asset.size == stat.st_size and asset.mtime == stat.st_mtime:
+                return asset
+            new_asset = self._load(relative_path, path, stat)
+            if asset is not None:
+                asset.close()
+            self._assets[relative_path] = new_asset
+            return new_asset
+
+    def _load(self, relative_path: str, path: str, stat: os.stat_result) -> MediaAsset:
+        mapped = None
+        digest = hashlib.sha256()
+        if stat.st_size:
+            with open(path, 'rb') as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            digest.update(mapped)
+        self.stats['hashed'] += 1
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        logger.info(f"🗂️ Media indexado: {relative_path} ({stat.st_size} bytes, {digest.hexdigest()[:URL_DIGEST_CHARS]})")
+        return MediaAsset(relative_path, path, stat.st_size, stat.st_mtime, digest.hexdigest(), content_type, mapped)
+
+    def versioned_path(self, relative_path: str) -> Optional[str]:
+        """Ruta versionada ``/media/<hash>/<ruta>``, o None si el archivo no existe."""
+        asset = self.get(relative_path)
+        if asset is None:
+            return None
+        return f"/media/{asset.digest}/{asset.relative_path}"
+
+    def public_url(self, base_url: str, relative_path: str) -> str:
+        """
+        URL pública del archivo, versionada por hash si está en el catálogo.
+
+        Args:
+            base_url: URL pública del servidor (p. ej. la de ngrok)
+            relative_path: Ruta relativa a ``root``
+        """
+        base_url = base_url.rstrip('/')
+        versioned = self.versioned_path(relative_path)
+        if versioned is None:
+            return f"{base_url}/resources/{relative_path}"
+        return f"{base_url}{versioned}"
+
+    def respond(
+        self,
+        asset: MediaAsset,
+        request_headers: Mapping[str, str],
+        immutable: bool = False,
+        head: bool = False
+    ) -> MediaResponse:
+        """
+        Resuelve un GET/HEAD del archivo: 200, 206, 304 o 416.
+
+        Args:
+            asset: Archivo solicitado
+            request_headers: Cabeceras de la petición (claves en minúsculas)
+            immutable: Si la URL está versionada por hash
+            head: Si es una petición HEAD (sin cuerpo)
+        """
+        headers = {
+            'ETag': asset.etag,
+            'Last-Modified': asset.last_modified,
+            'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            'Accept-Ranges': 'bytes',
+            'Content-Type': asset.content_type,
+        }
+
+        if self._not_modified(asset, request_headers):
+            self.stats['not_modified'] += 1
+            return MediaResponse(304, headers, memoryview(b""))
+
+        byte_range = None
+        range_header = request_headers.get('range')
+        if range_header and self._if_range_matches(asset, request_headers.get('if-range')):
+            byte_range = self._parse_range(range_header, asset.size)
+            if byte_range == (-1, -1):
+                headers['Content-Range'] = f"bytes */{asset.size}"
+                return MediaResponse(416, headers, memoryview(b""))
+
+        if byte_range is None:
+            status, start, end = 200, 0, asset.size
+            self.stats['full'] += 1
+        else:
+            status, (start, end) = 206, byte_range
+            headers['Content-Range'] = f"bytes {start}-{end - 1}/{asset.size}"
+            self.stats['partial'] += 1
+
+        headers['Content-Length'] = str(end - start)
+        if head:
+            return MediaResponse(status, headers, memoryview(b""))
+        self.stats['bytes_sent'] += end - start
+        return MediaResponse(status, headers, asset.content(start, end))
+
+    @staticmethod
+    def _not_modified(asset: MediaAsset, request_headers: Mapping[str, str]) -> bool:
+        if_none_match = request_headers.get('if-none-match')
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or asset.etag in tags
+        if_modified_since = request_headers.get('if-modified-since')
+        if if_modified_since:
+            try:
+                return int(asset.mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def _if_range_matches(asset: MediaAsset, if_range: Optional[str]) -> bool:
+        """Sin If-Range, o si coincide con la versión actual, el rango aplica."""
+        if not if_range:
+            return True
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return if_range == asset.etag
+        return if_range == asset.last_modified
+
+    @staticmethod
+    def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+        """
+        Interpreta un rango ``bytes=a-b`` / ``bytes=a-`` / ``bytes=-n``.
+
+        Returns:
+            (inicio, fin exclusivo); None para ignorar el rango (se sirve
+            completo, p. ej. rangos múltiples); (-1, -1) si no es satisfacible
+        """
+        unit, _, spec = range_header.partition('=')
+        if unit.strip().lower() != 'bytes' or ',' in spec:
+            return None
+        first, _, last = spec.strip().partition('-')
+        try:
+            if first == '':
+                suffix = int(last)
+                if suffix <= 0:
+                    return (-1, -1)
+                return (max(0, size - suffix), size)
+            start = int(first)
+            end = int(last) + 1 if last else size
+        except ValueError:
+            return None
+        if start >= size or end <= start:
+            return (-1, -1)
+        return (start, min(end, size))
+
+
+# Raíz del proyecto (app/infrastructure/media/static_media.py → cuatro niveles arriba)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Instancia global sobre la carpeta resources/ del proyecto
+static_media_catalog = StaticMediaCatalog(os.path.join(PROJECT_ROOT, "resources"))
@@ -0,0 +1 @@
+# Observabilidad: métricas del servicio
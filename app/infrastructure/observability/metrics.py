@@ -0,0 +1,392 @@
+"""
+Métricas del servicio en formato de texto de Prometheus.
+
+Contadores e histogramas propios (sin dependencias) pensados para el hot
+path del webhook:
+
+- Cada combinación de etiquetas se resuelve una sola vez a un objeto hijo;
+  registrar es una búsqueda en dict y una suma (microsegundos).
+- Sin locks: todas las observaciones se hacen en el hilo del event loop
+  (las llamadas bloqueantes que corren en hilos se miden alrededor del
+  ``await``), así que no hay contención.
+- El estado que ya llevan otros componentes (colas, cachés, guard de
+  OpenAI...) no se duplica: se lee con collectors solo al hacer scrape.
+
+Con varios workers cada uno publica periódicamente sus muestras en el
+almacén compartido y ``/metrics`` suma los contadores e histogramas de
+todos (los gauges llevan la etiqueta ``worker``), así que el resultado no
+depende de qué worker atienda el scrape.
+"""
+
+import asyncio
+import logging
+import math
+import re
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latencias en segundos: de 5 ms a 30 s
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "brenda_"
+
+# (sufijo del nombre, etiquetas como pares ordenados, valor)
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+_INVALID_NAME_CHARS = re.compile(r'[^a-zA-Z0-9_]')
+
+
+def metric_name(*parts: str) -> str:
+    """Nombre válido para Prometheus a partir de partes libres."""
+    name = '_'.join(part for part in parts if part)
+    return _INVALID_NAME_CHARS.sub('_', name).strip('_').lower()
+
+
+class MetricFamily:
+    """Métrica con sus muestras ya calculadas (lo que produce un collector)."""
+
+    __slots__ = ('name', 'kind', 'help', 'samples')
+
+    def __init__(self, name: str, kind: str, help: str, samples: Optional[List[Sample]] = None):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.samples: List[Sample] = samples if samples is not None else []
+
+    def add(self, value: float, suffix: str = '', **labels: Any) -> None:
+        self.samples.append((suffix, tuple(sorted((key, str(val)) for key, val in labels.items())), float(value)))
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Una posición por límite más +Inf; no acumulativas hasta el render
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric(ABC):
+    kind = ''
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any):
+        """Hijo para esta combinación de etiquetas (se crea la primera vez)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera etiquetas {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """Objeto que acumula una combinación de etiquetas."""
+        pass
+
+    def _label_pairs(self, values: Tuple[Any, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted(tuple(zip(self.labelnames, map(str, values))) + extra))
+
+
+class Counter(_Metric):
+    """Contador monotónico con etiquetas."""
+
+    kind = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Incrementa la serie sin etiquetas."""
+        self.labels().inc(amount)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help)
+        for values, child in list(self._children.items()):
+            family.samples.append(('_total', self._label_pairs(values), child.value))
+        return family
+
+
+class Histogram(_Metric):
+    """Histograma de latencias con etiquetas."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float) -> None:
+        """Observa un valor en la serie sin etiquetas."""
+        self.labels().observe(value)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help)
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), child.counts):
+                cumulative += count
+                le = '+Inf' if bound == math.inf else repr(bound)
+                family.samples.append(('_bucket', self._label_pairs(values, (('le', le),)), cumulative))
+            family.samples.append(('_count', self._label_pairs(values), cumulative))
+            family.samples.append(('_sum', self._label_pairs(values), child.sum))
+        return family
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        f'{key}="' + value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+        for key, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def flatten_status(family_prefix: str, status: Dict[str, Any], help: str = '') -> List[MetricFamily]:
+    """
+    Convierte un ``get_status()`` en gauges.
+
+    - ``{'retries': 3}`` -> ``<prefijo>_retries 3``
+    - ``{'lanes': {'reply': {'sent': 5}}}`` -> ``<prefijo>_lanes_sent{key="reply"} 5``
+    - ``{'fetch_ms': {'a.pdf': 12}}`` -> ``<prefijo>_fetch_ms{key="a.pdf"} 12``
+
+    Los booleanos valen 0/1; textos y niveles más profundos se omiten.
+    """
+    families: Dict[str, MetricFamily] = {}
+
+    def gauge(name: str) -> MetricFamily:
+        family = families.get(name)
+        if family is None:
+            family = families[name] = MetricFamily(name, 'gauge', help)
+        return family
+
+    def number(value: Any) -> Optional[float]:
+        if isinstance(value, bool):
+            return float(value)
+        if isinstance(value, (int, float)):
+            return float(value)
+        return None
+
+    for key, value in status.items():
+        if number(value) is not None:
+            gauge(metric_name(family_prefix, key)).add(number(value))
+        elif isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                if number(sub_value) is not None:
+                    gauge(metric_name(family_prefix, key)).add(number(sub_value), key=sub_key)
+                elif isinstance(sub_value, dict):
+                    for leaf, leaf_value in sub_value.items():
+                        if number(leaf_value) is not None:
+                            gauge(metric_name(family_prefix, key, leaf)).add(number(leaf_value), key=sub_key)
+    return list(families.values())
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas y collectors del proceso.
+
+    Args:
+        prefix: Prefijo de todos los nombres
+    """
+
+    SNAPSHOT_NAMESPACE = "metrics_snapshots"
+
+    def __init__(self, prefix: str = METRIC_PREFIX):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[MetricFamily]]] = {}
+        self._publish_task: Optional[asyncio.Task] = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help, labelnames, buckets))
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """Registra (o reemplaza) una función que produce métricas al hacer scrape."""
+        self._collectors[name] = collector
+
+    def register_status(self, name: str, get_status: Callable[[], Dict[str, Any]], help: str = '') -> None:
+        """Expone un ``get_status()`` existente como gauges ``<prefijo><name>_*``."""
+        self.register_collector(name, lambda: flatten_status(self.prefix + name, get_status(), help))
+
+    def collect(self) -> List[MetricFamily]:
+        families = [metric.collect() for metric in list(self._metrics.values())]
+        for name, collector in list(self._collectors.items()):
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.warning(f"⚠️ Collector de métricas '{name}' falló: {e}")
+        return families
+
+    # === VARIOS WORKERS ===
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Muestras de este worker serializables para el almacén compartido."""
+        return {
+            'updated_at': time.time(),
+            'families': [
+                [family.name, family.kind, family.help, [[suffix, list(map(list, labels)), value] for suffix, labels, value in family.samples]]
+                for family in self.collect()
+            ]
+        }
+
+    @staticmethod
+    def _from_snapshot(snapshot: Dict[str, Any]) -> List[MetricFamily]:
+        return [
+            MetricFamily(name, kind, help, [(suffix, tuple(tuple(pair) for pair in labels), value) for suffix, labels, value in samples])
+            for name, kind, help, samples in snapshot.get('families', [])
+        ]
+
+    def publish(self, store, worker_id: str) -> None:
+        store.set(self.SNAPSHOT_NAMESPACE, worker_id, self.snapshot())
+
+    @staticmethod
+    def _label_gauges(families: List[MetricFamily], worker_id: str) -> List[MetricFamily]:
+        # Contadores e histogramas se suman entre workers; los gauges (colas,
+        # estado del guard...) se muestran por worker
+        for family in families:
+            if family.kind == 'gauge':
+                family.samples = [
+                    (suffix, tuple(sorted(labels + (('worker', worker_id),))), value)
+                    for suffix, labels, value in family.samples
+                ]
+        return families
+
+    def collect_all_workers(self, store, worker_id: str, max_age_seconds: float) -> List[MetricFamily]:
+        """Métricas vivas de este worker más los snapshots recientes de los demás."""
+        families = self._label_gauges(self.collect(), worker_id)
+        cutoff = time.time() - max_age_seconds
+        for other_id, snapshot in store.items(self.SNAPSHOT_NAMESPACE).items():
+            if other_id == worker_id:
+                continue
+            if snapshot.get('updated_at', 0) < cutoff:
+                # Worker que ya no publica (apagado o reiniciado)
+                store.delete(self.SNAPSHOT_NAMESPACE, other_id)
+                continue
+            families.extend(self._label_gauges(self._from_snapshot(snapshot), other_id))
+        return families
+
+    async def start_publishing(self, store, worker_id: str, interval_seconds: float) -> None:
+        """Publica el snapshot de este worker periódicamente (solo con almacén compartido)."""
+        if self._publish_task is not None or not store.shared:
+            return
+
+        async def publish_loop():
+            while True:
+                try:
+                    self.publish(store, worker_id)
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudieron publicar las métricas del worker: {e}")
+                await asyncio.sleep(interval_seconds)
+
+        self._publish_task = asyncio.create_task(publish_loop())
+
+    async def stop_publishing(self, store, worker_id: str) -> None:
+        if self._publish_task is None:
+            return
+        self._publish_task.cancel()
+        try:
+            await self._publish_task
+        except asyncio.CancelledError:
+            pass
+        self._publish_task = None
+        store.delete(self.SNAPSHOT_NAMESPACE, worker_id)
+
+    # === RENDER ===
+
+    @staticmethod
+    def render(families: Iterable[MetricFamily]) -> str:
+        """Texto de exposición de Prometheus; las muestras repetidas (varios workers) se suman."""
+        merged: Dict[str, Tuple[str, str, Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]]] = {}
+        for family in families:
+            entry = merged.get(family.name)
+            if entry is None:
+                entry = merged[family.name] = (family.kind, family.help, {})
+            values = entry[2]
+            for suffix, labels, value in family.samples:
+                values[(suffix, labels)] = values.get((suffix, labels), 0.0) + value
+
+        lines: List[str] = []
+        for name in sorted(merged):
+            kind, help, values = merged[name]
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (suffix, labels), value in values.items():
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registro global del proceso
+metrics_registry = MetricsRegistry()
+
+# === MÉTRICAS DEL HOT PATH ===
+
+inbound_messages = metrics_registry.counter(
+    'inbound_messages', 'Mensajes entrantes procesados por ruta', ('route',)
+)
+message_processing_seconds = metrics_registry.histogram(
+    'message_processing_seconds', 'Tiempo de procesamiento de un mensaje entrante por ruta', ('route',)
+)
+openai_request_seconds = metrics_registry.histogram(
+    'openai_request_seconds', 'Latencia de las llamadas a OpenAI por call site', ('call_site',)
+)
+twilio_send_seconds = metrics_registry.histogram(
+    'twilio_send_seconds', 'Latencia de la API de Twilio por resultado', ('outcome',)
+)
+twilio_send_errors = metrics_registry.counter(
+    'twilio_send_errors', 'Errores al enviar por Twilio (transitorios o definitivos)', ('kind',)
+)
+db_query_seconds = metrics_registry.histogram(
+    'db_query_seconds', 'Latencia de las queries a PostgreSQL por método que las ejecuta', ('method',)
+)
+db_query_errors = metrics_registry.counter(
+    'db_query_errors', 'Queries a PostgreSQL con error por método', ('method',)
+)
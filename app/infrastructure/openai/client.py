@@ -4,14 +4,19 @@ Maneja análisis de intención, extracción de información y generación de res
 """
 import logging
 import json
-from typing import Dict, Any, Optional, List
-from openai import AsyncOpenAI
+import time
+from typing import AsyncIterator, Dict, Any, Optional, List
 
 from app.config import settings
+from app.infrastructure.openai.usage_tracker import token_usage_tracker, bind_usage_context
+from app.infrastructure.openai.streaming import iter_paragraph_chunks
+from app.infrastructure.openai.resilience import openai_call_guard, CircuitOpenError
+from app.domain.course_fact_index import get_course_fact_index
+from prompts.prompt_assembly import count_tokens
 from prompts.agent_prompts import (
-    get_intent_analysis_prompt,
+    build_intent_analysis_prompt,
     get_information_extraction_prompt,
-    get_response_generation_prompt,
+    build_response_generation_prompt,
     get_validation_prompt,
     PromptConfig
 )
@@ -78,10 +83,106 @@ class OpenAIClient:
         if not settings.openai_api_key:
             raise ValueError("OPENAI_API_KEY no está configurada")
         
+        # El SDK se importa al crear el cliente (en el startup, en paralelo con PostgreSQL)
+        from openai import AsyncOpenAI
+        
+        # Los reintentos los maneja openai_call_guard (con presupuesto global)
         self.client = AsyncOpenAI(
-            api_key=settings.openai_api_key
+            api_key=settings.openai_api_key,
+            max_retries=0,
+            timeout=settings.openai_request_timeout_seconds
         )
         self.logger = logging.getLogger(__name__)
+        # Validaciones resueltas con el índice de hechos vs. enviadas al LLM
+        self.validation_stats = {'fact_index': 0, 'llm': 0}
+    
+    async def _create_completion(self, call_site: str, **params):
+        """
+        Llama a chat.completions.create registrando tokens, costo y latencia.
+        
+        Args:
+            call_site: Identificador del punto de llamada para la contabilidad
+            **params: Parámetros para la API de OpenAI
+            
+        Returns:
+            Respuesta cruda de OpenAI
+        """
+        started = time.perf_counter()
+        estimated_tokens = self._estimate_request_tokens(params)
+        response = await openai_call_guard.call(
+            lambda: self.client.chat.completions.create(**params),
+            estimated_tokens
+        )
+        latency_ms = (time.perf_counter() - started) * 1000
+        
+        usage = response.usage.model_dump() if getattr(response, 'usage', None) else {}
+        if usage.get('total_tokens'):
+            # Devolver al límite tpm lo reservado de más por max_tokens
+            openai_call_guard.token_bucket.refund(max(0, estimated_tokens - usage['total_tokens']))
+        token_usage_tracker.record(call_site, getattr(response, 'model', params.get('model')), usage, latency_ms)
+        return response
+    
+    @staticmethod
+    def _estimate_request_tokens(params: Dict[str, Any]) -> int:
+        """Estima tokens de una petición (prompt + max_tokens) para el límite por minuto."""
+        prompt_tokens = sum(count_tokens(message.get('content') or '') for message in params.get('messages', []))
+        return prompt_tokens + params.get('max_tokens', 0)
+    
+    @property
+    def is_circuit_open(self) -> bool:
+        """True si el circuit breaker está abierto y las llamadas irían directo a fallback."""
+        return openai_call_guard.breaker.is_open
+    
+    async def _stream_completion(self, call_site: str, **params) -> AsyncIterator[str]:
+        """
+        Llama a chat.completions.create en modo streaming y emite los deltas de texto.
+        
+        Al terminar el stream registra tokens, costo y latencia igual que
+        ``_create_completion``. El stream completo corre dentro de
+        ``openai_call_guard.stream`` (cupo de concurrencia y breaker).
+        
+        Args:
+            call_site: Identificador del punto de llamada para la contabilidad
+            **params: Parámetros para la API de OpenAI
+            
+        Yields:
+            Deltas de texto a medida que llegan
+        """
+        started = time.perf_counter()
+        first_token_ms = None
+        usage = {}
+        model = params.get('model')
+        
+        estimated_tokens = self._estimate_request_tokens(params)
+        stream = openai_call_guard.stream(
+            lambda: self.client.chat.completions.create(
+                stream=True,
+                stream_options={"include_usage": True},
+                **params
+            ),
+            estimated_tokens
+        )
+        try:
+            async for event in stream:
+                model = getattr(event, 'model', None) or model
+                if getattr(event, 'usage', None):
+                    usage = event.usage.model_dump()
+                if not event.choices:
+                    continue
+                delta = event.choices[0].delta.content
+                if delta:
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - started) * 1000
+                    yield delta
+        finally:
+            # Libera el cupo de concurrencia aunque quien consume corte antes
+            await stream.aclose()
+            latency_ms = (time.perf_counter() - started) * 1000
+            token_usage_tracker.record(call_site, model, usage, latency_ms)
+            if usage.get('total_tokens'):
+                openai_call_guard.token_bucket.refund(max(0, estimated_tokens - usage['total_tokens']))
+            if first_token_ms is not None:
+                self.logger.info(f"⚡ Stream {call_site}: primer token en {first_token_ms:.0f}ms, total {latency_ms:.0f}ms")
     
     async def analyze_intent(
         self,
@@ -103,22 +204,20 @@ class OpenAIClient:
         try:
             debug_print(f"🔍 ANALIZANDO INTENCIÓN\n💬 Mensaje: '{user_message}'\n👤 Usuario: {user_memory.name if user_memory.name else 'Anónimo'}", "analyze_intent", "openai_client.py")
             
-            prompt = get_intent_analysis_prompt(user_message, user_memory, recent_messages)
+            prompt = build_intent_analysis_prompt(user_message, user_memory, recent_messages)
             config = PromptConfig.get_config('intent_analysis')
             
             debug_print(f"⚙️ Configuración OpenAI:\n🤖 Modelo: {config['model']}\n🌡️ Temperature: {config['temperature']}\n📏 Max tokens: {config['max_tokens']}", "analyze_intent", "openai_client.py")
             
-            debug_print(f"📝 PROMPT ENVIADO A OPENAI:\n{prompt[:500]}{'...' if len(prompt) > 500 else ''}", "analyze_intent", "openai_client.py")
+            debug_print(f"📝 PROMPT ENVIADO A OPENAI:\n{prompt.suffix[:500]}{'...' if len(prompt.suffix) > 500 else ''}", "analyze_intent", "openai_client.py")
             
             debug_print("🚀 Enviando petición a OpenAI...", "analyze_intent", "openai_client.py")
-            response = await self.client.chat.completions.create(
+            response = await self._create_completion(
+                'analyze_intent',
                 model=config['model'],
                 temperature=config['temperature'],
                 max_tokens=config['max_tokens'],
-                messages=[
-                    {"role": "system", "content": "Eres un analizador de intención experto. Responde SOLO con JSON válido."},
-                    {"role": "user", "content": prompt}
-                ]
+                messages=prompt.to_messages()
             )
             
             content = response.choices[0].message.content
@@ -192,7 +291,8 @@ class OpenAIClient:
             
             self.logger.info(f"📊 Extrayendo información de: '{user_message[:50]}...'")
             
-            response = await self.client.chat.completions.create(
+            response = await self._create_completion(
+                'extract_information',
                 model=config['model'],
                 temperature=config['temperature'],
                 max_tokens=config['max_tokens'],
@@ -251,20 +351,19 @@ class OpenAIClient:
             Respuesta generada por GPT-4o-mini
         """
         try:
-            prompt = get_response_generation_prompt(
+            prompt = build_response_generation_prompt(
                 user_message, user_memory, intent_analysis, context_info
             )
             config = PromptConfig.get_config('main_agent')
             
             self.logger.info(f"💬 Generando respuesta para categoría: {intent_analysis.get('category', 'UNKNOWN')}")
             
-            response = await self.client.chat.completions.create(
+            response = await self._create_completion(
+                'generate_response',
                 model=config['model'],
                 temperature=config['temperature'],
                 max_tokens=config['max_tokens'],
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+                messages=prompt.to_messages()
             )
             
             generated_response = response.choices[0].message.content
@@ -281,11 +380,64 @@ class OpenAIClient:
             self.logger.info(f"✅ Respuesta generada: {len(generated_response)} caracteres")
             return generated_response
             
+        except CircuitOpenError:
+            self.logger.warning("🚨 Circuit breaker abierto, usando respuesta de fallback")
+            return self._get_fallback_response(intent_analysis.get('category', 'GENERAL_QUESTION'))
         except Exception as e:
             self.logger.error(f"💥 Error generando respuesta: {e}")
             # Fallback para asegurar que siempre responda algo
             return self._get_fallback_response(intent_analysis.get('category', 'GENERAL_QUESTION'))
     
+    async def generate_response_stream(
+        self,
+        user_message: str,
+        user_memory,
+        intent_analysis: Dict[str, Any],
+        context_info: str = "",
+        min_chunk_chars: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Versión streaming de ``generate_response``: emite la respuesta por párrafos.
+        
+        Permite enviar el primer mensaje de WhatsApp mientras el resto se
+        sigue generando. Si el stream falla antes de emitir texto se emite la
+        respuesta de fallback de la categoría.
+        
+        Args:
+            user_message: Mensaje del usuario
+            user_memory: Memoria del usuario
+            intent_analysis: Resultado del análisis de intención
+            context_info: Información adicional de contexto
+            min_chunk_chars: Tamaño mínimo de cada fragmento (default: settings)
+            
+        Yields:
+            Fragmentos de la respuesta cortados en límites de párrafo
+        """
+        emitted = False
+        try:
+            prompt = build_response_generation_prompt(
+                user_message, user_memory, intent_analysis, context_info
+            )
+            config = PromptConfig.get_config('main_agent')
+            
+            deltas = self._stream_completion(
+                'generate_response',
+                model=config['model'],
+                temperature=config['temperature'],
+                max_tokens=config['max_tokens'],
+                messages=prompt.to_messages()
+            )
+            async for chunk in iter_paragraph_chunks(
+                deltas, min_chunk_chars or settings.openai_stream_min_chunk_chars
+            ):
+                emitted = True
+                yield chunk
+                
+        except Exception as e:
+            self.logger.error(f"💥 Error generando respuesta en streaming: {e}")
+            if not emitted:
+                yield self._get_fallback_response(intent_analysis.get('category', 'GENERAL_QUESTION'))
+    
     def _get_fallback_response(self, category: str) -> str:
         """
         Genera respuesta de fallback según la categoría.
@@ -353,12 +505,26 @@ Gracias por escribir. Estoy aquí para ayudarte con todo lo relacionado a nuestr
         Returns:
             Dict con análisis e información extraída y respuesta generada
         """
+        if self.is_circuit_open:
+            # Proveedor caído: responder de inmediato en lugar de esperar timeouts
+            self.logger.warning("🚨 Circuit breaker abierto, usando respuesta de fallback")
+            return {
+                'intent_analysis': {'category': 'GENERAL_QUESTION', 'confidence': 0.3},
+                'extracted_info': {},
+                'response': self._get_fallback_response('GENERAL_QUESTION'),
+                'success': False,
+                'error': 'openai_circuit_open'
+            }
+        
         try:
             # 1. Analizar intención
             intent_analysis = await self.analyze_intent(
                 user_message, user_memory, recent_messages
             )
             
+            # Atribuir las llamadas siguientes a la categoría detectada
+            bind_usage_context(category=intent_analysis.get('category'))
+            
             # 2. Extraer información (con manejo de errores mejorado)
             try:
                 extracted_info = await self.extract_information(
@@ -400,6 +566,10 @@ Gracias por escribir. Estoy aquí para ayudarte con todo lo relacionado a nuestr
         """
         Valida una respuesta usando el validador anti-alucinación.
         
+        Si hay datos del curso, primero verifica los datos concretos de la
+        respuesta contra el índice de hechos del curso; el LLM se usa cuando
+        quedan datos que el índice no puede decidir o no extrajo ninguno.
+        
         Args:
             response: Respuesta del agente a validar
             course_data: Datos del curso para validación
@@ -412,11 +582,30 @@ Gracias por escribir. Estoy aquí para ayudarte con todo lo relacionado a nuestr
         try:
             debug_print(f"🔍 VALIDANDO RESPUESTA\n📝 Texto: '{response[:100]}{'...' if len(response) > 100 else ''}'", "validate_response", "openai_client.py")
             
+            # Verificación determinista contra el índice de hechos del curso: se
+            # omite el LLM si hay contradicciones o si se verificaron todos los
+            # datos extraídos (sin datos extraídos, el LLM sigue validando)
+            if course_data:
+                fact_check = get_course_fact_index(course_data, bonuses_data).verify(response)
+                if not fact_check.needs_llm_validation:
+                    self.validation_stats['fact_index'] += 1
+                    debug_print(f"⚡ Validación resuelta con índice de hechos - Es válida: {fact_check.is_consistent}", "validate_response", "openai_client.py")
+                    return {
+                        "is_valid": fact_check.is_consistent,
+                        "confidence": 0.95 if fact_check.is_consistent else 0.9,
+                        "issues": fact_check.issues(),
+                        "corrected_response": None,
+                        "explanation": f"Verificado con índice de hechos ({len(fact_check.verified)} datos coinciden con BD)",
+                        "validation_method": "fact_index"
+                    }
+            
+            self.validation_stats['llm'] += 1
             prompt = get_validation_prompt(response, course_data or {}, bonuses_data or [], all_courses_data or [])
             config = PromptConfig.get_config('intent_analysis')  # Usar misma config que intent_analysis
             
             debug_print("🚀 Enviando a OpenAI para validación...", "validate_response", "openai_client.py")
-            validation_response = await self.client.chat.completions.create(
+            validation_response = await self._create_completion(
+                'validate_response',
                 model=config['model'],
                 temperature=0.1,  # Muy baja para validación precisa
                 max_tokens=300,
@@ -467,13 +656,16 @@ Gracias por escribir. Estoy aquí para ayudarte con todo lo relacionado a nuestr
         
         Args:
             messages: Lista de mensajes en formato OpenAI
-            **kwargs: Parámetros adicionales para la API
+            **kwargs: Parámetros adicionales para la API. ``call_site``
+                identifica la llamada en la contabilidad de tokens.
             
         Returns:
             Respuesta de OpenAI
         """
+        call_site = kwargs.pop('call_site', 'chat_completion')
         try:
-            response = await self.client.chat.completions.create(
+            response = await self._create_completion(
+                call_site,
                 model=kwargs.get('model', 'gpt-4o-mini'),
                 messages=messages,
                 temperature=kwargs.get('temperature', 0.7),
@@ -483,7 +675,7 @@ Gracias por escribir. Estoy aquí para ayudarte con todo lo relacionado a nuestr
             
             return {
                 'content': response.choices[0].message.content,
-                'usage': response.usage.dict() if response.usage else {},
+                'usage': response.usage.model_dump() if response.usage else {},
                 'model': response.model
             }
             
@@ -493,4 +685,43 @@ Gracias por escribir. Estoy aquí para ayudarte con todo lo relacionado a nuestr
                 'content': "Lo siento, estoy teniendo problemas técnicos. ¿Podrías reformular tu pregunta?",
                 'usage': {},
                 'model': kwargs.get('model', 'gpt-4o-mini')
-            }
\ No newline at end of file
+            }
+
+    async def chat_completion_stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """
+        Versión streaming de ``chat_completion``: emite la respuesta por párrafos.
+        
+        Args:
+            messages: Lista de mensajes en formato OpenAI
+            **kwargs: Parámetros adicionales para la API. ``call_site``
+                identifica la llamada en la contabilidad de tokens y
+                ``min_chunk_chars`` el tamaño mínimo de cada fragmento.
+            
+        Yields:
+            Fragmentos de la respuesta cortados en límites de párrafo
+            
+        Raises:
+            Exception: si el stream falla después de emitir algún fragmento,
+                para que quien consume sepa que la respuesta quedó cortada
+        """
+        call_site = kwargs.pop('call_site', 'chat_completion')
+        min_chunk_chars = kwargs.pop('min_chunk_chars', None) or settings.openai_stream_min_chunk_chars
+        emitted = False
+        try:
+            deltas = self._stream_completion(
+                call_site,
+                model=kwargs.get('model', 'gpt-4o-mini'),
+                messages=messages,
+                temperature=kwargs.get('temperature', 0.7),
+                max_tokens=kwargs.get('max_tokens', 500),
+                **{k: v for k, v in kwargs.items() if k not in ['model', 'temperature', 'max_tokens']}
+            )
+            async for chunk in iter_paragraph_chunks(deltas, min_chunk_chars):
+                emitted = True
+                yield chunk
+                
+        except Exception as e:
+            logger.error(f"Error en chat_completion_stream: {e}")
+            if emitted:
+                raise
+            yield "Lo siento, estoy teniendo problemas técnicos. ¿Podrías reformular tu pregunta?"
@@ -0,0 +1,389 @@
+"""
+Control de carga para llamadas a OpenAI.
+
+Protege al bot de acumular corrutinas cuando el proveedor se degrada:
+- Token bucket de requests/min y tokens/min (límites de la cuenta)
+- Concurrencia acotada
+- Reintentos con backoff exponencial y jitter, limitados por un
+  presupuesto global de reintentos
+- Circuit breaker que corta las llamadas mientras el proveedor falla
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def retryable_errors() -> Tuple[type, ...]:
+    """
+    Errores transitorios que vale la pena reintentar.
+
+    El SDK de OpenAI se importa recién al primer fallo (para entonces ya está
+    cargado): así importar este módulo (p. ej. desde la cola de envíos de
+    Twilio) no arrastra el SDK completo.
+    """
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    )
+
+
+class CircuitOpenError(Exception):
+    """Se lanza cuando el circuit breaker está abierto y la llamada no se intenta."""
+
+
+class TokenBucket:
+    """
+    Token bucket asíncrono con recarga continua.
+
+    Args:
+        rate_per_minute: Capacidad que se recarga por minuto
+        capacity: Máximo acumulable (por defecto, un minuto de tasa)
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """
+        Espera hasta poder consumir ``amount`` y lo descuenta.
+
+        Returns:
+            Segundos esperados
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate_per_second
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """
+        Consume ``amount`` si está disponible, sin esperar.
+
+        Returns:
+            0 si se consumió; si no, segundos que faltan para que haya suficiente
+        """
+        amount = min(amount, self.capacity)
+        self._refill()
+        if self._tokens >= amount:
+            self._tokens -= amount
+            return 0.0
+        return (amount - self._tokens) / self.rate_per_second
+
+    def refund(self, amount: float) -> None:
+        """Devuelve capacidad reservada de más (p. ej. tokens estimados no usados)."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class RetryBudget:
+    """
+    Presupuesto global de reintentos.
+
+    Permite reintentar mientras los reintentos de la ventana no superen
+    ``ratio`` de las peticiones (más un mínimo fijo). Así, una caída del
+    proveedor no multiplica la carga por el número de reintentos.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries_per_window: int = 10, window_seconds: float = 60.0):
+        self.ratio = ratio
+        self.min_retries_per_window = min_retries_per_window
+        self.window_seconds = window_seconds
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        for events in (self._requests, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def record_request(self) -> None:
+        self._requests.append(time.monotonic())
+
+    def try_acquire(self) -> bool:
+        """Consume un reintento si el presupuesto lo permite."""
+        now = time.monotonic()
+        self._trim(now)
+        allowed = self.min_retries_per_window + self.ratio * len(self._requests)
+        if len(self._retries) >= allowed:
+            return False
+        self._retries.append(now)
+        return True
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de tres estados (closed → open → half_open).
+
+    Tras ``failure_threshold`` fallos consecutivos se abre y rechaza
+    llamadas durante ``recovery_seconds``; luego deja pasar una llamada de
+    prueba que lo cierra si tiene éxito.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_seconds:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        # HALF_OPEN: una sola llamada de prueba a la vez
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and time.monotonic() - self._opened_at < self.recovery_seconds
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("✅ Circuit breaker de OpenAI cerrado")
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Termina una llamada que no dice nada del proveedor (p. ej. un 400)."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"🚨 Circuit breaker de OpenAI abierto tras {self._consecutive_failures} fallos; "
+                    f"se usarán respuestas de fallback por {self.recovery_seconds:.0f}s"
+                )
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class OpenAICallGuard:
+    """
+    Envuelve cada llamada a OpenAI con límites de tasa, concurrencia,
+    reintentos y circuit breaker.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 200000,
+        max_retries: int = 3,
+        retry_budget_ratio: float = 0.2,
+        base_backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 8.0,
+        breaker_failure_threshold: int = 5,
+        breaker_recovery_seconds: float = 30.0
+    ):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.retry_budget = RetryBudget(ratio=retry_budget_ratio)
+        self.breaker = CircuitBreaker(breaker_failure_threshold, breaker_recovery_seconds)
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.stats: Dict[str, int] = {
+            'calls': 0, 'retries': 0, 'retry_budget_exhausted': 0,
+            'short_circuited': 0, 'failures': 0
+        }
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Backoff exponencial con jitter completo; respeta Retry-After si viene."""
+        retry_after = None
+        response = getattr(error, 'response', None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get('retry-after'))
+            except (TypeError, ValueError):
+                retry_after = None
+        ceiling = min(self.max_backoff_seconds, self.base_backoff_seconds * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff_seconds))
+        return delay
+
+    async def call(self, func: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> Any:
+        """
+        Ejecuta ``func`` respetando límites, reintentos y breaker.
+
+        Args:
+            func: Corrutina sin argumentos que realiza la llamada
+            estimated_tokens: Tokens estimados (prompt + max_tokens) para el límite tpm
+
+        Returns:
+            Resultado de ``func``
+
+        Raises:
+            CircuitOpenError: Si el breaker está abierto
+        """
+        attempt = 0
+        self.retry_budget.record_request()
+        while True:
+            if not self.breaker.allow_request():
+                self.stats['short_circuited'] += 1
+                raise CircuitOpenError("Circuit breaker de OpenAI abierto")
+
+            settled = False
+            try:
+                async with self.semaphore:
+                    await self.request_bucket.acquire()
+                    await self.token_bucket.acquire(estimated_tokens)
+                    self.stats['calls'] += 1
+                    try:
+                        result = await func()
+                    except retryable_errors() as error:
+                        self.breaker.record_failure()
+                        settled = True
+                        self.stats['failures'] += 1
+                        last_error = error
+                    else:
+                        self.breaker.record_success()
+                        settled = True
+                        return result
+            finally:
+                if not settled:
+                    # Errores no transitorios (p. ej. 400) o cancelación (también
+                    # esperando cupo): no dicen nada del proveedor, pero la llamada
+                    # de prueba del breaker debe liberarse
+                    self.breaker.release_probe()
+
+            await self._wait_before_retry(attempt, last_error)
+            attempt += 1
+
+    async def stream(self, func: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> AsyncIterator[Any]:
+        """
+        Como ``call``, para respuestas en streaming: emite los eventos del stream
+        que crea ``func`` manteniendo el cupo de concurrencia hasta que termina.
+
+        Solo se reintenta la creación del stream. Un error transitorio durante
+        la iteración se propaga y cuenta como fallo para el breaker.
+
+        Raises:
+            CircuitOpenError: Si el breaker está abierto
+        """
+        attempt = 0
+        self.retry_budget.record_request()
+        while True:
+            if not self.breaker.allow_request():
+                self.stats['short_circuited'] += 1
+                raise CircuitOpenError("Circuit breaker de OpenAI abierto")
+
+            settled = False
+            try:
+                async with self.semaphore:
+                    await self.request_bucket.acquire()
+                    await self.token_bucket.acquire(estimated_tokens)
+                    self.stats['calls'] += 1
+                    try:
+                        stream = await func()
+                    except retryable_errors() as error:
+                        self.breaker.record_failure()
+                        settled = True
+                        self.stats['failures'] += 1
+                        last_error = error
+                    else:
+                        try:
+                            async for event in stream:
+                                yield event
+                        except retryable_errors():
+                            self.breaker.record_failure()
+                            settled = True
+                            self.stats['failures'] += 1
+                            raise
+                        self.breaker.record_success()
+                        settled = True
+                        return
+            finally:
+                if not settled:
+                    # Error no transitorio, cancelación o stream cerrado por quien lo consume
+                    self.breaker.release_probe()
+
+            await self._wait_before_retry(attempt, last_error)
+            attempt += 1
+
+    async def _wait_before_retry(self, attempt: int, last_error: Exception) -> None:
+        """Espera el backoff del reintento ``attempt + 1``, o relanza si no quedan reintentos."""
+        if attempt >= self.max_retries:
+            raise last_error
+        if not self.retry_budget.try_acquire():
+            self.stats['retry_budget_exhausted'] += 1
+            logger.warning(f"⚠️ Presupuesto de reintentos de OpenAI agotado: {last_error}")
+            raise last_error
+
+        delay = self._backoff_delay(attempt, last_error)
+        self.stats['retries'] += 1
+        logger.warning(f"🔁 Reintento {attempt + 1}/{self.max_retries} de OpenAI en {delay:.2f}s: {type(last_error).__name__}")
+        await asyncio.sleep(delay)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado actual para monitoreo."""
+        return {
+            'breaker_state': self.breaker.state,
+            'available_requests': round(self.request_bucket.available, 1),
+            'available_tokens': round(self.token_bucket.available),
+            **self.stats
+        }
+
+
+# Instancia global compartida por todos los clientes OpenAI del proceso
+openai_call_guard = OpenAICallGuard(
+    max_concurrency=settings.openai_max_concurrency,
+    requests_per_minute=settings.openai_requests_per_minute,
+    tokens_per_minute=settings.openai_tokens_per_minute,
+    max_retries=settings.openai_max_retries,
+    retry_budget_ratio=settings.openai_retry_budget_ratio,
+    breaker_failure_threshold=settings.openai_breaker_failure_threshold,
+    breaker_recovery_seconds=settings.openai_breaker_recovery_seconds
+)
@@ -0,0 +1,116 @@
+"""
+Corte de respuestas en streaming por párrafos.
+
+Acumula los deltas de texto que llegan de OpenAI y libera fragmentos completos
+(cortados en límites de párrafo) para que puedan enviarse por WhatsApp
+mientras el resto de la respuesta se sigue generando.
+"""
+
+from typing import AsyncIterator, List
+
+PARAGRAPH_SEPARATOR = "\n\n"
+
+# Twilio rechaza mensajes de WhatsApp de más de 1600 caracteres
+WHATSAPP_MAX_CHARS = 1500
+
+
+class ParagraphChunker:
+    """
+    Agrupa texto en streaming en fragmentos listos para enviar.
+
+    Un fragmento se libera cuando hay al menos un párrafo completo y el
+    acumulado alcanza ``min_chars`` (evita mandar saludos sueltos como
+    mensajes separados). Si un párrafo excede ``max_chars`` se corta en el
+    último salto de línea o fin de oración disponible.
+    """
+
+    def __init__(self, min_chars: int = 200, max_chars: int = WHATSAPP_MAX_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        """
+        Agrega un delta y retorna los fragmentos que ya pueden enviarse.
+
+        Args:
+            delta: Texto recibido del stream
+
+        Returns:
+            Lista (posiblemente vacía) de fragmentos completos
+        """
+        self._buffer += delta
+        chunks = []
+
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            chunk = self._buffer[:cut].strip()
+            self._buffer = self._buffer[cut:].lstrip("\n")
+            if chunk:
+                chunks.append(chunk)
+
+        return chunks
+
+    def flush(self) -> List[str]:
+        """Libera lo que quede en el buffer al terminar el stream."""
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        if not remainder:
+            return []
+        if len(remainder) <= self.max_chars:
+            return [remainder]
+        chunks = []
+        while len(remainder) > self.max_chars:
+            cut = self._find_soft_cut(remainder)
+            chunks.append(remainder[:cut].strip())
+            remainder = remainder[cut:].strip()
+        if remainder:
+            chunks.append(remainder)
+        return chunks
+
+    def _find_cut(self):
+        """Posición de corte dentro del buffer, o None si aún no hay fragmento listo."""
+        search_from = min(self.min_chars, len(self._buffer))
+        separator = self._buffer.find(PARAGRAPH_SEPARATOR, search_from)
+        if separator != -1 and separator <= self.max_chars:
+            return separator + len(PARAGRAPH_SEPARATOR)
+
+        if len(self._buffer) > self.max_chars:
+            # Párrafo demasiado largo: cortar en el último párrafo, línea u oración
+            return self._find_soft_cut(self._buffer)
+
+        return None
+
+    def _find_soft_cut(self, text: str) -> int:
+        window = text[:self.max_chars]
+        for marker in (PARAGRAPH_SEPARATOR, "\n", ". ", "! ", "? "):
+            position = window.rfind(marker)
+            if position > 0:
+                return position + len(marker)
+        return self.max_chars
+
+
+async def iter_paragraph_chunks(
+    deltas: AsyncIterator[str],
+    min_chars: int = 200,
+    max_chars: int = WHATSAPP_MAX_CHARS
+) -> AsyncIterator[str]:
+    """
+    Convierte un stream de deltas de texto en fragmentos por párrafo.
+
+    Args:
+        deltas: Iterador asíncrono de deltas de texto
+        min_chars: Tamaño mínimo de cada fragmento (salvo el último)
+        max_chars: Tamaño máximo de cada fragmento
+
+    Yields:
+        Fragmentos de texto listos para enviar
+    """
+    chunker = ParagraphChunker(min_chars, max_chars)
+    async for delta in deltas:
+        for chunk in chunker.feed(delta):
+            yield chunk
+    for chunk in chunker.flush():
+        yield chunk
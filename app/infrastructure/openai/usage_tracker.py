@@ -0,0 +1,372 @@
+"""
+Contabilidad de tokens y costos para las llamadas a OpenAI.
+
+Registra tokens de prompt y de respuesta por call site, usuario, categoría
+y campaña. Mantiene agregados acumulados y una ventana móvil en memoria,
+exporta snapshots JSON periódicamente y alerta cuando se rebasa un presupuesto.
+
+El contexto (usuario, categoría, campaña) se propaga con ``contextvars``:
+cada webhook se procesa en su propia tarea asyncio, así que lo que se
+vincula durante un mensaje no se mezcla con otros mensajes concurrentes.
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, asdict
+from datetime import datetime, date
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.infrastructure.observability.metrics import METRIC_PREFIX, MetricFamily, openai_request_seconds
+
+logger = logging.getLogger(__name__)
+
+# Precio en USD por 1K tokens (prompt, completion)
+MODEL_PRICING_PER_1K: Dict[str, Tuple[float, float]] = {
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-4o': (0.0025, 0.01),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+}
+DEFAULT_PRICING_PER_1K: Tuple[float, float] = MODEL_PRICING_PER_1K['gpt-4o-mini']
+
+# Dimensiones de agregación disponibles
+DIMENSIONS = ('call_site', 'user', 'category', 'campaign', 'model')
+
+_usage_context: ContextVar[Dict[str, Optional[str]]] = ContextVar('openai_usage_context', default={})
+
+
+def bind_usage_context(**fields: Optional[str]) -> Token:
+    """
+    Vincula atributos (user_id, category, campaign) al mensaje en curso.
+
+    Los campos se combinan con los ya vinculados, de modo que la categoría
+    puede agregarse después del análisis de intención sin perder el usuario.
+
+    Returns:
+        Token para restaurar el contexto anterior con ``reset_usage_context``
+    """
+    current = dict(_usage_context.get())
+    current.update({key: value for key, value in fields.items() if value is not None})
+    return _usage_context.set(current)
+
+
+def reset_usage_context(token: Token) -> None:
+    """Restaura el contexto de uso previo a ``bind_usage_context``."""
+    _usage_context.reset(token)
+
+
+def get_usage_context() -> Dict[str, Optional[str]]:
+    """Retorna una copia del contexto de uso vinculado al mensaje en curso."""
+    return dict(_usage_context.get())
+
+
+def estimate_cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Calcula el costo en USD de una llamada según la tabla de precios."""
+    prompt_price, completion_price = DEFAULT_PRICING_PER_1K
+    for model_prefix, pricing in MODEL_PRICING_PER_1K.items():
+        # El modelo devuelto por la API incluye versión (gpt-4o-mini-2024-07-18)
+        if model and model.startswith(model_prefix):
+            prompt_price, completion_price = pricing
+            break
+    return (prompt_tokens / 1000) * prompt_price + (completion_tokens / 1000) * completion_price
+
+
+@dataclass
+class UsageAggregate:
+    """Agregado acumulado de uso para una clave de una dimensión."""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def avg_latency_ms(self) -> float:
+        return self.total_latency_ms / self.calls if self.calls else 0.0
+
+    def add(self, prompt_tokens: int, completion_tokens: int, cost_usd: float, latency_ms: float) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost_usd
+        self.total_latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['total_tokens'] = self.total_tokens
+        data['avg_latency_ms'] = round(self.avg_latency_ms, 2)
+        data['cost_usd'] = round(self.cost_usd, 6)
+        return data
+
+
+@dataclass
+class UsageRecord:
+    """Registro individual de una llamada a OpenAI."""
+    timestamp: float
+    call_site: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cost_usd: float
+    latency_ms: float
+    user_id: Optional[str] = None
+    category: Optional[str] = None
+    campaign: Optional[str] = None
+
+
+class TokenUsageTracker:
+    """
+    Agregador en memoria de tokens, costo y latencia de OpenAI.
+
+    Responsabilidades:
+    - Acumular uso por call site, usuario, categoría, campaña y modelo
+    - Mantener una ventana móvil de registros recientes
+    - Exportar snapshots JSON de forma periódica
+    - Alertar cuando se excede el presupuesto diario global o por usuario
+    """
+
+    def __init__(
+        self,
+        export_dir: Optional[str] = "metrics",
+        export_interval_seconds: int = 300,
+        rolling_window_seconds: int = 3600,
+        daily_cost_budget_usd: Optional[float] = None,
+        user_daily_token_budget: Optional[int] = None
+    ):
+        self.export_dir = export_dir
+        self.export_interval_seconds = export_interval_seconds
+        self.rolling_window_seconds = rolling_window_seconds
+        self.daily_cost_budget_usd = daily_cost_budget_usd
+        self.user_daily_token_budget = user_daily_token_budget
+
+        self.aggregates: Dict[str, Dict[str, UsageAggregate]] = {dimension: {} for dimension in DIMENSIONS}
+        self.recent_records: Deque[UsageRecord] = deque()
+        self.alert_handlers: List[Callable[[Dict[str, Any]], None]] = []
+
+        self._day: date = date.today()
+        self._daily_cost_usd = 0.0
+        self._daily_user_tokens: Dict[str, int] = {}
+        self._alerts_sent: set = set()
+        self._last_export = time.monotonic()
+
+    def register_alert_handler(self, handler: Callable[[Dict[str, Any]], None]) -> None:
+        """Registra un callback que recibe cada alerta de presupuesto."""
+        self.alert_handlers.append(handler)
+
+    def record(
+        self,
+        call_site: str,
+        model: str,
+        usage: Optional[Dict[str, Any]],
+        latency_ms: float
+    ) -> Optional[UsageRecord]:
+        """
+        Registra el uso de una llamada a OpenAI.
+
+        Args:
+            call_site: Identificador del punto de llamada (analyze_intent, etc.)
+            model: Modelo reportado por la API
+            usage: Diccionario ``usage`` de la respuesta (prompt/completion tokens)
+            latency_ms: Latencia de la llamada en milisegundos
+
+        Returns:
+            UsageRecord registrado o None si no hubo datos de uso
+        """
+        try:
+            openai_request_seconds.labels(call_site).observe(latency_ms / 1000)
+            usage = usage or {}
+            prompt_tokens = int(usage.get('prompt_tokens') or 0)
+            completion_tokens = int(usage.get('completion_tokens') or 0)
+            context = get_usage_context()
+
+            record = UsageRecord(
+                timestamp=time.time(),
+                call_site=call_site,
+                model=model or 'unknown',
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cost_usd=estimate_cost_usd(model, prompt_tokens, completion_tokens),
+                latency_ms=latency_ms,
+                user_id=context.get('user_id'),
+                category=context.get('category'),
+                campaign=context.get('campaign')
+            )
+
+            keys = {
+                'call_site': record.call_site,
+                'user': record.user_id,
+                'category': record.category,
+                'campaign': record.campaign,
+                'model': record.model
+            }
+            for dimension, key in keys.items():
+                if key is None:
+                    continue
+                aggregate = self.aggregates[dimension].setdefault(key, UsageAggregate())
+                aggregate.add(prompt_tokens, completion_tokens, record.cost_usd, latency_ms)
+
+            self.recent_records.append(record)
+            self._trim_rolling_window(record.timestamp)
+            self._check_budgets(record)
+            self._maybe_export()
+
+            return record
+
+        except Exception as e:
+            logger.error(f"❌ Error registrando uso de OpenAI: {e}")
+            return None
+
+    def _trim_rolling_window(self, now: float) -> None:
+        cutoff = now - self.rolling_window_seconds
+        while self.recent_records and self.recent_records[0].timestamp < cutoff:
+            self.recent_records.popleft()
+
+    def _check_budgets(self, record: UsageRecord) -> None:
+        """Actualiza contadores diarios y dispara alertas de presupuesto."""
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._daily_cost_usd = 0.0
+            self._daily_user_tokens.clear()
+            self._alerts_sent.clear()
+
+        self._daily_cost_usd += record.cost_usd
+        if self.daily_cost_budget_usd is not None and self._daily_cost_usd > self.daily_cost_budget_usd:
+            self._alert('daily_cost_budget', 'global', round(self._daily_cost_usd, 4), self.daily_cost_budget_usd)
+
+        if record.user_id:
+            user_tokens = self._daily_user_tokens.get(record.user_id, 0)
+            user_tokens += record.prompt_tokens + record.completion_tokens
+            self._daily_user_tokens[record.user_id] = user_tokens
+            if self.user_daily_token_budget is not None and user_tokens > self.user_daily_token_budget:
+                self._alert('user_daily_token_budget', record.user_id, user_tokens, self.user_daily_token_budget)
+
+    def _alert(self, kind: str, key: str, value: float, budget: float) -> None:
+        # Una alerta por tipo y clave por día para no saturar los logs
+        alert_key = (kind, key)
+        if alert_key in self._alerts_sent:
+            return
+        self._alerts_sent.add(alert_key)
+
+        alert = {
+            'kind': kind,
+            'key': key,
+            'value': value,
+            'budget': budget,
+            'day': self._day.isoformat()
+        }
+        logger.warning(f"🚨 Presupuesto de OpenAI excedido: {kind} ({key}) = {value} > {budget}")
+        for handler in self.alert_handlers:
+            try:
+                handler(alert)
+            except Exception as e:
+                logger.error(f"❌ Error en handler de alerta de presupuesto: {e}")
+
+    def get_rolling_summary(self) -> Dict[str, Any]:
+        """Resumen de la ventana móvil (llamadas, tokens y costo recientes)."""
+        self._trim_rolling_window(time.time())
+        summary = UsageAggregate()
+        for record in self.recent_records:
+            summary.add(record.prompt_tokens, record.completion_tokens, record.cost_usd, record.latency_ms)
+        return {
+            'window_seconds': self.rolling_window_seconds,
+            **summary.to_dict()
+        }
+
+    def get_top(self, dimension: str, limit: int = 10, sort_by: str = 'cost_usd') -> List[Dict[str, Any]]:
+        """
+        Retorna las claves de una dimensión ordenadas por consumo.
+
+        Args:
+            dimension: call_site, user, category, campaign o model
+            limit: Número máximo de resultados
+            sort_by: Campo de ordenamiento (cost_usd, total_tokens, avg_latency_ms...)
+        """
+        entries = [
+            {'key': key, **aggregate.to_dict()}
+            for key, aggregate in self.aggregates.get(dimension, {}).items()
+        ]
+        entries.sort(key=lambda entry: entry.get(sort_by, 0), reverse=True)
+        return entries[:limit]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Snapshot completo de agregados, ventana móvil y presupuesto diario."""
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'rolling_window': self.get_rolling_summary(),
+            'daily': {
+                'day': self._day.isoformat(),
+                'cost_usd': round(self._daily_cost_usd, 6),
+                'cost_budget_usd': self.daily_cost_budget_usd
+            },
+            'aggregates': {
+                dimension: {key: aggregate.to_dict() for key, aggregate in values.items()}
+                for dimension, values in self.aggregates.items()
+            }
+        }
+
+    def get_metric_families(self) -> List[MetricFamily]:
+        """Tokens, llamadas y costo acumulados por call site para /metrics."""
+        tokens = MetricFamily(METRIC_PREFIX + 'openai_tokens', 'counter', 'Tokens de OpenAI por call site')
+        calls = MetricFamily(METRIC_PREFIX + 'openai_calls', 'counter', 'Llamadas a OpenAI con uso registrado por call site')
+        cost = MetricFamily(METRIC_PREFIX + 'openai_cost_usd', 'counter', 'Costo estimado de OpenAI por call site')
+        for call_site, aggregate in self.aggregates.get('call_site', {}).items():
+            tokens.add(aggregate.prompt_tokens, '_total', call_site=call_site, kind='prompt')
+            tokens.add(aggregate.completion_tokens, '_total', call_site=call_site, kind='completion')
+            calls.add(aggregate.calls, '_total', call_site=call_site)
+            cost.add(aggregate.cost_usd, '_total', call_site=call_site)
+        return [tokens, calls, cost]
+
+    def _maybe_export(self) -> None:
+        if not self.export_dir or self.export_interval_seconds <= 0:
+            return
+        if time.monotonic() - self._last_export >= self.export_interval_seconds:
+            self.export_snapshot()
+
+    def export_snapshot(self) -> Optional[str]:
+        """
+        Escribe el snapshot actual en ``export_dir`` como JSON.
+
+        Returns:
+            Ruta del archivo escrito o None si falla
+        """
+        self._last_export = time.monotonic()
+        if not self.export_dir:
+            return None
+        try:
+            os.makedirs(self.export_dir, exist_ok=True)
+            filepath = os.path.join(self.export_dir, f"openai_usage_{self._day.isoformat()}.json")
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(self.get_summary(), f, ensure_ascii=False, indent=2)
+            logger.info(f"📊 Snapshot de uso OpenAI exportado: {filepath}")
+            return filepath
+        except Exception as e:
+            logger.error(f"❌ Error exportando uso de OpenAI: {e}")
+            return None
+
+    def reset(self) -> None:
+        """Limpia todos los agregados (útil para pruebas)."""
+        self.aggregates = {dimension: {} for dimension in DIMENSIONS}
+        self.recent_records.clear()
+        self._daily_cost_usd = 0.0
+        self._daily_user_tokens.clear()
+        self._alerts_sent.clear()
+
+
+# Instancia global del tracker
+token_usage_tracker = TokenUsageTracker(
+    export_dir=settings.openai_usage_export_dir,
+    export_interval_seconds=settings.openai_usage_export_interval_seconds,
+    daily_cost_budget_usd=settings.openai_daily_cost_budget_usd,
+    user_daily_token_budget=settings.openai_user_daily_token_budget
+)
@@ -0,0 +1 @@
+# Infraestructura de estado compartido entre workers
@@ -0,0 +1,360 @@
+"""
+Almacenes clave-valor para el estado compartido entre workers.
+
+Con un solo worker todo el estado mutable (memoria de leads, métricas de
+campañas, solicitudes de contacto, FAQs) puede vivir en diccionarios del
+proceso. Con varios workers de gunicorn ese estado debe vivir en un
+almacén compartido; estos backends ofrecen la misma interfaz:
+
+- ``memory``: diccionarios del proceso (comportamiento de un solo worker)
+- ``sqlite``: archivo SQLite en modo WAL, compartido por los workers de un
+  mismo dyno (sustituto local de un KV externo)
+- ``redis``: Redis externo (requiere el paquete ``redis``)
+
+Los valores deben ser serializables a JSON. Además de clave-valor por
+namespace, cada backend ofrece colas FIFO (buzón de cada worker) y leases
+con expiración (asignación de slots de worker).
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class KeyValueStore(ABC):
+    """Interfaz común de los backends de estado compartido."""
+
+    # True si el estado es visible para otros procesos
+    shared: bool = False
+
+    @abstractmethod
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        pass
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def items(self, namespace: str) -> Dict[str, Any]:
+        """Copia de todas las claves del namespace."""
+        pass
+
+    @abstractmethod
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        """Incrementa un contador entero de forma atómica y retorna el nuevo valor."""
+        pass
+
+    @abstractmethod
+    def push(self, queue: str, value: Any) -> None:
+        """Agrega un elemento al final de la cola."""
+        pass
+
+    @abstractmethod
+    def pop_batch(self, queue: str, limit: int = 100) -> List[Any]:
+        """Retira hasta ``limit`` elementos del inicio de la cola, en orden."""
+        pass
+
+    @abstractmethod
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Toma (o renueva) el lease ``name`` si está libre, expirado o ya es de ``owner``."""
+        pass
+
+    @abstractmethod
+    def lease_owner(self, name: str) -> Optional[str]:
+        """Dueño actual del lease, o None si está libre o expirado."""
+        pass
+
+    @abstractmethod
+    def release_lease(self, name: str, owner: str) -> None:
+        pass
+
+
+class InProcessKeyValueStore(KeyValueStore):
+    """Estado en diccionarios del proceso (un solo worker)."""
+
+    shared = False
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        self._queues: Dict[str, Deque[Any]] = defaultdict(deque)
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        return self._data[namespace].get(key, default)
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        self._data[namespace][key] = value
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._data[namespace].pop(key, None)
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        return dict(self._data[namespace])
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        with self._lock:
+            value = int(self._data[namespace].get(key, 0)) + amount
+            self._data[namespace][key] = value
+            return value
+
+    def push(self, queue: str, value: Any) -> None:
+        self._queues[queue].append(value)
+
+    def pop_batch(self, queue: str, limit: int = 100) -> List[Any]:
+        pending = self._queues[queue]
+        return [pending.popleft() for _ in range(min(limit, len(pending)))]
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        with self._lock:
+            now = time.time()
+            current = self._leases.get(name)
+            if current is None or current[0] == owner or current[1] <= now:
+                self._leases[name] = (owner, now + ttl_seconds)
+                return True
+            return False
+
+    def lease_owner(self, name: str) -> Optional[str]:
+        current = self._leases.get(name)
+        if current is None or current[1] <= time.time():
+            return None
+        return current[0]
+
+    def release_lease(self, name: str, owner: str) -> None:
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == owner:
+                del self._leases[name]
+
+
+class SQLiteKeyValueStore(KeyValueStore):
+    """
+    Estado en un archivo SQLite compartido por los procesos del mismo host.
+
+    Args:
+        path: Ruta del archivo de base de datos
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS kv (
+                    namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                );
+                CREATE TABLE IF NOT EXISTS queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, value TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS queue_name ON queue (name, id);
+                CREATE TABLE IF NOT EXISTS lease (
+                    name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL
+                );
+            """)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        row = self._connection().execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)",
+            (namespace, key, json.dumps(value, ensure_ascii=False))
+        )
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connection().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        rows = self._connection().execute("SELECT key, value FROM kv WHERE namespace = ?", (namespace,))
+        return {key: json.loads(value) for key, value in rows}
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            value = (int(json.loads(row[0])) if row else 0) + amount
+            connection.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value) VALUES (?, ?, ?)", (namespace, key, str(value))
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return value
+
+    def push(self, queue: str, value: Any) -> None:
+        self._connection().execute(
+            "INSERT INTO queue (name, value) VALUES (?, ?)", (queue, json.dumps(value, ensure_ascii=False))
+        )
+
+    def pop_batch(self, queue: str, limit: int = 100) -> List[Any]:
+        connection = self._connection()
+        # Lectura sin bloqueo primero: el buzón suele estar vacío y BEGIN
+        # IMMEDIATE toma el lock de escritura de toda la base
+        if connection.execute("SELECT 1 FROM queue WHERE name = ? LIMIT 1", (queue,)).fetchone() is None:
+            return []
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT id, value FROM queue WHERE name = ? ORDER BY id LIMIT ?", (queue, limit)
+            ).fetchall()
+            if rows:
+                connection.execute("DELETE FROM queue WHERE name = ? AND id <= ?", (queue, rows[-1][0]))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return [json.loads(value) for _, value in rows]
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        cursor = self._connection().execute(
+            """
+            INSERT INTO lease (name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE lease.owner = excluded.owner OR lease.expires_at <= ?
+            """,
+            (name, owner, now + ttl_seconds, now)
+        )
+        return cursor.rowcount == 1
+
+    def lease_owner(self, name: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT owner FROM lease WHERE name = ? AND expires_at > ?", (name, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def release_lease(self, name: str, owner: str) -> None:
+        self._connection().execute("DELETE FROM lease WHERE name = ? AND owner = ?", (name, owner))
+
+
+class RedisKeyValueStore(KeyValueStore):
+    """
+    Estado en Redis (KV externo, compartido entre dynos).
+
+    Args:
+        url: URL de conexión (``redis://...``)
+        prefix: Prefijo de todas las claves
+    """
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "brenda"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("El backend 'redis' requiere el paquete redis (pip install redis)") from e
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        value = self.client.hget(self._key('kv', namespace), key)
+        return json.loads(value) if value is not None else default
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        self.client.hset(self._key('kv', namespace), key, json.dumps(value, ensure_ascii=False))
+
+    def delete(self, namespace: str, key: str) -> None:
+        self.client.hdel(self._key('kv', namespace), key)
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        return {key: json.loads(value) for key, value in self.client.hgetall(self._key('kv', namespace)).items()}
+
+    def incr(self, namespace: str, key: str, amount: int = 1) -> int:
+        return int(self.client.hincrby(self._key('kv', namespace), key, amount))
+
+    def push(self, queue: str, value: Any) -> None:
+        self.client.rpush(self._key('queue', queue), json.dumps(value, ensure_ascii=False))
+
+    def pop_batch(self, queue: str, limit: int = 100) -> List[Any]:
+        values = self.client.lpop(self._key('queue', queue), limit) or []
+        return [json.loads(value) for value in values]
+
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        key = self._key('lease', name)
+        ttl_ms = int(ttl_seconds * 1000)
+        if self.client.set(key, owner, nx=True, px=ttl_ms):
+            return True
+        # Renovación: solo si el lease ya es nuestro (comparar y extender de forma atómica)
+        renewed = self.client.eval(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end",
+            1, key, owner, ttl_ms
+        )
+        return bool(renewed)
+
+    def lease_owner(self, name: str) -> Optional[str]:
+        return self.client.get(self._key('lease', name))
+
+    def release_lease(self, name: str, owner: str) -> None:
+        self.client.eval(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end",
+            1, self._key('lease', name), owner
+        )
+
+
+async def call_store(store: KeyValueStore, func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Ejecuta ``func(*args)``, que hace llamadas a ``store``, sin bloquear el event loop.
+
+    Con un backend compartido (SQLite, Redis) cada llamada es E/S y se ejecuta
+    en un hilo; el almacén en proceso responde en memoria y se llama directo.
+    """
+    if store.shared:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+def build_shared_state_store() -> KeyValueStore:
+    """Backend de estado compartido según ``settings.shared_state_backend``."""
+    backend = (settings.shared_state_backend or 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteKeyValueStore(settings.shared_state_sqlite_path)
+    if backend == 'redis':
+        if not settings.shared_state_redis_url:
+            raise ValueError("SHARED_STATE_REDIS_URL es obligatorio con el backend 'redis'")
+        return RedisKeyValueStore(settings.shared_state_redis_url)
+    if backend != 'memory':
+        logger.warning(f"⚠️ Backend de estado compartido desconocido: {backend}; se usa memoria del proceso")
+    if settings.web_workers > 1:
+        logger.warning("⚠️ WEB_WORKERS > 1 con estado en memoria: cada worker tendrá su propio estado")
+    return InProcessKeyValueStore()
+
+
+# Instancia global compartida por todos los componentes del proceso
+shared_state_store = build_shared_state_store()
@@ -0,0 +1,248 @@
+"""
+Enrutamiento consistente de usuarios a workers.
+
+Con varios workers de gunicorn, el kernel reparte las conexiones entrantes
+sin saber de qué usuario son. Para que los mensajes de un mismo usuario se
+procesen siempre en el mismo worker (en orden, y con su memoria en la caché
+local de ese worker) cada worker:
+
+1. Toma un slot ``0..N-1`` con un lease renovado periódicamente en el
+   almacén compartido.
+2. Calcula el slot dueño de cada usuario con rendezvous hashing (HRW): si
+   cambia el número de workers, solo se reasignan los usuarios del slot que
+   cambió.
+3. Si el mensaje es de un usuario suyo, lo procesa; si no, lo deja en el
+   buzón del worker dueño y responde de inmediato a Twilio (las respuestas
+   se envían por la API, no en la respuesta HTTP del webhook).
+4. Consume su propio buzón en segundo plano.
+
+Si el dueño no tiene el lease vigente (worker caído o reiniciando), el
+mensaje se procesa donde llegó. Con un solo worker todo se procesa local.
+Un worker que no logra renovar su lease deja de consumir el buzón y de
+considerarse dueño de sus usuarios hasta volver a tomar un slot.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+from app.infrastructure.shared_state.kv_store import KeyValueStore, shared_state_store
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+def _slot_weight(user_id: str, slot: int) -> int:
+    digest = hashlib.blake2b(f"{slot}:{user_id}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def owner_slot(user_id: str, worker_count: int) -> int:
+    """Slot dueño del usuario (rendezvous hashing)."""
+    if worker_count <= 1:
+        return 0
+    return max(range(worker_count), key=lambda slot: _slot_weight(user_id, slot))
+
+
+class WorkerRouter:
+    """
+    Asigna cada usuario a un worker y reenvía sus mensajes al dueño.
+
+    Args:
+        store: Almacén compartido (leases y buzones)
+        worker_count: Número de workers del dyno
+        lease_seconds: Vigencia del lease del slot (se renueva a un tercio)
+        poll_interval_seconds: Frecuencia de lectura del buzón propio
+    """
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        worker_count: int = 1,
+        lease_seconds: float = 15.0,
+        poll_interval_seconds: float = 0.05
+    ):
+        self.store = store
+        self.worker_count = max(1, worker_count)
+        self.lease_seconds = lease_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.slot: Optional[int] = None
+        self._handler: Optional[MessageHandler] = None
+        self._lease_task: Optional[asyncio.Task] = None
+        self._inbox_task: Optional[asyncio.Task] = None
+        # user_id -> [lock, mensajes en curso o en espera]
+        self._user_locks: Dict[str, list] = {}
+        self._background = set()
+        self.stats: Dict[str, int] = {'local': 0, 'forwarded': 0, 'received': 0, 'failover': 0, 'lease_lost': 0}
+
+    @property
+    def enabled(self) -> bool:
+        """El enrutamiento solo aplica con varios workers y estado compartido."""
+        return self.worker_count > 1 and self.store.shared
+
+    def owns(self, user_id: str) -> bool:
+        """True si los mensajes del usuario se procesan siempre en este worker."""
+        if not self.enabled:
+            return True
+        return self.slot is not None and owner_slot(user_id, self.worker_count) == self.slot
+
+    async def start(self, handler: MessageHandler) -> None:
+        """Toma un slot y empieza a consumir el buzón propio."""
+        self._handler = handler
+        if not self.enabled:
+            return
+        if not await self._acquire_slot():
+            logger.warning(f"⚠️ Sin slot libre para el worker {self.worker_id}; procesará todo localmente")
+            return
+        self._lease_task = asyncio.get_running_loop().create_task(self._renew_lease())
+
+    async def stop(self) -> None:
+        if self._lease_task is not None:
+            self._lease_task.cancel()
+        if self._inbox_task is not None:
+            self._inbox_task.cancel()
+        if self.slot is not None:
+            await asyncio.to_thread(self.store.release_lease, self._lease_name(self.slot), self.worker_id)
+            self.slot = None
+
+    async def dispatch(self, user_id: str, payload: Dict[str, Any]) -> Optional[Any]:
+        """
+        Procesa el mensaje aquí o lo reenvía al worker dueño del usuario.
+
+        Args:
+            user_id: Usuario del mensaje (clave de enrutamiento)
+            payload: Datos del webhook (serializables a JSON)
+
+        Returns:
+            Resultado del handler si se procesó en este worker, None si se reenvió
+        """
+        if self.enabled and self.slot is not None:
+            owner = owner_slot(user_id, self.worker_count)
+            if owner != self.slot:
+                if await asyncio.to_thread(self._forward, owner, user_id, payload):
+                    self.stats['forwarded'] += 1
+                    return None
+                self.stats['failover'] += 1
+        self.stats['local'] += 1
+        return await self._handle(user_id, payload)
+
+    def _forward(self, owner: int, user_id: str, payload: Dict[str, Any]) -> bool:
+        """Deja el mensaje en el buzón del dueño si tiene el lease vigente (corre en un hilo)."""
+        if self.store.lease_owner(self._lease_name(owner)) is None:
+            return False
+        self.store.push(self._inbox_name(owner), {'user_id': user_id, 'payload': payload})
+        return True
+
+    async def _handle(self, user_id: str, payload: Dict[str, Any]) -> Any:
+        # Un mensaje a la vez por usuario: respeta el orden de llegada
+        entry = self._user_locks.setdefault(user_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await self._handler(payload)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._user_locks[user_id]
+
+    async def _acquire_slot(self) -> bool:
+        """Toma el primer slot libre y empieza a consumir su buzón."""
+        for slot in range(self.worker_count):
+            if await asyncio.to_thread(self.store.acquire_lease, self._lease_name(slot), self.worker_id, self.lease_seconds):
+                self.slot = slot
+                self._inbox_task = asyncio.get_running_loop().create_task(self._consume_inbox(slot))
+                logger.info(f"🧭 Worker {self.worker_id} atiende el slot {self.slot}/{self.worker_count}")
+                return True
+        return False
+
+    def _drop_slot(self) -> None:
+        """Deja de atender el slot: sin lease, otro worker pudo tomarlo."""
+        logger.error(f"🚨 El worker {self.worker_id} perdió el slot {self.slot}; procesará localmente hasta recuperar uno")
+        self.stats['lease_lost'] += 1
+        if self._inbox_task is not None:
+            self._inbox_task.cancel()
+            self._inbox_task = None
+        self.slot = None
+
+    async def _renew_lease(self) -> None:
+        """
+        Renueva el lease a un tercio de su vigencia. Si se pierde (u otro
+        worker lo tomó, o no se pudo renovar antes de que venciera), el
+        worker deja de consumir el buzón y de considerarse dueño de sus
+        usuarios hasta volver a tomar un slot.
+        """
+        loop = asyncio.get_running_loop()
+        renewed_at = loop.time()
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if self.slot is None:
+                    if await self._acquire_slot():
+                        renewed_at = loop.time()
+                    continue
+                if await asyncio.to_thread(
+                    self.store.acquire_lease, self._lease_name(self.slot), self.worker_id, self.lease_seconds
+                ):
+                    renewed_at = loop.time()
+                    continue
+            except Exception as e:
+                logger.error(f"Error renovando el lease del slot {self.slot}: {e}")
+                # Sin respuesta del almacén el lease sigue vigente hasta que vence
+                if loop.time() - renewed_at < self.lease_seconds:
+                    continue
+            if self.slot is not None:
+                self._drop_slot()
+
+    async def _consume_inbox(self, slot: int) -> None:
+        inbox = self._inbox_name(slot)
+        while True:
+            try:
+                messages = await asyncio.to_thread(self.store.pop_batch, inbox)
+            except Exception as e:
+                logger.error(f"Error leyendo el buzón {inbox}: {e}")
+                messages = []
+            for message in messages:
+                self.stats['received'] += 1
+                task = asyncio.create_task(self._handle_safely(message['user_id'], message['payload']))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            if not messages:
+                await asyncio.sleep(self.poll_interval_seconds)
+
+    async def _handle_safely(self, user_id: str, payload: Dict[str, Any]) -> None:
+        try:
+            await self._handle(user_id, payload)
+        except Exception as e:
+            logger.error(f"Error procesando mensaje reenviado de {user_id}: {e}")
+
+    @staticmethod
+    def _lease_name(slot: int) -> str:
+        return f"worker_slot:{slot}"
+
+    @staticmethod
+    def _inbox_name(slot: int) -> str:
+        return f"worker_inbox:{slot}"
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado actual para monitoreo."""
+        return {
+            'enabled': self.enabled,
+            'worker_id': self.worker_id,
+            'slot': self.slot,
+            'worker_count': self.worker_count,
+            **self.stats
+        }
+
+
+# Instancia global del worker actual
+worker_router = WorkerRouter(
+    shared_state_store,
+    worker_count=settings.web_workers,
+    lease_seconds=settings.worker_lease_seconds
+)
@@ -8,15 +8,173 @@ Estado: ✅ ESTRUCTURA BASE PREPARADA
 Fecha: Julio 2025
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional, Union
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Union, Tuple
 from datetime import datetime
 import json
 import os
+import time
 from abc import ABC, abstractmethod
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+# ============================================================================
+# 0. REGISTRO DE USO CON BUFFER
+# ============================================================================
+
+class ToolUsageLog:
+    """
+    Sink con buffer para las métricas de uso de herramientas.
+    
+    ``record()`` solo agrega la entrada en memoria; un flush en segundo plano
+    (en un hilo, para no bloquear el event loop) la agrega al archivo JSON
+    conservando los últimos ``max_entries`` registros. Así la herramienta no
+    espera la lectura y reescritura del archivo antes de responder.
+    """
+    
+    def __init__(self, path: str = "tool_usage_metrics.json", flush_delay_seconds: float = 5.0, max_entries: int = 1000):
+        self.path = path
+        self.flush_delay_seconds = flush_delay_seconds
+        self.max_entries = max_entries
+        self._buffer: deque = deque(maxlen=max_entries)
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.stats = {'recorded': 0, 'flushed': 0, 'flush_errors': 0}
+    
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Agrega la entrada y agenda un flush si no hay uno pendiente."""
+        self._buffer.append(entry)
+        self.stats['recorded'] += 1
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sin event loop: se escribe en el próximo flush()
+        self._flush_task = loop.create_task(self._flush_later())
+    
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay_seconds)
+        await self.flush()
+    
+    async def flush(self) -> int:
+        """Escribe las entradas pendientes; devuelve cuántas se escribieron."""
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            entries = list(self._buffer)
+            self._buffer.clear()
+            try:
+                await asyncio.to_thread(self._append_to_file, entries)
+                self.stats['flushed'] += len(entries)
+            except Exception as e:
+                self.stats['flush_errors'] += 1
+                logger.error(f"Error guardando métricas de herramientas: {e}")
+            return len(entries)
+    
+    async def close(self) -> None:
+        """Cancela el flush agendado y escribe lo pendiente (al apagar)."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        await self.flush()
+    
+    def _append_to_file(self, entries: List[Dict[str, Any]]) -> None:
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                logs = json.load(f)
+        else:
+            logs = []
+        
+        logs.extend(entries)
+        
+        # Mantener solo los últimos registros
+        if len(logs) > self.max_entries:
+            logs = logs[-self.max_entries:]
+        
+        with open(self.path, 'w') as f:
+            json.dump(logs, f, ensure_ascii=False, indent=2)
+
+
+tool_usage_log = ToolUsageLog(flush_delay_seconds=settings.tool_usage_flush_seconds)
+
+# ============================================================================
+# 0.1 CACHÉ DE RESULTADOS POR CURSO
+# ============================================================================
+
+class ToolResultCache:
+    """
+    Caché LRU de resultados de herramientas que solo dependen del curso.
+    
+    La clave es (herramienta, course_id, versión del catálogo del curso).
+    ``invalidate(course_id)`` sube la versión y descarta sus entradas, así que
+    un resultado que se estaba construyendo antes de invalidar se guarda con
+    la versión vieja y nunca se vuelve a servir. En la app se invalida todo
+    cuando ``DynamicCourseInfoProvider`` detecta que cambió la fila del curso
+    (el course_id de la clave es el curso elegido por el usuario, que no
+    coincide con el id de BD); ``ttl_seconds`` acota cuánto tarda en verse un
+    cambio que no pase por ahí.
+    """
+    
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, Any, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._versions: Dict[Any, int] = {}
+        # Sube con cada invalidación global; cuenta también para cursos aún sin versión propia
+        self._epoch = 0
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'invalidations': 0}
+    
+    def version(self, course_id: Any) -> int:
+        return self._epoch + self._versions.get(course_id, 0)
+    
+    def get(self, tool_name: str, course_id: Any) -> Optional[Dict[str, Any]]:
+        key = (tool_name, course_id, self.version(course_id))
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at >= self.ttl_seconds:
+            del self._entries[key]
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return result
+    
+    def put(self, tool_name: str, course_id: Any, version: int, result: Dict[str, Any]) -> None:
+        """Guarda el resultado construido con ``version`` (la vigente al empezar)."""
+        if version != self.version(course_id):
+            return
+        self._entries[(tool_name, course_id, version)] = (time.monotonic(), result)
+        self._entries.move_to_end((tool_name, course_id, version))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, course_id: Any = None) -> None:
+        """Descarta los resultados de un curso (o de todos si no se indica)."""
+        self.stats['invalidations'] += 1
+        if course_id is None:
+            self._epoch += 1
+            self._entries.clear()
+            return
+        self._versions[course_id] = self._versions.get(course_id, 0) + 1
+        for key in [key for key in self._entries if key[1] == course_id]:
+            del self._entries[key]
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {'entries': len(self._entries), **self.stats}
+
 # ============================================================================
 # 1. INTERFAZ BASE DE HERRAMIENTAS
 # ============================================================================
@@ -29,8 +187,21 @@ class BaseTool(ABC):
     - Define estructura común para todas las herramientas
     - Maneja logging y métricas automáticamente
     - Proporciona validación de parámetros
+    
+    ``depends_on`` lista herramientas que, si se activan en la misma interacción,
+    deben terminar antes que esta; ``timeout_seconds`` reemplaza el timeout
+    por defecto del sistema y ``timeout_content`` es la respuesta si se agota.
+    
+    Las herramientas ``cacheable`` producen el mismo resultado para todos los
+    usuarios de un curso: el sistema lo guarda en ``ToolResultCache`` y a cada
+    usuario le entrega ``personalize(resultado)``.
     """
     
+    depends_on: Tuple[str, ...] = ()
+    timeout_seconds: Optional[float] = None
+    timeout_content: str = "Déjame consultar esa información para ti."
+    cacheable: bool = False
+    
     def __init__(self, name: str, category: str):
         self.name = name
         self.category = category
@@ -41,8 +212,18 @@ class BaseTool(ABC):
         """Ejecuta la herramienta específica."""
         pass
     
+    def personalize(self, result: Dict[str, Any], user_id: str, **kwargs) -> Dict[str, Any]:
+        """
+        Adapta un resultado en caché al usuario. Por defecto solo copia el
+        diccionario y la lista de recursos para no compartirlos entre usuarios.
+        """
+        personalized = dict(result)
+        if 'resources' in personalized:
+            personalized['resources'] = [dict(resource) for resource in personalized['resources']]
+        return personalized
+    
     async def log_usage(self, user_id: str, course_id: str, success: bool = True):
-        """Registra el uso de la herramienta para métricas."""
+        """Registra el uso de la herramienta para métricas (el archivo se escribe en segundo plano)."""
         try:
             self.usage_count += 1
             log_entry = {
@@ -57,25 +238,7 @@ class BaseTool(ABC):
             logger.info(f"🛠️ HERRAMIENTA ACTIVADA: {self.name} | {user_id} | {success}")
             
             # Guardar en archivo de métricas
-            log_file = "tool_usage_metrics.json"
-            try:
-                if os.path.exists(log_file):
-                    with open(log_file, 'r') as f:
-                        logs = json.load(f)
-                else:
-                    logs = []
-                
-                logs.append(log_entry)
-                
-                # Mantener solo los últimos 1000 registros
-                if len(logs) > 1000:
-                    logs = logs[-1000:]
-                
-                with open(log_file, 'w') as f:
-                    json.dump(logs, f, ensure_ascii=False, indent=2)
-                    
-            except Exception as e:
-                logger.error(f"Error guardando métricas de herramientas: {e}")
+            tool_usage_log.record(log_entry)
                 
         except Exception as e:
             logger.error(f"Error registrando uso de herramienta: {e}")
@@ -89,6 +252,8 @@ class EnviarRecursosGratuitos(BaseTool):
     Herramienta para enviar recursos gratuitos desde la base de datos.
     """
     
+    cacheable = True
+    
     def __init__(self, resource_service, db_service=None):
         super().__init__("enviar_recursos_gratuitos", "demonstration")
         self.resource_service = resource_service
@@ -146,6 +311,8 @@ class MostrarSyllabusInteractivo(BaseTool):
     Herramienta para mostrar el syllabus completo del curso.
     """
     
+    cacheable = True
+    
     def __init__(self, db_service):
         super().__init__("mostrar_syllabus_interactivo", "demonstration")
         self.db_service = db_service
@@ -155,9 +322,11 @@ class MostrarSyllabusInteractivo(BaseTool):
         Ejecuta la muestra del syllabus interactivo.
         """
         try:
-            # Obtener información del curso
-            course_info = await self.db_service.get_course_details(course_id)
-            sessions = await self.db_service.get_course_sessions(course_id)
+            # Obtener información del curso (consultas independientes, en paralelo)
+            course_info, sessions = await asyncio.gather(
+                self.db_service.get_course_details(course_id),
+                self.db_service.get_course_sessions(course_id)
+            )
             
             # TODO: Generar mensaje formateado (implementar después)
             mensaje = f"📚 **Temario Completo - {course_info.get('name', 'Curso de IA')}**"
@@ -196,6 +365,8 @@ class EnviarPreviewCurso(BaseTool):
     Herramienta para enviar preview en video del curso.
     """
     
+    cacheable = True
+    
     def __init__(self, resource_service):
         super().__init__("enviar_preview_curso", "demonstration")
         self.resource_service = resource_service
@@ -243,6 +414,8 @@ class MostrarComparativaPrecios(BaseTool):
     Herramienta para mostrar análisis de inversión vs mercado.
     """
     
+    cacheable = True
+    
     def __init__(self, db_service):
         super().__init__("mostrar_comparativa_precios", "persuasion")
         self.db_service = db_service
@@ -280,6 +453,8 @@ class MostrarBonosExclusivos(BaseTool):
     Herramienta para mostrar bonos por tiempo limitado.
     """
     
+    cacheable = True
+    
     def __init__(self, db_service):
         super().__init__("mostrar_bonos_exclusivos", "persuasion")
         self.db_service = db_service
@@ -322,6 +497,7 @@ class ContactarAsesorDirecto(BaseTool):
     
     def __init__(self, contact_flow_handler=None):
         super().__init__("contactar_asesor_directo", "closing")
+        self.timeout_content = "Te voy a conectar con un asesor. Déjame un momento para coordinar."
         self.contact_flow_handler = contact_flow_handler
     
     async def execute(self, user_id: str, course_id: str = None, **kwargs) -> Dict[str, Any]:
@@ -369,11 +545,14 @@ class ToolActivationSystem:
     - Analiza intención y activa herramientas apropiadas
     - Máximo 2 herramientas por interacción
     - Prioriza herramientas más efectivas
+    - Ejecuta en paralelo las herramientas sin dependencias entre sí
     """
     
-    def __init__(self):
+    def __init__(self, tool_timeout_seconds: float = 8.0, result_cache: Optional[ToolResultCache] = None):
         self.tools = {}
         self.activation_history = []
+        self.tool_timeout_seconds = tool_timeout_seconds
+        self.result_cache = result_cache or ToolResultCache()
     
     def register_tool(self, tool: BaseTool):
         """Registra una herramienta en el sistema."""
@@ -421,10 +600,8 @@ class ToolActivationSystem:
                 tools_to_activate = await handler(user_message, user_id, course_id, **kwargs)
                 
                 # Ejecutar herramientas (máximo 2)
-                for tool_name in tools_to_activate[:2]:
-                    if tool_name in self.tools:
-                        result = await self.tools[tool_name].execute(user_id, course_id, **kwargs)
-                        activated_tools.append(result)
+                selected = [name for name in tools_to_activate[:2] if name in self.tools]
+                activated_tools = await self._execute_tools(selected, user_id, course_id, **kwargs)
             
             # Registrar activación
             self.activation_history.append({
@@ -440,6 +617,62 @@ class ToolActivationSystem:
         
         return activated_tools
     
+    async def _execute_tools(self, tool_names: List[str], user_id: str, course_id: str, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Ejecuta las herramientas por oleadas: en cada una corren en paralelo las que
+        no esperan a otra herramienta pendiente. Los resultados se devuelven en el
+        orden de selección, sin importar cuál terminó primero.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = list(dict.fromkeys(tool_names))
+        while pending:
+            ready = [name for name in pending if not any(dep in pending for dep in self.tools[name].depends_on)]
+            if not ready:
+                # Dependencia circular: se ejecutan en el orden seleccionado
+                ready = pending[:1]
+            outcomes = await asyncio.gather(*(
+                self._run_tool(self.tools[name], user_id, course_id, **kwargs) for name in ready
+            ))
+            results.update(zip(ready, outcomes))
+            pending = [name for name in pending if name not in results]
+        return [results[name] for name in tool_names]
+    
+    def invalidate_course(self, course_id: str = None) -> None:
+        """Descarta los resultados en caché de un curso (p. ej. tras editar su catálogo)."""
+        self.result_cache.invalidate(course_id)
+    
+    async def _run_tool(self, tool: BaseTool, user_id: str, course_id: str, **kwargs) -> Dict[str, Any]:
+        """Ejecuta una herramienta con su timeout; un fallo no cancela a las demás."""
+        if tool.cacheable:
+            cached = self.result_cache.get(tool.name, course_id)
+            if cached is not None:
+                await tool.log_usage(user_id, course_id, True)
+                return tool.personalize(cached, user_id, **kwargs)
+            version = self.result_cache.version(course_id)
+        timeout = tool.timeout_seconds or self.tool_timeout_seconds
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(tool.execute(user_id, course_id, **kwargs), timeout)
+            if tool.cacheable and result.get('tool_activated'):
+                self.result_cache.put(tool.name, course_id, version, result)
+                return tool.personalize(result, user_id, **kwargs)
+            return result
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Herramienta {tool.name} excedió {timeout}s")
+            error = 'timeout'
+        except Exception as e:
+            logger.error(f"Error ejecutando herramienta {tool.name}: {e}")
+            error = str(e)
+        finally:
+            logger.debug(f"🛠️ {tool.name} en {(time.perf_counter() - started) * 1000:.1f} ms")
+        await tool.log_usage(user_id, course_id, False)
+        return {
+            "type": "error",
+            "content": tool.timeout_content,
+            "tool_activated": False,
+            "error": error
+        }
+    
     async def _handle_exploration_intent(self, message: str, user_id: str, course_id: str, **kwargs) -> List[str]:
         """Maneja intención de exploración."""
         if 'contenido' in message.lower() or 'módulo' in message.lower():
@@ -529,7 +762,7 @@ class MockDatabaseService:
 # 7. INICIALIZACIÓN DEL SISTEMA
 # ============================================================================
 
-def initialize_tool_system(db_service=None, resource_service=None, contact_flow_handler=None):
+def initialize_tool_system(db_service=None, resource_service=None, contact_flow_handler=None, tool_timeout_seconds: float = None):
     """
     Inicializa el sistema completo de herramientas.
     
@@ -537,6 +770,7 @@ def initialize_tool_system(db_service=None, resource_service=None, contact_flow_
         db_service: Servicio de base de datos (opcional, usa mock si no se proporciona)
         resource_service: Servicio de recursos (opcional, usa mock si no se proporciona)
         contact_flow_handler: Handler de flujo de contacto (opcional)
+        tool_timeout_seconds: Timeout por herramienta (por defecto el de settings)
         
     Returns:
         ToolActivationSystem configurado con todas las herramientas
@@ -548,7 +782,10 @@ def initialize_tool_system(db_service=None, resource_service=None, contact_flow_
         resource_service = MockResourceService()
     
     # Crear sistema de activación
-    tool_system = ToolActivationSystem()
+    tool_system = ToolActivationSystem(
+        tool_timeout_seconds or settings.tool_timeout_seconds,
+        ToolResultCache(settings.tool_cache_max_entries, settings.tool_cache_ttl_seconds)
+    )
     
     # Registrar herramientas de demostración
     tool_system.register_tool(EnviarRecursosGratuitos(resource_service, db_service))
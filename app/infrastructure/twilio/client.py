@@ -2,13 +2,16 @@
 Cliente de Twilio para envío de mensajes de WhatsApp.
 Capa de infraestructura que maneja la comunicación con la API de Twilio.
 """
+import asyncio
 import logging
+import time
 from typing import Dict, Any, Optional
-from twilio.rest import Client
 from twilio.base.exceptions import TwilioException
 
 from app.config import settings
 from app.domain.entities.message import OutgoingMessage, MessageType
+from app.infrastructure.twilio.send_queue import SendLane, outbound_send_queue
+from app.infrastructure.observability.metrics import twilio_send_errors, twilio_send_seconds
 
 logger = logging.getLogger(__name__)
 
@@ -17,27 +20,63 @@ def debug_print(message: str, function_name: str = "", file_name: str = "twilio_
     print(f"📱 [{file_name}::{function_name}] {message}")
 
 
+def _is_connection_setup_error(error: Exception) -> bool:
+    """
+    True si la petición no llegó a Twilio porque no se pudo abrir la conexión.
+    
+    Un timeout de lectura o una conexión cortada a media respuesta pueden
+    ocurrir después de que Twilio aceptó el mensaje: reintentarlos lo duplicaría.
+    """
+    from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout
+    from urllib3.exceptions import NewConnectionError
+    
+    if isinstance(error, ConnectTimeout):
+        return True
+    if isinstance(error, RequestsConnectionError) and error.args:
+        # requests envuelve el MaxRetryError de urllib3; su ``reason`` es el error real
+        reason = getattr(error.args[0], 'reason', error.args[0])
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
 class TwilioWhatsAppClient:
     """Cliente especializado para WhatsApp via Twilio."""
     
     def __init__(self):
         """Inicializa el cliente de Twilio."""
+        # twilio.rest (y requests) se importan al crear el cliente, no al importar el módulo
+        from twilio.rest import Client
+        
         self.client = Client(
             settings.twilio_account_sid, 
             settings.twilio_auth_token
         )
         self.from_number = f"whatsapp:{settings.twilio_phone_number}"
         
-    async def send_message(self, message: OutgoingMessage) -> Dict[str, Any]:
+    async def send_message(self, message: OutgoingMessage, lane: SendLane = SendLane.REPLY) -> Dict[str, Any]:
         """
-        Envía un mensaje de WhatsApp.
+        Envía un mensaje de WhatsApp a través de la cola central de envíos.
         
         Args:
             message: Mensaje a enviar
+            lane: Carril de prioridad (respuesta, asesor o seguimiento)
             
         Returns:
             Dict con el resultado del envío
         """
+        return await outbound_send_queue.submit(message, self._send_now, lane=lane, sender=self.from_number)
+    
+    async def _send_now(self, message: OutgoingMessage) -> Dict[str, Any]:
+        """
+        Llama a la API de Twilio (lo invoca la cola de envíos).
+        
+        Args:
+            message: Mensaje a enviar
+            
+        Returns:
+            Dict con el resultado del envío; ``retryable`` indica errores transitorios
+        """
+        started = time.perf_counter()
         try:
             debug_print(f"📤 ENVIANDO MENSAJE WHATSAPP\n👤 A: {message.to_number}\n💬 Texto: '{message.body[:100]}{'...' if len(message.body) > 100 else ''}'", "send_message", "twilio_client.py")
             
@@ -56,7 +95,10 @@ class TwilioWhatsAppClient:
             
             # Enviar mensaje
             debug_print("🚀 Llamando API de Twilio...", "send_message", "twilio_client.py")
-            twilio_message = self.client.messages.create(**twilio_data)
+            # El SDK de Twilio es síncrono: se ejecuta en un hilo para no bloquear el event loop
+            # y permitir que los lotes de mensajes preparen el siguiente mientras tanto
+            twilio_message = await asyncio.to_thread(self.client.messages.create, **twilio_data)
+            twilio_send_seconds.labels('sent').observe(time.perf_counter() - started)
             debug_print(f"✅ MENSAJE ENVIADO EXITOSAMENTE!\n🔗 SID: {twilio_message.sid}\n📊 Status: {twilio_message.status}", "send_message", "twilio_client.py")
             
             logger.info(f"Mensaje enviado exitosamente. SID: {twilio_message.sid}")
@@ -71,30 +113,42 @@ class TwilioWhatsAppClient:
             
         except TwilioException as e:
             debug_print(f"❌ ERROR DE TWILIO: {e}", "send_message", "twilio_client.py")
+            http_status = getattr(e, 'status', None)
+            retryable = http_status == 429 or (http_status or 0) >= 500
+            twilio_send_seconds.labels('failed').observe(time.perf_counter() - started)
+            twilio_send_errors.labels('retryable' if retryable else 'fatal').inc()
             return {
                 'success': False,
                 'message_sid': None,
                 'status': 'failed',
                 'to': message.to_number,
-                'error': str(e)
+                'error': str(e),
+                # 429 (límite de la cuenta) y 5xx son transitorios
+                'retryable': retryable
             }
         except Exception as e:
             debug_print(f"💥 ERROR INESPERADO: {e}", "send_message", "twilio_client.py")
+            retryable = _is_connection_setup_error(e)
+            twilio_send_seconds.labels('failed').observe(time.perf_counter() - started)
+            twilio_send_errors.labels('retryable' if retryable else 'fatal').inc()
             return {
                 'success': False,
                 'message_sid': None,
                 'status': 'failed', 
                 'to': message.to_number,
-                'error': str(e)
+                'error': str(e),
+                # Solo si no se pudo conectar: un timeout de lectura puede duplicar el mensaje
+                'retryable': retryable
             }
     
-    async def send_text(self, to_number: str, text: str) -> Dict[str, Any]:
+    async def send_text(self, to_number: str, text: str, lane: SendLane = SendLane.REPLY) -> Dict[str, Any]:
         """
         Envía un mensaje de texto simple.
         
         Args:
             to_number: Número de teléfono destino
             text: Texto del mensaje
+            lane: Carril de prioridad
             
         Returns:
             Dict con el resultado del envío
@@ -104,7 +158,7 @@ class TwilioWhatsAppClient:
             body=text,
             message_type=MessageType.TEXT
         )
-        return await self.send_message(message)
+        return await self.send_message(message, lane=lane)
     
     async def send_media(self, to_number: str, text: str, media_url: str) -> Dict[str, Any]:
         """
@@ -0,0 +1,165 @@
+"""
+Lote de mensajes salientes para un mismo destinatario.
+
+Un anuncio de curso son varios mensajes seguidos (resumen, PDF, imagen,
+seguimiento). Antes cada mensaje se construía y se enviaba uno tras otro;
+``OutboundMessageBatch`` prepara todos los mensajes del lote a la vez y los
+despacha con compuertas de secuencia: el envío N sale en cuanto Twilio acepta
+el envío N-1, así que WhatsApp los recibe en el orden en que se agregaron
+aunque la preparación de cada uno termine en cualquier orden.
+
+Twilio encola los mensajes de un remitente en el orden en que los acepta, por
+eso la compuerta espera la aceptación del anterior y no solo su salida: dos
+peticiones HTTP simultáneas pueden llegar invertidas.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, List, Optional, Union
+
+from app.domain.entities.message import OutgoingMessage
+from app.infrastructure.twilio.send_queue import SendLane
+
+logger = logging.getLogger(__name__)
+
+# Un elemento del lote es un mensaje listo o una corrutina que lo construye
+BatchItem = Union[OutgoingMessage, Awaitable[OutgoingMessage]]
+
+
+@dataclass
+class BatchItemResult:
+    """Resultado de un mensaje del lote."""
+    sequence: int
+    result: Dict[str, Any]
+    prepare_ms: float = 0.0
+    send_ms: float = 0.0
+    skipped: bool = False
+
+    @property
+    def success(self) -> bool:
+        return bool(self.result.get('success'))
+
+
+@dataclass
+class BatchResult:
+    """Resultado del lote completo, en orden de secuencia."""
+    items: List[BatchItemResult] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return all(item.success for item in self.items)
+
+    @property
+    def sequential_ms(self) -> float:
+        """Tiempo que habría tomado preparar y enviar cada mensaje en serie."""
+        return sum(item.prepare_ms + item.send_ms for item in self.items)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'messages': len(self.items),
+            'sent': sum(1 for item in self.items if item.success),
+            'skipped': sum(1 for item in self.items if item.skipped),
+            'batch_ms': round(self.elapsed_ms, 1),
+            'sequential_ms': round(self.sequential_ms, 1),
+        }
+
+
+class OutboundMessageBatch:
+    """
+    Envía varios mensajes a un destinatario respetando el orden de entrega.
+
+    Args:
+        twilio_client: Cliente con ``send_message(OutgoingMessage)``
+        to_number: Destinatario (solo para logs)
+    """
+
+    def __init__(self, twilio_client, to_number: str):
+        self.twilio_client = twilio_client
+        self.to_number = to_number
+        self._items: List[BatchItem] = []
+        self._required: List[bool] = []
+        self._lanes: List[Optional[SendLane]] = []
+
+    def add(self, message: BatchItem, required: bool = False, lane: Optional[SendLane] = None) -> int:
+        """
+        Agrega un mensaje al final del lote.
+
+        Args:
+            message: Mensaje listo o corrutina que lo construye
+            required: Si su envío falla, los mensajes posteriores no se envían
+            lane: Carril de la cola de envíos (por defecto, el del cliente)
+
+        Returns:
+            Número de secuencia del mensaje
+        """
+        self._items.append(message)
+        self._required.append(required)
+        self._lanes.append(lane)
+        return len(self._items) - 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def dispatch(self) -> BatchResult:
+        """
+        Prepara todos los mensajes concurrentemente y los envía en orden.
+
+        Returns:
+            BatchResult con un resultado por mensaje, en orden de secuencia
+        """
+        started = time.perf_counter()
+        # gates[i] se marca cuando el mensaje i terminó (enviado, fallido u omitido)
+        gates = [asyncio.Event() for _ in self._items]
+        aborted = asyncio.Event()
+
+        async def run_item(sequence: int) -> BatchItemResult:
+            item_started = time.perf_counter()
+            try:
+                try:
+                    message = await self._prepare(self._items[sequence])
+                    error = None
+                except Exception as e:
+                    message, error = None, str(e)
+                    logger.error(f"Error preparando mensaje {sequence} del lote para {self.to_number}: {e}")
+                prepare_ms = (time.perf_counter() - item_started) * 1000
+
+                # Compuerta: ningún mensaje sale antes de que el anterior termine
+                if sequence > 0:
+                    await gates[sequence - 1].wait()
+                if message is None or aborted.is_set():
+                    if self._required[sequence]:
+                        aborted.set()
+                    return BatchItemResult(sequence, {'success': False, 'error': error or 'Lote interrumpido'},
+                                           prepare_ms=prepare_ms, skipped=True)
+
+                send_started = time.perf_counter()
+                lane = self._lanes[sequence]
+                if lane is None:
+                    result = await self.twilio_client.send_message(message)
+                else:
+                    result = await self.twilio_client.send_message(message, lane=lane)
+                send_ms = (time.perf_counter() - send_started) * 1000
+                if self._required[sequence] and not result.get('success'):
+                    aborted.set()
+                return BatchItemResult(sequence, result, prepare_ms=prepare_ms, send_ms=send_ms)
+            finally:
+                gates[sequence].set()
+
+        items = await asyncio.gather(*(run_item(sequence) for sequence in range(len(self._items))))
+        batch = BatchResult(items=list(items), elapsed_ms=(time.perf_counter() - started) * 1000)
+
+        summary = batch.to_dict()
+        logger.info(
+            f"📦 Lote para {self.to_number}: {summary['sent']}/{summary['messages']} enviados "
+            f"en {summary['batch_ms']:.0f} ms (en serie: {summary['sequential_ms']:.0f} ms)"
+        )
+        return batch
+
+    @staticmethod
+    async def _prepare(item: BatchItem) -> OutgoingMessage:
+        if isinstance(item, OutgoingMessage):
+            return item
+        return await item
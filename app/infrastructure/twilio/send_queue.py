@@ -0,0 +1,287 @@
+"""
+Cola central de envíos salientes a Twilio.
+
+Todos los mensajes pasan por aquí antes de llegar a la API de Twilio, para
+que una ráfaga de una campaña no supere el throughput de la cuenta (429 o
+penalizaciones por mensajes encolados):
+
+- Carriles de prioridad: respuestas de conversación antes que notificaciones
+  al asesor, y éstas antes que los mensajes de seguimiento.
+- Token bucket por número remitente (throughput de la cuenta) y por
+  destinatario (límite de mensajes por usuario de WhatsApp).
+- Un envío en vuelo por destinatario, para no invertir el orden de entrega.
+  Los envíos que esperan turno, token del destinatario o backoff quedan
+  aparcados sin ocupar un worker, así un destinatario lento no frena al resto.
+- Reintentos con backoff exponencial y jitter para errores transitorios
+  (429, 5xx, errores de conexión).
+- Métricas por carril para monitoreo.
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from app.config import settings
+from app.domain.entities.message import OutgoingMessage
+from app.infrastructure.openai.resilience import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Límite de buckets por destinatario antes de descartar los que están llenos
+MAX_RECIPIENT_BUCKETS = 10000
+
+
+class SendLane(IntEnum):
+    """Carriles de prioridad (menor valor = se envía antes)."""
+    REPLY = 0
+    ADVISOR = 1
+    FOLLOW_UP = 2
+
+
+SendFunction = Callable[[OutgoingMessage], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class _SendJob:
+    lane: SendLane
+    sender: str
+    message: OutgoingMessage
+    send: SendFunction
+    future: 'asyncio.Future[Dict[str, Any]]'
+    sequence: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempt: int = 0
+    # True mientras tiene el turno de su destinatario (en vuelo o esperando token/backoff)
+    holds_recipient: bool = False
+
+
+class OutboundSendQueue:
+    """
+    Despachador de envíos con carriles de prioridad y control de tasa.
+
+    Args:
+        messages_per_second: Throughput máximo por número remitente
+        recipient_messages_per_minute: Tasa sostenida por destinatario
+        recipient_burst: Ráfaga máxima por destinatario
+        workers: Envíos simultáneos a Twilio
+        max_retries: Reintentos por mensaje ante errores transitorios
+    """
+
+    def __init__(
+        self,
+        messages_per_second: float = 80.0,
+        recipient_messages_per_minute: float = 10.0,
+        recipient_burst: int = 45,
+        workers: int = 16,
+        max_retries: int = 3,
+        base_backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 8.0
+    ):
+        self.messages_per_second = messages_per_second
+        self.recipient_messages_per_minute = recipient_messages_per_minute
+        self.recipient_burst = recipient_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker_tasks = []
+        self._sender_buckets: Dict[str, TokenBucket] = {}
+        self._recipient_buckets: Dict[str, TokenBucket] = {}
+        self._busy_recipients: Set[str] = set()
+        self._parked: Dict[str, Deque[_SendJob]] = {}
+        self._sequence = itertools.count()
+
+        self.stats: Dict[str, Dict[str, float]] = {
+            lane.name.lower(): {
+                'enqueued': 0, 'sent': 0, 'failed': 0, 'retries': 0,
+                'wait_ms_total': 0.0, 'wait_ms_max': 0.0
+            }
+            for lane in SendLane
+        }
+        self.throttled_seconds: Dict[str, float] = {'sender': 0.0, 'recipient': 0.0}
+
+    def _ensure_started(self) -> None:
+        """Crea cola, buckets y workers en el event loop actual."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Primer uso, o el loop anterior terminó (scripts que llaman asyncio.run varias veces)
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._sender_buckets.clear()
+        self._recipient_buckets.clear()
+        self._busy_recipients.clear()
+        self._parked.clear()
+        self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"📮 Cola de envíos iniciada con {self.workers} workers ({self.messages_per_second:g} msg/s por remitente)")
+
+    async def submit(
+        self,
+        message: OutgoingMessage,
+        send: SendFunction,
+        lane: SendLane = SendLane.REPLY,
+        sender: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Encola un mensaje y espera el resultado de su envío.
+
+        Args:
+            message: Mensaje a enviar
+            send: Corrutina que hace la llamada real a Twilio
+            lane: Carril de prioridad
+            sender: Número remitente (clave del límite de la cuenta)
+
+        Returns:
+            Resultado del envío (mismo formato que ``send``)
+        """
+        self._ensure_started()
+        job = _SendJob(lane, sender, message, send, self._loop.create_future(), next(self._sequence))
+        self.stats[lane.name.lower()]['enqueued'] += 1
+        self._requeue(job)
+        return await job.future
+
+    def _requeue(self, job: _SendJob) -> None:
+        # Conserva su número de secuencia: vuelve a su lugar dentro del carril
+        self._queue.put_nowait((int(job.lane), job.sequence, job))
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                result = await self._dispatch(job)
+            except Exception as e:
+                logger.error(f"Error en la cola de envíos para {job.message.to_number}: {e}")
+                result = {'success': False, 'message_sid': None, 'status': 'failed',
+                          'to': job.message.to_number, 'error': str(e)}
+            finally:
+                self._queue.task_done()
+            if result is None:
+                # Aparcado: vuelve a la cola cuando le toque, sin ocupar este worker
+                continue
+            self._finish_turn(job)
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def _dispatch(self, job: _SendJob) -> Optional[Dict[str, Any]]:
+        """Hace un intento de envío; None si el envío quedó aparcado."""
+        lane_stats = self.stats[job.lane.name.lower()]
+        recipient = job.message.to_number
+
+        if not job.holds_recipient:
+            if recipient in self._busy_recipients:
+                # Otro envío al mismo destinatario va antes: espera su turno
+                self._parked.setdefault(recipient, deque()).append(job)
+                return None
+            self._busy_recipients.add(recipient)
+            job.holds_recipient = True
+
+        if job.attempt == 0:
+            wait = self._recipient_bucket(recipient).try_acquire()
+            if wait:
+                self.throttled_seconds['recipient'] += wait
+                self._loop.call_later(wait, self._requeue, job)
+                return None
+
+        self.throttled_seconds['sender'] += await self._sender_bucket(job.sender).acquire()
+        if job.attempt == 0:
+            wait_ms = (time.monotonic() - job.enqueued_at) * 1000
+            lane_stats['wait_ms_total'] += wait_ms
+            lane_stats['wait_ms_max'] = max(lane_stats['wait_ms_max'], wait_ms)
+
+        result = await job.send(job.message)
+        if result.get('success'):
+            lane_stats['sent'] += 1
+            return result
+        if not result.get('retryable') or job.attempt >= self.max_retries:
+            lane_stats['failed'] += 1
+            return result
+
+        delay = random.uniform(0, min(self.max_backoff_seconds, self.base_backoff_seconds * (2 ** job.attempt)))
+        job.attempt += 1
+        lane_stats['retries'] += 1
+        logger.warning(
+            f"🔁 Reintento {job.attempt}/{self.max_retries} de envío a {recipient} en {delay:.2f}s: {result.get('error')}"
+        )
+        self._loop.call_later(delay, self._requeue, job)
+        return None
+
+    def _finish_turn(self, job: _SendJob) -> None:
+        """Libera el turno del destinatario y devuelve a la cola su siguiente envío aparcado."""
+        if not job.holds_recipient:
+            return
+        job.holds_recipient = False
+        recipient = job.message.to_number
+        parked = self._parked.get(recipient)
+        if not parked:
+            self._busy_recipients.discard(recipient)
+            return
+        next_job = parked.popleft()
+        if not parked:
+            del self._parked[recipient]
+        next_job.holds_recipient = True
+        self._requeue(next_job)
+
+    def _sender_bucket(self, sender: str) -> TokenBucket:
+        bucket = self._sender_buckets.get(sender)
+        if bucket is None:
+            # Sin ráfaga: con capacidad de un segundo completo, el primer segundo
+            # de un pico dejaría pasar el doble del throughput de la cuenta
+            bucket = TokenBucket(self.messages_per_second * 60, capacity=1.0)
+            self._sender_buckets[sender] = bucket
+        return bucket
+
+    def _recipient_bucket(self, recipient: str) -> TokenBucket:
+        bucket = self._recipient_buckets.get(recipient)
+        if bucket is None:
+            if len(self._recipient_buckets) >= MAX_RECIPIENT_BUCKETS:
+                self._prune_recipients()
+            bucket = TokenBucket(self.recipient_messages_per_minute, capacity=self.recipient_burst)
+            self._recipient_buckets[recipient] = bucket
+        return bucket
+
+    def _prune_recipients(self) -> None:
+        """Descarta destinatarios sin envíos recientes (bucket lleno y sin envío en vuelo)."""
+        for recipient, bucket in list(self._recipient_buckets.items()):
+            if bucket.available >= bucket.capacity and recipient not in self._busy_recipients:
+                del self._recipient_buckets[recipient]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado actual para monitoreo."""
+        lanes = {}
+        for lane, stats in self.stats.items():
+            dispatched = stats['sent'] + stats['failed']
+            lanes[lane] = {
+                'enqueued': int(stats['enqueued']),
+                'sent': int(stats['sent']),
+                'failed': int(stats['failed']),
+                'retries': int(stats['retries']),
+                'avg_wait_ms': round(stats['wait_ms_total'] / dispatched, 1) if dispatched else 0.0,
+                'max_wait_ms': round(stats['wait_ms_max'], 1),
+            }
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'workers': self.workers,
+            'tracked_recipients': len(self._recipient_buckets),
+            'parked': sum(len(jobs) for jobs in self._parked.values()),
+            'throttled_seconds': {key: round(value, 2) for key, value in self.throttled_seconds.items()},
+            'lanes': lanes,
+        }
+
+
+# Instancia global compartida por todos los clientes de Twilio del proceso
+outbound_send_queue = OutboundSendQueue(
+    messages_per_second=settings.twilio_messages_per_second,
+    recipient_messages_per_minute=settings.twilio_recipient_messages_per_minute,
+    recipient_burst=settings.twilio_recipient_burst,
+    workers=settings.twilio_send_workers,
+    max_retries=settings.twilio_send_max_retries
+)
@@ -0,0 +1,136 @@
+"""
+Utilidades de arranque del webhook: tiempos por componente y componentes
+que se construyen en su primer uso.
+"""
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """
+    Tiempos de arranque por componente.
+
+    ``measure`` envuelve constructores síncronos y ``track`` corrutinas (que
+    pueden correr en paralelo con ``asyncio.gather``). Los componentes
+    diferidos quedan registrados cuando se construyen en su primer uso.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.started_at = clock()
+        self.ready_at: Optional[float] = None
+        self.components: Dict[str, Dict[str, Any]] = {}
+
+    def begin(self) -> None:
+        """Marca el inicio del arranque (el perfil se crea al importar el módulo)."""
+        self.started_at = self.clock()
+        self.ready_at = None
+        self.components.clear()
+
+    def _record(self, name: str, started: float, status: str, deferred: bool = False) -> None:
+        self.components[name] = {
+            'ms': round((self.clock() - started) * 1000, 1),
+            'offset_ms': round((started - self.started_at) * 1000, 1),
+            'status': status,
+            'deferred': deferred,
+        }
+
+    def measure(self, name: str, factory: Callable[[], Any], deferred: bool = False) -> Any:
+        """Ejecuta ``factory()`` midiendo su duración."""
+        started = self.clock()
+        try:
+            result = factory()
+        except Exception:
+            self._record(name, started, 'error', deferred)
+            raise
+        self._record(name, started, 'ok', deferred)
+        return result
+
+    async def track(self, name: str, awaitable: Awaitable[Any], deferred: bool = False) -> Any:
+        """Espera ``awaitable`` midiendo su duración."""
+        started = self.clock()
+        try:
+            result = await awaitable
+        except Exception:
+            self._record(name, started, 'error', deferred)
+            raise
+        self._record(name, started, 'ok', deferred)
+        return result
+
+    def mark_ready(self) -> None:
+        self.ready_at = self.clock()
+
+    @property
+    def total_ms(self) -> Optional[float]:
+        if self.ready_at is None:
+            return None
+        return round((self.ready_at - self.started_at) * 1000, 1)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado para monitoreo (``/metrics``)."""
+        return {
+            'ready': self.ready_at is not None,
+            'total_ms': self.total_ms or 0.0,
+            'components': {name: dict(info) for name, info in self.components.items()},
+        }
+
+    def format_report(self) -> List[str]:
+        """Líneas del desglose, en el orden en que arrancó cada componente."""
+        lines = []
+        for name, info in sorted(self.components.items(), key=lambda item: item[1]['offset_ms']):
+            icon = '✅' if info['status'] == 'ok' else '⚠️'
+            suffix = ' (diferido)' if info['deferred'] else ''
+            lines.append(f"{icon} {name:<22} {info['ms']:>8.1f} ms  desde +{info['offset_ms']:.0f} ms{suffix}")
+        if self.total_ms is not None:
+            lines.append(f"⏱️ Listo en {self.total_ms:.1f} ms")
+        return lines
+
+
+class LazyComponent:
+    """
+    Componente que se construye en su primer uso.
+
+    Se entrega en lugar de la instancia a quien lo usa con ``if componente:``
+    y luego llama a sus métodos. La primera evaluación construye el objeto
+    (midiendo el tiempo en ``profile``). Si la construcción falla, el
+    componente es falsy, igual que cuando el arranque lo dejaba en ``None``.
+    """
+
+    __slots__ = ('_name', '_factory', '_profile', '_instance', '_failed')
+
+    def __init__(self, name: str, factory: Callable[[], Any], profile: Optional[StartupProfile] = None):
+        self._name = name
+        self._factory = factory
+        self._profile = profile
+        self._instance = None
+        self._failed = False
+
+    @property
+    def resolved(self) -> bool:
+        return self._instance is not None
+
+    def resolve(self) -> Any:
+        """Construye el componente si hace falta; ``None`` si no se pudo."""
+        if self._instance is None and not self._failed:
+            try:
+                if self._profile is not None:
+                    deferred = self._profile.ready_at is not None
+                    self._instance = self._profile.measure(self._name, self._factory, deferred=deferred)
+                else:
+                    self._instance = self._factory()
+            except Exception as e:
+                self._failed = True
+                logger.error(f"❌ Error construyendo {self._name}: {e}")
+        return self._instance
+
+    def __bool__(self) -> bool:
+        return self.resolve() is not None
+
+    def __getattr__(self, attribute: str) -> Any:
+        instance = self.resolve()
+        if instance is None:
+            raise AttributeError(f"{self._name} no está disponible")
+        return getattr(instance, attribute)
@@ -1,22 +1,30 @@
 """
 Webhook handler para recibir mensajes de Twilio WhatsApp.
 """
+import asyncio
 import logging
+import time
 from typing import Dict, Any
 from fastapi import FastAPI, Request, Form, HTTPException, BackgroundTasks
-from fastapi.responses import PlainTextResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, FileResponse, Response
 import os
 
 from app.config import settings
 from app.infrastructure.twilio.client import TwilioWhatsAppClient
 from app.infrastructure.openai.client import OpenAIClient
+from app.infrastructure.media.media_registry import media_registry
+from app.infrastructure.media.static_media import static_media_catalog
+from app.infrastructure.shared_state.kv_store import shared_state_store
+from app.infrastructure.shared_state.worker_router import worker_router
+from app.infrastructure.campaign.metrics_tracker import campaign_metrics
+from app.infrastructure.observability.metrics import (
+    inbound_messages, message_processing_seconds, metrics_registry
+)
 from app.application.usecases.process_incoming_message import ProcessIncomingMessageUseCase
 from app.application.usecases.manage_user_memory import ManageUserMemoryUseCase
 from app.application.usecases.analyze_message_intent import AnalyzeMessageIntentUseCase
 from app.application.usecases.generate_intelligent_response import GenerateIntelligentResponseUseCase
 from app.application.usecases.privacy_flow_use_case import PrivacyFlowUseCase
-from app.application.usecases.tool_activation_use_case import ToolActivationUseCase
 from app.application.usecases.course_announcement_use_case import CourseAnnouncementUseCase
 from app.application.usecases.query_course_information import QueryCourseInformationUseCase
 from app.application.usecases.welcome_flow_use_case import WelcomeFlowUseCase
@@ -24,6 +32,7 @@ from memory.lead_memory import MemoryManager
 from app.application.usecases.detect_ad_hashtags_use_case import DetectAdHashtagsUseCase
 from app.application.usecases.process_ad_flow_use_case import ProcessAdFlowUseCase
 from app.application.usecases.advisor_referral_use_case import AdvisorReferralUseCase
+from app.presentation.api.startup import LazyComponent, StartupProfile
 
 logger = logging.getLogger(__name__)
 
@@ -43,19 +52,8 @@ app = FastAPI(
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 resources_path = os.path.join(project_root, "resources")
 
-print(f"🔍 Buscando resources en: {resources_path}")
-if os.path.exists(resources_path):
-    app.mount("/resources", StaticFiles(directory=resources_path), name="resources")
-    print(f"📁 ✅ Archivos estáticos montados desde: {resources_path}")
-    # Listar archivos para debug
-    course_materials_path = os.path.join(resources_path, "course_materials")
-    if os.path.exists(course_materials_path):
-        files = os.listdir(course_materials_path)
-        print(f"📂 Archivos disponibles: {files}")
-    else:
-        print(f"⚠️ Carpeta course_materials no encontrada")
-else:
-    print(f"❌ Carpeta resources no encontrada en: {resources_path}")
+# Los archivos se sirven desde el catálogo (mmap + ETag + rangos) en las rutas
+# /resources/... y /media/<hash>/... definidas más abajo; se indexan en el startup
 
 # Variables globales para las dependencias
 twilio_client = None
@@ -72,100 +70,101 @@ detect_ad_hashtags_use_case = None
 process_ad_flow_use_case = None
 advisor_referral_use_case = None
 
+# Tiempos de arranque por componente y tareas de arranque en segundo plano
+startup_profile = StartupProfile()
+_background_startup_tasks = set()
+
 @app.on_event("startup")
 async def startup_event():
-    """Evento de startup para inicializar todas las dependencias."""
-    global twilio_client, memory_use_case, intent_analyzer, course_query_use_case, intelligent_response_use_case, process_message_use_case, privacy_flow_use_case, tool_activation_use_case, course_announcement_use_case, detect_ad_hashtags_use_case, process_ad_flow_use_case, advisor_referral_use_case
+    """
+    Evento de startup para inicializar todas las dependencias.
+    
+    Los subsistemas independientes (clientes Twilio y OpenAI, PostgreSQL, índice de
+    estáticos y métricas de campaña) arrancan en paralelo; con
+    ``lazy_startup`` las herramientas de conversión se construyen en su
+    primer uso y el pre-subido de media corre en segundo plano. El desglose
+    de tiempos queda en ``startup_profile`` (y en /metrics).
+    """
+    global twilio_client, memory_use_case, intent_analyzer, course_query_use_case, intelligent_response_use_case, process_message_use_case, privacy_flow_use_case, tool_activation_use_case, course_announcement_use_case, welcome_flow_use_case, detect_ad_hashtags_use_case, process_ad_flow_use_case, advisor_referral_use_case
     
     debug_print("🚀 INICIANDO SISTEMA BOT BRENDA...", "startup", "webhook.py")
+    profile = startup_profile
+    profile.begin()
     
-    # Inicializar cliente Twilio
-    debug_print("Inicializando cliente Twilio...", "startup", "webhook.py")
-    twilio_client = TwilioWhatsAppClient()
-    debug_print("✅ Cliente Twilio inicializado correctamente", "startup", "webhook.py")
-
     # Crear manager de memoria y caso de uso
-    debug_print("Inicializando sistema de memoria...", "startup", "webhook.py")
-    memory_manager = MemoryManager(memory_dir="memorias")
-    memory_use_case = ManageUserMemoryUseCase(memory_manager)
+    memory_use_case = profile.measure(
+        'memory', lambda: ManageUserMemoryUseCase(MemoryManager(memory_dir="memorias", store=shared_state_store, owns_user=worker_router.owns))
+    )
     debug_print("✅ Sistema de memoria inicializado correctamente", "startup", "webhook.py")
 
+    # Subsistemas independientes en paralelo. Los SDKs de Twilio y OpenAI se importan al
+    # crear sus clientes, así que eso (y la carga de certificados TLS) corre en hilos
+    debug_print("⚡ Inicializando Twilio, OpenAI, PostgreSQL, estáticos y métricas de campaña en paralelo...", "startup", "webhook.py")
+    twilio_client, openai_client, course_system, _, campaign_restored = await asyncio.gather(
+        profile.track('twilio_client', asyncio.to_thread(TwilioWhatsAppClient)),
+        profile.track('openai_client', asyncio.to_thread(OpenAIClient)),
+        profile.track('postgres_courses', _initialize_course_system()),
+        profile.track('static_media', asyncio.to_thread(_index_static_resources)),
+        # Métricas de campaña: restaura las ventanas persistidas y las guarda periódicamente
+        profile.track('campaign_metrics', campaign_metrics.start()),
+        return_exceptions=True
+    )
+    if isinstance(twilio_client, BaseException):
+        raise twilio_client
+    debug_print("✅ Cliente Twilio inicializado correctamente", "startup", "webhook.py")
+
     # Inicializar flujo de privacidad
-    debug_print("🔐 Inicializando flujo de privacidad...", "startup", "webhook.py")
     privacy_flow_use_case = PrivacyFlowUseCase(memory_use_case, twilio_client)
     debug_print("✅ Flujo de privacidad inicializado correctamente", "startup", "webhook.py")
 
-    # Inicializar sistema con OpenAI (sin PostgreSQL por ahora)
+    course_query_use_case, course_repository, db_client = (
+        course_system if not isinstance(course_system, BaseException) else (None, None, None)
+    )
+    if isinstance(campaign_restored, BaseException):
+        debug_print(f"⚠️ Error iniciando métricas de campaña: {campaign_restored}", "startup", "webhook.py")
+    
+    # Herramientas de conversión: solo se usan tras una respuesta inteligente con intención clara
+    tool_activation_use_case = LazyComponent('tool_activation', _build_tool_activation_use_case, profile)
+    if not settings.lazy_startup:
+        tool_activation_use_case.resolve()
+
     try:
-        debug_print("🤖 Inicializando cliente OpenAI...", "startup", "webhook.py")
-        # Inicializar cliente OpenAI
-        openai_client = OpenAIClient()
+        if isinstance(openai_client, BaseException):
+            raise openai_client
         debug_print("✅ Cliente OpenAI inicializado correctamente", "startup", "webhook.py")
+        metrics_registry.register_status(
+            'openai_validation', lambda: openai_client.validation_stats,
+            'Validaciones de respuestas resueltas con el índice de hechos o con el LLM'
+        )
         
-        debug_print("🧠 Inicializando analizador de intención...", "startup", "webhook.py")
         intent_analyzer = AnalyzeMessageIntentUseCase(openai_client, memory_use_case)
         debug_print("✅ Analizador de intención inicializado correctamente", "startup", "webhook.py")
         
-        # Inicializar sistema de cursos PostgreSQL
-        debug_print("📚 Inicializando sistema de cursos PostgreSQL...", "startup", "webhook.py")
-        from app.infrastructure.database.client import DatabaseClient
-        from app.infrastructure.database.repositories.course_repository import CourseRepository
-        
-        try:
-            # Crear db_client y course_repository como en test_webhook_simulation.py
-            db_client = DatabaseClient()
-            course_repository = CourseRepository()
-            
-            # Conectar la instancia global de base de datos (COMO EN test_webhook_simulation.py)
-            from app.infrastructure.database.client import database_client
-            await database_client.connect()
-            
-            # QueryCourseInformationUseCase no necesita parámetros adicionales
-            course_query_use_case = QueryCourseInformationUseCase()
-            
-            # Inicializar el sistema de cursos (COMO EN test_webhook_simulation.py)
-            course_db_initialized = await course_query_use_case.initialize()
-            
-            if course_db_initialized:
-                debug_print("✅ Sistema de cursos PostgreSQL inicializado correctamente", "startup", "webhook.py")
-            else:
-                debug_print("⚠️ Sistema de cursos PostgreSQL no disponible, usando modo básico", "startup", "webhook.py")
-                course_query_use_case = None
-                
-        except Exception as e:
-            debug_print(f"⚠️ Error inicializando PostgreSQL: {e}", "startup", "webhook.py")
-            debug_print("🔄 Continuando sin sistema de cursos...", "startup", "webhook.py")
-            course_query_use_case = None
-            course_repository = None
-            db_client = None
-        
-        # Crear generador de respuestas inteligentes (sin sistema de cursos)
-        debug_print("🧩 Creando generador de respuestas inteligentes...", "startup", "webhook.py")
+        # Crear generador de respuestas inteligentes
         try:
-            intelligent_response_use_case = GenerateIntelligentResponseUseCase(
+            intelligent_response_use_case = profile.measure('intelligent_response', lambda: GenerateIntelligentResponseUseCase(
                 intent_analyzer, 
                 twilio_client, 
                 openai_client, 
                 db_client,
                 course_repository,
                 course_query_use_case
-            )
+            ))
             debug_print("✅ Generador de respuestas inteligentes creado", "startup", "webhook.py")
+            metrics_registry.register_status(
+                'course_info_cache', lambda: intelligent_response_use_case.dynamic_course_provider.cache_stats,
+                'Caché de información de cursos del generador de respuestas'
+            )
+            # Los resultados de herramientas en caché se descartan cuando cambia el curso en BD
+            intelligent_response_use_case.dynamic_course_provider.add_version_listener(
+                lambda course_id: tool_activation_use_case.invalidate_course_cache(course_id)
+                if tool_activation_use_case.resolved else None
+            )
         except Exception as e:
             debug_print(f"⚠️ Error creando generador inteligente: {e}", "startup", "webhook.py")
             intelligent_response_use_case = None
         
-        # Inicializar sistema de herramientas de conversión
-        debug_print("🛠️ Inicializando sistema de herramientas de conversión...", "startup", "webhook.py")
-        try:
-            tool_activation_use_case = ToolActivationUseCase()
-            debug_print("✅ Sistema de herramientas inicializado correctamente", "startup", "webhook.py")
-        except Exception as e:
-            debug_print(f"⚠️ Error con herramientas: {e}", "startup", "webhook.py")
-            tool_activation_use_case = None
-        
         # Inicializar sistema de anuncios de cursos
-        debug_print("📚 Inicializando sistema de anuncios de cursos...", "startup", "webhook.py")
         course_announcement_use_case = CourseAnnouncementUseCase(
             course_query_use_case, 
             memory_use_case, 
@@ -174,7 +173,6 @@ async def startup_event():
         debug_print("✅ Sistema de anuncios de cursos inicializado correctamente", "startup", "webhook.py")
         
         # Inicializar sistema de flujo de anuncios
-        debug_print("📢 Inicializando sistema de flujo de anuncios...", "startup", "webhook.py")
         detect_ad_hashtags_use_case = DetectAdHashtagsUseCase()
         process_ad_flow_use_case = ProcessAdFlowUseCase(
             memory_use_case, 
@@ -185,7 +183,6 @@ async def startup_event():
         debug_print("✅ Sistema de flujo de anuncios inicializado correctamente", "startup", "webhook.py")
         
         # Inicializar flujo de bienvenida genérico
-        debug_print("🎯 Inicializando flujo de bienvenida genérico...", "startup", "webhook.py")
         try:
             welcome_flow_use_case = WelcomeFlowUseCase(
                 privacy_flow_use_case, course_query_use_case, memory_use_case, twilio_client
@@ -196,7 +193,6 @@ async def startup_event():
             welcome_flow_use_case = None
         
         # Inicializar sistema de referencia a asesores
-        debug_print("👨‍💼 Inicializando sistema de referencia a asesores...", "startup", "webhook.py")
         try:
             advisor_referral_use_case = AdvisorReferralUseCase(twilio_client)
             debug_print("✅ Sistema de referencia a asesores inicializado correctamente", "startup", "webhook.py")
@@ -205,7 +201,6 @@ async def startup_event():
             advisor_referral_use_case = None
         
         # Crear caso de uso de procesamiento con capacidades inteligentes
-        debug_print("⚙️ Creando procesador de mensajes principal...", "startup", "webhook.py")
         process_message_use_case = ProcessIncomingMessageUseCase(
             twilio_client, 
             memory_use_case, 
@@ -229,7 +224,7 @@ async def startup_event():
         # Crear sistema básico sin OpenAI
         try:
             # Intentar crear course_query_use_case básico
-            course_query_use_case = QueryCourseInformationUseCase()
+            course_query_use_case = course_query_use_case or QueryCourseInformationUseCase()
             debug_print("✅ Sistema de cursos básico inicializado", "startup", "webhook.py")
         except Exception as db_error:
             debug_print(f"⚠️ Error con BD: {db_error}", "startup", "webhook.py")
@@ -262,9 +257,101 @@ async def startup_event():
         
         debug_print("⚠️ SISTEMA FALLBACK: Funcionalidad básica disponible", "startup", "webhook.py")
     
+    # Pre-subir los materiales de cursos al blob store (si hay uno configurado); las URLs
+    # también se registran al primer envío, así que con lazy_startup no bloquea el arranque
+    if media_registry.enabled:
+        prewarm = profile.track('media_prewarm', _prewarm_course_materials(), deferred=settings.lazy_startup)
+        if settings.lazy_startup:
+            task = asyncio.create_task(prewarm)
+            _background_startup_tasks.add(task)
+            task.add_done_callback(_background_startup_tasks.discard)
+        else:
+            await prewarm
+    
+    # Tomar slot de worker y consumir el buzón propio (solo con WEB_WORKERS > 1)
+    await profile.track('worker_router', worker_router.start(_process_webhook_data))
+    
+    # /metrics: collectors del estado existente y, con varios workers, publicación de muestras
+    _register_metrics_collectors()
+    await metrics_registry.start_publishing(shared_state_store, worker_router.worker_id, settings.metrics_publish_seconds)
+    
+    profile.mark_ready()
+    for line in profile.format_report():
+        debug_print(line, "startup", "webhook.py")
     debug_print("🎯 SISTEMA LISTO PARA RECIBIR MENSAJES", "startup", "webhook.py")
 
 
+def _index_static_resources() -> int:
+    """Indexa los archivos de resources/ (hash y mmap) para servirlos desde el catálogo."""
+    if not os.path.exists(resources_path):
+        print(f"❌ Carpeta resources no encontrada en: {resources_path}")
+        return 0
+    indexed = static_media_catalog.warm()
+    print(f"📁 ✅ Archivos estáticos indexados desde: {resources_path} ({indexed} archivos)")
+    return indexed
+
+
+async def _initialize_course_system():
+    """
+    Conecta PostgreSQL e inicializa el sistema de cursos.
+    
+    Returns:
+        (course_query_use_case, course_repository, db_client); el caso de uso
+        es None si el sistema de cursos no está disponible
+    """
+    from app.infrastructure.database.client import DatabaseClient, database_client
+    from app.infrastructure.database.repositories.course_repository import CourseRepository
+    
+    try:
+        db_client = DatabaseClient()
+        course_repository = CourseRepository()
+        
+        # Conectar la instancia global de base de datos
+        await database_client.connect()
+        
+        course_query_use_case = QueryCourseInformationUseCase()
+        if await course_query_use_case.initialize():
+            debug_print("✅ Sistema de cursos PostgreSQL inicializado correctamente", "startup", "webhook.py")
+            return course_query_use_case, course_repository, db_client
+        
+        debug_print("⚠️ Sistema de cursos PostgreSQL no disponible, usando modo básico", "startup", "webhook.py")
+        return None, course_repository, db_client
+        
+    except Exception as e:
+        debug_print(f"⚠️ Error inicializando PostgreSQL: {e}", "startup", "webhook.py")
+        debug_print("🔄 Continuando sin sistema de cursos...", "startup", "webhook.py")
+        return None, None, None
+
+
+def _build_tool_activation_use_case():
+    from app.application.usecases.tool_activation_use_case import ToolActivationUseCase
+    return ToolActivationUseCase()
+
+
+async def _prewarm_course_materials() -> int:
+    course_materials_dir = os.path.join(resources_path, "course_materials")
+    course_materials = [
+        f"course_materials/{filename}" for filename in os.listdir(course_materials_dir)
+    ] if os.path.isdir(course_materials_dir) else []
+    uploaded = await media_registry.prewarm(course_materials)
+    debug_print(f"☁️ Media pre-subido al blob store: {uploaded}/{len(course_materials)}", "startup", "webhook.py")
+    return uploaded
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Exporta la contabilidad de tokens de OpenAI y las métricas de campaña y libera el slot de worker antes de apagar."""
+    from app.infrastructure.openai.usage_tracker import token_usage_tracker
+    from app.infrastructure.tools.tool_system import tool_usage_log
+    token_usage_tracker.export_snapshot()
+    await tool_usage_log.close()
+    if memory_use_case is not None:
+        await memory_use_case.memory_manager.flush()
+    await campaign_metrics.stop()
+    await metrics_registry.stop_publishing(shared_state_store, worker_router.worker_id)
+    await worker_router.stop()
+
+
 @app.get("/")
 async def health_check():
     """Endpoint de health check."""
@@ -275,6 +362,92 @@ async def health_check():
     }
 
 
+def _register_metrics_collectors() -> None:
+    """Expone en /metrics el estado que ya llevan los componentes (se lee solo al hacer scrape)."""
+    from app.application.usecases.request_context import get_request_dedup_stats
+    from app.infrastructure.openai.resilience import openai_call_guard
+    from app.infrastructure.openai.usage_tracker import token_usage_tracker
+    from app.infrastructure.tools.tool_system import tool_usage_log
+    from app.infrastructure.twilio.send_queue import outbound_send_queue
+
+    metrics_registry.register_status('openai_guard', openai_call_guard.get_status, 'Guard de OpenAI: rate limit, breaker y reintentos')
+    metrics_registry.register_collector('openai_usage', token_usage_tracker.get_metric_families)
+    metrics_registry.register_status('request_dedup', get_request_dedup_stats, 'Llamadas ejecutadas y reutilizadas dentro de un mensaje')
+    metrics_registry.register_status('send_queue', outbound_send_queue.get_status, 'Cola de envíos a Twilio')
+    metrics_registry.register_status('static_media', lambda: static_media_catalog.stats, 'Catálogo de archivos estáticos')
+    metrics_registry.register_status('media_registry', media_registry.get_status, 'Media pre-subido al blob store')
+    metrics_registry.register_status('tool_usage_log', lambda: tool_usage_log.stats, 'Registro de uso de herramientas con escritura diferida')
+    if tool_activation_use_case is not None:
+        # Sin forzar la construcción del sistema de herramientas si todavía no se usó
+        metrics_registry.register_status(
+            'tool_result_cache',
+            lambda: tool_activation_use_case.tool_system.result_cache.get_status() if tool_activation_use_case.resolved else {},
+            'Caché de resultados de herramientas por curso'
+        )
+    metrics_registry.register_status('startup', startup_profile.get_status, 'Tiempos de arranque por componente (ms)')
+    metrics_registry.register_status('worker_router', worker_router.get_status, 'Enrutamiento de usuarios entre workers')
+    metrics_registry.register_status(
+        'campaign_metrics',
+        lambda: {'series': len(campaign_metrics.counters.series), 'memory_bytes': campaign_metrics.counters.memory_bytes()},
+        'Contadores de métricas de campaña'
+    )
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Métricas del servicio en formato de texto de Prometheus."""
+    if shared_state_store.shared:
+        families = metrics_registry.collect_all_workers(
+            shared_state_store, worker_router.worker_id, max_age_seconds=settings.metrics_publish_seconds * 4
+        )
+    else:
+        families = metrics_registry.collect()
+    return PlainTextResponse(metrics_registry.render(families), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/campaign-metrics/{campaign_name}")
+async def campaign_metrics_report(campaign_name: str, hours: float = 24.0):
+    """Interacciones y embudo (hashtag → privacidad → curso → asesor) de una campaña en las últimas horas."""
+    end = campaign_metrics.counters.clock()
+    start = end - hours * 3600
+    
+    def build_report():
+        # Con almacén compartido cada ventana es una lectura a SQLite/Redis
+        return {
+            "metrics": campaign_metrics.get_campaign_metrics(campaign_name, start, end),
+            "funnel": campaign_metrics.get_funnel(campaign_name, start=start, end=end)
+        }
+    
+    return await asyncio.to_thread(build_report)
+
+
+def _serve_media(request: Request, file_path: str, immutable: bool) -> Response:
+    """Sirve un archivo del catálogo con ETag, Cache-Control y soporte de rangos."""
+    asset = static_media_catalog.get(file_path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    media = static_media_catalog.respond(
+        asset,
+        {key.lower(): value for key, value in request.headers.items()},
+        immutable=immutable,
+        head=request.method == "HEAD"
+    )
+    return Response(content=media.body, status_code=media.status_code, headers=media.headers)
+
+
+@app.api_route("/resources/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_resource(request: Request, file_path: str):
+    """Archivos de resources/ (URL sin versión: caché con revalidación)."""
+    return _serve_media(request, file_path, immutable=False)
+
+
+@app.api_route("/media/{digest}/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_versioned_media(request: Request, digest: str, file_path: str):
+    """Archivos versionados por hash: caché de un año mientras el hash coincida."""
+    asset = static_media_catalog.get(file_path)
+    return _serve_media(request, file_path, immutable=asset is not None and asset.digest == digest)
+
+
 @app.post("/")
 async def root_webhook(request: Request):
     """
@@ -314,9 +487,32 @@ async def whatsapp_webhook(request: Request):
         }
         debug_print(f"✅ Datos del webhook preparados correctamente", "whatsapp_webhook", "webhook.py")
         
+        # Procesar aquí, o reenviar al worker dueño del usuario (modo multi-worker).
+        # Se enruta con el mismo user_id que usa la memoria (owns_user)
+        user_id = from_number.replace("whatsapp:", "").replace("+", "")
+        result = await worker_router.dispatch(user_id, webhook_data)
+        if result is None:
+            debug_print(f"🧭 Mensaje reenviado al worker dueño de {from_number}", "whatsapp_webhook", "webhook.py")
+        elif result.get("status") == "error":
+            return result
+        
+        return {"status": "success", "processed": True}
+        
+    except Exception as e:
+        debug_print(f"❌ ERROR EN WEBHOOK: {str(e)}", "whatsapp_webhook", "webhook.py")
+        return {"status": "error", "message": str(e)}
+
+
+async def _process_webhook_data(webhook_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Procesa un mensaje ya enrutado a este worker."""
+    try:
         # Procesar mensaje
         debug_print(f"🚀 INICIANDO PROCESAMIENTO SÍNCRONO...", "whatsapp_webhook", "webhook.py")
+        started = time.perf_counter()
         result = await process_message_use_case.execute(webhook_data)
+        route = result.get('processing_type') or result.get('reason') or ('error' if not result.get('success') else 'unknown')
+        inbound_messages.labels(route).inc()
+        message_processing_seconds.labels(route).observe(time.perf_counter() - started)
         
         # Mostrar resultado completo
         debug_print(f"📊 Resultado del procesamiento: {result}", "whatsapp_webhook", "webhook.py")
@@ -330,11 +526,11 @@ async def whatsapp_webhook(request: Request):
         debug_print(f"✅ MENSAJE PROCESADO EXITOSAMENTE!", "whatsapp_webhook", "webhook.py")
         debug_print(f"📤 Respuesta enviada: {result.get('response_sent', False)}", "whatsapp_webhook", "webhook.py")
         debug_print(f"🔗 SID respuesta: {result.get('response_sid', 'N/A')}", "whatsapp_webhook", "webhook.py")
-        
-        return {"status": "success", "processed": True}
+        return result
         
     except Exception as e:
-        debug_print(f"❌ ERROR EN WEBHOOK: {str(e)}", "whatsapp_webhook", "webhook.py")
+        debug_print(f"❌ ERROR PROCESANDO MENSAJE: {str(e)}", "whatsapp_webhook", "webhook.py")
+        inbound_messages.labels('error').inc()
         return {"status": "error", "message": str(e)}
 
 
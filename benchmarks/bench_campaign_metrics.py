@@ -0,0 +1,119 @@
+"""
+BENCHMARK DE MÉTRICAS DE CAMPAÑA
+================================
+Compara registrar eventos y consultar totales por rango y el embudo de una
+campaña con contadores por ventanas de tiempo contra guardar un dict por
+evento y recorrerlos todos en cada consulta (como hacía MetricsTracker).
+
+Uso:
+    python benchmarks/bench_campaign_metrics.py [eventos]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.infrastructure.campaign.metric_buckets import BucketedCounters
+from app.infrastructure.campaign.metrics_tracker import FUNNEL_STEPS, MetricsTracker
+from app.infrastructure.shared_state.kv_store import InProcessKeyValueStore
+
+CAMPAIGNS = [f"campaña_{i}" for i in range(20)]
+COURSES = [f"curso_{i}" for i in range(5)]
+NOW = 488888 * 3600.0  # alineado a una hora
+
+
+def build_events(count: int, seed: int = 5):
+    """(usuario, campaña, curso, tipo, timestamp) con un embudo que se va angostando."""
+    rng = random.Random(seed)
+    events = []
+    user = 0
+    while len(events) < count:
+        user += 1
+        campaign, course = rng.choice(CAMPAIGNS), rng.choice(COURSES)
+        started = NOW - rng.uniform(len(FUNNEL_STEPS) * 120, 30 * 86400)
+        for position, step in enumerate(FUNNEL_STEPS):
+            if position and rng.random() < 0.4:
+                break
+            events.append((f"+52155{user:08d}", campaign, course, step, started + position * 120))
+    return events[:count]
+
+
+class ScanBaseline:
+    """Un dict por evento y consultas que recorren todos los eventos."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def track(self, user_id, campaign, course, step, timestamp):
+        self.metrics.append({
+            'user_id': user_id, 'course_id': course, 'campaign_name': campaign,
+            'interaction_type': step, 'timestamp': timestamp
+        })
+
+    def range_total(self, campaign, start, end):
+        return sum(1 for m in self.metrics
+                   if m['campaign_name'] == campaign and start <= m['timestamp'] < end)
+
+    def funnel(self, campaign, start, end):
+        users = {step: set() for step in FUNNEL_STEPS}
+        for m in self.metrics:
+            if m['campaign_name'] == campaign and start <= m['timestamp'] < end:
+                users[m['interaction_type']].add(m['user_id'])
+        return [len(users[step]) for step in FUNNEL_STEPS]
+
+
+def run(count: int = 200000):
+    events = build_events(count)
+    tracker = MetricsTracker(InProcessKeyValueStore(), BucketedCounters(clock=lambda: NOW), sinks=[])
+    baseline = ScanBaseline()
+
+    started = time.perf_counter()
+    for user_id, campaign, course, step, timestamp in events:
+        baseline.track(user_id, campaign, course, step, timestamp)
+    scan_ingest = time.perf_counter() - started
+
+    async def ingest():
+        for user_id, campaign, course, step, timestamp in events:
+            if step == 'hashtag':
+                await tracker.track_ad_interaction(user_id, course, campaign, step, timestamp)
+            else:
+                await tracker.track_user_interaction(user_id, step, timestamp)
+
+    started = time.perf_counter()
+    asyncio.run(ingest())
+    bucket_ingest = time.perf_counter() - started
+
+    print(f"📥 {count} eventos: dicts {count / scan_ingest:,.0f} ev/s, "
+          f"ventanas {count / bucket_ingest:,.0f} ev/s "
+          f"({len(tracker.counters.series)} series, {tracker.counters.memory_bytes() / 1e6:.1f} MB)")
+
+    # Rangos alineados a horas para que las dos implementaciones coincidan
+    ranges = [(NOW - 6 * 3600, NOW), (NOW - 7 * 86400, NOW), (NOW - 30 * 86400, NOW)]
+    for start, end in ranges:
+        campaign = CAMPAIGNS[0]
+        expected = baseline.range_total(campaign, start, end)
+        totals = tracker.get_campaign_metrics(campaign, start, end)['metrics']
+        assert sum(totals.values()) == expected, (sum(totals.values()), expected)
+        assert [step['users'] for step in tracker.get_funnel(campaign, start=start, end=end)['steps']] \
+            == baseline.funnel(campaign, start, end)
+
+        timings = []
+        for fn in (lambda: baseline.range_total(campaign, start, end),
+                   lambda: tracker.get_campaign_metrics(campaign, start, end),
+                   lambda: baseline.funnel(campaign, start, end),
+                   lambda: tracker.get_funnel(campaign, start=start, end=end)):
+            began = time.perf_counter()
+            for _ in range(5):
+                fn()
+            timings.append((time.perf_counter() - began) / 5 * 1000)
+        hours = (end - start) / 3600
+        print(f"  Rango {hours:6.0f} h   total: scan {timings[0]:7.2f} ms  ventanas {timings[1]:6.2f} ms"
+              f"   embudo: scan {timings[2]:7.2f} ms  ventanas {timings[3]:6.2f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
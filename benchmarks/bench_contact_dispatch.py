@@ -0,0 +1,132 @@
+"""
+BENCHMARK DEL DESPACHO DE SOLICITUDES A ASESORES
+================================================
+Compara las consultas del procesador de contacto con listas (recorrer todas
+las solicitudes y recalcular ``get_priority_score`` en cada consulta) contra
+la cola de despacho con heap e índices, a medida que crece el backlog.
+
+Uso:
+    python benchmarks/bench_contact_dispatch.py [consultas]
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.domain.entities.contact_request import ContactRequest
+from app.infrastructure.contact.advisor_dispatch import ContactDispatchQueue, DEFAULT_ADVISORS
+
+REASONS = ['quiero información', 'es urgente', 'cotización para mi equipo', 'necesito ya una llamada']
+SIZES = [None, 'grande', 'mediana', 'startup', 'pequeña']
+INDUSTRIES = [None, 'salud', 'finanzas', 'retail', 'tecnología']
+
+
+def build_requests(count: int, seed: int = 3):
+    """Backlog determinista: IDs y fechas fijos para que ambas implementaciones desempaten igual."""
+    rng = random.Random(seed)
+    now = datetime(2025, 3, 1, 12, 0)
+    requests = []
+    for i in range(count):
+        request = ContactRequest(
+            request_id=f"REQ_{i:08d}",
+            user_id=f"+52155{i % (count // 3 + 1):08d}", user_name='Lead', user_phone='+5215500000000',
+            contact_reason=rng.choice(REASONS), company_size=rng.choice(SIZES), industry=rng.choice(INDUSTRIES),
+            created_at=now - timedelta(minutes=rng.randint(0, 3 * 24 * 60)),
+        )
+        # Un tercio pendientes, un tercio asignadas y un tercio completadas
+        if i % 3 == 1:
+            request.assign_advisor(DEFAULT_ADVISORS[i % 4].advisor_id, DEFAULT_ADVISORS[i % 4].name)
+        elif i % 3 == 2:
+            request.mark_as_completed()
+        requests.append(request)
+    return requests
+
+
+class ListBaseline:
+    """Consultas como las hacía el procesador con listas."""
+
+    def __init__(self, requests):
+        self.pending = [r for r in requests if r.status == 'pending']
+        self.assigned = [r for r in requests if r.status == 'assigned']
+        self.completed = [r for r in requests if r.status == 'completed']
+
+    def next_pending(self):
+        return max(self.pending, key=lambda r: (r.get_priority_score(), -r.created_at.timestamp()))
+
+    def by_id(self, request_id):
+        for request in self.pending + self.assigned + self.completed:
+            if request.request_id == request_id:
+                return request
+
+    def by_user(self, user_id):
+        return [r for r in self.pending + self.assigned + self.completed if r.user_id == user_id]
+
+    def statistics(self):
+        everything = self.pending + self.assigned + self.completed
+        urgent = sum(1 for r in self.pending + self.assigned if r.is_urgent())
+        return urgent, sum(r.get_priority_score() for r in everything) / len(everything)
+
+
+class IndexedQueue:
+    def __init__(self, requests):
+        self.queue = ContactDispatchQueue(DEFAULT_ADVISORS)
+        for request in requests:
+            self.queue.upsert(request)
+
+    def next_pending(self):
+        return self.queue.peek_pending()
+
+    def by_id(self, request_id):
+        return self.queue.requests.get(request_id)
+
+    def by_user(self, user_id):
+        return [self.queue.requests[i] for i in self.queue.user_request_ids(user_id)]
+
+    def statistics(self):
+        return len(self.queue.urgent_open_ids), self.queue.priority_score_sum() / len(self.queue.requests)
+
+
+def measure(fn, arguments):
+    started = time.perf_counter()
+    for argument in arguments:
+        fn(*argument)
+    return (time.perf_counter() - started) / len(arguments) * 1e6
+
+
+def run(queries: int = 100):
+    print(f"📊 µs por consulta ({queries} consultas de cada tipo)")
+    for size in (300, 3000, 30000):
+        requests = build_requests(size)
+        started = time.perf_counter()
+        indexed = IndexedQueue(requests)
+        build_ms = (time.perf_counter() - started) * 1000
+        baseline = ListBaseline(requests)
+
+        # Las dos implementaciones deben coincidir
+        assert len(indexed.queue.requests) == size
+        assert baseline.next_pending().request_id == indexed.next_pending().request_id
+        urgent, average = baseline.statistics()
+        assert (urgent, round(average, 6)) == tuple(
+            round(v, 6) if isinstance(v, float) else v for v in indexed.statistics())
+
+        rng = random.Random(size)
+        ids = [(rng.choice(requests).request_id,) for _ in range(queries)]
+        users = [(rng.choice(requests).user_id,) for _ in range(queries)]
+        print(f"  Backlog {size} (índices construidos en {build_ms:.0f} ms)")
+        for name, method, arguments in (
+            ("siguiente en cola", 'next_pending', [()] * queries),
+            ("por ID", 'by_id', ids),
+            ("por usuario", 'by_user', users),
+            ("estadísticas", 'statistics', [()] * max(1, queries // 10)),
+        ):
+            before = measure(getattr(baseline, method), arguments)
+            after = measure(getattr(indexed, method), arguments)
+            print(f"    {name:<18} listas {before:10.1f}   índices {after:8.1f}   ({before / after:7.0f}x)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
@@ -0,0 +1,90 @@
+"""
+BENCHMARK DEL PROVEEDOR DINÁMICO DE CURSOS
+==========================================
+Simula las llamadas a get_primary_course_info() que hace un mensaje (bonos,
+info detallada para OpenAI, objeción de precio, precio directo) contra un
+repositorio falso con latencia de BD, y compara reconstruir el paquete en
+cada llamada contra el paquete en caché por versión de catálogo.
+
+Uso:
+    python benchmarks/bench_course_info_provider.py [mensajes]
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.application.usecases.dynamic_course_info_provider import DynamicCourseInfoProvider
+from app.domain.entities.course import Bond, Course, CourseInfo, CourseSession
+
+DB_LATENCY_SECONDS = 0.002
+CALLS_PER_MESSAGE = 4
+
+
+class FakeCourseRepository:
+    """Repositorio en memoria que cuenta consultas y simula latencia."""
+
+    def __init__(self):
+        now = datetime.now()
+        self.course = Course(
+            id_course=uuid.uuid4(), name='Experto en IA para Profesionales', created_at=now,
+            session_count=4, total_duration_min=720, price='4500', currency='MXN',
+            level='Profesional', status='active', modality='Online'
+        )
+        self.info = CourseInfo(
+            course=self.course,
+            sessions=[CourseSession(id_session=uuid.uuid4(), created_at=now, session_index=i,
+                                    title=f'Sesión {i}', duration_minutes=180,
+                                    id_course_fk=self.course.id_course) for i in range(1, 5)],
+            bonds=[Bond(id_bond=i, created_at=now, content=f'Bono {i}', type_bond='recurso') for i in range(1, 9)],
+        )
+        self.queries = 0
+
+    async def _query(self, result):
+        self.queries += 1
+        await asyncio.sleep(DB_LATENCY_SECONDS)
+        return result
+
+    async def get_active_courses(self, limit: int = 5):
+        return await self._query([self.course])
+
+    async def get_all_courses(self, limit: int = 5):
+        return await self._query([self.course])
+
+    async def get_course_complete_info(self, course_id):
+        # sesiones + bonos + actividades en el repositorio real
+        self.queries += 2
+        return await self._query(self.info)
+
+
+async def _run_messages(provider: DynamicCourseInfoProvider, messages: int, cached: bool) -> float:
+    started = time.perf_counter()
+    for _ in range(messages):
+        for _ in range(CALLS_PER_MESSAGE):
+            if not cached:
+                provider.invalidate()
+            await provider.get_primary_course_info()
+    return time.perf_counter() - started
+
+
+def run(messages: int = 50):
+    print(f"📊 get_primary_course_info × {CALLS_PER_MESSAGE} por mensaje ({messages} mensajes, "
+          f"latencia BD simulada {DB_LATENCY_SECONDS * 1000:.0f} ms)")
+    for cached in (False, True):
+        repo = FakeCourseRepository()
+        provider = DynamicCourseInfoProvider(repo)
+        elapsed = asyncio.run(_run_messages(provider, messages, cached))
+        label = 'Caché por versión de catálogo' if cached else 'Reconstrucción en cada llamada'
+        print(f"  {label:<32} {elapsed / messages * 1000:8.2f} ms/mensaje  "
+              f"{repo.queries / messages:6.2f} consultas/mensaje")
+        if cached:
+            print(f"  Estadísticas de caché: {provider.cache_stats}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,51 @@
+"""
+BENCHMARK DEL ÍNDICE DE HECHOS DE CURSO
+=======================================
+Mide cuánto cuesta verificar una respuesta contra el índice de hechos del
+curso (precio, duraciones, sesiones, modalidad y bonos) y qué proporción del
+corpus de respuestas se resuelve sin llamar al validador LLM.
+
+Uso:
+    python benchmarks/bench_fact_index.py [iteraciones]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.application.usecases.validate_response_use_case import ValidateResponseUseCase
+from app.domain.course_fact_index import CourseFactIndex, get_course_fact_index
+from bench_response_validator import COURSE_INFO, build_corpus
+
+BONDS = [
+    {'content': 'Workbook interactivo en Coda.io: plantillas y ejercicios'},
+    {'content': 'Biblioteca de prompts - más de 100 prompts probados'},
+    {'content': 'Acceso a la comunidad privada de egresados'},
+]
+
+
+def run(iterations: int = 200):
+    corpus = build_corpus(ValidateResponseUseCase(db_client=None, course_repository=None))
+    course = dict(COURSE_INFO, bonds=BONDS)
+
+    build_elapsed = timeit.timeit(lambda: CourseFactIndex.from_course_data(course), number=iterations)
+    lookup_elapsed = timeit.timeit(lambda: get_course_fact_index(course), number=iterations)
+    index = get_course_fact_index(course)
+
+    verify_elapsed = timeit.timeit(lambda: [index.verify(text) for text in corpus], number=iterations)
+    results = [index.verify(text) for text in corpus]
+    skipped = sum(1 for result in results if not result.needs_llm_validation)
+    contradicted = sum(1 for result in results if result.contradicted)
+
+    print(f"📊 Índice de hechos ({len(corpus)} respuestas, {iterations} iteraciones)")
+    print(f"  Construcción del índice         {build_elapsed / iterations * 1e6:9.1f} µs")
+    print(f"  Búsqueda en caché por huella    {lookup_elapsed / iterations * 1e6:9.1f} µs")
+    print(f"  Verificación                    {verify_elapsed / iterations / len(corpus) * 1e6:9.1f} µs/respuesta")
+    print(f"\n⚡ Resueltas sin LLM: {skipped}/{len(results)} ({skipped / len(results):.0%})")
+    print(f"🚨 Con datos contradichos: {contradicted}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
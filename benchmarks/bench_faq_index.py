@@ -0,0 +1,100 @@
+"""
+BENCHMARK DEL ÍNDICE DE FAQs
+============================
+Compara la detección de FAQs por recorrido lineal (subcadena de cada
+palabra clave de cada FAQ, como hacía ``detect_faq``) contra el índice
+invertido BM25 + frases, a medida que crece la base de FAQs.
+
+Las FAQs sintéticas se generan combinando las 10 FAQs reales con temas
+de relleno, de modo que cada consulta tenga candidatos ruidosos.
+
+Uso:
+    python benchmarks/bench_faq_index.py [consultas]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.infrastructure.faq.faq_index import FAQSearchIndex
+from app.infrastructure.faq.faq_processor import CATEGORY_KEYWORDS, FAQProcessor
+from app.infrastructure.shared_state.kv_store import InProcessKeyValueStore
+
+QUERIES = [
+    "¿Cuánto cuesta el curso?", "cuanto dura el programa", "necesito conocimientos previos?",
+    "tienen casos de exito en hospitales", "¿me dan diploma al terminar?", "qué garantías ofrecen",
+    "cuál es el retorno de la inversión", "hola, buenas tardes", "quiero hablar con alguien",
+    "¿el acceso es ilimitado?", "como lo implemento en mi empresa", "tienen soporte tecnico",
+]
+
+TOPICS = ['ventas', 'marketing', 'logistica', 'finanzas', 'recursos humanos', 'legal', 'compras',
+          'calidad', 'produccion', 'atencion a clientes', 'operaciones', 'datos', 'seguridad']
+
+
+def build_faqs(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    base = FAQProcessor(InProcessKeyValueStore()).faq_database
+    faqs = []
+    for i in range(size):
+        template = base[i % len(base)]
+        topic = rng.choice(TOPICS)
+        faqs.append({
+            **template,
+            'id': f"FAQ_{i + 1:05d}",
+            'question': f"{template['question']} ({topic} {i})",
+            'keywords': template['keywords'] if i < len(base) else [f"{topic} {i}", f"tema{i}"],
+            'answer': f"{template['answer']} Aplicado a {topic}.",
+        })
+    return faqs
+
+
+def linear_detect(faqs, message: str):
+    message_lower = message.lower()
+    for faq in faqs:
+        for keyword in faq['keywords']:
+            if keyword in message_lower:
+                return faq
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in message_lower:
+                for faq in faqs:
+                    if faq['category'] == category:
+                        return faq
+    return None
+
+
+def run(queries: int = 2000):
+    print(f"📊 {queries} consultas por tamaño de base (µs por consulta)")
+    for size in (10, 100, 1000, 5000):
+        faqs = build_faqs(size)
+        started = time.perf_counter()
+        index = FAQSearchIndex(faqs, CATEGORY_KEYWORDS)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        sample = [QUERIES[i % len(QUERIES)] for i in range(queries)]
+        started = time.perf_counter()
+        for query in sample:
+            linear_detect(faqs, query)
+        linear_us = (time.perf_counter() - started) / queries * 1e6
+
+        started = time.perf_counter()
+        for query in sample:
+            index.search(query, top_k=3, require_phrase=True)
+        index_us = (time.perf_counter() - started) / queries * 1e6
+
+        print(f"  {size:>5} FAQs   lineal {linear_us:8.1f}   índice {index_us:7.1f}   "
+              f"({linear_us / index_us:5.1f}x)   construcción {build_ms:7.1f} ms")
+
+    index = FAQSearchIndex(build_faqs(10), CATEGORY_KEYWORDS)
+    print("\n🔎 Top-1 por consulta (10 FAQs reales)")
+    for query in QUERIES:
+        matches = index.search(query, top_k=1, require_phrase=True)
+        found = f"{matches[0].faq['id']} ({matches[0].score:.1f}, {matches[0].matched_phrases})" if matches else "—"
+        print(f"  {query:<42} {found}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,105 @@
+"""
+BENCHMARK DEL NIVEL SEMÁNTICO DE FAQs
+=====================================
+Mide cuántos mensajes de un corpus etiquetado (paráfrasis, faltas de
+ortografía y mensajes que no son FAQ) se resuelven de forma determinista
+solo con palabras clave y cuántos más con el nivel semántico, además de
+la precisión de cada nivel y la latencia por lote.
+
+Requiere numpy; el backend ``sentence_transformers`` requiere además
+sentence-transformers (el modelo se descarga la primera vez).
+
+Uso:
+    python benchmarks/bench_faq_semantic.py [hashing|sentence_transformers] [umbral]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.infrastructure.faq.faq_processor import FAQProcessor
+from app.infrastructure.faq.semantic_index import (
+    HashingEmbedder, SemanticFAQMatcher, SentenceTransformerEmbedder
+)
+from app.infrastructure.shared_state.kv_store import InProcessKeyValueStore
+
+# (mensaje, FAQ esperada o None si no es una FAQ)
+CORPUS = [
+    ("¿Cuánto cuesta el curso?", 'FAQ_001'),
+    ("que presio tiene", 'FAQ_001'),
+    ("¿cuánto tengo que pagar?", 'FAQ_001'),
+    ("¿Cuántas horas son en total?", 'FAQ_002'),
+    ("¿cuánto tiempo me lleva terminarlo?", 'FAQ_002'),
+    ("¿cómo lo aplico en mi negocio?", 'FAQ_003'),
+    ("¿necesito saber programar?", 'FAQ_004'),
+    ("¿hay requisitos previos?", 'FAQ_004'),
+    ("¿tienen testimonios de otros alumnos?", 'FAQ_005'),
+    ("¿qué retorno de inversion puedo esperar?", 'FAQ_006'),
+    ("¿me dan constancia?", 'FAQ_007'),
+    ("¿entregan certificacion al final?", 'FAQ_007'),
+    ("¿al terminar recibo algún documento que lo acredite?", 'FAQ_007'),
+    ("si tengo dudas ¿quién me ayuda?", 'FAQ_008'),
+    ("¿por cuánto tiempo puedo ver las clases?", 'FAQ_009'),
+    ("¿si no me gusta me regresan el dinero?", 'FAQ_010'),
+    ("¿hay reembolso?", 'FAQ_010'),
+    ("hola buenas tardes", None),
+    ("me llamo Ana y soy gerente de ventas", None),
+    ("ok gracias", None),
+    ("quiero inscribirme ya", None),
+    ("trabajo en una empresa de logística con 200 personas", None),
+]
+
+
+def build_matcher(backend: str, threshold=None) -> SemanticFAQMatcher:
+    if backend == 'sentence_transformers':
+        return SemanticFAQMatcher(SentenceTransformerEmbedder(settings.faq_semantic_model), threshold)
+    return SemanticFAQMatcher(HashingEmbedder(), threshold)
+
+
+def score(results):
+    answered = sum(1 for (_, expected), faq in zip(CORPUS, results) if faq is not None)
+    correct = sum(1 for (_, expected), faq in zip(CORPUS, results) if faq is not None and faq['id'] == expected)
+    should_answer = sum(1 for _, expected in CORPUS if expected)
+    return answered, correct, should_answer
+
+
+async def main(backend: str, threshold=None):
+    keyword_only = FAQProcessor(InProcessKeyValueStore())
+    keyword_only.semantic_matcher = None
+    messages = [message for message, _ in CORPUS]
+
+    results = await keyword_only.detect_faq_batch(messages)
+    answered, correct, should_answer = score(results)
+    print(f"🔑 Solo palabras clave: {correct}/{should_answer} FAQs correctas, {answered - correct} incorrectas")
+
+    processor = FAQProcessor(InProcessKeyValueStore(), semantic_matcher=build_matcher(backend, threshold))
+    started = time.perf_counter()
+    await processor.detect_faq_batch(messages)  # incluye la construcción del índice
+    first_ms = (time.perf_counter() - started) * 1000
+    processor.match_stats = {key: 0 for key in processor.match_stats}
+
+    started = time.perf_counter()
+    results = await processor.detect_faq_batch(messages)
+    batch_ms = (time.perf_counter() - started) * 1000
+    answered, correct, should_answer = score(results)
+    print(f"🧠 Palabras clave + semántico ({backend}): {correct}/{should_answer} FAQs correctas, "
+          f"{answered - correct} incorrectas")
+    print(f"⏱️ Primer lote (con índice) {first_ms:.1f} ms, lote de {len(messages)} mensajes {batch_ms:.1f} ms")
+
+    for (message, expected), faq in zip(CORPUS, results):
+        found = faq['id'] if faq else '—'
+        mark = '✅' if found == (expected or '—') else '❌'
+        print(f"  {mark} {message:<55} {found:<8} (esperada {expected or '—'})")
+    print(f"\n📈 Reporte: {processor.get_match_report()}")
+
+
+def run(backend: str = 'hashing', threshold=None):
+    asyncio.run(main(backend, threshold))
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else 'hashing', float(sys.argv[2]) if len(sys.argv) > 2 else None)
@@ -0,0 +1,138 @@
+"""
+BENCHMARK DE TIEMPO DE IMPORTACIÓN
+==================================
+Mide con ``python -X importtime`` cuánto tarda en importarse el webhook (y
+un módulo liviano, como en los tests), agrupa el tiempo por paquete y
+verifica que los SDKs que se cargan de forma diferida (OpenAI, Twilio REST,
+asyncpg, httpx) no vuelvan a importarse al cargar el módulo.
+
+La línea base está en benchmarks/import_time_baseline.json; ``--check``
+falla (exit 1) si el tiempo supera la línea base más la tolerancia o si un
+SDK diferido se importa de nuevo al cargar el módulo.
+
+Uso:
+    python benchmarks/bench_import_time.py [--runs N] [--check] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "import_time_baseline.json")
+TARGETS = ["app.presentation.api.webhook", "app.application.usecases.request_context"]
+# SDKs que solo se importan al crear su cliente (startup) o al usarse
+LAZY_MODULES = ["openai", "twilio.rest", "asyncpg", "httpx"]
+TOLERANCE = 0.25
+
+# Settings requiere credenciales; para importar alcanza con valores de relleno
+PLACEHOLDER_ENV = {
+    "TWILIO_ACCOUNT_SID": "ACbench",
+    "TWILIO_AUTH_TOKEN": "bench",
+    "TWILIO_PHONE_NUMBER": "+10000000000",
+    "OPENAI_API_KEY": "sk-bench",
+}
+
+
+def import_once(module: str):
+    """Importa ``module`` en un proceso nuevo; (µs por módulo importado, ms de proceso)."""
+    env = dict(os.environ)
+    for key, value in PLACEHOLDER_ENV.items():
+        env.setdefault(key, value)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules, wall_ms
+
+
+def measure(module: str, runs: int):
+    """Mediana de ``runs`` importaciones (la primera, que compila .pyc, se descarta)."""
+    import_once(module)
+    samples = [import_once(module) for _ in range(runs)]
+    modules = samples[-1][0]
+    by_package = Counter()
+    for name, (self_us, _) in modules.items():
+        by_package[name.split(".")[0]] += self_us
+    return {
+        "import_ms": round(statistics.median(s[0][module][1] for s in samples) / 1000, 1),
+        "process_ms": round(statistics.median(s[1] for s in samples), 1),
+        "modules": len(modules),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in by_package.most_common(12)},
+        "lazy_loaded": [name for name in LAZY_MODULES if name in modules],
+    }
+
+
+def check(results, baseline) -> list:
+    """Regresiones respecto a la línea base."""
+    problems = []
+    for module, result in results.items():
+        expected = baseline.get("targets", {}).get(module)
+        if expected is None:
+            continue
+        limit = expected["import_ms"] * (1 + baseline.get("tolerance", TOLERANCE))
+        if result["import_ms"] > limit:
+            problems.append(f"{module}: {result['import_ms']} ms > {limit:.1f} ms")
+        if result["lazy_loaded"]:
+            problems.append(f"{module}: importa {', '.join(result['lazy_loaded'])} al cargarse")
+    return problems
+
+
+def run(runs: int = 5, check_baseline: bool = False, update_baseline: bool = False) -> int:
+    results = {}
+    for module in TARGETS:
+        result = results[module] = measure(module, runs)
+        packages = ", ".join(f"{name} {ms}" for name, ms in list(result["packages_ms"].items())[:6])
+        print(f"📦 {module}: {result['import_ms']} ms importando, {result['process_ms']} ms de proceso, "
+              f"{result['modules']} módulos")
+        print(f"   Por paquete (ms): {packages}")
+        print(f"   SDKs diferidos cargados: {', '.join(result['lazy_loaded']) or 'ninguno'}")
+
+    if update_baseline:
+        baseline = {
+            "python": platform.python_version(),
+            "tolerance": TOLERANCE,
+            "targets": {module: {key: result[key] for key in ("import_ms", "modules", "packages_ms")}
+                        for module, result in results.items()},
+        }
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"💾 Línea base guardada en {os.path.relpath(BASELINE_PATH, ROOT)}")
+
+    if check_baseline:
+        with open(BASELINE_PATH) as f:
+            problems = check(results, json.load(f))
+        for problem in problems:
+            print(f"❌ {problem}")
+        if problems:
+            return 1
+        print("✅ Sin regresiones respecto a la línea base")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempo de importación del webhook")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="Falla si hay regresión contra la línea base")
+    parser.add_argument("--update-baseline", action="store_true", help="Guarda los resultados como línea base")
+    args = parser.parse_args()
+    sys.exit(run(args.runs, args.check, args.update_baseline))
@@ -0,0 +1,137 @@
+"""
+BENCHMARK DE MEMORIA Y SERIALIZACIÓN DE LeadMemory
+==================================================
+Compara la LeadMemory compacta (``__slots__``, campos categóricos
+internados, listas diferidas y serializador propio) con la representación
+anterior (dataclass con ``__dict__`` y ``asdict``), reconstruida aquí con
+los mismos campos y valores por defecto.
+
+Para N leads en caché mide:
+- memoria retenida por lead (tracemalloc) al cargarlos desde JSON
+- to_dict + json.dumps por lead (guardar)
+- from_dict por lead (cargar, sin contar json.loads)
+
+El 60% de los leads están en primer contacto (sin historial) y el resto
+tiene historial, intereses y perfil de buyer persona.
+
+Uso:
+    python benchmarks/bench_lead_memory.py [leads]
+"""
+
+import gc
+import inspect
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, make_dataclass
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory.lead_memory import BUYER_PERSONAS, LeadMemory
+
+_PARAMETERS = list(inspect.signature(LeadMemory.__init__).parameters.values())[1:]
+LegacyLeadMemory = make_dataclass(
+    "LegacyLeadMemory", [(p.name, p.annotation, p.default) for p in _PARAMETERS]
+)
+
+
+def legacy_to_dict(lead_memory) -> dict:
+    """MemoryManager.to_dict anterior."""
+    data = asdict(lead_memory)
+    for key, value in data.items():
+        if isinstance(value, datetime):
+            data[key] = value.isoformat() if value else None
+    return data
+
+
+def legacy_from_dict(data: dict):
+    """MemoryManager.from_dict anterior."""
+    for key in ['last_interaction', 'created_at', 'updated_at']:
+        if data.get(key):
+            data[key] = datetime.fromisoformat(data[key])
+    for key in ['message_history', 'pain_points', 'buying_signals', 'interests']:
+        if data.get(key) is None:
+            data[key] = []
+    if data.get('stage') == 'initial':
+        data['stage'] = 'first_contact'
+    return LegacyLeadMemory(**data)
+
+
+def build_payloads(count: int) -> list:
+    """JSON de ``count`` leads como quedan guardados en el almacén."""
+    rng = random.Random(7)
+    now = datetime(2025, 3, 1, 12, 0).isoformat()
+    payloads = []
+    for index in range(count):
+        lead = LeadMemory(user_id=f"5215{index:08d}", created_at=datetime(2025, 3, 1), updated_at=datetime(2025, 3, 1))
+        if rng.random() >= 0.6:
+            lead.name = rng.choice(["Ana", "Luis", "María", "Jorge", "Sofía"])
+            lead.stage = rng.choice(["course_selection", "sales_agent"])
+            lead.current_flow = "sales_conversation"
+            lead.privacy_accepted = True
+            lead.interaction_count = rng.randint(3, 20)
+            lead.buyer_persona_match = rng.choice(BUYER_PERSONAS[1:])
+            lead.professional_level = rng.choice(["mid-level", "senior"])
+            lead.company_size = rng.choice(["small", "medium"])
+            lead.interests = ["automatización", "reportes"]
+            lead.pain_points = ["tareas repetitivas"]
+            lead.message_history = [
+                {"timestamp": now, "content": f"Mensaje {n} sobre el curso", "phone": f"+5215{index:08d}"}
+                for n in range(5)
+            ]
+            lead.last_interaction = datetime(2025, 3, 1, 12, 0)
+        payloads.append(json.dumps(lead.to_dict(), ensure_ascii=False))
+    return payloads
+
+
+def measure_cache(payloads: list, from_dict) -> tuple:
+    """(bytes retenidos por lead, caché) para {user_id: memoria} cargada desde JSON."""
+    gc.collect()
+    tracemalloc.start()
+    cache = {}
+    for payload in payloads:
+        lead = from_dict(json.loads(payload))
+        cache[lead.user_id] = lead
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return retained / len(cache), cache
+
+
+def timed(operation, items) -> float:
+    """µs por elemento."""
+    started = time.perf_counter()
+    for item in items:
+        operation(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+def run(count: int = 100000):
+    payloads = build_payloads(count)
+    results = {}
+    for label, to_dict, from_dict in (
+        ('dataclass', legacy_to_dict, legacy_from_dict),
+        ('slots', LeadMemory.to_dict, LeadMemory.from_dict),
+    ):
+        per_lead, cache = measure_cache(payloads, from_dict)
+        leads = list(cache.values())
+        save_us = timed(lambda lead: json.dumps(to_dict(lead), ensure_ascii=False), leads)
+        to_dict_us = timed(to_dict, leads)
+        dicts = [json.loads(payload) for payload in payloads]
+        from_dict_us = timed(from_dict, dicts)
+        results[label] = (per_lead, to_dict_us, from_dict_us)
+        print(f"🧠 {label:9s} {per_lead:7.0f} B por lead ({per_lead * count / 2**20:6.1f} MiB)  "
+              f"to_dict {to_dict_us:5.2f} µs  guardar {save_us:5.2f} µs  from_dict {from_dict_us:5.2f} µs")
+        del cache, leads, dicts
+
+    old, new = results['dataclass'], results['slots']
+    print(f"⚡ Memoria: -{(1 - new[0] / old[0]) * 100:.0f}%   to_dict: {old[1] / new[1]:.1f}x   "
+          f"from_dict: {old[2] / new[2]:.1f}x  ({count} leads)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
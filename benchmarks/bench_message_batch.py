@@ -0,0 +1,126 @@
+"""
+BENCHMARK DEL LOTE DE MENSAJES SALIENTES
+========================================
+Simula anuncios de curso (resumen, PDF, imagen y seguimiento) contra un SDK
+de Twilio falso que bloquea ``rtt`` milisegundos por mensaje, como el real.
+
+Compara:
+- Envío anterior: cada mensaje se prepara y se envía en serie, con la llamada
+  síncrona de Twilio dentro del event loop (bloquea a los demás usuarios).
+- OutboundMessageBatch: preparación concurrente, despacho en orden con
+  compuertas de secuencia y la llamada de Twilio en un hilo.
+
+Antes de medir verifica que cada usuario reciba sus mensajes en orden aunque
+la preparación de cada mensaje tarde un tiempo aleatorio.
+
+Uso:
+    python benchmarks/bench_message_batch.py [usuarios] [rtt_ms]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('TWILIO_ACCOUNT_SID', 'ACbenchmark')
+os.environ.setdefault('TWILIO_AUTH_TOKEN', 'benchmark')
+os.environ.setdefault('TWILIO_PHONE_NUMBER', '+10000000000')
+os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark')
+
+from app.domain.entities.message import MessageType, OutgoingMessage
+from app.infrastructure.twilio import client as twilio_module
+from app.infrastructure.twilio.client import TwilioWhatsAppClient
+from app.infrastructure.twilio.message_batch import OutboundMessageBatch
+
+ANNOUNCEMENT_PARTS = ['resumen', 'pdf', 'imagen', 'seguimiento']
+PREPARE_MS = 5
+
+
+class FakeMessages:
+    """``client.messages`` de Twilio: bloquea ``rtt`` y registra el orden de aceptación."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.accepted = {}
+        self._lock = threading.Lock()
+        self._sid = 0
+
+    def create(self, body, from_, to, media_url=None):
+        time.sleep(self.rtt)
+        with self._lock:
+            self._sid += 1
+            self.accepted.setdefault(to, []).append(body)
+            return SimpleNamespace(sid=f"SM{self._sid:06d}", status='queued')
+
+
+def make_client(rtt: float) -> TwilioWhatsAppClient:
+    client = TwilioWhatsAppClient.__new__(TwilioWhatsAppClient)
+    client.client = SimpleNamespace(messages=FakeMessages(rtt))
+    client.from_number = 'whatsapp:+10000000000'
+    return client
+
+
+async def prepare(user_id: str, part: str, jitter: bool) -> OutgoingMessage:
+    """Construcción de un mensaje (lectura de settings, URL del recurso...)."""
+    await asyncio.sleep(random.uniform(0, 0.03) if jitter else PREPARE_MS / 1000)
+    return OutgoingMessage(to_number=user_id, body=part, message_type=MessageType.TEXT)
+
+
+async def legacy_announcement(client: TwilioWhatsAppClient, user_id: str):
+    for part in ANNOUNCEMENT_PARTS:
+        message = await prepare(user_id, part, jitter=False)
+        client.client.messages.create(body=message.body, from_=client.from_number, to=f'whatsapp:{user_id}')
+
+
+async def batch_announcement(client: TwilioWhatsAppClient, user_id: str, jitter: bool = False):
+    batch = OutboundMessageBatch(client, user_id)
+    for index, part in enumerate(ANNOUNCEMENT_PARTS):
+        batch.add(prepare(user_id, part, jitter), required=index == 0)
+    return await batch.dispatch()
+
+
+async def check_order(users: int):
+    client = make_client(rtt=0.01)
+    await asyncio.gather(*(batch_announcement(client, f'+52{i:010d}', jitter=True) for i in range(users)))
+    for to, bodies in client.client.messages.accepted.items():
+        assert bodies == ANNOUNCEMENT_PARTS, f"Orden incorrecto para {to}: {bodies}"
+
+
+async def measure(announce, users: int, rtt: float):
+    client = make_client(rtt)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(announce(client, f'+52{i:010d}') for i in range(users)))
+    elapsed = time.perf_counter() - started
+    return elapsed, results
+
+
+def run(users: int = 20, rtt_ms: float = 120):
+    twilio_module.debug_print = lambda *args, **kwargs: None
+    rtt = rtt_ms / 1000
+
+    asyncio.run(check_order(users))
+    print(f"✅ Orden de entrega verificado para {users} usuarios con preparación aleatoria")
+
+    print(f"📊 Anuncio de {len(ANNOUNCEMENT_PARTS)} mensajes, RTT de Twilio {rtt_ms:.0f} ms")
+    single_legacy, _ = asyncio.run(measure(legacy_announcement, 1, rtt))
+    single_batch, results = asyncio.run(measure(batch_announcement, 1, rtt))
+    summary = results[0].to_dict()
+    print(f"  1 usuario    envío anterior       {single_legacy * 1000:8.0f} ms")
+    print(f"  1 usuario    lote                 {single_batch * 1000:8.0f} ms "
+          f"(en serie: {summary['sequential_ms']:.0f} ms)")
+
+    many_legacy, _ = asyncio.run(measure(legacy_announcement, users, rtt))
+    many_batch, _ = asyncio.run(measure(batch_announcement, users, rtt))
+    print(f"  {users:<3}usuarios envío anterior       {many_legacy * 1000:8.0f} ms")
+    print(f"  {users:<3}usuarios lote                 {many_batch * 1000:8.0f} ms")
+    print(f"  Aceleración con {users} anuncios simultáneos: {many_legacy / many_batch:.1f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 120)
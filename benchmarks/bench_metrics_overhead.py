@@ -0,0 +1,55 @@
+"""
+BENCHMARK DEL COSTO DE INSTRUMENTACIÓN (/metrics)
+=================================================
+Mide cuánto suma por mensaje la instrumentación de métricas: un mensaje
+entrante típico incrementa el contador de su ruta, observa su latencia y la
+de dos llamadas a OpenAI, un envío a Twilio y tres queries a la base.
+También mide cuánto tarda un scrape de /metrics.
+
+Uso:
+    python benchmarks/bench_metrics_overhead.py [mensajes]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.infrastructure.observability.metrics import (
+    db_query_seconds, inbound_messages, message_processing_seconds, metrics_registry,
+    openai_request_seconds, twilio_send_seconds
+)
+
+ROUTES = ['privacy_flow', 'course_announcement', 'ad_flow', 'welcome_flow', 'advisor_referral', 'intelligent']
+METHODS = ['CourseRepository.get_course_by_id', 'CourseRepository.get_course_sessions', 'CourseRepository.get_course_bonuses']
+
+
+def instrument_message(index: int) -> None:
+    route = ROUTES[index % len(ROUTES)]
+    inbound_messages.labels(route).inc()
+    openai_request_seconds.labels('intent_analysis').observe(0.42)
+    openai_request_seconds.labels('response_generation').observe(1.3)
+    for method in METHODS:
+        db_query_seconds.labels(method).observe(0.004)
+    twilio_send_seconds.labels('sent').observe(0.18)
+    message_processing_seconds.labels(route).observe(2.1)
+
+
+def run(count: int = 200000):
+    started = time.perf_counter()
+    for index in range(count):
+        instrument_message(index)
+    elapsed = time.perf_counter() - started
+    print(f"📈 {count} mensajes instrumentados: {elapsed / count * 1e6:.2f} µs por mensaje "
+          f"(8 observaciones + 1 contador)")
+
+    started = time.perf_counter()
+    for _ in range(20):
+        text = metrics_registry.render(metrics_registry.collect())
+    print(f"🧾 Scrape de /metrics: {(time.perf_counter() - started) / 20 * 1000:.2f} ms "
+          f"({len(text.splitlines())} líneas)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
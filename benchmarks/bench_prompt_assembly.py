@@ -0,0 +1,88 @@
+"""
+MICROBENCHMARK DE ENSAMBLADO DE PROMPTS
+=======================================
+Mide el costo de construir cada tipo de prompt: versión de texto completo
+(prefijo estático + contexto) contra la versión dividida, donde el prefijo
+está precompilado y solo se arma el sufijo dinámico.
+
+Uso:
+    python benchmarks/bench_prompt_assembly.py [iteraciones]
+"""
+
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prompts.agent_prompts import (
+    build_intent_analysis_prompt,
+    get_intent_analysis_prompt,
+    build_response_generation_prompt,
+    get_response_generation_prompt,
+)
+from prompts.personalization_prompts import (
+    get_personalized_system_prompt,
+    get_personalized_response_prompt,
+)
+from prompts.prompt_assembly import count_static_tokens
+
+
+def _sample_inputs():
+    """Datos representativos de una conversación a mitad del flujo."""
+    user_memory = SimpleNamespace(
+        name='Ana', role='Gerente de Marketing', interests=['marketing digital'],
+        pain_points=['reportes manuales', 'contenido lento'], interaction_count=6,
+        automation_needs={'report_types': ['ventas semanales'], 'frequency': 'semanal'},
+        stage='sales_agent', lead_score=65
+    )
+    recent_messages = ['hola', '¿cuánto cuesta el curso?', 'somos 20 personas en el equipo']
+    intent_analysis = {'category': 'EXPLORATION_PRICING', 'confidence': 0.8}
+    course_info = {
+        'course': {'name': 'Experto en IA para Profesionales', 'price': 4500, 'currency': 'MXN',
+                   'session_count': 4, 'total_duration_min': 720, 'modality': 'online'},
+        'sessions': [1, 2, 3, 4],
+        'bonds': [1, 2, 3],
+        'course_structure': 'Sesión: Fundamentos de IA aplicada\n' * 8
+    }
+    user_context = {
+        'user_profile': {'buyer_persona': 'lucia_copypro', 'company_size': 'pequeña'},
+        'interests_and_needs': {'pain_points': ['contenido lento'], 'automation_needs': {'x': 1}},
+        'communication_context': {'urgency_signals': ['esta semana']}
+    }
+    return user_memory, recent_messages, intent_analysis, course_info, user_context
+
+
+def run(iterations: int = 5000):
+    user_memory, recent_messages, intent_analysis, course_info, user_context = _sample_inputs()
+
+    cases = {
+        'intent_analysis (texto completo)': lambda: get_intent_analysis_prompt(
+            '¿cuánto cuesta?', user_memory, recent_messages),
+        'intent_analysis (prefijo + sufijo)': lambda: build_intent_analysis_prompt(
+            '¿cuánto cuesta?', user_memory, recent_messages),
+        'main_agent (texto completo)': lambda: get_response_generation_prompt(
+            '¿cuánto cuesta?', user_memory, intent_analysis, '', course_info),
+        'main_agent (prefijo + sufijo)': lambda: build_response_generation_prompt(
+            '¿cuánto cuesta?', user_memory, intent_analysis, '', course_info),
+        'personalized_system': lambda: get_personalized_system_prompt(user_context),
+        'personalized_response': lambda: get_personalized_response_prompt(
+            '¿cuánto cuesta?', user_context, 'pricing'),
+    }
+
+    print(f"📊 Ensamblado de prompts ({iterations} iteraciones por caso)")
+    for name, builder in cases.items():
+        builder()  # calentar caches de conteo estático
+        elapsed = timeit.timeit(builder, number=iterations)
+        print(f"  {name:<38} {elapsed / iterations * 1e6:9.1f} µs/prompt")
+
+    intent = build_intent_analysis_prompt('¿cuánto cuesta?', user_memory, recent_messages)
+    response = build_response_generation_prompt('¿cuánto cuesta?', user_memory, intent_analysis, '', course_info)
+    print("\n🧩 Tokens del prefijo estático reutilizable (candidato a prompt caching):")
+    print(f"  intent_analysis: {count_static_tokens(intent.prefix)}")
+    print(f"  main_agent:      {count_static_tokens(response.prefix)}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
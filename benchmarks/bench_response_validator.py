@@ -0,0 +1,193 @@
+"""
+BENCHMARK DEL VALIDADOR DE RESPUESTAS
+=====================================
+Compara la validación anterior (un lower() y una búsqueda por cada
+patrón/frase/palabra) contra el escáner compilado de ValidateResponseUseCase
+(un solo lower() y regex filtradas por su literal obligatorio), usando como corpus las respuestas reales del bot:
+plantillas, respuestas de fallback y respuestas tipo LLM con precios,
+duraciones y sesiones.
+
+Antes de medir verifica que ambas versiones reporten exactamente los mismos
+problemas para cada respuesta del corpus.
+
+Uso:
+    python benchmarks/bench_response_validator.py [iteraciones]
+"""
+
+import asyncio
+import inspect
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.application.usecases.validate_response_use_case import ValidateResponseUseCase
+from app.templates.ad_flow_templates import AdFlowTemplates
+from app.templates.advisor_referral_templates import AdvisorReferralTemplates
+from app.templates.contact_flow_templates import ContactFlowTemplates
+from app.templates.course_announcement_templates import CourseAnnouncementTemplates
+from app.templates.faq_templates import FAQTemplates
+from app.templates.privacy_flow_templates import PrivacyFlowTemplates
+
+
+COURSE_INFO = {
+    'name': 'Experto en IA para Profesionales', 'price': 4500, 'currency': 'MXN',
+    'session_count': 4, 'total_duration_min': 720, 'level': 'Profesional', 'modality': 'online'
+}
+PARTIAL_COURSE_INFO = {'name': 'Experto en IA para Profesionales', 'price': 4500}
+
+SAMPLE_ARGS = {
+    'user_name': 'Ana', 'whatsapp_name': 'Ana', 'user_role': 'Gerente de Marketing',
+    'user_phone': '+5215555555555', 'specific_interest': 'automatización de reportes',
+    'is_first_time': True, 'category': 'precio', 'role': 'Gerente de Marketing',
+    'course_price': 4500, 'course_code': 'EXPERTO_IA_GPT_GEMINI', 'pdf_name': 'guia.pdf',
+    'image_name': 'curso.png', 'advisor_name': 'Especialista en IA', 'contact_time': 'mañana',
+    'bonuses': ['Workbook interactivo', 'Biblioteca de prompts'], 'suggestions': ['precio', 'duración'],
+    'course_info': COURSE_INFO, 'course_data': COURSE_INFO,
+    'contact_info': {'name': 'Ana', 'email': 'ana@example.com'},
+}
+
+LLM_LIKE_REPLIES = [
+    "¡Hola Ana! El curso tiene 4 sesiones de 3 horas cada una y el precio es de $4,500 MXN.",
+    "Según la información disponible, la duración es de 12 horas distribuidas en 4 semanas.",
+    "Excelente pregunta. Basándome en nuestra base de datos, el curso incluye certificado de finalización.",
+    "Tenemos un descuento del 20% esta semana. ¿Te gustaría que te comparta el temario?",
+    "Comenzamos el próximo lunes. Son 12 módulos y 8 semanas de duración con clases en vivo.",
+    "Entiendo tu preocupación por el costo. Muchos gerentes recuperan la inversión en 2 meses.",
+    "¡Perfecto! Te conecto con un asesor para resolver tus dudas sobre el nivel del programa.",
+    "La IA puede ayudarte a automatizar reportes semanales y ahorrar 10 horas de trabajo.",
+    "Según nuestra base de datos, el programa es de nivel intermedio y se imparte en línea.",
+    "¿En qué área te gustaría enfocarte? ¿Marketing, automatización o análisis de datos?",
+]
+
+
+class LegacyValidator:
+    """Copia de las verificaciones de texto previas al escáner compilado."""
+
+    def __init__(self, validator: ValidateResponseUseCase):
+        self.risk_patterns = validator.risk_patterns
+        self.forbidden_phrases = validator.forbidden_phrases
+
+    def issues(self, response_text, course_info):
+        issues = []
+        for pattern in self.risk_patterns:
+            matches = re.findall(pattern, response_text.lower())
+            if matches:
+                issues.append(f"CRÍTICO: Patrón de riesgo detectado: {matches[0]}")
+        for phrase in self.forbidden_phrases:
+            if phrase in response_text.lower():
+                issues.append(f"CRÍTICO: Frase prohibida detectada: '{phrase}'")
+        if course_info:
+            response_lower = response_text.lower()
+            checks = [
+                (['precio', 'cuesta', 'costo', '$'], 'price', 'precio'),
+                (['duración', 'horas', 'tiempo'], 'total_duration_min', 'duración'),
+                (['nivel', 'básico', 'intermedio', 'avanzado'], 'level', 'nivel'),
+                (['sesión', 'módulo', 'clase'], 'session_count', 'sesiones'),
+            ]
+            for keywords, field, label in checks:
+                if any(word in response_lower for word in keywords):
+                    if not course_info.get(field):
+                        issues.append(f"ADVERTENCIA: Menciona {label} sin datos verificados en BD")
+        if course_info and any(word in response_text.lower() for word in ['curso', 'precio', 'duración']):
+            validation_phrases = [
+                'según la información', 'basándome en', 'según nuestra base de datos',
+                'datos verificados', 'información disponible'
+            ]
+            if not any(phrase in response_text.lower() for phrase in validation_phrases):
+                issues.append("RECOMENDACIÓN: Agregar mención de validación con BD")
+        return issues
+
+
+def compiled_issues(validator: ValidateResponseUseCase, response_text, course_info):
+    """Mismas verificaciones que validate_response, sobre un solo escaneo."""
+    found = validator.scanner.scan(response_text.lower())
+    issues = validator._check_risk_patterns(found) + validator._check_forbidden_phrases(found)
+    if course_info:
+        for field, (keywords, warning) in validator.course_field_triggers.items():
+            if validator._mentions_any(found, keywords) and not course_info.get(field):
+                issues.append(warning)
+    issues += validator._check_database_validation_mentions(found, course_info)
+    return issues
+
+
+def _template_replies():
+    """Llama a cada plantilla estática con argumentos de ejemplo."""
+    replies = []
+    template_classes = [
+        AdFlowTemplates, AdvisorReferralTemplates, ContactFlowTemplates,
+        CourseAnnouncementTemplates, FAQTemplates, PrivacyFlowTemplates,
+    ]
+    for template_class in template_classes:
+        for name, method in inspect.getmembers(template_class, inspect.isfunction):
+            if name.startswith('_'):
+                continue
+            params = inspect.signature(method).parameters.values()
+            try:
+                kwargs = {p.name: SAMPLE_ARGS[p.name] for p in params if p.default is inspect.Parameter.empty}
+                text = method(**kwargs)
+            except Exception:
+                continue
+            if isinstance(text, str):
+                replies.append(text)
+    return replies
+
+
+def build_corpus(validator: ValidateResponseUseCase):
+    from app.infrastructure.openai.client import OpenAIClient
+
+    replies = _template_replies() + LLM_LIKE_REPLIES
+    fallback_categories = ['FREE_RESOURCES', 'EXPLORATION', 'OBJECTION_PRICE', 'CONTACT_REQUEST', 'GENERAL_QUESTION']
+    replies += [OpenAIClient._get_fallback_response(None, category) for category in fallback_categories]
+    for course_info in (None, COURSE_INFO):
+        replies.append(asyncio.run(validator._generate_safe_response("¿cuánto cuesta?", course_info)))
+    return replies
+
+
+def run(iterations: int = 200):
+    validator = ValidateResponseUseCase(db_client=None, course_repository=None)
+    legacy = LegacyValidator(validator)
+    corpus = build_corpus(validator)
+    contexts = [None, PARTIAL_COURSE_INFO, COURSE_INFO]
+
+    async def use_case_issues(text, course_info):
+        result = await validator.validate_response(text, course_info=course_info)
+        # Las contradicciones del índice de hechos no existían en la versión previa
+        return [issue for issue in result.issues if not issue.startswith("CRÍTICO: Dato de")]
+
+    loop = asyncio.new_event_loop()
+    for text in corpus:
+        for course_info in contexts:
+            expected = legacy.issues(text, course_info)
+            actual = loop.run_until_complete(use_case_issues(text, course_info))
+            assert actual == expected, f"Diferencia en {text[:60]!r}: {actual} != {expected}"
+            assert compiled_issues(validator, text, course_info) == expected
+    loop.close()
+
+    print(f"📊 Validación de {len(corpus)} respuestas × {len(contexts)} contextos ({iterations} iteraciones)")
+    print(f"  Longitud media: {sum(len(t) for t in corpus) / len(corpus):.0f} caracteres")
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in corpus:
+            for course_info in contexts:
+                legacy.issues(text, course_info)
+    legacy_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in corpus:
+            for course_info in contexts:
+                compiled_issues(validator, text, course_info)
+    compiled_elapsed = time.perf_counter() - started
+
+    checks = iterations * len(corpus) * len(contexts)
+    print(f"  Verificaciones previas              {legacy_elapsed / checks * 1e6:9.1f} µs/respuesta")
+    print(f"  Escáner compilado                   {compiled_elapsed / checks * 1e6:9.1f} µs/respuesta")
+    print(f"  Aceleración: {legacy_elapsed / compiled_elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
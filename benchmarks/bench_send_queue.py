@@ -0,0 +1,135 @@
+"""
+BENCHMARK DE LA COLA DE ENVÍOS
+==============================
+Simula un pico de campaña: cientos de mensajes de seguimiento y, en medio,
+respuestas de conversación y notificaciones al asesor, contra un Twilio
+falso que responde 429 cuando se supera el throughput de la cuenta.
+
+Compara:
+- Envío directo (comportamiento anterior): cada caso de uso llama a Twilio
+  en cuanto tiene el mensaje.
+- OutboundSendQueue: token bucket por remitente y destinatario, carriles de
+  prioridad y reintentos con backoff.
+
+Uso:
+    python benchmarks/bench_send_queue.py [seguimientos] [msg_por_segundo]
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('TWILIO_ACCOUNT_SID', 'ACbenchmark')
+os.environ.setdefault('TWILIO_AUTH_TOKEN', 'benchmark')
+os.environ.setdefault('TWILIO_PHONE_NUMBER', '+10000000000')
+os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark')
+
+from twilio.base.exceptions import TwilioRestException
+
+from app.domain.entities.message import MessageType, OutgoingMessage
+from app.infrastructure.twilio import client as twilio_module
+from app.infrastructure.twilio.client import TwilioWhatsAppClient
+from app.infrastructure.twilio.send_queue import OutboundSendQueue, SendLane
+
+RTT = 0.05
+REPLIES = 20
+ADVISOR_NOTIFICATIONS = 10
+
+
+class RateLimitedMessages:
+    """``client.messages`` de Twilio con límite de mensajes por segundo de la cuenta."""
+
+    def __init__(self, limit_per_second: int):
+        self.limit_per_second = limit_per_second
+        self.accepted = 0
+        self.rejected = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    def create(self, body, from_, to, media_url=None):
+        time.sleep(RTT)
+        with self._lock:
+            now = time.monotonic()
+            while self._window and self._window[0] < now - 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.limit_per_second:
+                self.rejected += 1
+                raise TwilioRestException(429, '/Messages', 'Too Many Requests', code=20429)
+            self._window.append(now)
+            self.accepted += 1
+            return SimpleNamespace(sid=f"SM{self.accepted:06d}", status='queued')
+
+
+def make_client(limit_per_second: int) -> TwilioWhatsAppClient:
+    client = TwilioWhatsAppClient.__new__(TwilioWhatsAppClient)
+    client.client = SimpleNamespace(messages=RateLimitedMessages(limit_per_second))
+    client.from_number = 'whatsapp:+10000000000'
+    return client
+
+
+def traffic(follow_ups: int):
+    """Seguimientos de campaña primero; respuestas y avisos al asesor llegan durante el pico."""
+    jobs = [(SendLane.FOLLOW_UP, f'+52{i:010d}', 0.0) for i in range(follow_ups)]
+    jobs += [(SendLane.REPLY, f'+53{i:010d}', 0.2 + i * 0.05) for i in range(REPLIES)]
+    jobs += [(SendLane.ADVISOR, '+5215614686075', 0.3 + i * 0.1) for i in range(ADVISOR_NOTIFICATIONS)]
+    return jobs
+
+
+async def run_scenario(send, follow_ups: int):
+    latencies = {lane: [] for lane in SendLane}
+    outcomes = []
+
+    async def one(lane, to_number, delay):
+        await asyncio.sleep(delay)
+        message = OutgoingMessage(to_number=to_number, body=lane.name, message_type=MessageType.TEXT)
+        started = time.perf_counter()
+        result = await send(message, lane)
+        latencies[lane].append(time.perf_counter() - started)
+        outcomes.append(result.get('success'))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*job) for job in traffic(follow_ups)))
+    return time.perf_counter() - started, latencies, outcomes
+
+
+def report(name, elapsed, latencies, outcomes, messages):
+    delivered = sum(1 for ok in outcomes if ok)
+    print(f"  {name}")
+    print(f"    Entregados {delivered}/{len(outcomes)}   429 recibidos: {messages.rejected}   total {elapsed:.1f} s")
+    for lane in SendLane:
+        values = sorted(latencies[lane])
+        if values:
+            p95 = values[int(len(values) * 0.95) - 1 if len(values) > 1 else 0]
+            print(f"    {lane.name:<10} p95 {p95 * 1000:8.0f} ms")
+
+
+def run(follow_ups: int = 300, limit_per_second: int = 40):
+    twilio_module.debug_print = lambda *args, **kwargs: None
+    print(f"📊 Pico de {follow_ups} seguimientos + {REPLIES} respuestas + {ADVISOR_NOTIFICATIONS} avisos, "
+          f"límite de la cuenta {limit_per_second} msg/s")
+
+    direct_client = make_client(limit_per_second)
+    result = asyncio.run(run_scenario(lambda message, lane: direct_client._send_now(message), follow_ups))
+    report("Envío directo", *result, direct_client.client.messages)
+
+    queue = OutboundSendQueue(messages_per_second=limit_per_second, workers=16,
+                              recipient_messages_per_minute=600, recipient_burst=45)
+    queued_client = make_client(limit_per_second)
+
+    def queued_send(message, lane):
+        return queue.submit(message, queued_client._send_now, lane=lane, sender=queued_client.from_number)
+
+    result = asyncio.run(run_scenario(queued_send, follow_ups))
+    report("Cola de envíos", *result, queued_client.client.messages)
+    print(f"    Estado: {queue.get_status()['lanes']}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 40)
@@ -0,0 +1,95 @@
+"""
+BENCHMARK DE ESTADO COMPARTIDO ENTRE WORKERS
+============================================
+Mide lo que agrega el modo multi-worker sobre cada mensaje:
+
+- Reparto de usuarios entre slots con rendezvous hashing (balance y
+  cuántos usuarios cambian de worker al pasar de N a N+1 workers).
+- Latencia de las operaciones del backend ``sqlite`` (get/set de la memoria
+  del lead, push/pop del buzón, lectura del buzón vacío y renovación del
+  lease) frente al backend en memoria del proceso.
+
+Uso:
+    python benchmarks/bench_shared_state.py [operaciones]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.infrastructure.shared_state.kv_store import InProcessKeyValueStore, SQLiteKeyValueStore
+from app.infrastructure.shared_state.worker_router import owner_slot
+
+LEAD = {
+    'user_id': '+5215500000000', 'name': 'Lead de prueba', 'stage': 'course_selection',
+    'interaction_count': 12, 'message_history': [{'role': 'user', 'content': 'hola ' * 20}] * 10
+}
+
+
+def measure_routing(users: int = 10000, max_workers: int = 8) -> None:
+    user_ids = [f"+52155{i:08d}" for i in range(users)]
+    print(f"🧭 Reparto de {users} usuarios")
+    previous = None
+    for workers in range(1, max_workers + 1):
+        owners = [owner_slot(user_id, workers) for user_id in user_ids]
+        counts = Counter(owners)
+        spread = (max(counts.values()) - min(counts.values())) / (users / workers) * 100
+        moved = '' if previous is None else \
+            f"   reasignados {sum(a != b for a, b in zip(previous, owners)) / users * 100:5.1f}%"
+        print(f"  {workers} workers: desviación máx. {spread:5.1f}%{moved}")
+        previous = owners
+
+
+def time_ops(store, operations: int) -> dict:
+    results = {}
+    started = time.perf_counter()
+    for i in range(operations):
+        store.set('lead_memory', f"user_{i % 100}", LEAD)
+    results['set'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(operations):
+        store.get('lead_memory', f"user_{i % 100}")
+    results['get'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for i in range(operations):
+        store.push('worker_inbox:0', {'user_id': f"user_{i}", 'payload': {'Body': 'hola'}})
+    while store.pop_batch('worker_inbox:0'):
+        pass
+    results['push+pop'] = time.perf_counter() - started
+
+    # Lo que hace cada worker cada 50 ms con el buzón vacío
+    started = time.perf_counter()
+    for _ in range(operations):
+        store.pop_batch('worker_inbox:0')
+    results['pop vacío'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(operations):
+        store.acquire_lease('worker_slot:0', 'bench', 15.0)
+    results['lease'] = time.perf_counter() - started
+    return results
+
+
+def run(operations: int = 2000):
+    measure_routing()
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {
+            'memoria': InProcessKeyValueStore(),
+            'sqlite': SQLiteKeyValueStore(os.path.join(directory, 'shared_state.db')),
+        }
+        print(f"📊 {operations} operaciones por tipo (µs por operación)")
+        for name, store in stores.items():
+            results = time_ops(store, operations)
+            print(f"  {name:<8} " + "   ".join(
+                f"{op} {elapsed / operations * 1e6:7.1f}" for op, elapsed in results.items()
+            ))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
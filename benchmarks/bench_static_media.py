@@ -0,0 +1,94 @@
+"""
+BENCHMARK DE ARCHIVOS ESTÁTICOS DE CURSOS
+=========================================
+Compara servir el PDF y la imagen del curso con ``StaticFiles`` (lectura del
+archivo por bloques en cada descarga) contra el catálogo de media (mmap,
+ETag precalculado y URLs versionadas por hash), usando el transporte ASGI de
+httpx para no medir la red.
+
+Mide descargas completas, GET condicionales (If-None-Match → 304) y
+rangos de bytes.
+
+Uso:
+    python benchmarks/bench_static_media.py [descargas]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+from app.infrastructure.media.static_media import PROJECT_ROOT, StaticMediaCatalog
+
+RESOURCES = os.path.join(PROJECT_ROOT, "resources")
+FILES = ['course_materials/experto_ia_profesionales.pdf', 'course_materials/experto_ia_profesionales.jpg']
+
+
+def build_static_files_app() -> FastAPI:
+    app = FastAPI()
+    app.mount("/resources", StaticFiles(directory=RESOURCES), name="resources")
+    return app
+
+
+def build_catalog_app(catalog: StaticMediaCatalog) -> FastAPI:
+    app = FastAPI()
+
+    @app.api_route("/media/{digest}/{file_path:path}", methods=["GET", "HEAD"])
+    async def serve(request: Request, digest: str, file_path: str):
+        asset = catalog.get(file_path)
+        media = catalog.respond(asset, {k.lower(): v for k, v in request.headers.items()},
+                                immutable=asset.digest == digest, head=request.method == "HEAD")
+        return Response(content=media.body, status_code=media.status_code, headers=media.headers)
+
+    return app
+
+
+async def measure(app: FastAPI, urls, downloads: int, headers_for=None):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Primera descarga para obtener ETags (y calentar cachés)
+        etags = {url: (await client.get(url)).headers.get('etag') for url in urls}
+        started = time.perf_counter()
+        total_bytes = 0
+        for _ in range(downloads):
+            for url in urls:
+                headers = headers_for(etags[url]) if headers_for else None
+                response = await client.get(url, headers=headers)
+                assert response.status_code in (200, 206, 304), response.status_code
+                total_bytes += len(response.content)
+        return (time.perf_counter() - started) / (downloads * len(urls)), total_bytes
+
+
+def run(downloads: int = 100):
+    catalog = StaticMediaCatalog(RESOURCES)
+    started = time.perf_counter()
+    catalog.warm()
+    print(f"🗂️ Catálogo indexado en {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    static_urls = [f"/resources/{path}" for path in FILES]
+    catalog_urls = [catalog.versioned_path(path) for path in FILES]
+    static_app, catalog_app = build_static_files_app(), build_catalog_app(catalog)
+
+    scenarios = [
+        ("Descarga completa", None),
+        ("GET condicional (304)", lambda etag: {'If-None-Match': etag}),
+        ("Rango de 64 KB", lambda etag: {'Range': 'bytes=0-65535'}),
+    ]
+    print(f"📊 {downloads} descargas de {len(FILES)} archivos por escenario")
+    for name, headers_for in scenarios:
+        static_time, _ = asyncio.run(measure(static_app, static_urls, downloads, headers_for))
+        catalog_time, _ = asyncio.run(measure(catalog_app, catalog_urls, downloads, headers_for))
+        print(f"  {name:<24} StaticFiles {static_time * 1000:7.2f} ms   catálogo {catalog_time * 1000:7.2f} ms   "
+              f"({static_time / catalog_time:.1f}x)")
+    print(f"  Estadísticas del catálogo: {catalog.stats}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
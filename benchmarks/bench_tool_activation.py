@@ -0,0 +1,92 @@
+"""
+BENCHMARK DE ACTIVACIÓN DE HERRAMIENTAS
+=======================================
+Compara ejecutar dos herramientas una tras otra (con el registro de uso
+escribiendo tool_usage_metrics.json en cada llamada) contra ejecutarlas en
+paralelo con el registro en buffer, y repetir la activación para un mismo
+curso (resultados servidos desde ToolResultCache). Los servicios simulan la
+latencia de la base de datos con asyncio.sleep.
+
+Uso:
+    python benchmarks/bench_tool_activation.py [activaciones] [latencia_ms]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.infrastructure.tools import tool_system as tools_module
+from app.infrastructure.tools.tool_system import MockDatabaseService, ToolUsageLog, initialize_tool_system
+
+TOOL_NAMES = ['mostrar_syllabus_interactivo', 'mostrar_bonos_exclusivos']
+
+
+class SlowDatabaseService(MockDatabaseService):
+    """Mock con latencia fija por consulta."""
+
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+
+    async def get_course_details(self, course_id):
+        await asyncio.sleep(self.latency_seconds)
+        return await super().get_course_details(course_id)
+
+    async def get_course_sessions(self, course_id):
+        await asyncio.sleep(self.latency_seconds)
+        return await super().get_course_sessions(course_id)
+
+    async def get_active_bonuses(self, course_id):
+        await asyncio.sleep(self.latency_seconds)
+        return await super().get_active_bonuses(course_id)
+
+
+async def run_sequential(system, activations: int, log: ToolUsageLog):
+    """Como antes: una herramienta tras otra y el archivo reescrito en cada uso."""
+    for index in range(activations):
+        for name in TOOL_NAMES:
+            await system.tools[name].execute(f"user_{index}", "curso_1")
+            await log.flush()
+
+
+async def run_concurrent(system, activations: int, log: ToolUsageLog):
+    """Un curso distinto por activación: nunca hay resultados en caché."""
+    for index in range(activations):
+        results = await system._execute_tools(TOOL_NAMES, f"user_{index}", f"curso_{index}")
+        assert [r['tool_activated'] for r in results] == [True, True]
+    await log.close()
+
+
+async def run_cached(system, activations: int, log: ToolUsageLog):
+    """Todos los usuarios preguntan por el mismo curso."""
+    system.invalidate_course()
+    for index in range(activations):
+        results = await system._execute_tools(TOOL_NAMES, f"user_{index}", "curso_1")
+        assert [r['tool_activated'] for r in results] == [True, True]
+    await log.close()
+
+
+async def main(activations: int, latency_ms: float):
+    workdir = tempfile.mkdtemp()
+    system = initialize_tool_system(db_service=SlowDatabaseService(latency_ms / 1000))
+    timings = {}
+    for label, runner in (('secuencial', run_sequential), ('paralelo', run_concurrent), ('caché', run_cached)):
+        log = tools_module.tool_usage_log = ToolUsageLog(os.path.join(workdir, f"{label}.json"), flush_delay_seconds=1.0)
+        started = time.perf_counter()
+        await runner(system, activations, log)
+        timings[label] = (time.perf_counter() - started) / activations * 1000
+        print(f"🛠️ {label:10s} {timings[label]:7.3f} ms por activación ({log.stats['flushed']} registros escritos)")
+    print(f"⚡ Paralelo: {timings['secuencial'] / timings['paralelo']:.2f}x   "
+          f"caché: {timings['secuencial'] / timings['caché']:.0f}x ({system.result_cache.get_status()})")
+
+
+def run(activations: int = 100, latency_ms: float = 20.0):
+    asyncio.run(main(activations, latency_ms))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 20.0)
@@ -1,62 +1,260 @@
-from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import List, Dict, Optional, Any
-import os, json, shutil, logging
+from operator import attrgetter
+from typing import Callable, List, Dict, Optional, Any
+import asyncio, os, json, shutil, logging, sys
+
+# Valores conocidos de los campos categóricos. Se internan para que los leads
+# en caché compartan un único objeto str por valor en lugar de una copia por
+# lead (json.loads crea un str nuevo por cada valor que lee).
+LEAD_STAGES = (
+    "first_contact", "privacy_flow", "course_selection", "sales_agent", "converted",
+    "privacy_flow_completed", "privacy_rejected", "ready_for_sales_agent",
+)
+CONVERSATION_FLOWS = ("none", "privacy", "course_selection", "sales_conversation")
+BUYER_PERSONAS = (
+    "unknown", "lucia_copypro", "marcos_multitask", "sofia_visionaria",
+    "ricardo_rh_agil", "daniel_data_innovador",
+)
+_PROFILE_VALUES = (
+    "low", "medium", "high", "premium", "junior", "mid-level", "senior", "executive",
+    "startup", "small", "large", "enterprise", "marketing", "operations", "tech",
+    "consulting", "healthcare", "beginner", "intermediate", "advanced", "influencer",
+    "decision_maker", "budget_holder", "business", "technical", "casual", "standard",
+)
+_INTERNED = {value: sys.intern(value) for value in (*LEAD_STAGES, *CONVERSATION_FLOWS, *BUYER_PERSONAS, *_PROFILE_VALUES)}
+
+
+def _intern(value):
+    """Devuelve la instancia compartida de un valor categórico conocido."""
+    return _INTERNED.get(value, value) if value.__class__ is str else value
+
+
+def _interned_field(name: str) -> property:
+    """Campo categórico que se interna al asignarse."""
+    slot = f"_{name}"
+    get_value = attrgetter(slot)
+
+    def set_value(self, value):
+        setattr(self, slot, _intern(value))
+
+    return property(get_value, set_value)
+
+
+def _lazy_list(name: str) -> property:
+    """Lista que solo se crea en su primer acceso (None hasta entonces)."""
+    slot = f"_{name}"
+    get_slot = attrgetter(slot)
+
+    def get_value(self):
+        value = get_slot(self)
+        if value is None:
+            value = []
+            setattr(self, slot, value)
+        return value
+
+    def set_value(self, value):
+        setattr(self, slot, value)
+
+    return property(get_value, set_value)
+
+
+def _storage_slots(fields, property_fields) -> tuple:
+    """Slots de los campos; los que se exponen como property usan ``_<campo>``."""
+    return tuple(f"_{name}" if name in property_fields else name for name in fields)
+
 
-@dataclass
 class LeadMemory:
     """
     Estructura de memoria persistente para cada usuario/lead.
+    
+    Cada worker mantiene en caché una instancia por lead activo, así que la
+    representación es compacta: ``__slots__`` en lugar de ``__dict__``, los
+    campos categóricos internados y las listas de uso frecuente creadas
+    recién cuando se leen. ``to_dict``/``from_dict`` serializan campo por
+    campo sin la copia profunda de ``dataclasses.asdict``.
     """
-    user_id: str = ""
-    name: str = ""
-    selected_course: str = ""
-    stage: str = "first_contact"  # first_contact, privacy_flow, course_selection, sales_agent, converted
-    privacy_accepted: bool = False
-    privacy_requested: bool = False  # Nueva: si ya se le pidió aceptar privacidad
-    lead_score: int = 50
-    interaction_count: int = 0
-    message_history: Optional[List[Dict]] = None
-    pain_points: Optional[List[str]] = None
-    buying_signals: Optional[List[str]] = None
-    automation_needs: Optional[Dict[str, Any]] = None
-    role: Optional[str] = None
-    interests: Optional[List[str]] = None
-    interest_level: str = "unknown"
-    last_interaction: Optional[datetime] = None
-    created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
-    brenda_introduced: bool = False
-    
-    # Nuevos campos para flujos personalizados
-    current_flow: str = "none"  # none, privacy, course_selection, sales_conversation
-    flow_step: int = 0  # paso actual dentro del flujo
-    waiting_for_response: str = ""  # qué tipo de respuesta espera (name, privacy_acceptance, course_choice, etc.)
-    
-    # 🆕 CAMPOS PARA MENSAJE ORIGINAL (para activación automática de flujo de anuncios)
-    original_message_body: Optional[str] = None  # Cuerpo del mensaje original que inició el flujo
-    original_message_sid: Optional[str] = None   # SID del mensaje original
-    
-    # 🆕 CAMPOS DE PERSONALIZACIÓN AVANZADA (FASE 2)
-    # Buyer persona information
-    buyer_persona_match: str = "unknown"  # lucia_copypro, marcos_multitask, sofia_visionaria, ricardo_rh_agil, daniel_data_innovador
-    professional_level: str = "unknown"  # junior, mid-level, senior, executive
-    company_size: str = "unknown"  # startup, small, medium, large, enterprise
-    industry_sector: str = "unknown"  # marketing, operations, tech, consulting, healthcare, etc.
-    technical_level: str = "unknown"  # beginner, intermediate, advanced
-    decision_making_power: str = "unknown"  # influencer, decision_maker, budget_holder
-    
-    # Advanced insights
-    budget_indicators: Optional[List[str]] = None  # low, medium, high, premium signals
-    urgency_signals: Optional[List[str]] = None  # urgency indicators from conversation
-    conversation_history: Optional[List[Dict]] = None  # detailed conversation log
-    insights_confidence: float = 0.0  # confidence in extracted insights (0.0-1.0)
-    last_insights_update: Optional[str] = None  # last time insights were updated
-    
-    # Personalization context
-    response_style_preference: str = "business"  # business, technical, casual, executive
-    communication_frequency: str = "standard"  # low, standard, high
-    preferred_examples: Optional[List[str]] = None  # types of examples that resonate
+    
+    # Campos persistidos, en el orden del JSON
+    FIELDS = (
+        "user_id", "name", "selected_course", "stage", "privacy_accepted", "privacy_requested",
+        "lead_score", "interaction_count", "message_history", "pain_points", "buying_signals",
+        "automation_needs", "role", "interests", "interest_level", "last_interaction",
+        "created_at", "updated_at", "brenda_introduced", "current_flow", "flow_step",
+        "waiting_for_response", "original_message_body", "original_message_sid",
+        "buyer_persona_match", "professional_level", "company_size", "industry_sector",
+        "technical_level", "decision_making_power", "budget_indicators", "urgency_signals",
+        "conversation_history", "insights_confidence", "last_insights_update",
+        "insights_message_count", "response_style_preference", "communication_frequency",
+        "preferred_examples",
+    )
+    INTERNED_FIELDS = ("stage", "current_flow", "buyer_persona_match")
+    LAZY_LIST_FIELDS = ("message_history", "pain_points", "buying_signals", "interests")
+    DATETIME_FIELDS = ("last_interaction", "created_at", "updated_at")
+    # Campos de perfil que se internan al construir (se asignan con literales
+    # en el código, que Python ya interna)
+    PROFILE_FIELDS = (
+        "interest_level", "professional_level", "company_size", "industry_sector",
+        "technical_level", "decision_making_power", "response_style_preference",
+        "communication_frequency",
+    )
+    # Atributos que los flujos guardan solo en la caché del worker (no se
+    # persisten); sin asignar hasta que un flujo los usa, así que
+    # ``hasattr``/``getattr(..., default)`` siguen funcionando igual.
+    TRANSIENT_FIELDS = (
+        "faq_history", "available_courses", "contact_flow_state", "contact_info",
+        "contact_request_id", "contact_status",
+    )
+    
+    __slots__ = _storage_slots(FIELDS, INTERNED_FIELDS + LAZY_LIST_FIELDS) + TRANSIENT_FIELDS
+    
+    def __init__(
+        self,
+        user_id: str = "",
+        name: str = "",
+        selected_course: str = "",
+        stage: str = "first_contact",  # ver LEAD_STAGES
+        privacy_accepted: bool = False,
+        privacy_requested: bool = False,  # Nueva: si ya se le pidió aceptar privacidad
+        lead_score: int = 50,
+        interaction_count: int = 0,
+        message_history: Optional[List[Dict]] = None,
+        pain_points: Optional[List[str]] = None,
+        buying_signals: Optional[List[str]] = None,
+        automation_needs: Optional[Dict[str, Any]] = None,
+        role: Optional[str] = None,
+        interests: Optional[List[str]] = None,
+        interest_level: str = "unknown",
+        last_interaction: Optional[datetime] = None,
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
+        brenda_introduced: bool = False,
+        # Nuevos campos para flujos personalizados
+        current_flow: str = "none",  # ver CONVERSATION_FLOWS
+        flow_step: int = 0,  # paso actual dentro del flujo
+        waiting_for_response: str = "",  # qué tipo de respuesta espera (name, privacy_acceptance, course_choice, etc.)
+        # 🆕 CAMPOS PARA MENSAJE ORIGINAL (para activación automática de flujo de anuncios)
+        original_message_body: Optional[str] = None,  # Cuerpo del mensaje original que inició el flujo
+        original_message_sid: Optional[str] = None,  # SID del mensaje original
+        # 🆕 CAMPOS DE PERSONALIZACIÓN AVANZADA (FASE 2)
+        buyer_persona_match: str = "unknown",  # ver BUYER_PERSONAS
+        professional_level: str = "unknown",  # junior, mid-level, senior, executive
+        company_size: str = "unknown",  # startup, small, medium, large, enterprise
+        industry_sector: str = "unknown",  # marketing, operations, tech, consulting, healthcare, etc.
+        technical_level: str = "unknown",  # beginner, intermediate, advanced
+        decision_making_power: str = "unknown",  # influencer, decision_maker, budget_holder
+        # Advanced insights
+        budget_indicators: Optional[List[str]] = None,  # low, medium, high, premium signals
+        urgency_signals: Optional[List[str]] = None,  # urgency indicators from conversation
+        conversation_history: Optional[List[Dict]] = None,  # detailed conversation log
+        insights_confidence: float = 0.0,  # confidence in extracted insights (0.0-1.0)
+        last_insights_update: Optional[str] = None,  # last time insights were updated (ISO datetime)
+        insights_message_count: int = 0,  # interaction_count covered by the last extraction
+        # Personalization context
+        response_style_preference: str = "business",  # business, technical, casual, executive
+        communication_frequency: str = "standard",  # low, standard, high
+        preferred_examples: Optional[List[str]] = None,  # types of examples that resonate
+    ):
+        self.user_id = user_id
+        self.name = name
+        self.selected_course = selected_course
+        self._stage = _intern(stage)
+        self.privacy_accepted = privacy_accepted
+        self.privacy_requested = privacy_requested
+        self.lead_score = lead_score
+        self.interaction_count = interaction_count
+        self._message_history = message_history
+        self._pain_points = pain_points
+        self._buying_signals = buying_signals
+        self.automation_needs = automation_needs
+        self.role = role
+        self._interests = interests
+        self.interest_level = _intern(interest_level)
+        self.last_interaction = last_interaction
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.brenda_introduced = brenda_introduced
+        self._current_flow = _intern(current_flow)
+        self.flow_step = flow_step
+        self.waiting_for_response = waiting_for_response
+        self.original_message_body = original_message_body
+        self.original_message_sid = original_message_sid
+        self._buyer_persona_match = _intern(buyer_persona_match)
+        self.professional_level = _intern(professional_level)
+        self.company_size = _intern(company_size)
+        self.industry_sector = _intern(industry_sector)
+        self.technical_level = _intern(technical_level)
+        self.decision_making_power = _intern(decision_making_power)
+        self.budget_indicators = budget_indicators
+        self.urgency_signals = urgency_signals
+        self.conversation_history = conversation_history
+        self.insights_confidence = insights_confidence
+        self.last_insights_update = last_insights_update
+        self.insights_message_count = insights_message_count
+        self.response_style_preference = _intern(response_style_preference)
+        self.communication_frequency = _intern(communication_frequency)
+        self.preferred_examples = preferred_examples
+    
+    stage = _interned_field("stage")
+    current_flow = _interned_field("current_flow")
+    buyer_persona_match = _interned_field("buyer_persona_match")
+    message_history = _lazy_list("message_history")
+    pain_points = _lazy_list("pain_points")
+    buying_signals = _lazy_list("buying_signals")
+    interests = _lazy_list("interests")
+    
+    def to_dict(self) -> dict:
+        """
+        Convierte a diccionario para JSON.
+        
+        Las listas y diccionarios no se copian: el resultado se serializa de
+        inmediato (archivo o almacén compartido). Las listas diferidas que
+        nunca se usaron se escriben vacías, como quedan al cargarse.
+        """
+        data = dict(zip(self.FIELDS, _slot_values(self)))
+        for key in self.LAZY_LIST_FIELDS:
+            if data[key] is None:
+                data[key] = []
+        for key in self.DATETIME_FIELDS:
+            value = data[key]
+            if value is not None:
+                data[key] = value.isoformat()
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "LeadMemory":
+        """
+        Construye desde el diccionario de ``to_dict`` (o de versiones anteriores).
+        
+        Los campos ausentes toman su valor por defecto y las claves
+        desconocidas se ignoran.
+        """
+        # Claves tomadas de FIELDS (internadas): Python asocia los kwargs por
+        # identidad, con las claves de json.loads tendría que comparar texto
+        values = {key: data[key] for key in cls.FIELDS if key in data}
+        # Las listas vacías no se crean hasta que se usen
+        for key in cls.LAZY_LIST_FIELDS:
+            if values.get(key) == []:
+                values[key] = None
+        # Convertir strings de datetime de vuelta a datetime
+        for key in cls.DATETIME_FIELDS:
+            value = values.get(key)
+            if value.__class__ is str:
+                values[key] = datetime.fromisoformat(value) if value else None
+        # Migrar stage antiguo a nuevo sistema
+        if values.get("stage") == "initial":
+            values["stage"] = "first_contact"
+        return cls(**values)
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return (f"LeadMemory(user_id={self.user_id!r}, name={self.name!r}, stage={self._stage!r}, "
+                f"current_flow={self._current_flow!r}, interaction_count={self.interaction_count!r})")
     
     def is_first_interaction(self) -> bool:
         """Verifica si es la primera interacción del usuario."""
@@ -211,13 +409,39 @@ class LeadMemory:
         
         return min(priority_score, 100)  # Cap at 100
 
+# Valores persistidos en el orden de LeadMemory.FIELDS, leídos directo de los
+# slots (sin materializar las listas diferidas)
+_slot_values = attrgetter(*LeadMemory.__slots__[:len(LeadMemory.FIELDS)])
+
 class MemoryManager:
     """
     Gestor de memoria persistente con auto-corrección.
     """
-    def __init__(self, memory_dir: str = "memorias"):
+    # Namespace de las memorias en el almacén compartido
+    STORE_NAMESPACE = "lead_memory"
+
+    def __init__(self, memory_dir: str = "memorias", store=None, owns_user: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            memory_dir: Carpeta de los archivos JSON de memoria
+            store: Almacén de estado compartido (KeyValueStore). Si es compartido
+                entre workers, las memorias se persisten ahí en lugar de en archivos;
+                leads_cache sigue siendo local porque cada usuario se enruta
+                siempre al mismo worker.
+            owns_user: Indica si el usuario se enruta a este worker
+                (``WorkerRouter.owns``). Los usuarios de otro worker solo se
+                procesan aquí por failover; su copia en caché se revalida
+                contra el almacén en ``refresh_lead_memory``.
+        """
         self.memory_dir = memory_dir
         self.leads_cache = {}
+        self.store = store if store is not None and getattr(store, 'shared', False) else None
+        self.owns_user = owns_user
+        # Escrituras al almacén compartido pendientes (None = borrar), por usuario;
+        # se hacen en un hilo para no bloquear el event loop con la red o SQLite
+        self._pending_writes: Dict[str, Optional[dict]] = {}
+        self._writing: Dict[str, Optional[dict]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
         os.makedirs(memory_dir, exist_ok=True)
     
     def get_lead_memory(self, user_id: str) -> LeadMemory:
@@ -244,6 +468,84 @@ class MemoryManager:
         
         return self.leads_cache[user_id]
     
+    async def refresh_lead_memory(self, user_id: str) -> None:
+        """
+        Trae del almacén compartido (en un hilo) la memoria del usuario si no
+        está en caché o si la copia local pudo quedar desactualizada (usuario
+        de otro worker procesado aquí por failover). Se llama al inicio de cada
+        mensaje para que ``get_lead_memory`` no lea el almacén desde el event loop.
+        """
+        if self.store is None or self._has_pending_write(user_id):
+            return
+        cached = self.leads_cache.get(user_id)
+        if cached is not None and self._is_owned(user_id):
+            return
+        cached_at = self._cached_at(user_id)
+        try:
+            data = await asyncio.to_thread(self.store.get, self.STORE_NAMESPACE, user_id)
+        except Exception as e:
+            logging.error(f"❌ Error loading lead memory for {user_id}: {e}")
+            return
+        if data is None or self._has_pending_write(user_id) or self._cached_at(user_id) != cached_at:
+            # Se guardó una versión local mientras se leía: esa manda
+            return
+        if user_id not in self.leads_cache or data.get('updated_at') != cached_at:
+            self.leads_cache[user_id] = self.from_dict(data)
+    
+    def _cached_at(self, user_id: str) -> Optional[str]:
+        cached = self.leads_cache.get(user_id)
+        if cached is None or cached.updated_at is None:
+            return None
+        return cached.updated_at.isoformat()
+    
+    def _is_owned(self, user_id: str) -> bool:
+        """True si la caché local del usuario no puede quedar desactualizada."""
+        return self.store is None or self.owns_user is None or self.owns_user(user_id)
+    
+    def _has_pending_write(self, user_id: str) -> bool:
+        return user_id in self._pending_writes or user_id in self._writing
+    
+    def _write_to_store(self, user_id: str, data: Optional[dict]) -> None:
+        """
+        Encola la escritura (o el borrado, con ``data=None``) del usuario en el
+        almacén compartido. Varias escrituras del mismo usuario antes del
+        flush se combinan en la última. Sin event loop se escribe directo.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._apply_writes({user_id: data})
+            return
+        if data is not None:
+            # to_dict no copia las listas; se copian porque el flush corre en otro hilo
+            data = {key: value.copy() if isinstance(value, (list, dict)) else value for key, value in data.items()}
+        self._pending_writes[user_id] = data
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_writes())
+    
+    async def _flush_writes(self) -> None:
+        while self._pending_writes:
+            self._writing, self._pending_writes = self._pending_writes, {}
+            try:
+                await asyncio.to_thread(self._apply_writes, self._writing)
+            finally:
+                self._writing = {}
+    
+    def _apply_writes(self, writes: Dict[str, Optional[dict]]) -> None:
+        for user_id, data in writes.items():
+            try:
+                if data is None:
+                    self.store.delete(self.STORE_NAMESPACE, user_id)
+                else:
+                    self.store.set(self.STORE_NAMESPACE, user_id, data)
+            except Exception as e:
+                logging.error(f"❌ Error writing lead memory for {user_id} to the shared store: {e}")
+    
+    async def flush(self) -> None:
+        """Espera a que las escrituras pendientes lleguen al almacén (al apagar)."""
+        if self._flush_task is not None:
+            await self._flush_task
+    
     def save_lead_memory(self, user_id: str, lead_memory: LeadMemory) -> bool:
         """
         Guarda la memoria de un lead específico con backup automático.
@@ -257,6 +559,11 @@ class MemoryManager:
             lead_memory.updated_at = datetime.now()
             self.leads_cache[user_id] = lead_memory
             
+            if self.store is not None:
+                self._write_to_store(user_id, self.to_dict(lead_memory))
+                logging.info(f"✅ Memoria guardada para usuario {user_id}")
+                return True
+            
             # Asegurar que el directorio existe
             os.makedirs(self.memory_dir, exist_ok=True)
             
@@ -287,6 +594,16 @@ class MemoryManager:
         - Convierte tipos de datos apropiadamente
         """
         try:
+            if self.store is not None and self._has_pending_write(user_id):
+                # Aún no llegó al almacén: la última escritura encolada manda
+                pending = self._pending_writes[user_id] if user_id in self._pending_writes else self._writing[user_id]
+                return self.from_dict(json.loads(json.dumps(pending))) if pending is not None else None
+            if self.store is not None:
+                data = self.store.get(self.STORE_NAMESPACE, user_id)
+                if data is not None:
+                    logging.info(f"✅ Memoria cargada para usuario {user_id}")
+                    return self.from_dict(data)
+            
             filename = f"memory_{user_id}.json"
             filepath = os.path.join(self.memory_dir, filename)
             
@@ -302,45 +619,11 @@ class MemoryManager:
     
     def to_dict(self, lead_memory: LeadMemory) -> dict:
         """Convierte LeadMemory a diccionario para JSON."""
-        data = asdict(lead_memory)
-        # Convertir datetime a string para JSON
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat() if value else None
-        return data
+        return lead_memory.to_dict()
     
     def from_dict(self, data: dict) -> LeadMemory:
         """Convierte diccionario desde JSON a LeadMemory."""
-        # Convertir strings de datetime de vuelta a datetime
-        for key in ['last_interaction', 'created_at', 'updated_at']:
-            if data.get(key):
-                data[key] = datetime.fromisoformat(data[key])
-        
-        # Inicializar listas vacías si son None
-        if data.get('message_history') is None:
-            data['message_history'] = []
-        if data.get('pain_points') is None:
-            data['pain_points'] = []
-        if data.get('buying_signals') is None:
-            data['buying_signals'] = []
-        if data.get('interests') is None:
-            data['interests'] = []
-        
-        # Valores por defecto para nuevos campos (compatibilidad hacia atrás)
-        if 'privacy_requested' not in data:
-            data['privacy_requested'] = False
-        if 'current_flow' not in data:
-            data['current_flow'] = "none"
-        if 'flow_step' not in data:
-            data['flow_step'] = 0
-        if 'waiting_for_response' not in data:
-            data['waiting_for_response'] = ""
-        
-        # Migrar stage antiguo a nuevo sistema
-        if data.get('stage') == 'initial':
-            data['stage'] = 'first_contact'
-        
-        return LeadMemory(**data)
+        return LeadMemory.from_dict(data)
     
     def clear_user_memory(self, user_id: str) -> bool:
         """
@@ -356,6 +639,8 @@ class MemoryManager:
             # Remover del cache
             if user_id in self.leads_cache:
                 del self.leads_cache[user_id]
+            if self.store is not None:
+                self._write_to_store(user_id, None)
             
             # Eliminar archivo de memoria
             filename = f"memory_{user_id}.json"
@@ -413,6 +698,10 @@ class MemoryManager:
         try:
             # Limpiar cache
             self.leads_cache.clear()
+            self._pending_writes.clear()
+            if self.store is not None:
+                for user_id in self.store.items(self.STORE_NAMESPACE):
+                    self.store.delete(self.STORE_NAMESPACE, user_id)
             
             # Eliminar todos los archivos de memoria
             if os.path.exists(self.memory_dir):
@@ -11,6 +11,11 @@ Fecha: Julio 2025
 from typing import Dict, Any, Optional, List, Union
 from datetime import datetime
 
+from prompts.prompt_assembly import (
+    PromptSection, SplitPrompt, assemble_prompt, assemble_split_prompt, truncate_to_tokens,
+    PRIORITY_REQUIRED, PRIORITY_HIGH, PRIORITY_MEDIUM, PRIORITY_LOW
+)
+
 # ============================================================================
 # 1. PROMPT PRINCIPAL DEL AGENTE (ADAPTADO PARA WHATSAPP)
 # ============================================================================
@@ -139,35 +144,8 @@ CATEGORÍAS DE RESPUESTA ADAPTADAS A BUYER PERSONAS:
 # 2. ANÁLISIS DE INTENCIÓN PARA WHATSAPP
 # ============================================================================
 
-def get_intent_analysis_prompt(user_message: str, user_memory, recent_messages: Union[list, None] = None) -> str:
-    """
-    Genera el prompt para análisis de intención específico para líderes PyME en WhatsApp.
-    
-    Args:
-        user_message: Mensaje del usuario a analizar
-        user_memory: Memoria del usuario con contexto empresarial
-        recent_messages: Mensajes recientes para contexto
-        
-    Returns:
-        Prompt completo para análisis de intención orientado a PyMEs
-    """
-    automation_info = ""
-    if user_memory and user_memory.automation_needs:
-        needs = user_memory.automation_needs
-        if any(needs.values() if isinstance(needs, dict) else []):
-            automation_info = f"\n- Necesidades de automatización empresarial: {needs}"
-    
-    # **NUEVO**: Análisis de contexto conversacional
-    conversation_context = ""
-    if recent_messages and len(recent_messages) > 1:
-        conversation_context = f"""
-CONTEXTO CONVERSACIONAL:
-- Mensajes anteriores: {recent_messages[-3:] if len(recent_messages) >= 3 else recent_messages}
-- Patrón de interacción: {'Exploratorio' if len(recent_messages) < 3 else 'Profundizando' if len(recent_messages) < 6 else 'Decisión'}
-- Tono del usuario: {'Informativo' if any('?' in msg for msg in recent_messages[-2:]) else 'Explorativo' if any('hola' in msg.lower() for msg in recent_messages[-2:]) else 'Decisivo'}
-"""
-    
-    return f"""
+# Instrucciones estáticas del análisis de intención (se cuentan una sola vez)
+INTENT_ANALYSIS_INSTRUCTIONS = """
 Clasifica el mensaje del líder PyME en una de estas CATEGORÍAS ESPECÍFICAS para empresas pequeñas y medianas:
 
 **CATEGORÍAS DE EXPLORACIÓN EMPRESARIAL:**
@@ -207,19 +185,9 @@ Clasifica el mensaje del líder PyME en una de estas CATEGORÍAS ESPECÍFICAS pa
 22. IMPLEMENTATION_TIMELINE - Solicita cronograma de implementación
 23. SUCCESS_METRICS - Pregunta sobre métricas de éxito o ROI específico
 
-MENSAJE ACTUAL: {user_message}
-
-CONTEXTO EMPRESARIAL DEL USUARIO:
-- Nombre: {user_memory.name if user_memory and user_memory.name else 'Líder PyME'}
-- Cargo/Empresa: {user_memory.role if user_memory and user_memory.role else 'No especificado'}
-- Sector: {', '.join(user_memory.interests if user_memory and user_memory.interests else ['Por identificar'])}
-- Tamaño empresa: {'PyME ' + str(user_memory.interaction_count) + ' empleados' if user_memory and user_memory.interaction_count > 50 else 'PyME (estimado)'}
-- Dolores operativos: {', '.join(user_memory.pain_points if user_memory and user_memory.pain_points else ['Por identificar'])}
-- Historial: {user_memory.interaction_count if user_memory else 0} interacciones
-- Mensajes recientes: {recent_messages if recent_messages else 'Primera interacción'}
-{automation_info}
-{conversation_context}
+"""
 
+INTENT_ANALYSIS_OUTPUT_FORMAT = """
 CONTEXTO DE BUYER PERSONAS (usar para clasificación):
 - **Lucía CopyPro**: Marketing Digital, agencia B2B, necesita contenido más rápido
 - **Marcos Multitask**: Operaciones, manufactura, necesita reportes automáticos
@@ -243,7 +211,7 @@ IMPORTANTE PARA LÍDERES PYME EN WHATSAPP:
 - **NUEVO**: Identifica señales de decisión temprana para facilitar el proceso
 
 Responde SOLO con JSON:
-{{
+{
     "category": "CATEGORIA_PRINCIPAL",
     "confidence": 0.8,
     "buyer_persona_match": "lucia_copypro|marcos_multitask|sofia_visionaria|ricardo_rh|daniel_data|general_pyme",
@@ -256,9 +224,119 @@ Responde SOLO con JSON:
     "implementation_timeline": "immediate|30_days|90_days|strategic_planning",
     "conversation_stage": "exploration|consideration|decision|objection_handling",
     "emotional_state": "curious|concerned|excited|skeptical|ready_to_buy"
-}}
+}
 """
 
+# Prefijo precompilado para el mensaje system (idéntico en cada llamada)
+INTENT_ANALYSIS_SYSTEM_PREFIX = (
+    "Eres un analizador de intención experto. Responde SOLO con JSON válido.\n"
+    + INTENT_ANALYSIS_INSTRUCTIONS
+    + INTENT_ANALYSIS_OUTPUT_FORMAT
+)
+
+
+def _get_intent_analysis_sections(user_message: str, user_memory, recent_messages: Union[list, None] = None) -> List[PromptSection]:
+    """
+    Construye las secciones dinámicas del análisis de intención.
+    
+    El volcado de necesidades de automatización y los mensajes recientes son
+    secciones de baja prioridad: se resumen o eliminan si el prompt excede
+    el presupuesto de ``PromptConfig.PROMPT_BUDGETS['intent_analysis']``.
+    """
+    automation_info = ""
+    automation_summary = ""
+    if user_memory and user_memory.automation_needs:
+        needs = user_memory.automation_needs
+        if any(needs.values() if isinstance(needs, dict) else []):
+            automation_info = f"\n- Necesidades de automatización empresarial: {needs}"
+            automation_summary = truncate_to_tokens(automation_info, 40)
+    
+    # **NUEVO**: Análisis de contexto conversacional
+    conversation_context = ""
+    conversation_summary = ""
+    if recent_messages and len(recent_messages) > 1:
+        interaction_pattern = 'Exploratorio' if len(recent_messages) < 3 else 'Profundizando' if len(recent_messages) < 6 else 'Decisión'
+        user_tone = 'Informativo' if any('?' in msg for msg in recent_messages[-2:]) else 'Explorativo' if any('hola' in msg.lower() for msg in recent_messages[-2:]) else 'Decisivo'
+        conversation_context = f"""
+CONTEXTO CONVERSACIONAL:
+- Mensajes anteriores: {recent_messages[-3:] if len(recent_messages) >= 3 else recent_messages}
+- Patrón de interacción: {interaction_pattern}
+- Tono del usuario: {user_tone}
+"""
+        conversation_summary = f"""
+CONTEXTO CONVERSACIONAL:
+- Patrón de interacción: {interaction_pattern}
+- Tono del usuario: {user_tone}
+"""
+    
+    recent_summary = None
+    if recent_messages:
+        recent_summary = f"- Mensajes recientes: {[truncate_to_tokens(msg, 30) for msg in recent_messages[-2:]]}\n"
+    
+    user_context = f"""MENSAJE ACTUAL: {user_message}
+
+CONTEXTO EMPRESARIAL DEL USUARIO:
+- Nombre: {user_memory.name if user_memory and user_memory.name else 'Líder PyME'}
+- Cargo/Empresa: {user_memory.role if user_memory and user_memory.role else 'No especificado'}
+- Sector: {', '.join(user_memory.interests if user_memory and user_memory.interests else ['Por identificar'])}
+- Tamaño empresa: {'PyME ' + str(user_memory.interaction_count) + ' empleados' if user_memory and user_memory.interaction_count > 50 else 'PyME (estimado)'}
+- Dolores operativos: {', '.join(user_memory.pain_points if user_memory and user_memory.pain_points else ['Por identificar'])}
+- Historial: {user_memory.interaction_count if user_memory else 0} interacciones
+"""
+    
+    return [
+        PromptSection('user_context', user_context, PRIORITY_REQUIRED),
+        PromptSection('recent_messages', f"- Mensajes recientes: {recent_messages if recent_messages else 'Primera interacción'}\n", PRIORITY_LOW, summary=recent_summary),
+        PromptSection('automation_needs', f"{automation_info}\n", PRIORITY_LOW, summary=f"{automation_summary}\n"),
+        PromptSection('conversation_context', f"{conversation_context}\n", PRIORITY_MEDIUM, summary=f"{conversation_summary}\n"),
+    ]
+
+
+def build_intent_analysis_prompt(user_message: str, user_memory, recent_messages: Union[list, None] = None) -> SplitPrompt:
+    """
+    Genera el prompt de análisis de intención como prefijo estático + sufijo dinámico.
+    
+    Args:
+        user_message: Mensaje del usuario a analizar
+        user_memory: Memoria del usuario con contexto empresarial
+        recent_messages: Mensajes recientes para contexto
+        
+    Returns:
+        SplitPrompt listo para ``to_messages()``
+    """
+    return assemble_split_prompt(
+        INTENT_ANALYSIS_SYSTEM_PREFIX,
+        _get_intent_analysis_sections(user_message, user_memory, recent_messages),
+        PromptConfig.get_prompt_budget('intent_analysis'),
+        'intent_analysis'
+    )
+
+
+def get_intent_analysis_prompt(user_message: str, user_memory, recent_messages: Union[list, None] = None) -> str:
+    """
+    Genera el prompt para análisis de intención específico para líderes PyME en WhatsApp.
+    
+    Versión en un solo texto (instrucciones, contexto y formato de salida).
+    Para llamadas a OpenAI usar ``build_intent_analysis_prompt``.
+    
+    Args:
+        user_message: Mensaje del usuario a analizar
+        user_memory: Memoria del usuario con contexto empresarial
+        recent_messages: Mensajes recientes para contexto
+        
+    Returns:
+        Prompt completo para análisis de intención orientado a PyMEs
+    """
+    sections = [
+        PromptSection('instructions', INTENT_ANALYSIS_INSTRUCTIONS, PRIORITY_REQUIRED, static=True),
+        *_get_intent_analysis_sections(user_message, user_memory, recent_messages),
+        PromptSection('output_format', INTENT_ANALYSIS_OUTPUT_FORMAT, PRIORITY_REQUIRED, static=True),
+    ]
+    
+    return assemble_prompt(
+        sections, PromptConfig.get_prompt_budget('intent_analysis'), 'intent_analysis'
+    ).text
+
 # ============================================================================
 # 3. EXTRACCIÓN DE INFORMACIÓN DE MENSAJES
 # ============================================================================
@@ -559,6 +637,18 @@ class PromptConfig:
         'information_extraction': 400  # JSON con datos extraídos
     }
     
+    # Presupuesto de tokens del prompt de entrada (None = sin límite)
+    PROMPT_BUDGETS = {
+        'main_agent': 4000,             # Respuesta principal con contexto de curso
+        'intent_analysis': 1800,        # Clasificación con contexto del usuario
+        'personalized_response': 600    # Prompt de usuario para respuesta personalizada
+    }
+    
+    @classmethod
+    def get_prompt_budget(cls, prompt_type: str) -> Optional[int]:
+        """Retorna el presupuesto de tokens de entrada para un tipo de prompt."""
+        return cls.PROMPT_BUDGETS.get(prompt_type)
+    
     @classmethod
     def get_config(cls, prompt_type: str) -> Dict[str, Any]:
         """
@@ -573,14 +663,84 @@ class PromptConfig:
         return {
             'model': cls.MODELS.get(prompt_type, 'gpt-4o-mini'),
             'temperature': cls.TEMPERATURES.get(prompt_type, 0.5),
-            'max_tokens': cls.MAX_TOKENS.get(prompt_type, 500)
+            'max_tokens': cls.MAX_TOKENS.get(prompt_type, 500),
+            'prompt_budget': cls.PROMPT_BUDGETS.get(prompt_type)
         }
 
 # ============================================================================
 # 6. PROMPTS DE GENERACIÓN DE RESPUESTA
 # ============================================================================
 
-def get_response_generation_prompt(
+# Partes estáticas del prompt de generación de respuesta
+RESPONSE_GENERATION_HEADER = f"""
+{SYSTEM_PROMPT}
+
+"""
+
+# ``course_data_location`` indica dónde está la información del curso de BD:
+# arriba en el prompt de un solo texto, en el mensaje del usuario cuando las
+# instrucciones van en el prefijo system cacheado
+_RESPONSE_GENERATION_INSTRUCTIONS_TEMPLATE = """INSTRUCCIONES ESPECÍFICAS PARA LÍDERES PYME:
+1. Responde como consultora empresarial especializada en IA para PyMEs
+2. Usa lenguaje ejecutivo: enfócate en ROI, eficiencia, competitividad
+3. Personaliza basándote en el cargo y sector del líder
+4. Cuantifica beneficios siempre que sea posible (horas ahorradas, % mejoras)
+5. Incluye ejemplos de casos de éxito similares a su situación
+6. Mantén el mensaje entre 150-250 palabras (ejecutivos necesitan más contexto)
+7. Incluye call-to-action empresarial claro (demo, auditoría, consulta)
+8. ⚠️ CRÍTICO: USA SOLO información del curso confirmada de BD {course_data_location}
+9. Si mencionas sesiones, actividades o bonos, usa EXACTAMENTE los datos de BD
+10. Si no tienes información específica en BD, di "déjame consultar esa información"
+
+**NUEVO - TÉCNICAS DE CONVERSACIÓN MEJORADAS:**
+11. **Empatía activa**: "Entiendo tu frustración con los reportes manuales..."
+12. **Validación de experiencia**: "Es normal que te sientas abrumado con tantas opciones..."
+13. **Reducción de ansiedad**: "Muchos líderes como tú han empezado con pasos pequeños..."
+14. **Celebración de iniciativa**: "Me encanta que estés pensando en innovar tu empresa..."
+15. **Preguntas estratégicas**: "¿Qué te haría sentir más confiado para empezar?"
+
+**NUEVO - ELEMENTOS DE CONVERSACIÓN:**
+16. Usa "nosotros" para crear sentido de colaboración
+17. Incluye preguntas que inviten a reflexión
+18. Ofrece opciones cuando sea posible
+19. Termina con una pregunta que mantenga la conversación activa
+20. **Adapta el tono según el estado emocional detectado**:
+    - Curious: Enfócate en educación y casos de éxito
+    - Concerned: Valida preocupaciones y ofrece soluciones específicas
+    - Excited: Acelera hacia próximos pasos y implementación
+    - Skeptical: Enfócate en casos de éxito y ROI cuantificable
+    - Ready_to_buy: Facilita la decisión con opciones claras
+
+**NUEVO - ESTRUCTURA DE RESPUESTA OPTIMIZADA:**
+- **Apertura empática** (1-2 líneas): Reconocer su situación específica
+- **Educación con ROI** (3-4 líneas): Información relevante + beneficios cuantificables
+- **Caso de éxito** (2-3 líneas): Ejemplo específico de su industria
+- **Próximo paso claro** (1-2 líneas): Call-to-action específico
+- **Pregunta de cierre** (1 línea): Mantener conversación activa
+
+**NUEVO - PALABRAS CLAVE PARA CONEXIÓN EMOCIONAL:**
+- "Entiendo que..." (empatía)
+- "Muchos líderes como tú..." (validación social)
+- "Imagina poder..." (visualización de beneficios)
+- "¿Qué te haría sentir..." (pregunta reflexiva)
+- "Juntos podemos..." (colaboración)
+
+RESPONDE COMO BRENDA - CONSULTORA IA PARA PYMES:
+"""
+
+
+RESPONSE_GENERATION_INSTRUCTIONS = _RESPONSE_GENERATION_INSTRUCTIONS_TEMPLATE.format(
+    course_data_location="arriba"
+)
+
+
+# Prefijo precompilado para el mensaje system (idéntico en cada llamada)
+RESPONSE_GENERATION_SYSTEM_PREFIX = RESPONSE_GENERATION_HEADER + _RESPONSE_GENERATION_INSTRUCTIONS_TEMPLATE.format(
+    course_data_location='que viene en el mensaje del usuario (sección "INFORMACIÓN DEL CURSO")'
+)
+
+
+def _get_response_generation_sections(
     user_message: str,
     user_memory,
     intent_analysis: Dict[str, Any],
@@ -588,24 +748,18 @@ def get_response_generation_prompt(
     course_detailed_info: Union[Dict[str, Any], None] = None,
     contextual_bonuses: Union[List[Dict[str, Any]], None] = None,
     bonus_activation_info: Union[Dict[str, Any], None] = None
-) -> str:
+) -> List[PromptSection]:
     """
-    Genera prompt para crear respuesta inteligente orientada a líderes PyME.
+    Construye las secciones dinámicas del prompt de generación de respuesta.
     
-    Args:
-        user_message: Mensaje del líder empresarial
-        user_memory: Memoria empresarial del usuario
-        intent_analysis: Resultado del análisis de intención empresarial
-        context_info: Información adicional de contexto
-        course_detailed_info: Información detallada del curso desde BD (opcional)
-        contextual_bonuses: Lista de bonos contextuales para activar (opcional)
-        bonus_activation_info: Información sobre cuándo/cómo activar bonos (opcional)
-        
-    Returns:
-        Prompt completo para generar respuesta empresarial
+    La estructura completa del curso, los bonos y el volcado de automatización
+    se resumen o eliminan si el prompt excede el presupuesto de
+    ``PromptConfig.PROMPT_BUDGETS['main_agent']``.
     """
     
     business_context = ""
+    automation_context = ""
+    automation_summary = None
     if user_memory:
         # Determinar buyer persona match
         buyer_persona = intent_analysis.get('buyer_persona_match', 'general_pyme')
@@ -620,11 +774,15 @@ PERFIL EMPRESARIAL DEL USUARIO:
 - Historial interacciones: {user_memory.interaction_count}
 - Lead score empresarial: {user_memory.lead_score}/100
 - Dolores operativos: {', '.join(user_memory.pain_points) if user_memory.pain_points else 'Eficiencia operativa'}
-- Automatización identificada: {user_memory.automation_needs if hasattr(user_memory, 'automation_needs') else 'Por identificar'}
 """
+        # El volcado de automatización puede ser largo: sección de baja prioridad
+        automation_needs = user_memory.automation_needs if hasattr(user_memory, 'automation_needs') else 'Por identificar'
+        automation_context = f"- Automatización identificada: {automation_needs}\n"
+        automation_summary = truncate_to_tokens(automation_context, 40).rstrip("\n") + "\n"
     
     # Agregar información detallada del curso si está disponible
     course_context = ""
+    course_summary = ""
     if course_detailed_info:
         course_data = course_detailed_info.get('course', {})
         sessions_data = course_detailed_info.get('sessions', [])
@@ -647,10 +805,21 @@ INFORMACIÓN DETALLADA DEL CURSO (CONFIRMADA DE BASE DE DATOS):
 **TOTAL DE BONOS:** {len(bonds_data)} bonos incluidos
 **TOTAL DE SESIONES:** {len(sessions_data)} sesiones estructuradas
 
+⚠️ OBLIGATORIO: Usa SOLO esta información verificada de BD. NO agregues datos adicionales."""
+        # Resumen sin la estructura completa (la parte más pesada del contexto)
+        course_summary = f"""
+INFORMACIÓN DEL CURSO (CONFIRMADA DE BASE DE DATOS):
+**Curso:** {course_data.get('name', 'No disponible')}
+**Precio:** ${course_data.get('price', 'No disponible')} {course_data.get('currency', 'USD')}
+**Duración:** {course_data.get('session_count', 0)} sesiones ({round(course_data.get('total_duration_min', 0)/60, 1)} horas)
+**Modalidad:** {course_data.get('modality', 'No especificado')}
+**TOTAL DE BONOS:** {len(bonds_data)} | **TOTAL DE SESIONES:** {len(sessions_data)}
+
 ⚠️ OBLIGATORIO: Usa SOLO esta información verificada de BD. NO agregues datos adicionales."""
     
     # Agregar información de bonos contextuales si está disponible
     bonus_context = ""
+    bonus_summary = ""
     if contextual_bonuses and bonus_activation_info:
         should_activate = bonus_activation_info.get('should_activate_bonuses', False)
         conversation_context = bonus_activation_info.get('conversation_context', 'general')
@@ -692,15 +861,13 @@ SISTEMA DE BONOS CONTEXTUALES ACTIVADO:
 - Miedo técnico → Bonos 3, 1, 6 (Soporte, Workbook, Biblioteca)
 - Crecimiento profesional → Bonos 5, 7, 4 (Bolsa empleo, LinkedIn, Comunidad)
 """
+            bonus_summary = (
+                f"\nBONOS PRIORIZADOS ({conversation_context}, urgencia {urgency_level}): "
+                + "; ".join(bonus.get('content', 'Bono disponible') for bonus in contextual_bonuses[:4])
+                + "\n"
+            )
     
-    return f"""
-{SYSTEM_PROMPT}
-
-MENSAJE DEL LÍDER EMPRESARIAL: {user_message}
-
-{business_context}
-
-ANÁLISIS DE INTENCIÓN EMPRESARIAL:
+    intent_context = f"""ANÁLISIS DE INTENCIÓN EMPRESARIAL:
 - Categoría: {intent_analysis.get('category', 'EXPLORATION_SECTOR')}
 - Buyer Persona Detectado: {intent_analysis.get('buyer_persona_match', 'general_pyme')}
 - Dolor empresarial: {intent_analysis.get('business_pain_detected', 'general_efficiency')}
@@ -711,59 +878,97 @@ ANÁLISIS DE INTENCIÓN EMPRESARIAL:
 - Timeline implementación: {intent_analysis.get('implementation_timeline', '30_days')}
 - Nivel de urgencia: {intent_analysis.get('urgency_level', 'medium')}
 
-{context_info}
-
-{course_context}
-
-{bonus_context}
-
-INSTRUCCIONES ESPECÍFICAS PARA LÍDERES PYME:
-1. Responde como consultora empresarial especializada en IA para PyMEs
-2. Usa lenguaje ejecutivo: enfócate en ROI, eficiencia, competitividad
-3. Personaliza basándote en el cargo y sector del líder
-4. Cuantifica beneficios siempre que sea posible (horas ahorradas, % mejoras)
-5. Incluye ejemplos de casos de éxito similares a su situación
-6. Mantén el mensaje entre 150-250 palabras (ejecutivos necesitan más contexto)
-7. Incluye call-to-action empresarial claro (demo, auditoría, consulta)
-8. ⚠️ CRÍTICO: USA SOLO información del curso confirmada de BD arriba
-9. Si mencionas sesiones, actividades o bonos, usa EXACTAMENTE los datos de BD
-10. Si no tienes información específica en BD, di "déjame consultar esa información"
-
-**NUEVO - TÉCNICAS DE CONVERSACIÓN MEJORADAS:**
-11. **Empatía activa**: "Entiendo tu frustración con los reportes manuales..."
-12. **Validación de experiencia**: "Es normal que te sientas abrumado con tantas opciones..."
-13. **Reducción de ansiedad**: "Muchos líderes como tú han empezado con pasos pequeños..."
-14. **Celebración de iniciativa**: "Me encanta que estés pensando en innovar tu empresa..."
-15. **Preguntas estratégicas**: "¿Qué te haría sentir más confiado para empezar?"
-
-**NUEVO - ELEMENTOS DE CONVERSACIÓN:**
-16. Usa "nosotros" para crear sentido de colaboración
-17. Incluye preguntas que inviten a reflexión
-18. Ofrece opciones cuando sea posible
-19. Termina con una pregunta que mantenga la conversación activa
-20. **Adapta el tono según el estado emocional detectado**:
-    - Curious: Enfócate en educación y casos de éxito
-    - Concerned: Valida preocupaciones y ofrece soluciones específicas
-    - Excited: Acelera hacia próximos pasos y implementación
-    - Skeptical: Enfócate en casos de éxito y ROI cuantificable
-    - Ready_to_buy: Facilita la decisión con opciones claras
+"""
+    
+    return [
+        PromptSection('user_message', f"MENSAJE DEL LÍDER EMPRESARIAL: {user_message}\n\n", PRIORITY_REQUIRED),
+        PromptSection('business_context', business_context, PRIORITY_HIGH),
+        PromptSection('automation_needs', automation_context, PRIORITY_LOW, summary=automation_summary),
+        PromptSection('separator', "\n\n", PRIORITY_REQUIRED, static=True),
+        PromptSection('intent_analysis', intent_context, PRIORITY_REQUIRED),
+        PromptSection('context_info', f"{context_info}\n\n", PRIORITY_MEDIUM,
+                      summary=f"{truncate_to_tokens(context_info, 200)}\n\n"),
+        PromptSection('course_context', f"{course_context}\n\n", PRIORITY_HIGH,
+                      summary=f"{course_summary}\n\n" if course_summary else None),
+        PromptSection('bonus_context', f"{bonus_context}\n\n", PRIORITY_MEDIUM,
+                      summary=f"{bonus_summary}\n\n" if bonus_summary else None),
+    ]
+
+
+def build_response_generation_prompt(
+    user_message: str,
+    user_memory,
+    intent_analysis: Dict[str, Any],
+    context_info: str = "",
+    course_detailed_info: Union[Dict[str, Any], None] = None,
+    contextual_bonuses: Union[List[Dict[str, Any]], None] = None,
+    bonus_activation_info: Union[Dict[str, Any], None] = None
+) -> SplitPrompt:
+    """
+    Genera el prompt de respuesta como prefijo estático + sufijo dinámico.
+    
+    Args:
+        user_message: Mensaje del líder empresarial
+        user_memory: Memoria empresarial del usuario
+        intent_analysis: Resultado del análisis de intención empresarial
+        context_info: Información adicional de contexto
+        course_detailed_info: Información detallada del curso desde BD (opcional)
+        contextual_bonuses: Lista de bonos contextuales para activar (opcional)
+        bonus_activation_info: Información sobre cuándo/cómo activar bonos (opcional)
+        
+    Returns:
+        SplitPrompt listo para ``to_messages()``
+    """
+    return assemble_split_prompt(
+        RESPONSE_GENERATION_SYSTEM_PREFIX,
+        _get_response_generation_sections(
+            user_message, user_memory, intent_analysis, context_info,
+            course_detailed_info, contextual_bonuses, bonus_activation_info
+        ),
+        PromptConfig.get_prompt_budget('main_agent'),
+        'main_agent'
+    )
 
-**NUEVO - ESTRUCTURA DE RESPUESTA OPTIMIZADA:**
-- **Apertura empática** (1-2 líneas): Reconocer su situación específica
-- **Educación con ROI** (3-4 líneas): Información relevante + beneficios cuantificables
-- **Caso de éxito** (2-3 líneas): Ejemplo específico de su industria
-- **Próximo paso claro** (1-2 líneas): Call-to-action específico
-- **Pregunta de cierre** (1 línea): Mantener conversación activa
 
-**NUEVO - PALABRAS CLAVE PARA CONEXIÓN EMOCIONAL:**
-- "Entiendo que..." (empatía)
-- "Muchos líderes como tú..." (validación social)
-- "Imagina poder..." (visualización de beneficios)
-- "¿Qué te haría sentir..." (pregunta reflexiva)
-- "Juntos podemos..." (colaboración)
-
-RESPONDE COMO BRENDA - CONSULTORA IA PARA PYMES:
-"""
+def get_response_generation_prompt(
+    user_message: str,
+    user_memory,
+    intent_analysis: Dict[str, Any],
+    context_info: str = "",
+    course_detailed_info: Union[Dict[str, Any], None] = None,
+    contextual_bonuses: Union[List[Dict[str, Any]], None] = None,
+    bonus_activation_info: Union[Dict[str, Any], None] = None
+) -> str:
+    """
+    Genera prompt para crear respuesta inteligente orientada a líderes PyME.
+    
+    Versión en un solo texto. Para llamadas a OpenAI usar
+    ``build_response_generation_prompt``.
+    
+    Args:
+        user_message: Mensaje del líder empresarial
+        user_memory: Memoria empresarial del usuario
+        intent_analysis: Resultado del análisis de intención empresarial
+        context_info: Información adicional de contexto
+        course_detailed_info: Información detallada del curso desde BD (opcional)
+        contextual_bonuses: Lista de bonos contextuales para activar (opcional)
+        bonus_activation_info: Información sobre cuándo/cómo activar bonos (opcional)
+        
+    Returns:
+        Prompt completo para generar respuesta empresarial
+    """
+    sections = [
+        PromptSection('system', RESPONSE_GENERATION_HEADER, PRIORITY_REQUIRED, static=True),
+        *_get_response_generation_sections(
+            user_message, user_memory, intent_analysis, context_info,
+            course_detailed_info, contextual_bonuses, bonus_activation_info
+        ),
+        PromptSection('instructions', RESPONSE_GENERATION_INSTRUCTIONS, PRIORITY_REQUIRED, static=True),
+    ]
+    
+    return assemble_prompt(
+        sections, PromptConfig.get_prompt_budget('main_agent'), 'main_agent'
+    ).text
 
 # ============================================================================
 # EJEMPLO DE USO
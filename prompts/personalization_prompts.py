@@ -7,6 +7,11 @@ based on detected buyer personas and user context.
 
 from typing import Dict, Any, Optional
 
+from prompts.agent_prompts import PromptConfig
+from prompts.prompt_assembly import (
+    PromptSection, assemble_prompt, PRIORITY_REQUIRED, PRIORITY_LOW
+)
+
 # Base system prompt for personalized responses
 PERSONALIZATION_SYSTEM_PROMPT = """
 Eres Brenda, asesora especializada en IA aplicada para PyMEs de "Aprenda y Aplique IA". 
@@ -185,26 +190,19 @@ COMMUNICATION_APPROACHES = {
     }
 }
 
-def get_personalized_system_prompt(user_context: Dict[str, Any]) -> str:
+def _build_persona_system_prefix(buyer_persona: Optional[str]) -> str:
     """
-    Generates a personalized system prompt based on user context.
+    Builds the static part of the personalized system prompt for a buyer persona.
     
     Args:
-        user_context: User context with buyer persona and profile information
+        buyer_persona: Buyer persona identifier (unknown personas use the general profile)
         
     Returns:
-        Personalized system prompt for AI generation
+        System prompt prefix that only depends on the buyer persona
     """
-    
-    buyer_persona = user_context.get('user_profile', {}).get('buyer_persona', 'unknown')
-    professional_level = user_context.get('user_profile', {}).get('professional_level', 'unknown')
-    company_size = user_context.get('user_profile', {}).get('company_size', 'unknown')
-    
-    # Get buyer persona specific context
     persona_info = BUYER_PERSONA_PROMPTS.get(buyer_persona, {})
     
-    # Build personalized prompt
-    personalized_prompt = f"""
+    return f"""
 {PERSONALIZATION_SYSTEM_PROMPT}
 
 {persona_info.get('context', 'USUARIO GENERAL')}
@@ -212,8 +210,6 @@ def get_personalized_system_prompt(user_context: Dict[str, Any]) -> str:
 ESTILO DE COMUNICACIÓN PERSONALIZADO:
 - Enfoque: {persona_info.get('communication_style', 'profesional_general')}
 - Nivel de lenguaje: {persona_info.get('language_level', 'intermedio_negocios')}
-- Tamaño de empresa: {company_size}
-- Nivel profesional: {professional_level}
 
 BENEFICIOS CLAVE PARA ESTE PERFIL:
 {chr(10).join([f"• {benefit}" for benefit in persona_info.get('key_benefits', ['Beneficios generales de IA'])])}
@@ -228,8 +224,55 @@ INSTRUCCIONES ESPECÍFICAS:
 4. Adapta el nivel de detalle técnico según su perfil
 5. Mantén el enfoque en valor empresarial y ROI
 """
+
+# Precompiled system prefixes (built once at import, reused byte-identically
+# so the provider's prompt caching can match them)
+PERSONA_SYSTEM_PREFIXES = {
+    buyer_persona: _build_persona_system_prefix(buyer_persona)
+    for buyer_persona in BUYER_PERSONA_PROMPTS
+}
+DEFAULT_PERSONA_SYSTEM_PREFIX = _build_persona_system_prefix(None)
+
+def get_persona_system_prefix(buyer_persona: Optional[str]) -> str:
+    """Returns the precompiled system prefix for a buyer persona."""
+    return PERSONA_SYSTEM_PREFIXES.get(buyer_persona, DEFAULT_PERSONA_SYSTEM_PREFIX)
+
+def get_personalized_system_prompt(user_context: Dict[str, Any]) -> str:
+    """
+    Generates a personalized system prompt based on user context.
+    
+    The buyer persona part is a precompiled prefix; only the company size and
+    professional level are appended per call.
+    
+    Args:
+        user_context: User context with buyer persona and profile information
+        
+    Returns:
+        Personalized system prompt for AI generation
+    """
     
-    return personalized_prompt
+    buyer_persona = user_context.get('user_profile', {}).get('buyer_persona', 'unknown')
+    professional_level = user_context.get('user_profile', {}).get('professional_level', 'unknown')
+    company_size = user_context.get('user_profile', {}).get('company_size', 'unknown')
+    
+    return f"""{get_persona_system_prefix(buyer_persona)}
+PERFIL DEL USUARIO:
+- Tamaño de empresa: {company_size}
+- Nivel profesional: {professional_level}
+"""
+
+# Static instructions for the personalized response prompt
+PERSONALIZED_RESPONSE_INSTRUCTIONS = """
+INSTRUCCIONES PARA LA RESPUESTA:
+1. Personaliza completamente basándote en el buyer persona indicado
+2. Aborda directamente los pain points mencionados
+3. Usa ejemplos específicos para su industria y rol
+4. Si hay señales de urgencia, ajusta el tono apropiadamente
+5. Proporciona valor inmediato en tu respuesta
+6. Incluye call-to-action relevante a su nivel de decisión
+
+OBJETIVO: Generar una respuesta que demuestre comprensión profunda de su negocio y necesidades específicas.
+"""
 
 def get_personalized_response_prompt(
     user_message: str,
@@ -253,28 +296,29 @@ def get_personalized_response_prompt(
     automation_needs = user_context.get('interests_and_needs', {}).get('automation_needs', {})
     urgency_signals = user_context.get('communication_context', {}).get('urgency_signals', [])
     
-    response_prompt = f"""
+    user_context_text = f"""
 MENSAJE DEL USUARIO: "{user_message}"
 
 CONTEXTO PERSONALIZADO:
 - Buyer Persona: {buyer_persona}
 - Pain Points identificados: {', '.join(pain_points[:3]) if pain_points else 'Por identificar'}
 - Necesidades de automatización: {str(automation_needs)[:100] if automation_needs else 'Por explorar'}
-- Señales de urgencia: {', '.join(urgency_signals) if urgency_signals else 'Ninguna'}
-- Intención de conversación: {conversation_intent}
-
-INSTRUCCIONES PARA LA RESPUESTA:
-1. Personaliza completamente basándote en el buyer persona {buyer_persona}
-2. Aborda directamente los pain points mencionados
-3. Usa ejemplos específicos para su industria y rol
-4. Si hay señales de urgencia, ajusta el tono apropiadamente
-5. Proporciona valor inmediato en tu respuesta
-6. Incluye call-to-action relevante a su nivel de decisión
-
-OBJETIVO: Generar una respuesta que demuestre comprensión profunda de su negocio y necesidades específicas.
 """
     
-    return response_prompt
+    # Las señales de urgencia se acumulan sin límite en la memoria: se resumen si exceden el presupuesto
+    urgency_text = f"- Señales de urgencia: {', '.join(urgency_signals) if urgency_signals else 'Ninguna'}\n"
+    urgency_summary = f"- Señales de urgencia: {', '.join(urgency_signals[-3:])}\n" if urgency_signals else None
+    
+    sections = [
+        PromptSection('user_context', user_context_text, PRIORITY_REQUIRED),
+        PromptSection('urgency_signals', urgency_text, PRIORITY_LOW, summary=urgency_summary),
+        PromptSection('conversation_intent', f"- Intención de conversación: {conversation_intent}\n", PRIORITY_REQUIRED),
+        PromptSection('instructions', PERSONALIZED_RESPONSE_INSTRUCTIONS, PRIORITY_REQUIRED, static=True),
+    ]
+    
+    return assemble_prompt(
+        sections, PromptConfig.get_prompt_budget('personalized_response'), 'personalized_response'
+    ).text
 
 def get_buyer_persona_examples(buyer_persona: str) -> Dict[str, Any]:
     """
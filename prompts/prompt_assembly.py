@@ -0,0 +1,263 @@
+"""
+ENSAMBLADO DE PROMPTS CON PRESUPUESTO DE TOKENS
+===============================================
+Los prompts se arman como una lista de secciones con prioridad. Si el total
+excede el presupuesto del tipo de prompt, primero se resumen y después se
+eliminan las secciones de menor prioridad (volcados de memoria, mensajes
+recientes, etc.). Las secciones requeridas nunca se tocan.
+
+El conteo de tokens es local: usa ``tiktoken`` si está instalado y, si no,
+una estimación por caracteres. El conteo de las secciones estáticas se
+cachea, así que solo se cuenta el texto dinámico en cada llamada.
+
+Los prompts grandes se dividen en un prefijo estático (precompilado al
+importar y enviado idéntico como mensaje ``system``, lo que aprovecha el
+prompt caching del proveedor) y un sufijo dinámico corto.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prioridades de sección (mayor = más importante)
+PRIORITY_REQUIRED = 100
+PRIORITY_HIGH = 75
+PRIORITY_MEDIUM = 50
+PRIORITY_LOW = 25
+
+# Promedio aproximado de caracteres por token en español
+CHARS_PER_TOKEN = 3.6
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken es opcional
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Cuenta tokens de un texto de forma local.
+
+    Args:
+        text: Texto a medir
+
+    Returns:
+        Número de tokens (exacto con tiktoken, estimado sin él)
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+@lru_cache(maxsize=256)
+def count_static_tokens(text: str) -> int:
+    """Cuenta tokens de texto estático (plantillas) con cache."""
+    return count_tokens(text)
+
+
+def max_tokens_bound(text: str) -> int:
+    """
+    Cota superior barata de tokens: ningún token ocupa menos de un byte.
+
+    Permite saltarse la tokenización cuando el prompt cabe holgadamente.
+    Sin ``tiktoken`` la estimación por caracteres ya es barata y se usa tal cual.
+    """
+    if _encoding is None:
+        return count_tokens(text)
+    return len(text.encode("utf-8"))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "...") -> str:
+    """
+    Recorta un texto para que no exceda ``max_tokens``.
+
+    Args:
+        text: Texto a recortar
+        max_tokens: Máximo de tokens permitidos
+        suffix: Marca que se agrega al texto recortado
+
+    Returns:
+        Texto recortado (o el original si ya cabe)
+    """
+    if max_tokens_bound(text) <= max_tokens or count_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, int(max_tokens * CHARS_PER_TOKEN) - len(suffix))
+    return text[:max_chars].rstrip() + suffix
+
+
+@dataclass
+class PromptSection:
+    """Fragmento de prompt con prioridad para el recorte por presupuesto."""
+    name: str
+    text: str
+    priority: int = PRIORITY_MEDIUM
+    summary: Optional[str] = None  # versión reducida usada antes de eliminar
+    static: bool = False  # texto constante: su conteo se cachea
+
+    @property
+    def required(self) -> bool:
+        return self.priority >= PRIORITY_REQUIRED
+
+    def token_count(self) -> int:
+        if self.static:
+            return count_static_tokens(self.text)
+        return count_tokens(self.text)
+
+    def token_bound(self) -> int:
+        if self.static:
+            return count_static_tokens(self.text)
+        return max_tokens_bound(self.text)
+
+
+@dataclass
+class AssembledPrompt:
+    """Resultado del ensamblado de un prompt."""
+    text: str
+    budget: Optional[int]
+    summarized_sections: List[str] = field(default_factory=list)
+    dropped_sections: List[str] = field(default_factory=list)
+    _token_count: Optional[int] = field(default=None, repr=False)
+
+    @property
+    def token_count(self) -> int:
+        """Tokens del prompt final (se calcula bajo demanda si no hubo recorte)."""
+        if self._token_count is None:
+            self._token_count = count_tokens(self.text)
+        return self._token_count
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.token_count > self.budget
+
+
+def assemble_prompt(
+    sections: List[PromptSection],
+    budget_tokens: Optional[int] = None,
+    prompt_type: str = ""
+) -> AssembledPrompt:
+    """
+    Ensambla las secciones respetando el presupuesto de tokens.
+
+    Las secciones se concatenan en su orden original (cada una incluye sus
+    propios saltos de línea). Mientras se exceda el presupuesto, las secciones
+    opcionales se reemplazan por su resumen empezando por la de menor
+    prioridad; si aun así no cabe, se eliminan en el mismo orden.
+
+    Args:
+        sections: Secciones del prompt en orden
+        budget_tokens: Presupuesto de tokens (None = sin límite)
+        prompt_type: Tipo de prompt, solo para logging
+
+    Returns:
+        AssembledPrompt con el texto final y el detalle del recorte
+    """
+    texts = [section.text for section in sections]
+    summarized: List[str] = []
+    dropped: List[str] = []
+
+    # Camino rápido: si la cota por bytes cabe, no hace falta tokenizar
+    if budget_tokens is None or sum(section.token_bound() for section in sections) <= budget_tokens:
+        return AssembledPrompt(text="".join(texts), budget=budget_tokens)
+
+    counts = [section.token_count() for section in sections]
+    total = sum(counts)
+
+    if total > budget_tokens:
+        # Candidatas en orden de menor prioridad; a igual prioridad, la última primero
+        candidates = sorted(
+            (index for index, section in enumerate(sections) if not section.required),
+            key=lambda index: (sections[index].priority, -index)
+        )
+        # Primera pasada: resumir; segunda pasada: eliminar
+        for index in candidates:
+            if total <= budget_tokens:
+                break
+            section = sections[index]
+            if section.summary is None:
+                continue
+            summary_count = count_tokens(section.summary)
+            if summary_count < counts[index]:
+                total += summary_count - counts[index]
+                texts[index], counts[index] = section.summary, summary_count
+                summarized.append(section.name)
+
+        for index in candidates:
+            if total <= budget_tokens:
+                break
+            section = sections[index]
+            total -= counts[index]
+            texts[index], counts[index] = "", 0
+            dropped.append(section.name)
+            if section.name in summarized:
+                summarized.remove(section.name)
+
+        if total > budget_tokens:
+            logger.warning(
+                f"⚠️ Prompt '{prompt_type}' excede presupuesto aun sin secciones opcionales: "
+                f"{total}/{budget_tokens} tokens"
+            )
+        else:
+            logger.info(
+                f"✂️ Prompt '{prompt_type}' recortado a {total}/{budget_tokens} tokens "
+                f"(resumidas: {summarized}, eliminadas: {dropped})"
+            )
+
+    return AssembledPrompt(
+        text="".join(texts),
+        budget=budget_tokens,
+        summarized_sections=summarized,
+        dropped_sections=dropped,
+        _token_count=total
+    )
+
+
+@dataclass(frozen=True)
+class SplitPrompt:
+    """Prompt dividido en prefijo estático reutilizable y sufijo dinámico."""
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.suffix
+
+    def to_messages(self) -> List[Dict[str, str]]:
+        """Mensajes para chat completions: el prefijo va primero para maximizar cache hits."""
+        return [
+            {"role": "system", "content": self.prefix},
+            {"role": "user", "content": self.suffix}
+        ]
+
+
+def assemble_split_prompt(
+    prefix: str,
+    sections: List[PromptSection],
+    budget_tokens: Optional[int] = None,
+    prompt_type: str = ""
+) -> SplitPrompt:
+    """
+    Ensambla solo las secciones dinámicas detrás de un prefijo precompilado.
+
+    El presupuesto aplica al prompt completo: al sufijo le queda lo que no
+    ocupa el prefijo (cuyo conteo está cacheado).
+
+    Args:
+        prefix: Texto estático, construido una sola vez al importar
+        sections: Secciones dinámicas en orden
+        budget_tokens: Presupuesto total de tokens (None = sin límite)
+        prompt_type: Tipo de prompt, solo para logging
+
+    Returns:
+        SplitPrompt con el prefijo intacto y el sufijo recortado
+    """
+    suffix_budget = None
+    if budget_tokens is not None:
+        suffix_budget = max(0, budget_tokens - count_static_tokens(prefix))
+    assembled = assemble_prompt(sections, suffix_budget, prompt_type)
+    return SplitPrompt(prefix=prefix, suffix=assembled.text)